@@ -0,0 +1,36 @@
+"""add print_time_calibrations table
+
+Revision ID: 003_add_print_time_calibrations
+Revises: 002_add_modelmetadata
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_add_print_time_calibrations'
+down_revision = '002_add_modelmetadata'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'print_time_calibrations',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('material', sa.String(length=50), nullable=False),
+        sa.Column('printer_profile', sa.String(length=50), nullable=False),
+        sa.Column('feature_names', sa.JSON, nullable=False),
+        sa.Column('coefficients', sa.JSON, nullable=False),
+        sa.Column('alpha', sa.Float, nullable=False),
+        sa.Column('n_samples', sa.Integer, nullable=False),
+        sa.Column('mape', sa.Float, nullable=True),
+        sa.Column('baseline_mape', sa.Float, nullable=True),
+        sa.Column('fitted_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint('material', 'printer_profile', name='uq_print_time_calibrations_group'),
+    )
+
+
+def downgrade():
+    op.drop_table('print_time_calibrations')
@@ -0,0 +1,31 @@
+"""add model_shape_descriptors table
+
+Revision ID: 004_add_model_shape_descriptors
+Revises: 003_add_print_time_calibrations
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_add_model_shape_descriptors'
+down_revision = '003_add_print_time_calibrations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'model_shape_descriptors',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('model_id', sa.String(length=36), nullable=False, unique=True, index=True),
+        sa.Column('model_file_id', sa.Integer, sa.ForeignKey('model_files.id'), nullable=True),
+        sa.Column('version', sa.Integer, nullable=False, server_default='1'),
+        sa.Column('descriptor', sa.LargeBinary, nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table('model_shape_descriptors')
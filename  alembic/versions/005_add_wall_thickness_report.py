@@ -0,0 +1,23 @@
+"""add wall_thickness_report to model_metadata
+
+Revision ID: 005_add_wall_thickness_report
+Revises: 004_add_model_shape_descriptors
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_add_wall_thickness_report'
+down_revision = '004_add_model_shape_descriptors'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('model_metadata', sa.Column('wall_thickness_report', sa.JSON, nullable=True))
+
+
+def downgrade():
+    op.drop_column('model_metadata', 'wall_thickness_report')
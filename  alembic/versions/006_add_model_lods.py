@@ -0,0 +1,36 @@
+"""add model_lods table
+
+Revision ID: 006_add_model_lods
+Revises: 005_add_wall_thickness_report
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_add_model_lods'
+down_revision = '005_add_wall_thickness_report'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'model_lods',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('model_id', sa.String(length=36), nullable=False, index=True),
+        sa.Column('level', sa.Integer, nullable=False),
+        sa.Column('triangle_count', sa.Integer, nullable=False),
+        sa.Column('size_bytes', sa.Integer, nullable=False),
+        sa.Column('content_key', sa.String(length=64), nullable=False),
+        sa.Column('cell_size_mm', sa.Float, nullable=False, server_default='0'),
+        sa.Column('max_error_mm', sa.Float, nullable=False, server_default='0'),
+        sa.Column('mean_error_mm', sa.Float, nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.UniqueConstraint('model_id', 'level', name='uq_model_lods_level'),
+    )
+
+
+def downgrade():
+    op.drop_table('model_lods')
@@ -0,0 +1,27 @@
+"""add PMQ archive columns to model_files
+
+Revision ID: 007_add_model_file_archive
+Revises: 006_add_model_lods
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_add_model_file_archive'
+down_revision = '006_add_model_lods'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('model_files', sa.Column('archive_key', sa.String(length=64), nullable=True))
+    op.add_column('model_files', sa.Column('archive_size', sa.Integer, nullable=True))
+    op.add_column('model_files', sa.Column('archive_precision_mm', sa.Float, nullable=True))
+
+
+def downgrade():
+    op.drop_column('model_files', 'archive_precision_mm')
+    op.drop_column('model_files', 'archive_size')
+    op.drop_column('model_files', 'archive_key')
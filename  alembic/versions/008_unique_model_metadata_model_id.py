@@ -0,0 +1,68 @@
+"""deduplicate model_metadata and make model_id unique
+
+Revision ID: 008_unique_model_metadata_model_id
+Revises: 007_add_model_file_archive
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from itertools import groupby
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_unique_model_metadata_model_id'
+down_revision = '007_add_model_file_archive'
+branch_labels = None
+depends_on = None
+
+MERGED_COLUMNS = (
+    sa.column('seo_title', sa.String),
+    sa.column('market_description', sa.Text),
+    sa.column('tags', sa.JSON(none_as_null=True)),
+    sa.column('vertices', sa.Integer),
+    sa.column('polygons', sa.Integer),
+    sa.column('file_size_kb', sa.Float),
+    sa.column('complexity_score', sa.Float),
+    sa.column('estimated_time_minutes', sa.Float),
+    sa.column('wall_thickness_report', sa.JSON(none_as_null=True)),
+)
+
+
+def upgrade():
+    # Conserva la fila más reciente de cada model_id y completa sus columnas
+    # vacías con el último valor no nulo de las duplicadas
+    bind = op.get_bind()
+    model_metadata = sa.table(
+        'model_metadata', sa.column('id', sa.Integer), sa.column('model_id', sa.String), *MERGED_COLUMNS
+    )
+    duplicated = (
+        sa.select(model_metadata.c.model_id)
+        .group_by(model_metadata.c.model_id)
+        .having(sa.func.count() > 1)
+    )
+    rows = bind.execute(
+        sa.select(model_metadata)
+        .where(model_metadata.c.model_id.in_(duplicated))
+        .order_by(model_metadata.c.model_id, model_metadata.c.id)
+    ).mappings().all()
+
+    for model_id, group in groupby(rows, key=lambda row: row['model_id']):
+        group = list(group)
+        keeper = group[-1]['id']
+        merged = {
+            column.name: next((row[column.name] for row in reversed(group) if row[column.name] is not None), None)
+            for column in MERGED_COLUMNS
+        }
+        bind.execute(model_metadata.update().where(model_metadata.c.id == keeper).values(**merged))
+        bind.execute(
+            model_metadata.delete().where(model_metadata.c.model_id == model_id, model_metadata.c.id != keeper)
+        )
+
+    op.drop_index('ix_model_metadata_model_id', table_name='model_metadata')
+    op.create_index('ix_model_metadata_model_id', 'model_metadata', ['model_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_model_metadata_model_id', table_name='model_metadata')
+    op.create_index('ix_model_metadata_model_id', 'model_metadata', ['model_id'], unique=False)
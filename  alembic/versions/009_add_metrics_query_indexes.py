@@ -0,0 +1,46 @@
+"""add composite and partial indexes for the business metrics queries
+
+Revision ID: 009_add_metrics_query_indexes
+Revises: 008_unique_model_metadata_model_id
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009_add_metrics_query_indexes'
+down_revision = '008_unique_model_metadata_model_id'
+branch_labels = None
+depends_on = None
+
+# Proposed by scripts/index_advisor.py for the MetricsCollector query shapes
+INDEXES = (
+    ('ix_projects_status_updated_at', 'projects', ['status', 'updated_at'], None),
+    ('ix_users_role_updated_at', 'users', ['role', 'updated_at'], None),
+    ('ix_users_role_created_at', 'users', ['role', 'created_at'], None),
+    ('ix_quotes_status', 'quotes', ['status'], None),
+    ('ix_materials_current_stock_partial', 'materials', ['current_stock'], 'current_stock <= low_stock_threshold'),
+)
+
+
+def upgrade():
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; it does not
+    # block writes while the index builds
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
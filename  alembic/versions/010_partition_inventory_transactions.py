@@ -0,0 +1,184 @@
+"""partition inventory_transactions by month and add daily stock rollups
+
+Revision ID: 010_partition_inventory_transactions
+Revises: 009_add_metrics_query_indexes
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from datetime import date, datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_partition_inventory_transactions'
+down_revision = '009_add_metrics_query_indexes'
+branch_labels = None
+depends_on = None
+
+LEDGER_INDEX = 'ix_inventory_transactions_material_id_created_at'
+# Monthly partitions created ahead of time; later ones come from the
+# ensure_inventory_partitions beat task
+MONTHS_AHEAD = 3
+COLUMNS = 'id, created_at, updated_at, is_active, transaction_type, quantity, unit_cost, reference, notes, material_id'
+# UTC day of a ledger row, as app.services.inventory_ledger computes it
+LEDGER_DAY = {
+    'postgresql': "(created_at AT TIME ZONE 'UTC')::date",
+    'sqlite': 'date(created_at)',
+}
+DEFAULT_LEDGER_DAY = 'CAST(created_at AS DATE)'
+# Sign of each movement on stock (inventory_ledger.ledger_delta); adjustments carry
+# their own and unknown types do not move stock
+STOCK_DELTA = (
+    "CASE WHEN transaction_type IN ('purchase', 'return', 'adjustment') THEN quantity "
+    "WHEN transaction_type IN ('usage', 'waste') THEN -quantity ELSE 0 END"
+)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _create_month_partitions(first_month, months_ahead):
+    today = datetime.now(timezone.utc).date().replace(day=1)
+    month, last = first_month, _add_months(today, months_ahead)
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE IF NOT EXISTS inventory_transactions_y{month:%Y}m{month:%m} "
+            f"PARTITION OF inventory_transactions FOR VALUES FROM ('{month}') TO ('{upper}')"
+        )
+        month = upper
+
+
+def _free_relation_names(table):
+    # Index and primary key names live in the schema namespace and would
+    # clash with the ones of the replacement table
+    op.drop_index(op.f('ix_inventory_transactions_id'), table_name=table)
+    op.execute(f'ALTER TABLE {table} RENAME CONSTRAINT inventory_transactions_pkey TO {table}_pkey')
+
+
+def _backfill_rollups(dialect_name):
+    # Same rows as inventory_ledger.rebuild_rollups: daily in/out totals and
+    # the running closing stock per material, in one grouped INSERT ... SELECT
+    day = LEDGER_DAY.get(dialect_name, DEFAULT_LEDGER_DAY)
+    op.execute(f"""
+        INSERT INTO material_stock_daily
+            (material_id, day, quantity_in, quantity_out, transaction_count, closing_stock)
+        SELECT material_id, day, quantity_in, quantity_out, transaction_count,
+               SUM(quantity_in - quantity_out) OVER (PARTITION BY material_id ORDER BY day)
+        FROM (
+            SELECT material_id,
+                   {day} AS day,
+                   SUM(CASE WHEN delta > 0 THEN delta ELSE 0 END) AS quantity_in,
+                   SUM(CASE WHEN delta < 0 THEN -delta ELSE 0 END) AS quantity_out,
+                   COUNT(*) AS transaction_count
+            FROM (
+                SELECT material_id, created_at, {STOCK_DELTA} AS delta
+                FROM inventory_transactions
+                WHERE material_id IS NOT NULL AND created_at IS NOT NULL
+            ) AS moves
+            GROUP BY material_id, {day}
+        ) AS days
+    """)
+
+
+def upgrade():
+    op.create_table('material_stock_daily',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('material_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('quantity_in', sa.Float(), nullable=False),
+        sa.Column('quantity_out', sa.Float(), nullable=False),
+        sa.Column('transaction_count', sa.Integer(), nullable=False),
+        sa.Column('closing_stock', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['material_id'], ['materials.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('material_id', 'day', name='uq_material_stock_daily_day'),
+    )
+    op.create_index(op.f('ix_material_stock_daily_id'), 'material_stock_daily', ['id'], unique=False)
+
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        # No declarative partitioning: one table clustered by material and time
+        op.create_index(LEDGER_INDEX, 'inventory_transactions', ['material_id', 'created_at'])
+        _backfill_rollups(bind.dialect.name)
+        return
+
+    # A partitioned table needs the partition key in every unique constraint,
+    # so the primary key becomes (id, created_at) and created_at NOT NULL
+    op.rename_table('inventory_transactions', 'inventory_transactions_unpartitioned')
+    _free_relation_names('inventory_transactions_unpartitioned')
+    op.execute('ALTER SEQUENCE inventory_transactions_id_seq OWNED BY NONE')
+    op.execute("""
+        CREATE TABLE inventory_transactions (
+            id INTEGER NOT NULL DEFAULT nextval('inventory_transactions_id_seq'),
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            updated_at TIMESTAMP WITH TIME ZONE,
+            is_active BOOLEAN,
+            transaction_type VARCHAR(20) NOT NULL,
+            quantity FLOAT NOT NULL,
+            unit_cost FLOAT,
+            reference VARCHAR(100),
+            notes TEXT,
+            material_id INTEGER REFERENCES materials (id),
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute('CREATE TABLE inventory_transactions_default PARTITION OF inventory_transactions DEFAULT')
+
+    oldest = bind.execute(sa.text(
+        'SELECT min(coalesce(created_at, updated_at)) FROM inventory_transactions_unpartitioned'
+    )).scalar()
+    now = datetime.now(timezone.utc).date().replace(day=1)
+    first_month = min(oldest.date().replace(day=1), now) if oldest else now
+    _create_month_partitions(first_month, MONTHS_AHEAD)
+
+    op.execute(
+        f"INSERT INTO inventory_transactions ({COLUMNS}) "
+        f"SELECT {COLUMNS.replace('created_at', 'coalesce(created_at, updated_at, now())', 1)} "
+        f"FROM inventory_transactions_unpartitioned"
+    )
+    op.drop_table('inventory_transactions_unpartitioned')
+    op.execute('ALTER SEQUENCE inventory_transactions_id_seq OWNED BY inventory_transactions.id')
+    # Created on the parent, the index is created on every partition
+    op.create_index(LEDGER_INDEX, 'inventory_transactions', ['material_id', 'created_at'])
+    op.create_index(op.f('ix_inventory_transactions_id'), 'inventory_transactions', ['id'], unique=False)
+    _backfill_rollups(bind.dialect.name)
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.rename_table('inventory_transactions', 'inventory_transactions_partitioned')
+        _free_relation_names('inventory_transactions_partitioned')
+        op.drop_index(LEDGER_INDEX, table_name='inventory_transactions_partitioned')
+        op.execute('ALTER SEQUENCE inventory_transactions_id_seq OWNED BY NONE')
+        op.create_table('inventory_transactions',
+            sa.Column('id', sa.Integer(), server_default=sa.text("nextval('inventory_transactions_id_seq')"), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('transaction_type', sa.String(length=20), nullable=False),
+            sa.Column('quantity', sa.Float(), nullable=False),
+            sa.Column('unit_cost', sa.Float(), nullable=True),
+            sa.Column('reference', sa.String(length=100), nullable=True),
+            sa.Column('notes', sa.Text(), nullable=True),
+            sa.Column('material_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['material_id'], ['materials.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.execute(
+            f"INSERT INTO inventory_transactions ({COLUMNS}) "
+            f"SELECT {COLUMNS} FROM inventory_transactions_partitioned"
+        )
+        # Dropping the parent drops every partition
+        op.drop_table('inventory_transactions_partitioned')
+        op.execute('ALTER SEQUENCE inventory_transactions_id_seq OWNED BY inventory_transactions.id')
+        op.create_index(op.f('ix_inventory_transactions_id'), 'inventory_transactions', ['id'], unique=False)
+    else:
+        op.drop_index(LEDGER_INDEX, table_name='inventory_transactions')
+
+    op.drop_index(op.f('ix_material_stock_daily_id'), table_name='material_stock_daily')
+    op.drop_table('material_stock_daily')
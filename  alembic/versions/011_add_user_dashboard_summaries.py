@@ -0,0 +1,45 @@
+"""add user_dashboard_summaries
+
+Revision ID: 011_add_user_dashboard_summaries
+Revises: 010_partition_inventory_transactions
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_add_user_dashboard_summaries'
+down_revision = '010_partition_inventory_transactions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are filled on first read and by the reconcile_dashboard_summaries task
+    op.create_table('user_dashboard_summaries',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('projects_planning', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('projects_in_progress', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('projects_on_hold', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('projects_completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('projects_cancelled', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('quotes_total', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('quotes_draft', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('quotes_sent', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('quotes_accepted', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('quotes_rejected', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('quotes_value_total', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('materials_low_stock', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('marketplace_views', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('marketplace_downloads', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('marketplace_revenue', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('user_dashboard_summaries')
@@ -0,0 +1,68 @@
+"""add model_metadata.task_id and normalize model_metadata.tags online
+
+Revision ID: 012_add_model_metadata_task_id
+Revises: 011_add_user_dashboard_summaries
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.online_migration import add_column, backfill, create_index_concurrently, drop_index_concurrently
+from app.services.metadata_store import normalize_tags
+
+# revision identifiers, used by Alembic.
+revision = '012_add_model_metadata_task_id'
+down_revision = '011_add_user_dashboard_summaries'
+branch_labels = None
+depends_on = None
+
+TASK_ID_INDEX = 'ix_model_metadata_task_id'
+TAGS_BACKFILL = f'{revision}:normalize_tags'
+
+model_metadata = sa.table(
+    'model_metadata',
+    sa.column('id', sa.Integer),
+    sa.column('tags', sa.JSON),
+)
+
+
+def _normalize_tags_batch(conn, rows):
+    changed = []
+    for row_id, tags in rows:
+        normalized = normalize_tags(tags)
+        if normalized != tags:
+            changed.append({'row_id': row_id, 'new_tags': normalized})
+    if changed:
+        conn.execute(
+            model_metadata.update()
+            .where(model_metadata.c.id == sa.bindparam('row_id'))
+            .values(tags=sa.bindparam('new_tags')),
+            changed,
+        )
+    return len(changed)
+
+
+def upgrade():
+    # Nullable without default: a catalog-only change, under the lock budget.
+    # Existing rows keep NULL (earlier task ids only live in the result backend)
+    add_column(op, 'model_metadata', sa.Column('task_id', sa.String(length=155), nullable=True))
+    create_index_concurrently(op, TASK_ID_INDEX, 'model_metadata', ['task_id'])
+    # Throttled keyset batches with a checkpoint; rerunning the upgrade
+    # resumes after the last committed batch
+    with op.get_context().autocommit_block():
+        backfill(
+            op.get_bind().engine,
+            TAGS_BACKFILL,
+            model_metadata,
+            _normalize_tags_batch,
+            columns=[model_metadata.c.tags],
+            where=model_metadata.c.tags.isnot(None),
+        )
+
+
+def downgrade():
+    # The tags normalization is not reverted
+    drop_index_concurrently(op, TASK_ID_INDEX, 'model_metadata')
+    op.drop_column('model_metadata', 'task_id')
+    op.execute(sa.text("DELETE FROM online_migration_checkpoints WHERE name = :name").bindparams(name=TAGS_BACKFILL))
@@ -0,0 +1,43 @@
+"""add tenant_shards directory for sharding by user_id
+
+Revision ID: 013_add_tenant_shards
+Revises: 012_add_model_metadata_task_id
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_add_tenant_shards'
+down_revision = '012_add_model_metadata_task_id'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tenant_shards',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('shard', sa.String(length=50), nullable=False),
+        sa.Column('state', sa.String(length=20), nullable=False, server_default='active'),
+        sa.Column('moving_to', sa.String(length=50), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index(op.f('ix_tenant_shards_shard'), 'tenant_shards', ['shard'], unique=False)
+    # Existing tenants keep their rows on the primary ("default" shard)
+    op.execute("INSERT INTO tenant_shards (user_id, shard, state) SELECT id, 'default', 'active' FROM users")
+    # Shape descriptors stay on the primary (the similarity index is global),
+    # so their model file may live on another shard: keep the id, drop the FK
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_constraint('model_shape_descriptors_model_file_id_fkey', 'model_shape_descriptors', type_='foreignkey')
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_foreign_key(
+            'model_shape_descriptors_model_file_id_fkey', 'model_shape_descriptors',
+            'model_files', ['model_file_id'], ['id'],
+        )
+    op.drop_index(op.f('ix_tenant_shards_shard'), table_name='tenant_shards')
+    op.drop_table('tenant_shards')
@@ -0,0 +1,28 @@
+"""add model_metadata.raw_time_minutes, the uncalibrated print-time estimate
+
+Revision ID: 014_add_model_metadata_raw_time
+Revises: 013_add_tenant_shards
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.online_migration import add_column
+
+# revision identifiers, used by Alembic.
+revision = '014_add_model_metadata_raw_time'
+down_revision = '013_add_tenant_shards'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable without default: a catalog-only change, under the lock budget.
+    # Not backfilled: estimated_time_minutes already holds calibrated values,
+    # so the calibration trains only on predictions made from now on
+    add_column(op, 'model_metadata', sa.Column('raw_time_minutes', sa.Float(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('model_metadata', 'raw_time_minutes')
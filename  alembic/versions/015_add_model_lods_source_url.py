@@ -0,0 +1,34 @@
+"""add model_lods.source_url: level 0 references the original file
+
+Revision ID: 015_add_model_lods_source_url
+Revises: 014_add_model_metadata_raw_time
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.online_migration import add_column, with_lock_budget
+
+# revision identifiers, used by Alembic.
+revision = '015_add_model_lods_source_url'
+down_revision = '014_add_model_metadata_raw_time'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Both are catalog-only changes, under the lock budget. Existing level 0
+    # rows keep their stored copy until the model's LODs are regenerated
+    add_column(op, 'model_lods', sa.Column('source_url', sa.String(length=2048), nullable=True))
+    with_lock_budget(
+        op.get_bind(),
+        lambda: op.alter_column('model_lods', 'content_key', existing_type=sa.String(length=64), nullable=True),
+    )
+
+
+def downgrade():
+    # Rows that only reference their source cannot satisfy NOT NULL
+    op.execute("DELETE FROM model_lods WHERE content_key IS NULL")
+    op.alter_column('model_lods', 'content_key', existing_type=sa.String(length=64), nullable=False)
+    op.drop_column('model_lods', 'source_url')
@@ -1,24 +1,45 @@
 # app/api/ai.py
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+import os
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from app.schemas.ai_task import (
     ComplexityRequest,
     PrintTimeRequest,
     MetadataResponse,
     ComplexityReport,
     PrintTimeResponse,
+    PrintTimeCalibrationReport,
+    SimilarModelsResponse,
+    WallThicknessReport,
+    ModelLodsResponse,
+    ModelMetadataPage,
 )
 from app.tasks.ai_tasks import (
     generate_seo_title_task,
     generate_market_description_task,
-    generate_tags_task,
+    generate_tags_batch,
     analyze_complexity_task,
     predict_print_time_task,
+    index_model_shape_task,
+    analyze_wall_thickness_task,
+    generate_model_lods_task,
 )
+from app.api.deps import get_async_db, get_async_read_db, run_in_session
 from app.core.celery import celery_app
-from app.db.session import SessionLocal
 from app.db.models import ModelMetadata
+from app.db.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, apaginate
+from app.db.queries import LODS_FOR_MODEL, METADATA_BY_MODEL_ID, METADATA_BY_TASK_ID
+from app.services.print_time_calibration import PrintTimeCalibrator
+from app.services.shape_index import find_similar_models
+from app.services.content_store import content_store
+from app.services.mesh_io import MeshLoadError, local_path
+from app.services.mesh_lod import select_lod
+from app.services.metadata_store import metadata_upsert
 
 router = APIRouter(prefix="/api/v1/ai", tags=["AI"])
 
@@ -46,7 +67,8 @@ async def enqueue_description(model_id: str):
     summary="Encola generación de tags inteligentes",
 )
 async def enqueue_tags(model_id: str):
-    task = generate_tags_task.delay(model_id)
+    # En micro-lotes: una llamada a OpenAI y un upsert por lote de modelos
+    task = generate_tags_batch.submit(key=model_id)
     return JSONResponse({"task_id": task.id, "status": "queued"})
 
 @router.post(
@@ -55,7 +77,11 @@ async def enqueue_tags(model_id: str):
     summary="Encola análisis de complejidad de modelo",
 )
 async def enqueue_complexity(model_id: str, request: ComplexityRequest):
-    task = analyze_complexity_task.delay(request.model_file_url, model_id)
+    # Etapa siguiente al terminar: vistas previas livianas para el dashboard
+    task = analyze_complexity_task.apply_async(
+        (request.model_file_url, model_id),
+        link=generate_model_lods_task.si(request.model_file_url, model_id),
+    )
     return JSONResponse({"task_id": task.id, "status": "queued"})
 
 @router.post(
@@ -67,41 +93,225 @@ async def enqueue_print_time(model_id: str, request: PrintTimeRequest):
     task = predict_print_time_task.delay(request.dict(), model_id)
     return JSONResponse({"task_id": task.id, "status": "queued"})
 
+@router.get(
+    "/print-time/calibration",
+    response_model=List[PrintTimeCalibrationReport],
+    summary="Consulta la calidad (MAPE) de la calibración de tiempo de impresión",
+)
+async def get_print_time_calibration():
+    return await run_in_session(lambda session: PrintTimeCalibrator(session).report())
+
+@router.post(
+    "/wall-thickness/{model_id}",
+    summary="Encola análisis de paredes delgadas por tamaño de boquilla",
+)
+async def enqueue_wall_thickness(model_id: str, request: ComplexityRequest):
+    task = analyze_wall_thickness_task.delay(request.model_file_url, model_id)
+    return JSONResponse({"task_id": task.id, "status": "queued"})
+
+@router.get(
+    "/wall-thickness/{model_id}",
+    response_model=WallThicknessReport,
+    summary="Consulta el reporte de paredes delgadas de un modelo",
+)
+async def get_wall_thickness(model_id: str, db: AsyncSession = Depends(get_async_db)):
+    meta = (await db.execute(METADATA_BY_MODEL_ID, {"model_id": model_id})).scalars().first()
+    if not meta or not meta.wall_thickness_report:
+        raise HTTPException(status_code=404, detail="Wall thickness report not found")
+    return meta.wall_thickness_report
+
+@router.post(
+    "/lod/{model_id}",
+    summary="Encola la generación de niveles de detalle",
+)
+async def enqueue_lods(model_id: str, request: ComplexityRequest):
+    # Pedido por un usuario: carril interactivo (el encadenado desde la
+    # complejidad va por ai_bulk)
+    task = generate_model_lods_task.apply_async((request.model_file_url, model_id), queue="ai_interactive")
+    return JSONResponse({"task_id": task.id, "status": "queued"})
+
+@router.get(
+    "/lod/{model_id}",
+    response_model=ModelLodsResponse,
+    summary="Lista los niveles de detalle disponibles de un modelo",
+)
+async def list_lods(model_id: str, db: AsyncSession = Depends(get_async_db)):
+    lods = (await db.execute(LODS_FOR_MODEL, {"model_id": model_id})).scalars().all()
+    if not lods:
+        raise HTTPException(status_code=404, detail="LODs not found")
+    original = lods[0].size_bytes
+    return {
+        "model_id": model_id,
+        "levels": [
+            {
+                "level": lod.level,
+                "triangle_count": lod.triangle_count,
+                "size_bytes": lod.size_bytes,
+                "size_ratio": lod.size_bytes / original,
+                "max_error_mm": lod.max_error_mm,
+                "mean_error_mm": lod.mean_error_mm,
+            }
+            for lod in lods
+        ],
+    }
+
+@router.get(
+    "/lod/{model_id}/mesh",
+    summary="Descarga el nivel de detalle que cabe en el presupuesto del cliente",
+)
+async def get_lod_mesh(
+    model_id: str,
+    max_bytes: int = Query(None, ge=1),
+    max_triangles: int = Query(None, ge=1),
+):
+    lod = await run_in_session(
+        lambda session: select_lod(session, model_id, max_bytes=max_bytes, max_triangles=max_triangles)
+    )
+    if lod is None:
+        raise HTTPException(status_code=404, detail="LOD not found")
+    headers = {"X-LOD-Level": str(lod.level), "X-LOD-Triangles": str(lod.triangle_count)}
+    if lod.content_key is None:
+        # Nivel 0: el archivo original, sin copia en el almacén
+        if lod.source_url.startswith(("http://", "https://")):
+            return RedirectResponse(lod.source_url, headers=headers)
+        try:
+            path = local_path(lod.source_url)
+        except MeshLoadError:
+            raise HTTPException(status_code=404, detail="LOD not found")
+    elif content_store.exists(lod.content_key):
+        path = content_store.path_for(lod.content_key)
+    else:
+        path = None
+    if path is None or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="LOD not found")
+    return FileResponse(
+        path,
+        media_type="model/stl",
+        filename=f"{model_id}_lod{lod.level}.stl",
+        headers=headers,
+    )
+
+@router.post(
+    "/similar/{model_id}",
+    summary="Encola el indexado de forma para búsqueda de modelos similares",
+)
+async def enqueue_shape_index(model_id: str, request: ComplexityRequest):
+    task = index_model_shape_task.delay(request.model_file_url, model_id)
+    return JSONResponse({"task_id": task.id, "status": "queued"})
+
+@router.get(
+    "/similar/{model_id}",
+    response_model=SimilarModelsResponse,
+    summary="Busca modelos geométricamente similares y sus metadatos reutilizables",
+)
+async def get_similar_models(
+    model_id: str,
+    k: int = Query(5, ge=1, le=50),
+):
+    # Sincronizar el índice y la búsqueda top-k calculan en CPU: fuera del event loop
+    matches = await run_in_session(lambda session: find_similar_models(session, model_id, k=k))
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Model not indexed")
+    return {
+        "model_id": model_id,
+        "similar": [
+            {
+                "model_id": match.model_id,
+                "distance": match.distance,
+                "seo_title": meta.seo_title if meta else None,
+                "market_description": meta.market_description if meta else None,
+                "tags": meta.tags if meta else None,
+                "complexity_score": meta.complexity_score if meta else None,
+            }
+            for match, meta in matches
+        ],
+    }
+
+@router.post(
+    "/similar/{model_id}/reuse/{source_model_id}",
+    summary="Copia título, descripción, tags y complejidad de un modelo similar",
+)
+async def reuse_similar_metadata(
+    model_id: str,
+    source_model_id: str,
+    db: AsyncSession = Depends(get_async_db),
+):
+    source = (await db.execute(METADATA_BY_MODEL_ID, {"model_id": source_model_id})).scalars().first()
+    if not source:
+        raise HTTPException(status_code=404, detail="Source metadata not found")
+    await db.execute(metadata_upsert(db.get_bind().dialect.name, [{
+        "model_id": model_id,
+        "seo_title": source.seo_title,
+        "market_description": source.market_description,
+        "tags": source.tags,
+        "complexity_score": source.complexity_score,
+    }]))
+    await db.commit()
+    return {"model_id": model_id, "reused_from": source_model_id}
+
+@router.get(
+    "/metadata",
+    response_model=ModelMetadataPage,
+    summary="Lista los metadatos de modelos, paginados por cursor",
+)
+async def list_model_metadata(
+    cursor: str = Query(None, description="next_cursor de la página anterior"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db),
+):
+    try:
+        page = await apaginate(db, select(ModelMetadata), [ModelMetadata.id], cursor, limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": page.items, "next_cursor": page.next_cursor}
+
 @router.get(
     "/result/{task_id}",
     response_model=MetadataResponse,  # o un esquema genérico que abarque todos los campos
     summary="Consulta resultado de tarea de IA",
 )
-async def get_ai_result(task_id: str):
+async def get_ai_result(
+    task_id: str,
+    read_db: AsyncSession = Depends(get_async_read_db),
+    db: AsyncSession = Depends(get_async_db),
+):
     result = celery_app.AsyncResult(task_id)
-    state = result.state
+    # Consultar el estado es una llamada bloqueante al backend de resultados
+    state = await run_in_threadpool(lambda: result.state)
 
     if state in ("PENDING", "STARTED"):
         return {"task_id": task_id, "status": state}
 
     if state == "SUCCESS":
-        db = SessionLocal()
-        try:
-            meta = db.query(ModelMetadata).filter_by(task_id=task_id).first()
-            if not meta:
-                raise HTTPException(status_code=404, detail="Result not found")
-            return {
-                "task_id": task_id,
-                "status": state,
-                "data": {
-                    "model_id": meta.model_id,
-                    "seo_title": meta.seo_title,
-                    "market_description": meta.market_description,
-                    "tags": meta.tags,
-                    "vertices": meta.vertices,
-                    "polygons": meta.polygons,
-                    "file_size_kb": meta.file_size_kb,
-                    "complexity_score": meta.complexity_score,
-                    "estimated_time_minutes": meta.estimated_time_minutes,
-                },
-            }
-        finally:
-            db.close()
+        # Las tareas devuelven su model_id: la fila del modelo sigue siendo su
+        # resultado aunque otra tarea posterior la haya marcado con su id.
+        # Sin él (resultados anteriores), la fila que marcó esta tarea
+        payload = result.result
+        if isinstance(payload, dict) and payload.get("model_id"):
+            query, params = METADATA_BY_MODEL_ID, {"model_id": payload["model_id"]}
+        else:
+            query, params = METADATA_BY_TASK_ID, {"task_id": task_id}
+        meta = (await read_db.execute(query, params)).scalars().first()
+        if not meta:
+            # La réplica puede no tener aún la escritura del worker
+            meta = (await db.execute(query, params)).scalars().first()
+        if not meta:
+            raise HTTPException(status_code=404, detail="Result not found")
+        return {
+            "task_id": task_id,
+            "status": state,
+            "data": {
+                "model_id": meta.model_id,
+                "seo_title": meta.seo_title,
+                "market_description": meta.market_description,
+                "tags": meta.tags,
+                "vertices": meta.vertices,
+                "polygons": meta.polygons,
+                "file_size_kb": meta.file_size_kb,
+                "complexity_score": meta.complexity_score,
+                "estimated_time_minutes": meta.estimated_time_minutes,
+            },
+        }
 
     if state == "FAILURE":
         return {"task_id": task_id, "status": state, "error": str(result.result)}
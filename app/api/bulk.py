@@ -0,0 +1,61 @@
+# app/api/bulk.py
+
+import tempfile
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.api.deps import get_tenant_db
+from app.schemas.bulk import BulkImportReport
+from app.services.bulk_io import ENTITIES, MEDIA_TYPES, BulkFormatError, import_file, iter_export
+
+router = APIRouter(prefix="/api/v1/bulk", tags=["Bulk"])
+
+FORMAT_PATTERN = "^(csv|jsonl|npz)$"
+# Cuerpo en memoria hasta este tamaño; después, en un archivo temporal
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+def _check_entity(entity: str) -> None:
+    if entity not in ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Entidad desconocida: {entity}")
+
+
+@router.post(
+    "/{entity}/import",
+    response_model=BulkImportReport,
+    summary="Importación masiva desde CSV, JSONL o npz (el archivo es el cuerpo)",
+)
+async def import_entity(
+    entity: str,
+    request: Request,
+    format: str = Query(..., regex=FORMAT_PATTERN),
+    user_id: Optional[int] = Query(None, description="Usuario de las filas que no traen user_id"),
+    db: Session = Depends(get_tenant_db),
+):
+    _check_entity(entity)
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as body:
+        async for data in request.stream():
+            body.write(data)
+        body.seek(0)
+        try:
+            # COPY y la validación son síncronas: fuera del event loop
+            return await run_in_threadpool(import_file, db, entity, body, format, user_id)
+        except BulkFormatError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{entity}/export", summary="Exportación masiva en CSV, JSONL o npz")
+def export_entity(
+    entity: str,
+    format: str = Query("csv", regex=FORMAT_PATTERN),
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_tenant_db),
+):
+    _check_entity(entity)
+    return StreamingResponse(
+        iter_export(db, entity, format, user_id),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{entity}.{format}"'},
+    )
@@ -0,0 +1,22 @@
+# app/api/dashboard.py
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.deps import get_async_tenant_db
+from app.db.models import UserDashboardSummary
+from app.schemas.dashboard import DashboardSummary
+from app.services.dashboard_summary import get_summary
+
+router = APIRouter(prefix="/api/v1/dashboard", tags=["Dashboard"])
+
+@router.get(
+    "/{user_id}/summary",
+    response_model=DashboardSummary,
+    summary="Resumen del dashboard del usuario",
+)
+async def get_dashboard_summary(user_id: int, db: AsyncSession = Depends(get_async_tenant_db)):
+    # Búsqueda por clave primaria; solo el primer acceso calcula el resumen
+    summary = await db.get(UserDashboardSummary, user_id)
+    if summary is None:
+        summary = await db.run_sync(lambda session: get_summary(session, user_id))
+    return summary
@@ -1,8 +1,13 @@
 # app/api/deps.py
-from typing import Generator
+from typing import AsyncGenerator, Callable, Generator, Optional, TypeVar
 from fastapi import Depends
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal, SessionLocal, async_replica_router, shard_router
+
+T = TypeVar("T")
 
 
 def get_db() -> Generator[Session, None, None]:
@@ -17,4 +22,69 @@ def get_db() -> Generator[Session, None, None]:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependencia asíncrona para handlers ``async def``: las consultas no
+    bloquean el event loop.
+    Usage:
+        @router.get("/items")
+        async def read_items(db: AsyncSession = Depends(get_async_db)):
+            return (await db.execute(select(Item))).scalars().all()
+
+    El código de servicios síncrono se ejecuta con ``await db.run_sync(fn)``,
+    o con ``run_in_session`` si calcula en CPU.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sesión asíncrona de solo lectura sobre una réplica sana (o el primario
+    si no hay). Para lecturas pesadas que toleran el retraso de replicación.
+    """
+    async with async_replica_router.read_session() as db:
+        yield db
+
+
+async def run_in_session(fn: Callable[[Session], T]) -> T:
+    """
+    Ejecuta ``fn(session)`` en el threadpool con una sesión síncrona propia.
+    Para servicios síncronos con trabajo de CPU: ``AsyncSession.run_sync``
+    los ejecuta en el hilo del event loop y lo bloquea mientras calculan.
+    """
+    def call() -> T:
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+
+    return await run_in_threadpool(call)
+
+
+def get_tenant_db(user_id: Optional[int] = None) -> Generator[Session, None, None]:
+    """
+    Sesión del usuario ``user_id`` (parámetro de ruta o de consulta): con
+    sharding, sus tablas van al shard del usuario. Sin ``user_id``, las
+    consultas a tablas de tenant fallan con ``TenantRequiredError``.
+    """
+    db = SessionLocal()
+    db.info["tenant_id"] = user_id
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_tenant_db(user_id: Optional[int] = None) -> AsyncGenerator[AsyncSession, None]:
+    """Versión asíncrona de ``get_tenant_db``."""
+    if settings.DATABASE_SHARD_URLS and user_id is not None:
+        # Resuelve el shard fuera del event loop; la sesión lo toma de la caché
+        await run_in_threadpool(shard_router.entry, user_id)
+    async with AsyncSessionLocal() as db:
+        db.info["tenant_id"] = user_id
+        yield db
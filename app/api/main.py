@@ -1,21 +1,34 @@
 # app/api/main.py
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
-import redis
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+import redis.asyncio as aioredis
 import logging.config
 
 from app.core.config import settings
 from app.core.logging_config import LOGGING_CONFIG
-from app.api.deps import get_db
+from app.api.deps import get_async_db
+from app.db.session import sql_recorder
+from app.db.sharding import TenantMovingError, TenantRequiredError
 from app.api.ai import router as ai_router
+from app.api.dashboard import router as dashboard_router
+from app.api.bulk import router as bulk_router
 
 # Configure logging
 logging.config.dictConfig(LOGGING_CONFIG)
 
 app = FastAPI(title="PrintOptimizer BD API")
 
+# One Redis client (and connection pool) for every readiness probe
+redis_client = aioredis.from_url(settings.REDIS_URL)
+
+@app.on_event("shutdown")
+async def close_redis():
+    await redis_client.aclose()
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -25,8 +38,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include AI router
+# Include AI, dashboard and bulk import/export routers
 app.include_router(ai_router)
+app.include_router(dashboard_router)
+app.include_router(bulk_router)
+
+# Group the SQL statements of each request by route template (N+1 detection)
+@app.middleware("http")
+async def sql_unit_of_work(request: Request, call_next):
+    with sql_recorder.unit_of_work(request.method) as unit:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        unit.name = f"{request.method} {getattr(route, 'path', 'unmatched')}"
+    return response
+
+# Tenant writes are frozen for a few seconds while it moves between shards
+@app.exception_handler(TenantMovingError)
+async def tenant_moving_handler(request: Request, exc: TenantMovingError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.exception_handler(TenantRequiredError)
+async def tenant_required_handler(request: Request, exc: TenantRequiredError):
+    return JSONResponse(status_code=400, content={"detail": str(exc)})
 
 # Health check
 @app.get("/health")
@@ -35,14 +68,13 @@ async def health():
 
 # Readiness check: DB and Redis
 @app.get("/ready")
-async def ready(db=Depends(get_db)):
+async def ready(db: AsyncSession = Depends(get_async_db)):
     try:
-        db.execute("SELECT 1")
+        await db.execute(text("SELECT 1"))
     except Exception:
         raise HTTPException(status_code=503, detail="Database not ready")
     try:
-        r = redis.from_url(settings.REDIS_URL)
-        r.ping()
+        await redis_client.ping()
     except Exception:
         raise HTTPException(status_code=503, detail="Redis not ready")
     return {"status": "ready"}
@@ -51,4 +83,11 @@ async def ready(db=Depends(get_db)):
 @app.get("/metrics")
 async def metrics():
     data = generate_latest()
-    return Response(content=data, media_type=CONTENT_TYPE_LATEST)
\ No newline at end of file
+    return Response(content=data, media_type=CONTENT_TYPE_LATEST)
+
+# Per-statement SQL report and recent N+1 incidents (disabled by default)
+@app.get("/debug/sql")
+async def debug_sql(limit: int = 50):
+    if not settings.DEBUG_ENDPOINTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return sql_recorder.report(limit)
@@ -12,6 +12,7 @@ from pathlib import Path
 from typing import List, Dict, Optional
 import logging
 from app.core.config import settings
+from app.db.sqlite import backup_sqlite, restore_sqlite
 
 logger = logging.getLogger(__name__)
 
@@ -99,9 +100,13 @@ class BackupManager:
                 # SQLite backup
                 db_file = db_url.replace("sqlite:///", "")
                 if Path(db_file).exists():
-                    with open(db_file, 'rb') as f_in:
+                    # Online backup API: includes pages still in the -wal file
+                    snapshot = backup_path.with_suffix("")
+                    backup_sqlite(db_file, str(snapshot))
+                    with open(snapshot, 'rb') as f_in:
                         with gzip.open(backup_path, 'wb') as f_out:
                             shutil.copyfileobj(f_in, f_out)
+                    snapshot.unlink()
                     
                     logger.info(f"SQLite backup created: {backup_path}")
                     return str(backup_path)
@@ -211,7 +216,8 @@ class BackupManager:
             elif "sqlite:///" in db_url:
                 # SQLite restore
                 db_file = db_url.replace("sqlite:///", "")
-                shutil.copy2(backup_path, db_file)
+                # Copying over the file would replay a leftover -wal on top
+                restore_sqlite(str(backup_path), db_file)
                 logger.info(f"SQLite database restored from {backup_path}")
                 return True
             
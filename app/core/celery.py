@@ -2,69 +2,187 @@
 from celery import Celery
 from celery.schedules import crontab
 from app.core.config import settings
+import inspect
+import os
 import time
-from celery.signals import task_prerun, task_postrun, task_failure
-from app.core.metrics import CELERY_TASK_FAILURES, CELERY_TASK_DURATION
+from celery.signals import (
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_ready,
+)
+from app.core.celery_exporter import ENQUEUED_AT_HEADER, serve_worker_metrics, task_wait_seconds
+from app.core.metrics import CELERY_TASK_FAILURES, CELERY_TASK_DURATION, CELERY_TASK_WAIT
+from app.core.task_queues import queue_settings, validate_routes
+from app.core.task_results import result_settings
+from app.core.task_serialization import SERIALIZER, register_serializer
+from app.db.session import (
+    async_engine,
+    async_replica_router,
+    engine,
+    replica_router,
+    shard_router,
+    sql_recorder,
+)
+from app.db.sharding import current_tenant
 
-# Instancia de Celery
+# msgpack con zstd por encima del umbral (ver app/core/task_serialization.py)
+register_serializer(settings.CELERY_COMPRESS_MIN_BYTES)
+
+# Instancia de Celery; el backend aplica el TTL de resultado de cada tarea
 celery_app = Celery(
     "printoptimizer",
     broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL,
+    backend=f"app.core.task_results:PolicyRedisBackend+{settings.REDIS_URL}",
     include=["app.tasks"]
 )
 
 # Configuración de mensajería asíncrona
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
-    result_serializer="json",
+    task_serializer=SERIALIZER,
+    result_serializer=SERIALIZER,
+    # JSON se sigue aceptando para los mensajes encolados antes del cambio
+    accept_content=[SERIALIZER, "json"],
     timezone='America/Mexico_City',
     enable_utc=False,
-    task_routes={
-        'app.tasks.send_email': {'queue': 'emails'},
-        'app.tasks.generate_ai_metadata': {'queue': 'ai'},
-        'app.tasks.sync_marketplace_data': {'queue': 'sync'},
-        'app.tasks.cleanup_old_files': {'queue': 'maintenance'},
-    },
     beat_schedule={
         # Cada 5 minutos
         'sync-marketplace-data': {
-            'task': 'app.tasks.sync_marketplace_data',
+            'task': 'app.tasks.sync_marketplace_data_task',
             'schedule': 300.0,
         },
         # A medianoche local todos los días
         'cleanup-old-files': {
-            'task': 'app.tasks.cleanup_old_files',
+            'task': 'app.tasks.cleanup_old_files_task',
             'schedule': crontab(hour=0, minute=0),
         },
         # Reporte diario de analíticas a medianoche
         'generate-daily-analytics': {
-            'task': 'app.tasks.generate_daily_analytics',
+            'task': 'app.tasks.generate_daily_analytics_task',
             'schedule': crontab(hour=0, minute=0),
         },
+        # Recalibración diaria del estimador de tiempo de impresión
+        'calibrate-print-time': {
+            'task': 'app.tasks.calibrate_print_time_task',
+            'schedule': crontab(hour=1, minute=0),
+        },
+        # Particiones mensuales del libro de inventario, con meses de margen
+        'ensure-inventory-partitions': {
+            'task': 'app.tasks.ensure_inventory_partitions_task',
+            'schedule': crontab(hour=2, minute=0),
+        },
+        # Corrige la deriva de los resúmenes del dashboard cada hora
+        'reconcile-dashboard-summaries': {
+            'task': 'app.tasks.reconcile_dashboard_summaries_task',
+            'schedule': crontab(minute=30),
+        },
         # Backup semanal los domingos a medianoche
         'backup-database': {
-            'task': 'app.tasks.backup_database',
+            'task': 'app.tasks.backup_database_task',
             'schedule': crontab(day_of_week='sun', hour=0, minute=0),
         },
     }
 )
 
+# Carriles de prioridad: una cola por carril, router validado y autoescalado
+# por profundidad de cola (ver app/core/task_queues.py)
+celery_app.conf.update(**queue_settings())
+
+# Resultados: las tareas sin lector no los guardan y el resto caduca según
+# su política (ver app/core/task_results.py)
+celery_app.conf.update(**result_settings(settings.CELERY_RESULT_EXPIRES_SECONDS))
+
+# Modo embebido (SQLite): hilos en lugar de prefork para que todas las
+# tareas compartan el escritor único del proceso
+if engine.dialect.name == "sqlite":
+    celery_app.conf.worker_pool = "threads"
+
+def _task_tenant(task, args, kwargs):
+    """Argumento ``user_id`` de la tarea, posicional o por nombre."""
+    try:
+        bound = inspect.signature(task.run).bind_partial(*(args or ()), **(kwargs or {}))
+    except TypeError:
+        return None
+    return bound.arguments.get("user_id")
+
+@before_task_publish.connect
+def _before_task_publish_handler(headers=None, **kwargs):
+    # Hora de encolado, para medir la espera en cola (también en reintentos)
+    if headers is not None:
+        headers[ENQUEUED_AT_HEADER] = time.time()
+
 @task_prerun.connect
-def _task_prerun_handler(sender=None, task_id=None, task=None, **kwargs):
-    # Marca el inicio
-    setattr(task, "_start_time", time.time())
+def _task_prerun_handler(sender=None, task_id=None, task=None, args=None, kwargs=None, **extra):
+    # Marca el inicio. El estado de cada ejecución va en task.request y no en
+    # la tarea, que comparten los hilos del pool
+    now = time.time()
+    task.request.start_time = now
+    # Espera en cola desde la publicación (o la eta)
+    wait = task_wait_seconds(task.request, now)
+    if wait is not None:
+        queue = (task.request.delivery_info or {}).get("routing_key") or "unknown"
+        CELERY_TASK_WAIT.labels(task_name=sender.name, queue=queue).observe(wait)
+    # Agrupa las sentencias SQL de la tarea para detectar N+1
+    task.request.sql_unit = sql_recorder.start(sender.name)
+    # Las sesiones de las tareas con user_id van al shard de ese usuario
+    task.request.tenant_token = current_tenant.set(_task_tenant(task, args, kwargs))
 
 @task_postrun.connect
 def _task_postrun_handler(sender=None, task_id=None, task=None, **kwargs):
     # Calcula y registra la duración
-    start = getattr(task, "_start_time", None)
+    start = getattr(task.request, "start_time", None)
     if start is not None:
         duration = time.time() - start
         CELERY_TASK_DURATION.labels(task_name=sender.name).observe(duration)
+    sql_unit = getattr(task.request, "sql_unit", None)
+    if sql_unit is not None:
+        task.request.sql_unit = None
+        sql_recorder.stop(*sql_unit)
+    tenant_token = getattr(task.request, "tenant_token", None)
+    if tenant_token is not None:
+        task.request.tenant_token = None
+        current_tenant.reset(tenant_token)
 
 @task_failure.connect
 def _task_failure_handler(sender=None, task_id=None, exception=None, **kwargs):
     # Incrementa el contador de fallos
-    CELERY_TASK_FAILURES.labels(task_name=sender.name).inc()
\ No newline at end of file
+    CELERY_TASK_FAILURES.labels(task_name=sender.name).inc()
+
+@worker_init.connect
+def _worker_init_handler(sender=None, **kwargs):
+    # Un worker no arranca con tareas sin carril o un beat con nombres
+    # desconocidos: esas tareas acabarían en una cola que nadie consume
+    celery_app.loader.import_default_modules()
+    validate_routes(celery_app)
+
+@worker_ready.connect
+def _worker_ready_handler(sender=None, **kwargs):
+    # Métricas del worker (espera, duración y fallos de sus tareas)
+    if settings.CELERY_WORKER_METRICS_PORT:
+        serve_worker_metrics(settings.CELERY_WORKER_METRICS_PORT)
+
+@worker_process_shutdown.connect
+def _worker_process_shutdown_handler(pid=None, **kwargs):
+    # Con prefork, los ficheros de métricas de un hijo terminado se descartan
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+@worker_process_init.connect
+def _worker_process_init_handler(**kwargs):
+    # Cada hijo del prefork abre sus propias conexiones; las heredadas del
+    # padre se descartan sin cerrarlas para no romper las de otros procesos
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
+    for node in replica_router.nodes:
+        node.engine.dispose(close=False)
+    for node in async_replica_router.nodes:
+        node.engine.sync_engine.dispose(close=False)
+    for shard in shard_router.shards.values():
+        shard.dispose(close=False)
+    for shard in shard_router.async_shards.values():
+        shard.sync_engine.dispose(close=False)
@@ -0,0 +1,162 @@
+# app/core/celery_exporter.py
+"""
+Métricas de espera y de colas de Celery para Prometheus.
+
+Cada mensaje de tarea lleva la cabecera ``enqueued_at`` (ver
+app/core/celery.py) y el worker observa en ``celery_task_wait_seconds`` la
+espera hasta ``task_prerun``, por tarea y cola. Para las tareas con
+``eta``/``countdown`` la espera cuenta desde la hora programada.
+
+Los workers exponen sus métricas con ``serve_worker_metrics`` en
+``CELERY_WORKER_METRICS_PORT``; con prefork, ``PROMETHEUS_MULTIPROC_DIR``
+reúne las de los procesos hijo.
+
+``QueueCollector`` es el exportador ligero de las colas, un proceso aparte
+(``python -m app.core.celery_exporter``) que consulta en cada scrape:
+
+* la longitud de cada cola y la edad de su mensaje más antiguo en Redis;
+* las tareas reservadas y en ejecución de los workers (``inspect``).
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from prometheus_client import CollectorRegistry, start_http_server
+from prometheus_client.core import GaugeMetricFamily
+
+from app.core.task_queues import LANES, queue_depths
+
+logger = logging.getLogger(__name__)
+
+ENQUEUED_AT_HEADER = "enqueued_at"
+
+
+def task_wait_seconds(request, now: float) -> Optional[float]:
+    """Espera de la tarea en cola hasta ``now``; None sin cabecera (mensajes antiguos o eager)."""
+    enqueued_at = request.get(ENQUEUED_AT_HEADER)
+    if enqueued_at is None:
+        return None
+    ready_at = float(enqueued_at)
+    eta = request.get("eta")
+    if eta:
+        ready_at = max(ready_at, datetime.fromisoformat(eta).timestamp())
+    return max(now - ready_at, 0.0)
+
+
+def oldest_enqueued_at(client, queue: str) -> Optional[float]:
+    """
+    ``enqueued_at`` del mensaje más antiguo de la cola. El transporte de
+    Redis publica con LPUSH y consume por el final de la lista.
+    """
+    raw = client.lindex(queue, -1)
+    if raw is None:
+        return None
+    try:
+        value = json.loads(raw)["headers"].get(ENQUEUED_AT_HEADER)
+    except (ValueError, KeyError, TypeError):
+        return None
+    return float(value) if value is not None else None
+
+
+def _count_by_queue(replies: Optional[dict], queues: Iterable[str]) -> Dict[str, int]:
+    counts = {queue: 0 for queue in queues}
+    for tasks in (replies or {}).values():
+        for task in tasks:
+            queue = (task.get("delivery_info") or {}).get("routing_key")
+            if queue in counts:
+                counts[queue] += 1
+    return counts
+
+
+class QueueCollector:
+    """Colector de Prometheus con el estado de las colas en cada scrape."""
+
+    def __init__(self, app, queues: Iterable[str] = LANES, client=None,
+                 inspect_timeout: float = 1.0, clock=time.time):
+        self.app = app
+        self.queues = list(queues)
+        self.inspect_timeout = inspect_timeout
+        self.clock = clock
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.app.conf.broker_url)
+        return self._client
+
+    def collect(self):
+        length = GaugeMetricFamily("celery_queue_length", "Mensajes pendientes en la cola", labels=["queue"])
+        age = GaugeMetricFamily(
+            "celery_queue_oldest_message_age_seconds",
+            "Antigüedad del mensaje más antiguo de la cola (0 si está vacía)",
+            labels=["queue"],
+        )
+        reserved = GaugeMetricFamily(
+            "celery_tasks_reserved", "Tareas reservadas por los workers, sin empezar", labels=["queue"],
+        )
+        active = GaugeMetricFamily("celery_tasks_active", "Tareas en ejecución", labels=["queue"])
+        up = GaugeMetricFamily("celery_exporter_broker_up", "1 si el último scrape llegó al broker")
+
+        now = self.clock()
+        try:
+            depths = queue_depths(self.app, self.queues)
+            oldest = {queue: oldest_enqueued_at(self.client, queue) for queue in self.queues}
+            inspect = self.app.control.inspect(timeout=self.inspect_timeout)
+            reserved_counts = _count_by_queue(inspect.reserved(), self.queues)
+            active_counts = _count_by_queue(inspect.active(), self.queues)
+        except Exception as e:
+            logger.warning(f"Celery exporter scrape failed: {e}")
+            up.add_metric([], 0)
+            yield up
+            return
+
+        for queue in self.queues:
+            length.add_metric([queue], depths.get(queue, 0))
+            age.add_metric([queue], max(now - oldest[queue], 0.0) if oldest[queue] is not None else 0.0)
+            reserved.add_metric([queue], reserved_counts[queue])
+            active.add_metric([queue], active_counts[queue])
+        up.add_metric([], 1)
+        yield from (length, age, reserved, active, up)
+
+
+def worker_registry():
+    """Registro del worker: el agregado de los hijos del prefork si hay directorio multiproceso."""
+    from prometheus_client import REGISTRY, multiprocess
+
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def serve_worker_metrics(port: int) -> None:
+    start_http_server(port, registry=worker_registry())
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Exportador de colas de Celery para Prometheus")
+    parser.add_argument("--port", type=int, default=9808)
+    parser.add_argument("--inspect-timeout", type=float, default=1.0)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from app.core.celery import celery_app
+
+    registry = CollectorRegistry()
+    registry.register(QueueCollector(celery_app, inspect_timeout=args.inspect_timeout))
+    start_http_server(args.port, registry=registry)
+    logger.info(f"Celery exporter listening on :{args.port}")
+    while True:
+        time.sleep(3600)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 from pydantic import BaseSettings, AnyUrl
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
-    # Conexión a BD
-    DATABASE_URL: AnyUrl
+    # Conexión a BD: PostgreSQL, o SQLite (sqlite:///ruta) en modo embebido
+    DATABASE_URL: str
     # Redis para Celery
     REDIS_URL: AnyUrl
+    # TTL de los resultados de Celery sin política propia (app/core/task_results.py)
+    # y tamaño desde el que se comprimen mensajes y resultados con zstd
+    CELERY_RESULT_EXPIRES_SECONDS: int = 24 * 3600
+    CELERY_COMPRESS_MIN_BYTES: int = 1024
+    # Micro-lotes (app/core/task_batching.py): elementos por lote y espera
+    # máxima desde el primer elemento
+    TASK_BATCH_MAX_ITEMS: int = 50
+    TASK_BATCH_MAX_WAIT_SECONDS: float = 2.0
+    # Puerto de las métricas de Prometheus de cada worker; 0 = sin servidor
+    CELERY_WORKER_METRICS_PORT: int = 0
     # Servicio de IA
     OPENAI_API_KEY: str
     # Autenticación
@@ -13,6 +23,55 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     # Orígenes CORS
     CORS_ORIGINS: List[str] = []
+    # Réplicas de lectura (lista JSON de URLs); vacía = todo va al primario
+    DATABASE_REPLICA_URLS: List[str] = []
+    # Segundos que un proceso lee del primario tras escribir (read-your-writes)
+    REPLICA_PIN_SECONDS: float = 5.0
+    # Segundos entre verificaciones de salud de una réplica
+    REPLICA_HEALTH_CHECK_SECONDS: float = 10.0
+    # Shards adicionales al primario ("default") por nombre, como objeto JSON
+    # {"shard1": "postgresql://..."}; vacío = sin sharding
+    DATABASE_SHARD_URLS: Dict[str, str] = {}
+    # Segundos que un proceso confía en su copia del directorio de shards;
+    # el rebalanceo espera este tiempo más SHARD_MOVE_SETTLE_SECONDS antes de
+    # la sincronización final y antes de borrar el origen
+    SHARD_DIRECTORY_CACHE_SECONDS: float = 5.0
+    SHARD_MOVE_SETTLE_SECONDS: float = 2.0
+    SHARD_MOVE_BATCH_SIZE: int = 1000
+    # Ids de cada shard en PostgreSQL: el shard i reparte [i * stride + 1, ...)
+    SHARD_ID_STRIDE: int = 100_000_000
+    # Rol del proceso para dimensionar el pool de conexiones: api, worker o beat
+    DB_POOL_ROLE: str = "api"
+    # Instrumentación SQL: umbral de sentencia lenta y de repeticiones N+1
+    SLOW_STATEMENT_SECONDS: float = 0.5
+    N_PLUS_ONE_THRESHOLD: int = 10
+    # Habilita /debug/sql (expone SQL normalizado; no activar en público)
+    DEBUG_ENDPOINTS_ENABLED: bool = False
+    # Modo embebido (SQLite): espera máxima por el bloqueo de escritura,
+    # tamaño del mapeo en memoria y lotes del escritor único
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_WRITE_BATCH_SIZE: int = 100
+    SQLITE_WRITE_BATCH_SECONDS: float = 0.005
+    # Migraciones en línea (app/db/online_migration.py): espera máxima por un
+    # bloqueo y reintentos del DDL, duración máxima de una sentencia de
+    # backfill, tamaño de lote, pausa entre lotes y retraso tolerado de réplicas
+    MIGRATION_LOCK_TIMEOUT_MS: int = 2000
+    MIGRATION_LOCK_RETRIES: int = 10
+    MIGRATION_STATEMENT_TIMEOUT_MS: int = 30000
+    MIGRATION_BATCH_SIZE: int = 1000
+    MIGRATION_TARGET_BATCH_SECONDS: float = 0.5
+    MIGRATION_BATCH_SLEEP_SECONDS: float = 0.05
+    MIGRATION_MAX_REPLICA_LAG_SECONDS: float = 10.0
+    MIGRATION_MAX_LAG_WAIT_SECONDS: float = 600.0
+    # Almacén de contenido direccionado por hash (LODs, derivados)
+    CONTENT_STORE_DIR: str = "uploads/content"
+    # Origen de los archivos de modelo que leen las tareas (app/services/mesh_io.py):
+    # directorios locales permitidos (además de CONTENT_STORE_DIR), hosts
+    # http(s) permitidos (vacía = sin descargas) y tamaño máximo en bytes
+    MODEL_SOURCE_ROOTS: List[str] = ["uploads"]
+    MODEL_SOURCE_HOSTS: List[str] = []
+    MODEL_SOURCE_MAX_BYTES: int = 512 * 1024 * 1024
 
     class Config:
         env_file = ".env"
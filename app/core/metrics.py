@@ -11,8 +11,9 @@ from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_
-from app.models.models import Project, Quote, Material, User, ModelFile
-from prometheus_client import Counter, Histogram
+from app.db.models import Project, Quote, Material, User, ModelFile
+from prometheus_client import Counter, Gauge, Histogram
+from app.services.inventory_ledger import turnover_totals
 
 import asyncio
 
@@ -28,6 +29,97 @@ CELERY_TASK_DURATION = Histogram(
     "Duración de ejecución de tareas Celery (segundos)",
     ["task_name"],
 )
+# Espera en cola por tarea y cola: de la publicación (o la eta) a task_prerun
+CELERY_TASK_WAIT = Histogram(
+    "celery_task_wait_seconds",
+    "Espera de tareas Celery en la cola antes de empezar (segundos)",
+    ["task_name", "queue"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 600, 1800, 3600),
+)
+# Error (MAPE %) del estimador de tiempo de impresión calibrado
+PRINT_TIME_CALIBRATION_MAPE = Gauge(
+    "print_time_calibration_mape_percent",
+    "MAPE leave-one-out del tiempo de impresión calibrado por material e impresora",
+    ["material", "printer_profile"],
+)
+
+# Pools de conexiones a la BD por rol de proceso (api, worker, beat) y
+# destino (primary o replica)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Tamaño configurado del pool de conexiones",
+    ["role", "engine", "target"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Conexiones actualmente en uso",
+    ["role", "engine", "target"],
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections",
+    "Conexiones abiertas por encima de pool_size",
+    ["role", "engine", "target"],
+)
+DB_POOL_CHECKOUTS = Counter(
+    "db_pool_checkouts_total",
+    "Número total de conexiones entregadas por el pool",
+    ["role", "engine", "target"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Espera para obtener una conexión del pool (segundos)",
+    ["role", "engine", "target"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts_total",
+    "Esperas de conexión que agotaron pool_timeout",
+    ["role", "engine", "target"],
+)
+
+# Sentencias SQL por huella (ver app/db/instrumentation.py)
+DB_STATEMENT_DURATION = Histogram(
+    "db_statement_duration_seconds",
+    "Latencia de sentencias SQL por huella normalizada",
+    ["statement"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_SLOW_STATEMENTS = Counter(
+    "db_slow_statements_total",
+    "Sentencias SQL que superaron SLOW_STATEMENT_SECONDS",
+    ["statement"],
+)
+DB_UNIT_STATEMENTS = Histogram(
+    "db_unit_of_work_statements",
+    "Sentencias SQL por petición o tarea",
+    ["unit"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 250, 1000),
+)
+DB_UNIT_DB_SECONDS = Histogram(
+    "db_unit_of_work_db_seconds",
+    "Tiempo total en SQL por petición o tarea",
+    ["unit"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_N_PLUS_ONE = Counter(
+    "db_n_plus_one_total",
+    "Unidades de trabajo que repitieron una sentencia N_PLUS_ONE_THRESHOLD veces o más",
+    ["unit", "statement"],
+)
+DB_COMPILE_CACHE = Counter(
+    "db_compile_cache_total",
+    "Ejecuciones SQL según la caché de compilación: hit, miss o uncached",
+    ["result"],
+)
+DASHBOARD_SUMMARY_DRIFT = Counter(
+    "dashboard_summary_drift_total",
+    "Resúmenes del dashboard creados o corregidos por la reconciliación",
+)
+BULK_IMPORT_ROWS = Counter(
+    "bulk_import_rows_total",
+    "Filas de importaciones masivas por entidad: imported o rejected",
+    ["entity", "result"],
+)
 
 @dataclass
 class BusinessMetrics:
@@ -74,29 +166,51 @@ class BusinessMetrics:
 class MetricsCollector:
     """Collect and calculate business metrics"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, shards: Optional[List[Session]] = None):
         self.db = db
+        # Sessions for the tenant tables: one per shard, or ``db`` itself
+        self.shards = shards if shards is not None else [db]
+
+    @classmethod
+    def collect_from_replica(cls) -> BusinessMetrics:
+        """Collect all business metrics in a read-only session on a replica"""
+        # Imported here: app.db.session depends on this module for pool metrics
+        from app.db.session import replica_router, shard_router
+        with replica_router.read_session() as db:
+            if len(shard_router.shards) == 1:
+                return cls(db).collect_all_metrics()
+            # Tenant rows are spread over the shards, which have no replicas
+            shards = [Session(bind=engine, autoflush=False) for engine in shard_router.shards.values()]
+            try:
+                return cls(db, shards).collect_all_metrics()
+            finally:
+                for shard in shards:
+                    shard.close()
+
+    def _total(self, query) -> float:
+        """Sum of the scalar ``query(session)`` over the shards"""
+        return sum(query(db) or 0 for db in self.shards)
     
     def calculate_revenue_metrics(self) -> Dict[str, float]:
         """Calculate revenue-related metrics"""
         # Total revenue from completed projects
-        total_revenue = self.db.query(func.sum(Project.budget)).filter(
+        total_revenue = self._total(lambda db: db.query(func.sum(Project.budget)).filter(
             Project.status == "completed"
-        ).scalar() or 0.0
+        ).scalar()) or 0.0
         
         # Monthly recurring revenue (last 30 days)
         thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        monthly_revenue = self.db.query(func.sum(Project.budget)).filter(
+        monthly_revenue = self._total(lambda db: db.query(func.sum(Project.budget)).filter(
             and_(
                 Project.status == "completed",
                 Project.updated_at >= thirty_days_ago
             )
-        ).scalar() or 0.0
+        ).scalar()) or 0.0
         
         # Average order value
-        completed_projects_count = self.db.query(Project).filter(
+        completed_projects_count = self._total(lambda db: db.query(Project).filter(
             Project.status == "completed"
-        ).count()
+        ).count())
         
         average_order_value = (
             total_revenue / completed_projects_count 
@@ -144,19 +258,23 @@ class MetricsCollector:
     
     def calculate_project_metrics(self) -> Dict[str, float]:
         """Calculate project-related metrics"""
-        total_projects = self.db.query(Project).count()
-        completed_projects = self.db.query(Project).filter(
+        total_projects = self._total(lambda db: db.query(Project).count())
+        completed_projects = self._total(lambda db: db.query(Project).filter(
             Project.status == "completed"
-        ).count()
+        ).count())
         
         # Average project duration (in days)
-        completed_projects_with_dates = self.db.query(Project).filter(
-            and_(
-                Project.status == "completed",
-                Project.created_at.isnot(None),
-                Project.updated_at.isnot(None)
-            )
-        ).all()
+        completed_projects_with_dates = [
+            project
+            for db in self.shards
+            for project in db.query(Project).filter(
+                and_(
+                    Project.status == "completed",
+                    Project.created_at.isnot(None),
+                    Project.updated_at.isnot(None)
+                )
+            ).all()
+        ]
         
         if completed_projects_with_dates:
             total_duration = sum([
@@ -179,20 +297,21 @@ class MetricsCollector:
     
     def calculate_quote_metrics(self) -> Dict[str, float]:
         """Calculate quote-related metrics"""
-        total_quotes = self.db.query(Quote).count()
-        accepted_quotes = self.db.query(Quote).filter(
+        total_quotes = self._total(lambda db: db.query(Quote).count())
+        accepted_quotes = self._total(lambda db: db.query(Quote).filter(
             Quote.status == "accepted"
-        ).count()
+        ).count())
         
         # Quote to project conversion rate
-        projects_from_quotes = self.db.query(Project).filter(
+        projects_from_quotes = self._total(lambda db: db.query(Project).filter(
             Project.client_name.isnot(None)  # Assuming projects with clients came from quotes
-        ).count()
+        ).count())
         
         conversion_rate = (projects_from_quotes / total_quotes * 100) if total_quotes > 0 else 0.0
         
-        # Average quote value
-        average_quote_value = self.db.query(func.avg(Quote.total_amount)).scalar() or 0.0
+        # Average quote value, from the per-shard sums
+        quote_amounts = self._total(lambda db: db.query(func.sum(Quote.total_amount)).scalar())
+        average_quote_value = (quote_amounts / total_quotes) if total_quotes > 0 else 0.0
         
         return {
             "total_quotes_sent": total_quotes,
@@ -202,15 +321,19 @@ class MetricsCollector:
     
     def calculate_inventory_metrics(self) -> Dict[str, float]:
         """Calculate inventory-related metrics"""
-        total_materials = self.db.query(Material).count()
+        total_materials = self._total(lambda db: db.query(Material).count())
         
-        materials_low_stock = self.db.query(Material).filter(
+        materials_low_stock = self._total(lambda db: db.query(Material).filter(
             Material.current_stock <= Material.low_stock_threshold
-        ).count()
+        ).count())
         
-        # Simplified inventory turnover rate
-        # This would need more complex calculation in real scenario
-        inventory_turnover_rate = 0.0  # Placeholder
+        # Outflow over average daily stock for the last 30 days, read from
+        # the daily rollups of the inventory ledger
+        today = datetime.utcnow().date()
+        totals = [turnover_totals(db, today - timedelta(days=29), today) for db in self.shards]
+        outflow = sum(out for out, _ in totals)
+        average_stock = sum(average for _, average in totals)
+        inventory_turnover_rate = outflow / average_stock if average_stock > 0 else 0.0
         
         return {
             "total_materials": total_materials,
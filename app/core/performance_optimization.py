@@ -17,6 +17,15 @@ logger = logging.getLogger(__name__)
 
 class DatabaseOptimizer:
     """Database performance optimization"""
+
+    # Per-role overrides of the base pool: API processes serve many
+    # concurrent requests and should fail fast when the pool is exhausted;
+    # each Celery prefork child runs one task at a time; beat only enqueues.
+    POOL_ROLES = {
+        "api": {"pool_size": 20, "max_overflow": 30, "pool_timeout": 10},
+        "worker": {"pool_size": 2, "max_overflow": 2, "pool_timeout": 30},
+        "beat": {"pool_size": 1, "max_overflow": 0, "pool_timeout": 30},
+    }
     
     @staticmethod
     def configure_postgresql_pool():
@@ -31,7 +40,28 @@ class DatabaseOptimizer:
             "echo": False,  # Disable SQL logging in production
         }
         return pool_config
+
+    @staticmethod
+    def configure_pool_for_role(role: str) -> Dict[str, Any]:
+        """Pool configuration tuned for a process role (api, worker, beat)"""
+        if role not in DatabaseOptimizer.POOL_ROLES:
+            raise ValueError(f"Unknown pool role: {role}")
+        pool_config = DatabaseOptimizer.configure_postgresql_pool()
+        pool_config.update(DatabaseOptimizer.POOL_ROLES[role])
+        return pool_config
     
+    @staticmethod
+    def configure_sqlite_pragmas() -> Dict[str, Any]:
+        """Per-connection pragmas for the embedded single-node (SQLite) mode"""
+        return {
+            # Readers and the writer no longer block each other
+            "journal_mode": "WAL",
+            # In WAL mode only checkpoints fsync; still corruption-safe
+            "synchronous": "NORMAL",
+            "busy_timeout": settings.SQLITE_BUSY_TIMEOUT_MS,
+            "mmap_size": settings.SQLITE_MMAP_SIZE,
+        }
+
     @staticmethod
     def configure_query_optimization():
         """Configure query optimization settings"""
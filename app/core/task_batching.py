@@ -0,0 +1,179 @@
+# app/core/task_batching.py
+"""
+Micro-lotes de tareas pequeñas de Celery.
+
+Una tarea por modelo, usuario o destinatario paga un viaje al broker, el
+reparto del prefork y una sesión de BD. ``batched_task`` convierte un
+manejador de lotes en una tarea de vaciado: ``submit`` añade la llamada a
+una lista de Redis por tipo de tarea y devuelve un ``AsyncResult`` propio
+del elemento. El lote se vacía al llegar a ``max_items`` elementos o
+``max_wait_seconds`` después del primero, lo que ocurra antes.
+
+El vaciado toma un bloqueo por tipo de tarea (si está tomado, se
+reprograma ``max_wait_seconds`` después) y recorre la lista en lotes
+de ``max_items``: llama al manejador con los elementos (uno por
+``key``; las repeticiones reciben el mismo resultado), guarda el resultado
+de cada elemento en el backend y solo entonces los quita de la lista. Si
+el worker muere a mitad, el lote se repite: el manejador debe ser
+idempotente (upserts) y los elementos que ya tienen resultado se saltan.
+Si el manejador falla, el lote se reintenta; agotados los reintentos,
+cada elemento queda en FAILURE.
+"""
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+from celery import states
+from celery.app.task import Context
+
+from app.core.task_serialization import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+BUFFER_PREFIX = "celery-batch:"
+
+
+@dataclass
+class BatchItem:
+    # Id del elemento, consultable con AsyncResult como el de una tarea
+    id: str
+    # Clave de idempotencia: los elementos con la misma clave se procesan una vez
+    key: str
+    args: List[Any] = field(default_factory=list)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    enqueued_at: float = 0.0
+
+
+BatchHandler = Callable[[List[BatchItem]], Mapping[str, Any]]
+
+
+class BatchedTask:
+    """
+    Tarea de Celery que vacía el lote de ``handler``. El manejador recibe
+    los elementos y devuelve el resultado de cada uno por ``key``; una
+    excepción como valor marca ese elemento como fallido y una clave
+    ausente también.
+    """
+
+    def __init__(
+        self,
+        app,
+        handler: BatchHandler,
+        name: str,
+        max_items: int = 50,
+        max_wait_seconds: float = 2.0,
+        lock_seconds: float = 300.0,
+        max_retries: int = 3,
+        retry_seconds: float = 10.0,
+        acks_late: bool = False,
+        client=None,
+    ):
+        self.app = app
+        self.handler = handler
+        self.name = name
+        self.max_items = max_items
+        self.max_wait_seconds = max_wait_seconds
+        self.lock_seconds = lock_seconds
+        self.retry_seconds = retry_seconds
+        self.buffer_key = f"{BUFFER_PREFIX}{name}"
+        self.lock_key = f"{self.buffer_key}:lock"
+        self._client = client
+
+        def flush(task):
+            return self.flush(task)
+
+        flush.__doc__ = handler.__doc__
+        self.task = app.task(
+            name=name, bind=True, max_retries=max_retries, acks_late=acks_late, shared=False
+        )(flush)
+
+    @property
+    def client(self):
+        # La lista del lote vive en el Redis del broker
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.app.conf.broker_url)
+        return self._client
+
+    def submit(self, *args, key: Optional[str] = None, **kwargs):
+        """Añade una llamada al lote; devuelve el ``AsyncResult`` del elemento."""
+        item_id = str(uuid.uuid4())
+        item = BatchItem(item_id, key or item_id, list(args), kwargs, time.time())
+        length = self.client.rpush(self.buffer_key, dumps(asdict(item)))
+        if length % self.max_items == 0:
+            self.task.apply_async()
+        elif length == 1:
+            self.task.apply_async(countdown=self.max_wait_seconds)
+        return self.app.AsyncResult(item_id)
+
+    def pending(self) -> int:
+        return self.client.llen(self.buffer_key)
+
+    def flush(self, task) -> dict:
+        """
+        Vacía el lote. Si otro vaciado tiene el bloqueo, se reprograma: los
+        elementos que lleguen después de su última lectura quedarían sin
+        vaciado programado.
+        """
+        token = str(uuid.uuid4())
+        if not self.client.set(self.lock_key, token, nx=True, ex=int(self.lock_seconds)):
+            task.apply_async(countdown=self.max_wait_seconds)
+            return {"items": 0, "batches": 0, "skipped": True}
+        items_done = batches = 0
+        try:
+            while True:
+                raw = self.client.lrange(self.buffer_key, 0, self.max_items - 1)
+                if not raw:
+                    break
+                items = [BatchItem(**loads(value)) for value in raw]
+                self._process(task, items)
+                self.client.ltrim(self.buffer_key, len(raw), -1)
+                self.client.expire(self.lock_key, int(self.lock_seconds))
+                items_done += len(items)
+                batches += 1
+        finally:
+            if self.client.get(self.lock_key) == token.encode():
+                self.client.delete(self.lock_key)
+        return {"items": items_done, "batches": batches}
+
+    def _process(self, task, items: List[BatchItem]) -> None:
+        backend = self.app.backend
+        keys = [backend.get_key_for_task(item.id) for item in items]
+        values = backend.mget(keys)
+        # Redis devuelve una lista alineada con las claves; otros backends, un dict
+        if not hasattr(values, "items"):
+            values = dict(zip(keys, values))
+        # Elementos con resultado de un vaciado interrumpido antes de recortar la lista
+        todo = [item for item, key in zip(items, keys) if values.get(key) is None]
+        unique: Dict[str, BatchItem] = {}
+        for item in todo:
+            unique.setdefault(item.key, item)
+        if not unique:
+            return
+        try:
+            results = self.handler(list(unique.values()))
+        except Exception as exc:
+            if task.request.retries < task.max_retries:
+                # Los elementos siguen en la lista para el reintento
+                raise task.retry(exc=exc, countdown=self.retry_seconds)
+            logger.error(f"Batch {self.name} failed for {len(unique)} items: {exc}")
+            results = {key: exc for key in unique}
+
+        request = Context(task=self.name)
+        for item in todo:
+            if item.key not in results:
+                result, state = KeyError(f"Sin resultado para {item.key}"), states.FAILURE
+            else:
+                result = results[item.key]
+                state = states.FAILURE if isinstance(result, Exception) else states.SUCCESS
+            backend.store_result(item.id, result, state, request=request)
+
+
+def batched_task(app, name: str, **options) -> Callable[[BatchHandler], BatchedTask]:
+    """Decorador: registra ``handler`` como la tarea de vaciado ``name``."""
+    def decorator(handler: BatchHandler) -> BatchedTask:
+        return BatchedTask(app, handler, name, **options)
+    return decorator
@@ -0,0 +1,276 @@
+# app/core/task_queues.py
+"""
+Colas de Celery por carril de prioridad y autoescalado por profundidad.
+
+Cada tarea registrada pertenece a un carril (``TASK_LANES``), y cada carril
+es una cola con sus propios workers:
+
+* ``ai_interactive``: IA que un usuario espera desde la API (segundos).
+* ``ai_bulk``: recálculos del catálogo, espesor de pared, LODs, archivado y
+  calibración.
+* ``email``, ``sync`` y ``maintenance``.
+
+``route_task`` es el router de ``task_routes``; una cola explícita en
+``apply_async(queue=...)`` tiene precedencia. ``validate_routes`` falla al
+arrancar el worker si hay tareas registradas sin carril, carriles de
+tareas que no existen, entradas de beat con nombres desconocidos o tareas
+cuyo ``acks_late`` no coincide con ``LATE_ACK_LANES``.
+
+``QueueDepthAutoscaler`` (``worker_autoscaler``, con ``--autoscale=max,min``)
+ajusta la concurrencia del worker a la profundidad de sus colas en el
+broker. Para cada carril, ``LanePolicy`` pide los procesos que vacían la
+cola dentro de ``target_wait_seconds`` con el tiempo por tarea medido. El
+default de Celery solo mira los mensajes ya reservados, que con
+``worker_prefetch_multiplier=1`` nunca superan la concurrencia actual.
+"""
+import logging
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from celery.worker import state
+from celery.worker.autoscale import Autoscaler
+from kombu import Exchange, Queue
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRoutingError(Exception):
+    """Tareas sin carril, carriles de tareas inexistentes o beat con nombres desconocidos"""
+    pass
+
+
+@dataclass(frozen=True)
+class Lane:
+    name: str
+    # Espera máxima deseada de una tarea en la cola
+    target_wait_seconds: float
+    # Estimación inicial del tiempo por tarea, hasta medirlo
+    task_seconds: float
+    min_concurrency: int
+    max_concurrency: int
+
+
+# En orden de prioridad: un worker que consume varias colas las vacía en este orden
+LANES: Dict[str, Lane] = {
+    lane.name: lane for lane in (
+        Lane("ai_interactive", target_wait_seconds=5, task_seconds=3, min_concurrency=2, max_concurrency=8),
+        Lane("ai_bulk", target_wait_seconds=600, task_seconds=20, min_concurrency=1, max_concurrency=4),
+        Lane("email", target_wait_seconds=60, task_seconds=2, min_concurrency=1, max_concurrency=2),
+        Lane("sync", target_wait_seconds=300, task_seconds=10, min_concurrency=1, max_concurrency=4),
+        Lane("maintenance", target_wait_seconds=1800, task_seconds=60, min_concurrency=1, max_concurrency=2),
+    )
+}
+
+# Carriles cuyas tareas se confirman al terminar y se repiten si el worker
+# muere: la IA es idempotente (recalcula y reescribe la misma fila). Correo,
+# sincronización y mantenimiento se confirman al recibirse; repetirlos
+# enviaría dos veces un correo o solaparía dos backups
+LATE_ACK_LANES = frozenset({"ai_interactive", "ai_bulk"})
+
+TASK_LANES: Dict[str, str] = {
+    # IA solicitada desde la API
+    "app.tasks.generate_seo_title_task": "ai_interactive",
+    "app.tasks.generate_market_description_task": "ai_interactive",
+    "app.tasks.generate_tags_task": "ai_interactive",
+    "app.tasks.generate_tags_batch_task": "ai_interactive",
+    "app.tasks.analyze_complexity_task": "ai_interactive",
+    "app.tasks.predict_print_time_task": "ai_interactive",
+    "app.tasks.index_model_shape_task": "ai_interactive",
+    # IA en segundo plano
+    # Espesor de pared: decenas de segundos con 1M caras (ver mesh_bvh)
+    "app.tasks.analyze_wall_thickness_task": "ai_bulk",
+    "app.tasks.generate_model_lods_task": "ai_bulk",
+    "app.tasks.archive_model_file_task": "ai_bulk",
+    "app.tasks.calibrate_print_time_task": "ai_bulk",
+    "app.tasks.recompute_complexity_scores_task": "ai_bulk",
+    "app.tasks.recompute_complexity_batch_task": "ai_bulk",
+    "app.tasks.send_email_task": "email",
+    "app.tasks.send_quote_email_task": "email",
+    "app.tasks.sync_marketplace_data_task": "sync",
+    "app.tasks.sync_user_marketplace_data_task": "sync",
+    "app.tasks.cleanup_old_files_task": "maintenance",
+    "app.tasks.backup_database_task": "maintenance",
+    "app.tasks.generate_daily_analytics_task": "maintenance",
+    "app.tasks.ensure_inventory_partitions_task": "maintenance",
+    "app.tasks.reconcile_dashboard_summaries_task": "maintenance",
+}
+
+
+def route_task(name, args, kwargs, options, task=None, **kw) -> Optional[dict]:
+    """Router de ``task_routes``: la cola del carril de la tarea."""
+    lane = TASK_LANES.get(name)
+    return {"queue": lane} if lane is not None else None
+
+
+def queue_settings() -> dict:
+    """Configuración de Celery para los carriles."""
+    return dict(
+        task_queues=[Queue(name, Exchange(name), routing_key=name) for name in LANES],
+        task_default_queue="ai_bulk",
+        task_routes=(route_task,),
+        # Un mensaje reservado por proceso: las tareas largas no acaparan la
+        # cola mientras hay procesos libres en otros workers
+        worker_prefetch_multiplier=1,
+        # Redis: las colas de un worker se consultan en el orden de -Q
+        broker_transport_options={"queue_order_strategy": "priority"},
+        worker_autoscaler="app.core.task_queues:QueueDepthAutoscaler",
+    )
+
+
+def validate_routes(app) -> None:
+    """Comprueba que las tareas registradas, los carriles y el beat coinciden."""
+    registered = {name for name in app.tasks if not name.startswith("celery.")}
+    problems: List[str] = []
+    unrouted = sorted(registered - TASK_LANES.keys())
+    if unrouted:
+        problems.append(f"tareas sin carril: {', '.join(unrouted)}")
+    missing = sorted(TASK_LANES.keys() - registered)
+    if missing:
+        problems.append(f"carriles de tareas no registradas: {', '.join(missing)}")
+    unknown_lanes = sorted({lane for lane in TASK_LANES.values() if lane not in LANES})
+    if unknown_lanes:
+        problems.append(f"carriles desconocidos: {', '.join(unknown_lanes)}")
+    wrong_acks = sorted(
+        name for name in registered & TASK_LANES.keys()
+        if bool(app.tasks[name].acks_late) != (TASK_LANES[name] in LATE_ACK_LANES)
+    )
+    if wrong_acks:
+        problems.append(f"acks_late distinto del de su carril: {', '.join(wrong_acks)}")
+    for entry, schedule in sorted((app.conf.beat_schedule or {}).items()):
+        if schedule["task"] not in registered:
+            problems.append(f"beat '{entry}' usa la tarea desconocida {schedule['task']}")
+    if problems:
+        raise TaskRoutingError("; ".join(problems))
+
+
+def queue_depths(app, queues: Iterable[str]) -> Dict[str, int]:
+    """Mensajes pendientes por cola en el broker (0 si la cola no existe)."""
+    depths = {}
+    with app.connection_for_read() as conn:
+        channel = conn.default_channel
+        for queue in queues:
+            try:
+                depths[queue] = channel.queue_declare(queue=queue, passive=True).message_count
+            except conn.channel_errors:
+                depths[queue] = 0
+                channel = conn.default_channel
+    return depths
+
+
+class LanePolicy:
+    """Concurrencia que necesita un carril para cumplir su espera objetivo."""
+
+    def __init__(self, lane: Lane, smoothing: float = 0.3):
+        self.lane = lane
+        self.smoothing = smoothing
+        self.task_seconds = lane.task_seconds
+
+    def observe(self, completed: int, busy_seconds: float) -> None:
+        """Actualiza el tiempo por tarea con ``completed`` tareas en ``busy_seconds`` de procesos ocupados."""
+        if completed > 0 and busy_seconds > 0:
+            sample = busy_seconds / completed
+            self.task_seconds += self.smoothing * (sample - self.task_seconds)
+
+    def expected_wait(self, depth: int, concurrency: int) -> float:
+        return depth * self.task_seconds / max(concurrency, 1)
+
+    def desired(self, depth: int, busy: int) -> int:
+        # La cola se vacía en depth * task_seconds / c segundos; los procesos
+        # ocupados no se retiran
+        needed = math.ceil(depth * self.task_seconds / self.lane.target_wait_seconds)
+        return min(max(needed, busy, self.lane.min_concurrency), self.lane.max_concurrency)
+
+
+class QueueDepthAutoscaler(Autoscaler):
+    """
+    Autoscaler de Celery guiado por la profundidad de las colas del worker.
+    La concurrencia deseada es la suma de la de sus carriles, acotada por
+    ``--autoscale=max,min``. El broker se consulta cada ``poll_seconds``.
+    """
+    poll_seconds = 5.0
+
+    def __init__(self, *args, clock=time.monotonic, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.clock = clock
+        self.policies: Dict[str, LanePolicy] = {}
+        self._desired: Optional[int] = None
+        self._polled_at: Optional[float] = None
+        self._completed: Dict[str, int] = {}
+
+    def worker_queues(self) -> List[str]:
+        return [name for name in self.worker.app.amqp.queues.consume_from if name in LANES]
+
+    def _busy_by_lane(self) -> Dict[str, int]:
+        busy: Dict[str, int] = {}
+        for request in list(state.active_requests):
+            lane = (request.delivery_info or {}).get("routing_key") or TASK_LANES.get(request.name)
+            busy[lane] = busy.get(lane, 0) + 1
+        return busy
+
+    def _completed_by_lane(self) -> Dict[str, int]:
+        completed: Dict[str, int] = {}
+        for name, count in state.total_count.items():
+            lane = TASK_LANES.get(name)
+            completed[lane] = completed.get(lane, 0) + count
+        return completed
+
+    def desired_concurrency(self, depths: Mapping[str, int], busy: Mapping[str, int]) -> int:
+        total = sum(self.policies[queue].desired(depths.get(queue, 0), busy.get(queue, 0)) for queue in self.policies)
+        return min(max(total, self.min_concurrency), self.max_concurrency)
+
+    def poll(self) -> int:
+        now = self.clock()
+        queues = self.worker_queues()
+        for queue in queues:
+            self.policies.setdefault(queue, LanePolicy(LANES[queue]))
+        busy = self._busy_by_lane()
+        completed = self._completed_by_lane()
+        if self._polled_at is not None:
+            elapsed = now - self._polled_at
+            for queue in queues:
+                done = completed.get(queue, 0) - self._completed.get(queue, 0)
+                self.policies[queue].observe(done, busy.get(queue, 0) * elapsed)
+        self._completed, self._polled_at = completed, now
+        depths = queue_depths(self.worker.app, queues)
+        self._desired = self.desired_concurrency(depths, busy)
+        logger.debug(
+            f"Autoscale {','.join(queues)}: depths {depths}, busy {busy}, "
+            f"{self.processes} -> {self._desired} processes"
+        )
+        return self._desired
+
+    def _maybe_scale(self, req=None):
+        if self._polled_at is None or self.clock() - self._polled_at >= self.poll_seconds:
+            try:
+                self.poll()
+            except Exception as e:
+                # Sin broker no se cambia la concurrencia
+                logger.warning(f"Autoscale poll failed: {e}")
+        if self._desired is None:
+            return None
+        procs = self.processes
+        if self._desired > procs:
+            self.scale_up(self._desired - procs)
+            return True
+        if self._desired < procs:
+            self.scale_down(procs - self._desired)
+            return True
+
+    def scale_up(self, n):
+        self._last_scale_up = self.clock()
+        return self._grow(n)
+
+    def scale_down(self, n):
+        # Reduce tras ``keepalive`` desde el último crecimiento; el default
+        # de Celery no reduce nunca si el worker no ha crecido
+        if self._last_scale_up is None or self.clock() - self._last_scale_up > self.keepalive:
+            return self._shrink(n)
+
+    def info(self):
+        return {
+            **super().info(),
+            "desired": self._desired,
+            "task_seconds": {queue: round(p.task_seconds, 3) for queue, p in self.policies.items()},
+        }
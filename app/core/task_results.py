@@ -0,0 +1,101 @@
+# app/core/task_results.py
+"""
+Política de resultados de Celery por tarea.
+
+Cada tarea de ``TASK_LANES`` declara en ``RESULT_TTLS`` cuánto vive su
+resultado en Redis: ``IGNORE`` no lo guarda (``ignore_result``) y un número
+lo guarda esos segundos. Las tareas de IA devuelven solo su ``model_id``:
+``/ai/result`` consulta su estado mientras el cliente espera y con él lee
+la fila de ``model_metadata``, donde está el resultado en sí; una hora
+basta. Las ignoradas
+guardan igualmente sus fallos (``task_store_errors_even_if_ignored``) con
+el TTL por defecto.
+
+``PolicyRedisBackend`` aplica el TTL de la tarea al escribir su resultado;
+el de Celery aplica ``result_expires`` a todas por igual.
+"""
+import threading
+from typing import Dict, Optional
+
+from celery.backends.redis import RedisBackend
+
+from app.core.task_queues import TASK_LANES, TaskRoutingError
+
+IGNORE = None
+HOUR = 3600
+DAY = 24 * HOUR
+
+RESULT_TTLS: Dict[str, Optional[int]] = {
+    # IA solicitada desde la API: el cliente consulta el estado en segundos
+    "app.tasks.generate_seo_title_task": HOUR,
+    "app.tasks.generate_market_description_task": HOUR,
+    "app.tasks.generate_tags_task": HOUR,
+    # También los resultados por elemento del lote
+    "app.tasks.generate_tags_batch_task": HOUR,
+    "app.tasks.analyze_complexity_task": HOUR,
+    "app.tasks.predict_print_time_task": HOUR,
+    "app.tasks.analyze_wall_thickness_task": HOUR,
+    "app.tasks.index_model_shape_task": HOUR,
+    # Resúmenes que se consultan poco después de terminar
+    "app.tasks.generate_model_lods_task": HOUR,
+    "app.tasks.archive_model_file_task": HOUR,
+    "app.tasks.calibrate_print_time_task": DAY,
+    "app.tasks.recompute_complexity_scores_task": DAY,
+    # Sin lector: un resultado por lote del catálogo o por correo enviado
+    "app.tasks.recompute_complexity_batch_task": IGNORE,
+    "app.tasks.send_email_task": IGNORE,
+    "app.tasks.send_quote_email_task": IGNORE,
+    # Cada 5 minutos: una hora de historial son 12 claves
+    "app.tasks.sync_marketplace_data_task": HOUR,
+    "app.tasks.sync_user_marketplace_data_task": HOUR,
+    "app.tasks.cleanup_old_files_task": 7 * DAY,
+    "app.tasks.backup_database_task": 7 * DAY,
+    "app.tasks.generate_daily_analytics_task": 7 * DAY,
+    "app.tasks.ensure_inventory_partitions_task": 7 * DAY,
+    "app.tasks.reconcile_dashboard_summaries_task": DAY,
+}
+
+
+def result_settings(default_ttl: int = DAY) -> dict:
+    """Configuración de Celery para los resultados."""
+    missing = sorted(TASK_LANES.keys() - RESULT_TTLS.keys())
+    if missing:
+        raise TaskRoutingError(f"tareas sin política de resultado: {', '.join(missing)}")
+    return dict(
+        # TTL de fallos de tareas ignoradas, grupos y tareas sin política
+        result_expires=default_ttl,
+        task_store_errors_even_if_ignored=True,
+        task_annotations={
+            name: {"ignore_result": True} for name, ttl in RESULT_TTLS.items() if ttl is IGNORE
+        },
+    )
+
+
+class PolicyRedisBackend(RedisBackend):
+    """Backend de Redis que guarda cada resultado con el TTL de su tarea."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._storing = threading.local()
+
+    def ttl_for(self, task_name: Optional[str]) -> Optional[int]:
+        ttl = RESULT_TTLS.get(task_name)
+        # Las tareas ignoradas solo llegan aquí al fallar
+        return ttl if ttl is not None else self.expires
+
+    def _store_result(self, task_id, result, state, traceback=None, request=None, **kwargs):
+        self._storing.ttl = self.ttl_for(getattr(request, "task", None))
+        try:
+            return super()._store_result(task_id, result, state, traceback, request, **kwargs)
+        finally:
+            self._storing.ttl = None
+
+    def _set(self, key, value):
+        ttl = getattr(self._storing, "ttl", None) or self.expires
+        with self.client.pipeline() as pipe:
+            if ttl:
+                pipe.setex(key, ttl, value)
+            else:
+                pipe.set(key, value)
+            pipe.publish(key, value)
+            pipe.execute()
@@ -0,0 +1,104 @@
+# app/core/task_serialization.py
+"""
+Serializador binario de mensajes y resultados de Celery.
+
+``msgpackz`` codifica con msgpack y, por encima de ``COMPRESS_MIN_BYTES``,
+comprime con zstd (manifiestos de lotes, resúmenes de G-code). El primer
+byte del cuerpo indica el formato, así que un consumidor decodifica
+mensajes comprimidos y sin comprimir por igual:
+
+* ``RAW``: msgpack sin comprimir.
+* ``ZSTD``: msgpack comprimido con zstd.
+
+zstandard es opcional: sin él todo se envía sin comprimir, pero recibir un
+cuerpo comprimido falla con ``PayloadDecodeError``. Las fechas, ``Decimal``,
+``UUID`` y conjuntos se codifican como los convierte el serializador JSON
+de kombu (texto ISO, texto y listas), para que una tarea reciba lo mismo
+con cualquiera de los dos durante el despliegue.
+"""
+import datetime
+import threading
+import uuid
+from decimal import Decimal
+
+import msgpack
+from kombu.serialization import register
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - depende del entorno
+    zstandard = None
+
+SERIALIZER = "msgpackz"
+CONTENT_TYPE = "application/x-msgpackz"
+
+RAW = b"\x00"
+ZSTD = b"\x01"
+
+# Por debajo de este tamaño la compresión no compensa su cabecera ni su CPU
+COMPRESS_MIN_BYTES = 1024
+COMPRESSION_LEVEL = 3
+
+
+# Los (des)compresores de zstandard no admiten llamadas concurrentes: uno por hilo
+_zstd = threading.local()
+
+
+class PayloadDecodeError(ValueError):
+    """Cuerpo con un formato desconocido o comprimido sin zstandard instalado"""
+    pass
+
+
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Tipo no serializable: {type(obj).__name__}")
+
+
+def _compressor():
+    if not hasattr(_zstd, "compressor"):
+        _zstd.compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+    return _zstd.compressor
+
+
+def _decompressor():
+    if not hasattr(_zstd, "decompressor"):
+        _zstd.decompressor = zstandard.ZstdDecompressor()
+    return _zstd.decompressor
+
+
+def dumps(obj, compress_min_bytes: int = COMPRESS_MIN_BYTES) -> bytes:
+    packed = msgpack.packb(obj, default=_default, use_bin_type=True)
+    if zstandard is not None and len(packed) >= compress_min_bytes:
+        compressed = _compressor().compress(packed)
+        if len(compressed) < len(packed):
+            return ZSTD + compressed
+    return RAW + packed
+
+
+def loads(data) -> object:
+    if isinstance(data, str):
+        data = data.encode("latin-1")
+    header, body = bytes(data[:1]), data[1:]
+    if header == ZSTD:
+        if zstandard is None:
+            raise PayloadDecodeError("Cuerpo comprimido con zstd y zstandard no está instalado")
+        body = _decompressor().decompress(body)
+    elif header != RAW:
+        raise PayloadDecodeError(f"Cabecera de cuerpo desconocida: {header!r}")
+    return msgpack.unpackb(body, raw=False, strict_map_key=False)
+
+
+def register_serializer(compress_min_bytes: int = COMPRESS_MIN_BYTES) -> None:
+    """Registra ``msgpackz`` en kombu; los procesos que envían o leen tareas deben llamarla."""
+    register(
+        SERIALIZER,
+        lambda obj: dumps(obj, compress_min_bytes),
+        loads,
+        content_type=CONTENT_TYPE,
+        content_encoding="binary",
+    )
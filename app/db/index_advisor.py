@@ -0,0 +1,248 @@
+# app/db/index_advisor.py
+"""
+Asesor de índices para las formas de consulta que emite la aplicación.
+
+``QueryShapeRecorder`` escucha ``before_cursor_execute`` de un engine y
+agrupa los SELECT por forma (SQL parametrizado, listas ``IN`` colapsadas).
+``IndexAdvisor`` ejecuta EXPLAIN sobre cada forma y, para las tablas que el
+plan recorre completas, propone:
+
+* un índice compuesto con las columnas comparadas por igualdad seguidas de
+  la primera columna comparada por rango (``status = ? AND updated_at >= ?``
+  -> ``(status, updated_at)``);
+* un índice parcial cuando el filtro compara dos columnas de la misma fila
+  (``current_stock <= low_stock_threshold``), que ningún B-tree por columna
+  puede resolver.
+
+Soporta PostgreSQL (``EXPLAIN (FORMAT JSON)``) y SQLite
+(``EXPLAIN QUERY PLAN``).
+"""
+import re
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import Connection, Engine
+
+_WHITESPACE = re.compile(r"\s+")
+_PARAM_LIST = re.compile(r"\(\s*(?:\?|%\(\w+\)s|\$\d+|:\w+)(?:\s*,\s*(?:\?|%\(\w+\)s|\$\d+|:\w+))*\s*\)")
+_PREDICATE = re.compile(
+    r"\b(?P<table>\w+)\.(?P<column>\w+)\s*"
+    r"(?P<op>>=|<=|<>|!=|=|>|<|\bNOT\s+IN\b|\bIN\b|\bIS\s+NOT\b|\bIS\b)\s*"
+    r"(?:(?P<other_table>\w+)\.(?P<other_column>\w+)\b)?",
+    re.IGNORECASE,
+)
+_SQLITE_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)$")
+
+EQUALITY_OPS = {"=", "IN", "IS"}
+RANGE_OPS = {">", ">=", "<", "<="}
+
+
+def normalize_statement(statement: str) -> str:
+    """Forma de una sentencia: espacios y listas de parámetros colapsados."""
+    return _PARAM_LIST.sub("(...)", _WHITESPACE.sub(" ", statement.strip()))
+
+
+@dataclass
+class QueryShape:
+    """Consulta agrupada por forma con un ejemplo de parámetros."""
+    statement: str
+    parameters: Any
+    calls: int = 0
+    total_seconds: float = 0.0
+
+
+class QueryShapeRecorder:
+    """Registra las formas de los SELECT ejecutados sobre un engine."""
+
+    def __init__(self):
+        self.shapes: Dict[str, QueryShape] = {}
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info["index_advisor_start"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info.pop("index_advisor_start", None)
+        if executemany or start is None or not statement.lstrip().upper().startswith("SELECT"):
+            return
+        key = normalize_statement(statement)
+        shape = self.shapes.get(key)
+        if shape is None:
+            shape = self.shapes[key] = QueryShape(statement, parameters)
+        shape.calls += 1
+        shape.total_seconds += time.perf_counter() - start
+
+    @contextmanager
+    def record(self, engine: Engine) -> Iterator["QueryShapeRecorder"]:
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        try:
+            yield self
+        finally:
+            event.remove(engine, "before_cursor_execute", self._before)
+            event.remove(engine, "after_cursor_execute", self._after)
+
+
+@dataclass(frozen=True)
+class IndexProposal:
+    """Índice propuesto; ``where`` lo convierte en parcial."""
+    table: str
+    columns: Tuple[str, ...]
+    where: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        suffix = "_partial" if self.where else ""
+        return f"ix_{self.table}_{'_'.join(self.columns)}{suffix}"
+
+    def ddl(self, dialect_name: str = "postgresql") -> str:
+        """``CREATE INDEX`` (``CONCURRENTLY`` en PostgreSQL) idempotente."""
+        concurrently = " CONCURRENTLY" if dialect_name == "postgresql" else ""
+        where = f" WHERE {self.where}" if self.where else ""
+        return (
+            f"CREATE INDEX{concurrently} IF NOT EXISTS {self.name} "
+            f"ON {self.table} ({', '.join(self.columns)}){where}"
+        )
+
+
+@dataclass
+class ShapeAdvice:
+    """Resultado de EXPLAIN y propuestas para una forma de consulta."""
+    shape: QueryShape
+    full_scans: List[str]
+    proposals: List[IndexProposal] = field(default_factory=list)
+
+
+def explain_full_scans(conn: Connection, statement: str, parameters: Any) -> List[str]:
+    """Tablas que el plan de la sentencia recorre completas."""
+    dialect_name = conn.dialect.name
+    if dialect_name == "sqlite":
+        rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        return [m.group(1) for m in (_SQLITE_SCAN.match(row[-1]) for row in rows) if m]
+    if dialect_name == "postgresql":
+        plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        scans, stack = [], [plan[0]["Plan"]]
+        while stack:
+            node = stack.pop()
+            if node.get("Node Type") == "Seq Scan":
+                scans.append(node["Relation Name"])
+            stack.extend(node.get("Plans", []))
+        return scans
+    raise ValueError(f"EXPLAIN no soportado para el dialecto {dialect_name}")
+
+
+def _predicates(statement: str, table: str) -> Tuple[List[str], List[str], List[Tuple[str, str, str]]]:
+    """Columnas de ``table`` filtradas por igualdad, por rango y contra otra columna."""
+    equality, ranges, column_pairs = [], [], []
+    for m in _PREDICATE.finditer(statement):
+        if m.group("table") != table:
+            continue
+        op = _WHITESPACE.sub(" ", m.group("op").upper())
+        column = m.group("column")
+        if m.group("other_column"):
+            # Igualdad entre columnas es un join; el rango en la misma fila, un filtro
+            if op in RANGE_OPS and m.group("other_table") == table:
+                column_pairs.append((column, op, m.group("other_column")))
+        elif op in EQUALITY_OPS and column not in equality:
+            equality.append(column)
+        elif op in RANGE_OPS and column not in ranges:
+            ranges.append(column)
+    return equality, [c for c in ranges if c not in equality], column_pairs
+
+
+def propose_for_table(statement: str, table: str) -> List[IndexProposal]:
+    """Índices que permitirían resolver los filtros de ``table`` sin recorrerla."""
+    equality, ranges, column_pairs = _predicates(statement, table)
+    if column_pairs:
+        return [
+            IndexProposal(table, tuple(equality) + (column,), f"{column} {op} {other}")
+            for column, op, other in column_pairs
+        ]
+    if equality or ranges:
+        return [IndexProposal(table, tuple(equality) + tuple(ranges[:1]))]
+    return []
+
+
+class IndexAdvisor:
+    """
+    Propone índices para las formas registradas. Se ignoran tablas con menos
+    de ``min_rows`` filas y propuestas ya cubiertas por un índice existente.
+    """
+
+    def __init__(self, engine: Engine, min_rows: int = 1000):
+        self.engine = engine
+        self.min_rows = min_rows
+
+    def _existing(self) -> Dict[str, List[Tuple[str, Tuple[str, ...]]]]:
+        inspector = inspect(self.engine)
+        existing = {}
+        for table in inspector.get_table_names():
+            indexes = [(ix["name"], tuple(ix["column_names"])) for ix in inspector.get_indexes(table)]
+            indexes += [
+                (uq["name"], tuple(uq["column_names"])) for uq in inspector.get_unique_constraints(table)
+            ]
+            pk = inspector.get_pk_constraint(table)
+            if pk and pk.get("constrained_columns"):
+                indexes.append((pk.get("name"), tuple(pk["constrained_columns"])))
+            existing[table] = indexes
+        return existing
+
+    def _covered(self, proposal: IndexProposal, existing) -> bool:
+        for name, columns in existing.get(proposal.table, []):
+            if name == proposal.name:
+                return True
+            if not proposal.where and columns[:len(proposal.columns)] == proposal.columns:
+                return True
+        return False
+
+    def _row_counts(self, conn: Connection, tables: Iterable[str]) -> Dict[str, int]:
+        return {t: conn.exec_driver_sql(f"SELECT count(*) FROM {t}").scalar() for t in tables}
+
+    def analyze(self, shapes: Iterable[QueryShape]) -> List[ShapeAdvice]:
+        existing = self._existing()
+        advice = []
+        with self.engine.connect() as conn:
+            counts = self._row_counts(conn, existing)
+            for shape in shapes:
+                scans = [t for t in explain_full_scans(conn, shape.statement, shape.parameters) if t in existing]
+                proposals = [
+                    p
+                    for table in dict.fromkeys(scans)
+                    if counts[table] >= self.min_rows
+                    for p in propose_for_table(shape.statement, table)
+                    if not self._covered(p, existing)
+                ]
+                advice.append(ShapeAdvice(shape, scans, proposals))
+        return advice
+
+    def propose(self, shapes: Iterable[QueryShape]) -> List[IndexProposal]:
+        """Propuestas únicas; un índice que es prefijo de otro se descarta."""
+        unique: List[IndexProposal] = []
+        for advice in self.analyze(shapes):
+            for proposal in advice.proposals:
+                if proposal not in unique:
+                    unique.append(proposal)
+        return [
+            p for p in unique
+            if p.where or not any(
+                o is not p and not o.where and o.table == p.table
+                and len(o.columns) > len(p.columns) and o.columns[:len(p.columns)] == p.columns
+                for o in unique
+            )
+        ]
+
+    def apply(self, proposals: Iterable[IndexProposal]) -> List[str]:
+        """Crea los índices; en PostgreSQL fuera de transacción (``CONCURRENTLY``)."""
+        created = []
+        dialect_name = self.engine.dialect.name
+        with self.engine.connect() as conn:
+            if dialect_name == "postgresql":
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            for proposal in proposals:
+                conn.exec_driver_sql(proposal.ddl(dialect_name))
+                created.append(proposal.name)
+            if dialect_name != "postgresql":
+                conn.commit()
+        return created
@@ -0,0 +1,213 @@
+# app/db/instrumentation.py
+"""
+Instrumentación de sentencias SQL por huella y por unidad de trabajo.
+
+``StatementRecorder.instrument`` escucha ``before_cursor_execute`` /
+``after_cursor_execute`` de un engine. Cada sentencia se reduce a su huella
+(literales y listas de parámetros colapsados) y su latencia se registra:
+
+* en Prometheus, por huella (``db_statement_duration_seconds``) y por unidad
+  de trabajo (petición HTTP o tarea Celery);
+* en un resumen en memoria que sirve el reporte de depuración.
+
+Una unidad de trabajo (``unit_of_work``) cuenta las ejecuciones de cada
+huella; si una se repite ``n_plus_one_threshold`` veces o más se reporta
+como posible N+1 (una consulta por elemento de una colección).
+
+También se cuenta si cada ejecución reutilizó SQL ya compilado de la caché
+del engine (``db_compile_cache_total``); una tasa de aciertos baja indica
+sentencias que se construyen distintas en cada llamada.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine.default import CACHE_HIT, CACHE_MISS
+
+from app.core.metrics import (
+    DB_COMPILE_CACHE,
+    DB_N_PLUS_ONE,
+    DB_SLOW_STATEMENTS,
+    DB_STATEMENT_DURATION,
+    DB_UNIT_DB_SECONDS,
+    DB_UNIT_STATEMENTS,
+)
+from app.db.index_advisor import normalize_statement
+
+logger = logging.getLogger(__name__)
+
+_CACHE_RESULTS = {CACHE_HIT: "hit", CACHE_MISS: "miss"}
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(statement: str) -> str:
+    """Forma normalizada de una sentencia, sin literales."""
+    statement = _NUMBER_LITERAL.sub("?", _STRING_LITERAL.sub("?", statement))
+    return normalize_statement(statement)
+
+
+def fingerprint_id(normalized: str) -> str:
+    """Identificador corto y estable de una huella (etiqueta de métricas)."""
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+@dataclass
+class StatementStats:
+    """Acumulado de una huella en este proceso."""
+    statement: str
+    calls: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    slow_calls: int = 0
+
+
+@dataclass
+class UnitOfWork:
+    """Sentencias ejecutadas dentro de una petición o tarea."""
+    name: str
+    counts: Dict[str, int] = field(default_factory=dict)
+    statements: int = 0
+    db_seconds: float = 0.0
+
+
+_current_unit: ContextVar[Optional[UnitOfWork]] = ContextVar("sql_unit_of_work", default=None)
+
+
+class StatementRecorder:
+    def __init__(self, slow_seconds: float = 0.5, n_plus_one_threshold: int = 10, max_incidents: int = 100):
+        self.slow_seconds = slow_seconds
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.stats: Dict[str, StatementStats] = {}
+        self.incidents: Deque[Dict[str, Any]] = deque(maxlen=max_incidents)
+        self.compile_cache: Dict[str, int] = {"hit": 0, "miss": 0, "uncached": 0}
+        self._lock = threading.Lock()
+
+    def instrument(self, engine) -> None:
+        """Registra los eventos en un engine (síncrono o asíncrono)."""
+        target = getattr(engine, "sync_engine", engine)
+        if not event.contains(target, "before_cursor_execute", self._before):
+            event.listen(target, "before_cursor_execute", self._before)
+            event.listen(target, "after_cursor_execute", self._after)
+
+    def uninstrument(self, engine) -> None:
+        target = getattr(engine, "sync_engine", engine)
+        if event.contains(target, "before_cursor_execute", self._before):
+            event.remove(target, "before_cursor_execute", self._before)
+            event.remove(target, "after_cursor_execute", self._after)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("sql_statement_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("sql_statement_start")
+        if not starts:
+            return
+        self.record(statement, time.perf_counter() - starts.pop())
+        self.record_cache(getattr(context, "cache_hit", None))
+
+    def record_cache(self, cache_hit) -> None:
+        result = _CACHE_RESULTS.get(cache_hit, "uncached")
+        DB_COMPILE_CACHE.labels(result=result).inc()
+        with self._lock:
+            self.compile_cache[result] += 1
+
+    def record(self, statement: str, seconds: float) -> None:
+        normalized = fingerprint(statement)
+        key = fingerprint_id(normalized)
+        DB_STATEMENT_DURATION.labels(statement=key).observe(seconds)
+        slow = seconds >= self.slow_seconds
+        if slow:
+            DB_SLOW_STATEMENTS.labels(statement=key).inc()
+            logger.warning(f"Slow SQL statement {key} ({seconds * 1000:.0f} ms): {normalized[:200]}")
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = StatementStats(normalized)
+            stats.calls += 1
+            stats.total_seconds += seconds
+            stats.max_seconds = max(stats.max_seconds, seconds)
+            stats.slow_calls += slow
+
+        unit = _current_unit.get()
+        if unit is not None:
+            unit.counts[key] = unit.counts.get(key, 0) + 1
+            unit.statements += 1
+            unit.db_seconds += seconds
+
+    @contextmanager
+    def unit_of_work(self, name: str) -> Iterator[UnitOfWork]:
+        """Agrupa las sentencias ejecutadas en el contexto actual."""
+        unit = UnitOfWork(name)
+        token = _current_unit.set(unit)
+        try:
+            yield unit
+        finally:
+            _current_unit.reset(token)
+            self.finish(unit)
+
+    def start(self, name: str):
+        """Inicia una unidad sin bloque ``with`` (señales de Celery)."""
+        unit = UnitOfWork(name)
+        return unit, _current_unit.set(unit)
+
+    def stop(self, unit: UnitOfWork, token) -> None:
+        _current_unit.reset(token)
+        self.finish(unit)
+
+    def finish(self, unit: UnitOfWork) -> None:
+        DB_UNIT_STATEMENTS.labels(unit=unit.name).observe(unit.statements)
+        DB_UNIT_DB_SECONDS.labels(unit=unit.name).observe(unit.db_seconds)
+        for key, count in unit.counts.items():
+            if count < self.n_plus_one_threshold:
+                continue
+            DB_N_PLUS_ONE.labels(unit=unit.name, statement=key).inc()
+            with self._lock:
+                statement = self.stats[key].statement if key in self.stats else ""
+                self.incidents.append({
+                    "unit": unit.name,
+                    "statement_id": key,
+                    "statement": statement,
+                    "executions": count,
+                    "at": time.time(),
+                })
+            logger.warning(f"Possible N+1 in {unit.name}: statement {key} executed {count} times")
+
+    def report(self, limit: int = 50) -> Dict[str, List[Dict[str, Any]]]:
+        """Huellas con más tiempo acumulado e incidentes N+1 recientes."""
+        with self._lock:
+            top = sorted(self.stats.items(), key=lambda item: item[1].total_seconds, reverse=True)[:limit]
+            incidents = list(self.incidents)
+            cache = dict(self.compile_cache)
+        lookups = cache["hit"] + cache["miss"]
+        cache["hit_rate"] = cache["hit"] / lookups if lookups else None
+        return {
+            "statements": [
+                {
+                    "statement_id": key,
+                    "statement": stats.statement,
+                    "calls": stats.calls,
+                    "total_ms": stats.total_seconds * 1000,
+                    "mean_ms": stats.total_seconds * 1000 / stats.calls,
+                    "max_ms": stats.max_seconds * 1000,
+                    "slow_calls": stats.slow_calls,
+                }
+                for key, stats in top
+            ],
+            "n_plus_one": incidents,
+            "compile_cache": cache,
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+            self.incidents.clear()
+            self.compile_cache = dict.fromkeys(self.compile_cache, 0)
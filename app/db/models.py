@@ -1,17 +1,203 @@
-from sqlalchemy import Column, Integer, String, JSON, Float, DateTime, func
+from sqlalchemy import (
+    Column, Integer, BigInteger, String, JSON, Float, Date, DateTime, Boolean, Text, Enum, LargeBinary,
+    ForeignKey, Index, UniqueConstraint, func,
+)
 from .base import Base
 
+
+class AuditMixin:
+    """Columnas comunes de las tablas de dominio (ver 001_initial_migration)."""
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    is_active = Column(Boolean, default=True)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
 
+class Project(AuditMixin, Base):
+    __tablename__ = "projects"
+
+    name = Column(String(200), nullable=False)
+    description = Column(Text, nullable=True)
+    client_name = Column(String(100), nullable=True)
+    client_email = Column(String(100), nullable=True)
+    platform = Column(
+        Enum('THINGIVERSE', 'MYMINIFACTORY', 'CULTS3D', 'PATREON', 'DIRECT', name='marketplaceplatform'),
+        nullable=True,
+    )
+    status = Column(
+        Enum('PLANNING', 'IN_PROGRESS', 'ON_HOLD', 'COMPLETED', 'CANCELLED', name='projectstatus'),
+        nullable=True,
+    )
+    due_date = Column(DateTime, nullable=True)
+    budget = Column(Float, nullable=True)
+    estimated_hours = Column(Float, nullable=True)
+    actual_hours = Column(Float, nullable=True)
+    estimated_cost = Column(Float, nullable=True)
+    actual_cost = Column(Float, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class ModelFile(AuditMixin, Base):
+    __tablename__ = "model_files"
+
+    filename = Column(String(255), nullable=False)
+    original_filename = Column(String(255), nullable=True)
+    file_path = Column(String(500), nullable=True)
+    file_size = Column(Integer, nullable=True)
+    file_type = Column(String(10), nullable=True)
+    title = Column(String(200), nullable=True)
+    description = Column(Text, nullable=True)
+    tags = Column(JSON, nullable=True)
+    estimated_print_time = Column(Float, nullable=True)
+    estimated_material_usage = Column(Float, nullable=True)
+    support_required = Column(Boolean, nullable=True)
+    seo_title = Column(String(200), nullable=True)
+    seo_description = Column(Text, nullable=True)
+    marketplace_urls = Column(JSON, nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+    # Copia de archivo en formato PMQ (ver app/services/mesh_codec.py)
+    archive_key = Column(String(64), nullable=True)
+    archive_size = Column(Integer, nullable=True)
+    archive_precision_mm = Column(Float, nullable=True)
+
+class Material(AuditMixin, Base):
+    __tablename__ = "materials"
+
+    name = Column(String(100), nullable=False)
+    brand = Column(String(50), nullable=True)
+    material_type = Column(
+        Enum('FILAMENT', 'RESIN', 'POWDER', 'OTHER', name='materialtype'),
+        nullable=True,
+    )
+    color = Column(String(30), nullable=True)
+    current_stock = Column(Float, nullable=True)
+    unit = Column(String(10), nullable=True)
+    low_stock_threshold = Column(Float, nullable=True)
+    reorder_threshold = Column(Float, nullable=True)
+    cost_per_unit = Column(Float, nullable=False)
+    supplier = Column(String(100), nullable=True)
+    supplier_sku = Column(String(50), nullable=True)
+    properties = Column(JSON, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class InventoryTransaction(AuditMixin, Base):
+    """
+    Libro de movimientos de inventario (solo inserciones). En PostgreSQL la
+    tabla está particionada por mes de ``created_at`` y su clave primaria
+    es ``(id, created_at)`` (ver 010_partition_inventory_transactions).
+    """
+    __tablename__ = "inventory_transactions"
+    __table_args__ = (
+        Index("ix_inventory_transactions_material_id_created_at", "material_id", "created_at"),
+    )
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    transaction_type = Column(String(20), nullable=False)
+    quantity = Column(Float, nullable=False)
+    unit_cost = Column(Float, nullable=True)
+    reference = Column(String(100), nullable=True)
+    notes = Column(Text, nullable=True)
+    material_id = Column(Integer, ForeignKey("materials.id"), nullable=True)
+
+class MaterialStockDaily(Base):
+    """Acumulado diario por material, mantenido al registrar movimientos."""
+    __tablename__ = "material_stock_daily"
+    __table_args__ = (
+        UniqueConstraint("material_id", "day", name="uq_material_stock_daily_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    material_id = Column(Integer, ForeignKey("materials.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    quantity_in = Column(Float, nullable=False, default=0.0)
+    quantity_out = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+    # Existencia al cierre del día según el libro de movimientos
+    closing_stock = Column(Float, nullable=False, default=0.0)
+
+class Quote(AuditMixin, Base):
+    __tablename__ = "quotes"
+
+    quote_number = Column(String(50), nullable=True)
+    client_name = Column(String(100), nullable=False)
+    client_email = Column(String(100), nullable=True)
+    client_phone = Column(String(20), nullable=True)
+    subtotal = Column(Float, nullable=True)
+    markup_percentage = Column(Float, nullable=True)
+    markup_amount = Column(Float, nullable=True)
+    total_amount = Column(Float, nullable=True)
+    status = Column(String(20), nullable=True)
+    valid_until = Column(DateTime, nullable=True)
+    sent_date = Column(DateTime, nullable=True)
+    notes = Column(Text, nullable=True)
+    terms_conditions = Column(Text, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class MarketplaceAccount(AuditMixin, Base):
+    __tablename__ = "marketplace_accounts"
+
+    platform = Column(
+        Enum('THINGIVERSE', 'MYMINIFACTORY', 'CULTS3D', 'PATREON', 'DIRECT', name='marketplaceplatform'),
+        nullable=False,
+    )
+    username = Column(String(100), nullable=True)
+    api_key = Column(String(255), nullable=True)
+    api_secret = Column(String(255), nullable=True)
+    is_connected = Column(Boolean, nullable=True)
+    last_sync = Column(DateTime, nullable=True)
+    total_views = Column(Integer, nullable=True)
+    total_downloads = Column(Integer, nullable=True)
+    total_revenue = Column(Float, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+
+class UserDashboardSummary(Base):
+    """
+    Totales del dashboard por usuario, mantenidos en cada flush y corregidos
+    por la reconciliación periódica (ver app/services/dashboard_summary.py).
+    """
+    __tablename__ = "user_dashboard_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    projects_planning = Column(Integer, nullable=False, default=0)
+    projects_in_progress = Column(Integer, nullable=False, default=0)
+    projects_on_hold = Column(Integer, nullable=False, default=0)
+    projects_completed = Column(Integer, nullable=False, default=0)
+    projects_cancelled = Column(Integer, nullable=False, default=0)
+    # Presupuesto de los proyectos completados
+    revenue_total = Column(Float, nullable=False, default=0.0)
+    quotes_total = Column(Integer, nullable=False, default=0)
+    quotes_draft = Column(Integer, nullable=False, default=0)
+    quotes_sent = Column(Integer, nullable=False, default=0)
+    quotes_accepted = Column(Integer, nullable=False, default=0)
+    quotes_rejected = Column(Integer, nullable=False, default=0)
+    quotes_value_total = Column(Float, nullable=False, default=0.0)
+    materials_low_stock = Column(Integer, nullable=False, default=0)
+    marketplace_views = Column(Integer, nullable=False, default=0)
+    marketplace_downloads = Column(Integer, nullable=False, default=0)
+    marketplace_revenue = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class ProjectCost(AuditMixin, Base):
+    __tablename__ = "project_costs"
+
+    category = Column(String(50), nullable=False)
+    item_name = Column(String(100), nullable=False)
+    quantity = Column(Float, nullable=True)
+    unit_cost = Column(Float, nullable=False)
+    total_cost = Column(Float, nullable=True)
+    notes = Column(Text, nullable=True)
+    project_id = Column(Integer, ForeignKey("projects.id"), nullable=True)
+
 class ModelMetadata(Base):
     __tablename__ = "model_metadata"
 
     id = Column(Integer, primary_key=True, index=True)
-    model_id = Column(String(36), index=True, nullable=False)
+    # Único: las escrituras son upserts por model_id (ver app/services/metadata_store.py)
+    model_id = Column(String(36), unique=True, index=True, nullable=False)
     seo_title = Column(String(100), nullable=True)
     market_description = Column(String, nullable=True)
     tags = Column(JSON, nullable=True)
@@ -20,5 +206,86 @@ class ModelMetadata(Base):
     file_size_kb = Column(Float, nullable=True)
     complexity_score = Column(Float, nullable=True)
     estimated_time_minutes = Column(Float, nullable=True)
+    # Estimación del predictor antes de calibrar: rasgo de la calibración
+    raw_time_minutes = Column(Float, nullable=True)
+    wall_thickness_report = Column(JSON, nullable=True)
+    # Última tarea de IA que escribió la fila (consulta de resultados por tarea);
+    # 155 caracteres, como el task_id de Celery en sus backends SQL
+    task_id = Column(String(155), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class PrintTimeCalibration(Base):
+    """Coeficientes ajustados por material y perfil de impresora."""
+    __tablename__ = "print_time_calibrations"
+    __table_args__ = (
+        UniqueConstraint("material", "printer_profile", name="uq_print_time_calibrations_group"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    material = Column(String(50), nullable=False)
+    printer_profile = Column(String(50), nullable=False)
+    feature_names = Column(JSON, nullable=False)
+    coefficients = Column(JSON, nullable=False)
+    alpha = Column(Float, nullable=False)
+    n_samples = Column(Integer, nullable=False)
+    mape = Column(Float, nullable=True)
+    baseline_mape = Column(Float, nullable=True)
+    fitted_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class ModelShapeDescriptor(Base):
+    """Descriptor de forma float32 (D2 + caja + momentos) de un modelo."""
+    __tablename__ = "model_shape_descriptors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_id = Column(String(36), unique=True, index=True, nullable=False)
+    # Sin clave foránea desde 013: el archivo puede estar en otro shard
+    model_file_id = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=False, default=1)
+    descriptor = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class ModelLod(Base):
+    """Nivel de detalle de un modelo guardado en el almacén de contenido."""
+    __tablename__ = "model_lods"
+    __table_args__ = (
+        UniqueConstraint("model_id", "level", name="uq_model_lods_level"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    model_id = Column(String(36), index=True, nullable=False)
+    level = Column(Integer, nullable=False)
+    triangle_count = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    # Nivel 0: ``content_key`` nulo y ``source_url`` apunta al archivo original
+    content_key = Column(String(64), nullable=True)
+    source_url = Column(String(2048), nullable=True)
+    cell_size_mm = Column(Float, nullable=False, default=0.0)
+    max_error_mm = Column(Float, nullable=False, default=0.0)
+    mean_error_mm = Column(Float, nullable=False, default=0.0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+class OnlineMigrationCheckpoint(Base):
+    """Avance de los backfills por lotes de las migraciones (ver app/db/online_migration.py)."""
+    __tablename__ = "online_migration_checkpoints"
+
+    name = Column(String(200), primary_key=True)
+    # Última clave procesada; el backfill sigue desde aquí si se interrumpe
+    last_key = Column(BigInteger, nullable=True)
+    rows_done = Column(BigInteger, nullable=False, default=0)
+    batches = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
+
+class TenantShard(Base):
+    """Shard de cada usuario: directorio del sharding por tenant (ver app/db/sharding.py)."""
+    __tablename__ = "tenant_shards"
+
+    user_id = Column(Integer, primary_key=True)
+    shard = Column(String(50), nullable=False, index=True)
+    # active, o moving mientras un rebalanceo congela sus escrituras
+    state = Column(String(20), nullable=False, default="active")
+    # Shard de destino durante el movimiento
+    moving_to = Column(String(50), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
@@ -0,0 +1,318 @@
+# app/db/online_migration.py
+"""
+Migraciones en línea: cambios de esquema y backfills sobre tablas grandes
+sin bloquearlas, para usar desde las revisiones de Alembic.
+
+* ``add_column`` / ``with_lock_budget``: el DDL corto (``ADD COLUMN``,
+  ``ALTER``) corre con ``lock_timeout``. Un ``ALTER TABLE`` que espera su
+  bloqueo exclusivo deja en cola detrás de él a todas las consultas de la
+  tabla; con el presupuesto agotado se retira, deja pasar el tráfico y
+  reintenta con una espera creciente.
+* ``create_index_concurrently``: ``CREATE INDEX CONCURRENTLY`` fuera de la
+  transacción de la migración. Antes elimina el índice inválido que deja una
+  construcción interrumpida.
+* ``backfill``: recorre la tabla por keyset sobre la clave primaria en lotes
+  cortos, cada uno en su propia transacción con ``statement_timeout``. El
+  avance se guarda en ``online_migration_checkpoints`` en la misma
+  transacción que el lote, así que una migración interrumpida sigue desde
+  el último lote confirmado. El tamaño del lote se ajusta para durar
+  alrededor de ``target_batch_seconds``; entre lotes se duerme
+  ``batch_sleep_seconds`` y se espera mientras el retraso de las réplicas
+  supere ``max_replica_lag_seconds``.
+
+Los presupuestos salen de ``settings`` (``MIGRATION_*``), de modo que una
+migración en horario laboral se puede lanzar con presupuestos más
+estrictos por variables de entorno. Ejemplo de revisión::
+
+    def upgrade():
+        add_column(op, "model_metadata", sa.Column("task_id", sa.String(155)))
+        create_index_concurrently(op, "ix_model_metadata_task_id", "model_metadata", ["task_id"])
+        with op.get_context().autocommit_block():
+            backfill(op.get_bind().engine, "012:tags", table, normalize_batch, columns=[table.c.tags])
+
+``backfill`` abre sus propias conexiones: debe llamarse dentro de
+``autocommit_block`` para que la transacción de la migración no retenga
+bloqueos sobre la tabla mientras tanto.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Sequence
+
+from sqlalchemy import func, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine, Row
+from sqlalchemy.exc import DBAPIError
+
+from app.core.config import settings
+from app.db.models import OnlineMigrationCheckpoint
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE de PostgreSQL: bloqueo no obtenido (lock_timeout) y sentencia
+# cancelada (statement_timeout)
+LOCK_NOT_AVAILABLE = "55P03"
+QUERY_CANCELED = "57014"
+MIN_BATCH_SIZE = 10
+# Lotes entre mensajes de avance en el log
+LOG_EVERY_BATCHES = 20
+
+CHECKPOINTS = OnlineMigrationCheckpoint.__table__
+
+
+class MigrationBudgetExceeded(RuntimeError):
+    """La migración no pudo avanzar dentro de los presupuestos configurados."""
+
+
+@dataclass
+class MigrationBudget:
+    lock_timeout_ms: int
+    lock_retries: int
+    statement_timeout_ms: int
+    batch_size: int
+    target_batch_seconds: float
+    batch_sleep_seconds: float
+    max_replica_lag_seconds: float
+    max_lag_wait_seconds: float
+
+    @classmethod
+    def from_settings(cls, **overrides: Any) -> "MigrationBudget":
+        values = dict(
+            lock_timeout_ms=settings.MIGRATION_LOCK_TIMEOUT_MS,
+            lock_retries=settings.MIGRATION_LOCK_RETRIES,
+            statement_timeout_ms=settings.MIGRATION_STATEMENT_TIMEOUT_MS,
+            batch_size=settings.MIGRATION_BATCH_SIZE,
+            target_batch_seconds=settings.MIGRATION_TARGET_BATCH_SECONDS,
+            batch_sleep_seconds=settings.MIGRATION_BATCH_SLEEP_SECONDS,
+            max_replica_lag_seconds=settings.MIGRATION_MAX_REPLICA_LAG_SECONDS,
+            max_lag_wait_seconds=settings.MIGRATION_MAX_LAG_WAIT_SECONDS,
+        )
+        values.update(overrides)
+        return cls(**values)
+
+
+@dataclass
+class BackfillResult:
+    name: str
+    rows: int
+    batches: int
+    resumed_from: Optional[int]
+    completed: bool
+
+
+def _sqlstate(error: DBAPIError) -> Optional[str]:
+    # psycopg2 expone pgcode; asyncpg, sqlstate
+    return getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+
+
+def with_lock_budget(conn: Connection, operation: Callable[[], Any], budget: Optional[MigrationBudget] = None) -> Any:
+    """
+    Ejecuta ``operation`` (DDL sobre ``conn``) con ``lock_timeout`` dentro de
+    un SAVEPOINT y la reintenta si no obtiene el bloqueo. En otros motores
+    la ejecuta sin más.
+    """
+    budget = budget or MigrationBudget.from_settings()
+    if conn.dialect.name != "postgresql":
+        return operation()
+    for attempt in range(1, budget.lock_retries + 1):
+        try:
+            with conn.begin_nested():
+                conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{int(budget.lock_timeout_ms)}ms'")
+                result = operation()
+            conn.exec_driver_sql("SET LOCAL lock_timeout TO DEFAULT")
+            return result
+        except DBAPIError as e:
+            if _sqlstate(e) != LOCK_NOT_AVAILABLE:
+                raise
+            wait = min(budget.lock_timeout_ms / 1000 * attempt, 30.0)
+            logger.warning(
+                f"Lock not acquired within {budget.lock_timeout_ms} ms "
+                f"(attempt {attempt}/{budget.lock_retries}), retrying in {wait:.1f}s"
+            )
+            time.sleep(wait)
+    raise MigrationBudgetExceeded(f"Lock not acquired after {budget.lock_retries} attempts")
+
+
+def add_column(op, table: str, column, budget: Optional[MigrationBudget] = None) -> None:
+    """``ADD COLUMN`` con presupuesto de bloqueo; no hace nada si ya existe."""
+    conn = op.get_bind()
+    if column.name in {c["name"] for c in inspect(conn).get_columns(table)}:
+        logger.info(f"Column {table}.{column.name} already exists")
+        return
+    with_lock_budget(conn, lambda: op.add_column(table, column), budget)
+
+
+def create_index_concurrently(
+    op,
+    name: str,
+    table: str,
+    columns: Sequence[str],
+    where: Optional[str] = None,
+    unique: bool = False,
+    budget: Optional[MigrationBudget] = None,
+) -> None:
+    """
+    Construye el índice sin bloquear escrituras (``CONCURRENTLY`` en
+    PostgreSQL). Confirma antes la transacción de la migración.
+    """
+    budget = budget or MigrationBudget.from_settings()
+    with op.get_context().autocommit_block():
+        conn = op.get_bind()
+        if conn.dialect.name == "postgresql":
+            valid = conn.execute(
+                text(
+                    "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+                    "WHERE c.relname = :name"
+                ),
+                {"name": name},
+            ).scalar()
+            if valid is False:
+                logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            # La construcción puede tardar: sin statement_timeout, pero con
+            # lock_timeout para la espera inicial del bloqueo
+            conn.exec_driver_sql("SET statement_timeout = 0")
+            conn.exec_driver_sql(f"SET lock_timeout = '{int(budget.lock_timeout_ms)}ms'")
+        try:
+            op.create_index(
+                name,
+                table,
+                list(columns),
+                unique=unique,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=text(where) if where else None,
+                sqlite_where=text(where) if where else None,
+            )
+        finally:
+            if conn.dialect.name == "postgresql":
+                conn.exec_driver_sql("RESET statement_timeout")
+                conn.exec_driver_sql("RESET lock_timeout")
+
+
+def drop_index_concurrently(op, name: str, table: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
+
+
+def replica_lag_seconds(conn: Connection) -> float:
+    """Mayor retraso de reproducción de las réplicas (0 sin réplicas o fuera de PostgreSQL)."""
+    if conn.dialect.name != "postgresql":
+        return 0.0
+    lag = conn.execute(
+        text("SELECT COALESCE(EXTRACT(EPOCH FROM max(replay_lag)), 0) FROM pg_stat_replication")
+    ).scalar()
+    return float(lag or 0.0)
+
+
+def _wait_for_replicas(engine: Engine, budget: MigrationBudget) -> None:
+    if budget.max_replica_lag_seconds <= 0:
+        return
+    waited = 0.0
+    while True:
+        with engine.connect() as conn:
+            lag = replica_lag_seconds(conn)
+        if lag <= budget.max_replica_lag_seconds:
+            return
+        if waited >= budget.max_lag_wait_seconds:
+            raise MigrationBudgetExceeded(
+                f"Replica lag {lag:.1f}s above {budget.max_replica_lag_seconds}s for {waited:.0f}s"
+            )
+        logger.info(f"Replica lag {lag:.1f}s above budget, pausing backfill")
+        pause = min(1.0, budget.max_lag_wait_seconds - waited)
+        time.sleep(pause)
+        waited += pause
+
+
+def _set_batch_timeouts(conn: Connection, budget: MigrationBudget) -> None:
+    if conn.dialect.name == "postgresql":
+        conn.exec_driver_sql(f"SET LOCAL statement_timeout = '{int(budget.statement_timeout_ms)}ms'")
+        conn.exec_driver_sql(f"SET LOCAL lock_timeout = '{int(budget.lock_timeout_ms)}ms'")
+
+
+def _next_batch_size(size: int, elapsed: float, budget: MigrationBudget) -> int:
+    """Acerca la duración del lote a ``target_batch_seconds`` sin pasar de ``batch_size``."""
+    if elapsed > budget.target_batch_seconds * 1.5:
+        size = int(size * budget.target_batch_seconds / elapsed)
+    elif elapsed < budget.target_batch_seconds / 2:
+        size *= 2
+    return max(min(MIN_BATCH_SIZE, budget.batch_size), min(size, budget.batch_size))
+
+
+def backfill(
+    engine: Engine,
+    name: str,
+    table,
+    apply_batch: Callable[[Connection, Sequence[Row]], int],
+    columns: Sequence = (),
+    where=None,
+    key: str = "id",
+    budget: Optional[MigrationBudget] = None,
+    max_batches: Optional[int] = None,
+) -> BackfillResult:
+    """
+    Recorre ``table`` por ``key`` en lotes y llama ``apply_batch(conn, filas)``
+    con las filas ``(key, *columns)`` que cumplen ``where``; debe devolver
+    cuántas modificó. Se reanuda desde el checkpoint ``name``. Con
+    ``max_batches`` se detiene tras ese número de lotes (sin completar).
+    """
+    budget = budget or MigrationBudget.from_settings()
+    key_column = table.c[key]
+    CHECKPOINTS.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        state = conn.execute(select(CHECKPOINTS).where(CHECKPOINTS.c.name == name)).first()
+        if state is None:
+            conn.execute(CHECKPOINTS.insert().values(name=name, rows_done=0, batches=0))
+    if state is not None and state.completed_at is not None:
+        logger.info(f"Backfill {name} already completed ({state.rows_done} rows)")
+        return BackfillResult(name, state.rows_done, state.batches, state.last_key, True)
+
+    resumed_from = last_key = state.last_key if state is not None else None
+    if resumed_from is not None:
+        logger.info(f"Resuming backfill {name} after {key}={resumed_from}")
+    rows_done = batches = 0
+    batch_size = budget.batch_size
+    while max_batches is None or batches < max_batches:
+        _wait_for_replicas(engine, budget)
+        started = time.monotonic()
+        stmt = select(key_column, *columns).order_by(key_column).limit(batch_size)
+        if last_key is not None:
+            stmt = stmt.where(key_column > last_key)
+        if where is not None:
+            stmt = stmt.where(where)
+        try:
+            with engine.begin() as conn:
+                _set_batch_timeouts(conn, budget)
+                rows = conn.execute(stmt).all()
+                if not rows:
+                    conn.execute(
+                        update(CHECKPOINTS).where(CHECKPOINTS.c.name == name)
+                        .values(completed_at=func.now(), updated_at=func.now())
+                    )
+                    logger.info(f"Backfill {name} completed: {rows_done} rows in {batches} batches")
+                    return BackfillResult(name, rows_done, batches, resumed_from, True)
+                changed = apply_batch(conn, rows)
+                batch_last_key = rows[-1][0]
+                conn.execute(
+                    update(CHECKPOINTS).where(CHECKPOINTS.c.name == name).values(
+                        last_key=batch_last_key,
+                        rows_done=CHECKPOINTS.c.rows_done + changed,
+                        batches=CHECKPOINTS.c.batches + 1,
+                        updated_at=func.now(),
+                    )
+                )
+        except DBAPIError as e:
+            if _sqlstate(e) not in (QUERY_CANCELED, LOCK_NOT_AVAILABLE) or batch_size <= MIN_BATCH_SIZE:
+                raise
+            batch_size = max(MIN_BATCH_SIZE, batch_size // 2)
+            logger.warning(f"Backfill {name} batch over budget ({e.orig}), retrying with {batch_size} rows")
+            time.sleep(budget.batch_sleep_seconds)
+            continue
+
+        last_key = batch_last_key
+        rows_done += changed
+        batches += 1
+        batch_size = _next_batch_size(batch_size, time.monotonic() - started, budget)
+        if batches % LOG_EVERY_BATCHES == 0:
+            logger.info(f"Backfill {name}: {rows_done} rows changed, {key}={last_key}, batch {batch_size}")
+        time.sleep(budget.batch_sleep_seconds)
+    return BackfillResult(name, rows_done, batches, resumed_from, False)
@@ -0,0 +1,173 @@
+# app/db/pagination.py
+"""
+Paginación por keyset y lectura en streaming.
+
+La paginación por keyset filtra ``(c1, c2, ...) > (último c1, último c2,
+...)`` en lugar de usar ``OFFSET``: cada página cuesta lo mismo sin importar
+su posición y no repite ni salta filas si se insertan otras entre páginas.
+El orden debe terminar en una columna única y no nula (normalmente la clave
+primaria) para que sea total y estable. El cursor es un token opaco
+(base64 de JSON) con los nombres de las columnas de orden y los valores de
+la última fila entregada.
+
+``stream`` recorre resultados grandes con ``yield_per``: filas en lotes de
+tamaño fijo desde un cursor del servidor (``stream_results``), con memoria
+constante mientras el llamador no retenga las filas. Mantiene abierta una
+transacción mientras dura el recorrido; ``keyset_pages`` lee cada página
+en una sesión propia, para recorridos largos que procesan cada fila.
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, ContextManager, Generic, Iterator, List, Optional, Sequence, TypeVar
+
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+STREAM_BATCH_SIZE = 1000
+
+T = TypeVar("T")
+
+
+class InvalidCursor(ValueError):
+    """Excepción para cursores mal formados o de otro orden"""
+    pass
+
+
+@dataclass
+class Page(Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str]
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value: Any, column) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return value
+
+
+def encode_cursor(order_by: Sequence, values: Sequence[Any]) -> str:
+    payload = {"k": [c.key for c in order_by], "v": [_to_json(v) for v in values]}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode()
+
+
+def decode_cursor(order_by: Sequence, cursor: str) -> List[Any]:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        keys, values = payload["k"], payload["v"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor("Cursor inválido")
+    if keys != [c.key for c in order_by] or len(values) != len(order_by):
+        raise InvalidCursor("El cursor no corresponde a este orden")
+    try:
+        return [_from_json(v, c) for v, c in zip(values, order_by)]
+    except (TypeError, ValueError):
+        raise InvalidCursor("Cursor inválido")
+
+
+def keyset_select(
+    stmt: Select,
+    order_by: Sequence,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+) -> Select:
+    """Agrega orden, filtro de keyset y ``LIMIT limit + 1`` a ``stmt``."""
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit debe estar entre 1 y {MAX_PAGE_SIZE}")
+    if cursor:
+        key, values = tuple_(*order_by), tuple_(*decode_cursor(order_by, cursor))
+        stmt = stmt.where(key < values if descending else key > values)
+    ordering = [c.desc() if descending else c.asc() for c in order_by]
+    # Una fila extra indica si existe una página siguiente
+    return stmt.order_by(*ordering).limit(limit + 1)
+
+
+def build_page(rows: Sequence[T], order_by: Sequence, limit: int) -> Page[T]:
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(order_by, [getattr(last, c.key) for c in order_by])
+    return Page(items, next_cursor)
+
+
+def paginate(
+    db: Session,
+    stmt: Select,
+    order_by: Sequence,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+) -> Page:
+    """Página de entidades de ``stmt`` (``select(Modelo)``)."""
+    rows = db.execute(keyset_select(stmt, order_by, cursor, limit, descending)).scalars().all()
+    return build_page(rows, order_by, limit)
+
+
+async def apaginate(
+    db: AsyncSession,
+    stmt: Select,
+    order_by: Sequence,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    descending: bool = False,
+) -> Page:
+    """Variante de ``paginate`` para handlers asíncronos."""
+    rows = (await db.execute(keyset_select(stmt, order_by, cursor, limit, descending))).scalars().all()
+    return build_page(rows, order_by, limit)
+
+
+def stream(db: Session, stmt: Select, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Any]:
+    """
+    Filas de ``stmt`` en lotes de ``batch_size`` desde un cursor del
+    servidor. Para entidades ORM conviene seleccionar solo columnas: las
+    entidades cargadas permanecen en el identity map de la sesión.
+    """
+    result = db.execute(stmt.execution_options(yield_per=batch_size))
+    try:
+        yield from result
+    finally:
+        result.close()
+
+
+def keyset_pages(
+    open_session: Callable[[], ContextManager[Session]],
+    stmt: Select,
+    order_by: Sequence,
+    limit: int = MAX_PAGE_SIZE,
+) -> Iterator[List[Any]]:
+    """
+    Páginas de filas de ``stmt`` por keyset, cada una leída en una sesión
+    de ``open_session`` que se cierra antes de entregarla: el procesado de
+    una página no retiene una transacción ni un cursor abiertos.
+    """
+    cursor = None
+    while True:
+        with open_session() as db:
+            rows = db.execute(keyset_select(stmt, order_by, cursor, limit)).all()
+        page = build_page(rows, order_by, limit)
+        if page.items:
+            yield page.items
+        if page.next_cursor is None:
+            return
+        cursor = page.next_cursor
@@ -0,0 +1,90 @@
+# app/db/pool.py
+"""
+Engines con pools de conexiones dimensionados por rol de proceso (api,
+worker, beat) e instrumentados con métricas de Prometheus: conexiones en
+uso, overflow, entregas, espera por conexión y timeouts.
+"""
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import (
+    DB_POOL_CHECKED_OUT,
+    DB_POOL_CHECKOUT_WAIT,
+    DB_POOL_CHECKOUTS,
+    DB_POOL_OVERFLOW,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUTS,
+)
+from app.core.performance_optimization import DatabaseOptimizer
+from app.db.sqlite import configure_sqlite
+
+
+class _PoolMetricsMixin:
+    """Mide cada entrega y devolución de conexiones del ``QueuePool``."""
+    role = "api"
+    engine_kind = "sync"
+    target = "primary"
+
+    def _labels(self):
+        return {"role": self.role, "engine": self.engine_kind, "target": self.target}
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.labels(**self._labels()).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(**self._labels()).observe(time.perf_counter() - start)
+        DB_POOL_CHECKOUTS.labels(**self._labels()).inc()
+        self._report_usage()
+        return connection
+
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._report_usage()
+
+    def _report_usage(self):
+        DB_POOL_CHECKED_OUT.labels(**self._labels()).set(self.checkedout())
+        # overflow() es negativo mientras el pool no se llena
+        DB_POOL_OVERFLOW.labels(**self._labels()).set(max(self.overflow(), 0))
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.role, pool.engine_kind, pool.target = self.role, self.engine_kind, self.target
+        return pool
+
+
+class InstrumentedQueuePool(_PoolMetricsMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_PoolMetricsMixin, AsyncAdaptedQueuePool):
+    engine_kind = "async"
+
+
+def create_role_engine(url: str, role: str, use_async: bool = False, target: str = "primary"):
+    """
+    Engine (síncrono o asíncrono) con el pool de ``role``; ``target``
+    distingue en las métricas el primario de las réplicas. SQLite conserva
+    el pool por defecto de SQLAlchemy y recibe los pragmas del modo embebido.
+    """
+    url = str(url)
+    factory = create_async_engine if use_async else create_engine
+    if url.startswith("sqlite"):
+        engine = factory(url)
+        configure_sqlite(engine, DatabaseOptimizer.configure_sqlite_pragmas())
+        return engine
+
+    config = DatabaseOptimizer.configure_pool_for_role(role)
+    config["poolclass"] = InstrumentedAsyncQueuePool if use_async else InstrumentedQueuePool
+    engine = factory(url, **config)
+    pool = getattr(engine, "sync_engine", engine).pool
+    pool.role, pool.target = role, target
+    DB_POOL_SIZE.labels(role=role, engine=pool.engine_kind, target=target).set(pool.size())
+    return engine
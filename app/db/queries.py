@@ -0,0 +1,41 @@
+# app/db/queries.py
+"""
+Sentencias de las búsquedas más frecuentes, construidas una sola vez.
+
+Cada constante es un ``select()`` con parámetros con nombre que se
+construye al importar el módulo. SQLAlchemy memoriza su clave de caché en
+el propio objeto, así que cada ejecución solo busca el SQL compilado en la
+caché del engine y enlaza los valores:
+
+    db.execute(METADATA_BY_MODEL_ID, {"model_id": model_id}).scalars().first()
+
+La consulta ``db.query(...).filter_by(...)`` equivalente reconstruye la
+expresión y recalcula su clave en cada llamada (ver
+scripts/benchmark_query_cache.py). Sirven igual para ``Session.execute`` y
+``AsyncSession.execute``. La tasa de aciertos de la caché de compilación se
+reporta en ``db_compile_cache_total`` y en ``/debug/sql``.
+"""
+from sqlalchemy import bindparam, select
+
+from app.db.models import ModelFile, ModelLod, ModelMetadata, PrintTimeCalibration
+
+METADATA_BY_MODEL_ID = select(ModelMetadata).where(ModelMetadata.model_id == bindparam("model_id"))
+
+# Resultado de una tarea de IA (última tarea que escribió la fila)
+METADATA_BY_TASK_ID = select(ModelMetadata).where(ModelMetadata.task_id == bindparam("task_id"))
+
+# Polígonos y complejidad, los rasgos que usa la calibración
+METADATA_GEOMETRY = select(ModelMetadata.polygons, ModelMetadata.complexity_score).where(
+    ModelMetadata.model_id == bindparam("model_id")
+)
+
+LODS_FOR_MODEL = (
+    select(ModelLod).where(ModelLod.model_id == bindparam("model_id")).order_by(ModelLod.level)
+)
+
+MODEL_FILE_BY_ID = select(ModelFile).where(ModelFile.id == bindparam("model_file_id"))
+
+CALIBRATION_FOR_GROUP = select(PrintTimeCalibration).where(
+    PrintTimeCalibration.material == bindparam("material"),
+    PrintTimeCalibration.printer_profile == bindparam("printer_profile"),
+)
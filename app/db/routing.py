@@ -0,0 +1,198 @@
+# app/db/routing.py
+"""
+Enrutamiento de sesiones entre el primario y réplicas de lectura.
+
+Solo las unidades de trabajo abiertas explícitamente con ``read_session``
+van a una réplica, elegida por round-robin entre las sanas. Una réplica que
+falla su verificación (``SELECT 1``) se salta hasta la siguiente
+verificación; sin réplicas sanas se lee del primario.
+
+``write_session`` confirma en el primario y, si recibe ``pin_key``, fija las
+lecturas con esa misma clave al primario durante ``pin_seconds`` para que el
+proceso vea sus propias escrituras pese al retraso de replicación. El pin es
+local al proceso; las lecturas de datos escritos por otro proceso deben
+reintentar en el primario si no encuentran la fila.
+"""
+import itertools
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+
+class ReadOnlySessionError(Exception):
+    """Excepción al intentar escribir desde una sesión de solo lectura"""
+    pass
+
+
+def _reject_flush(session, flush_context, instances):
+    raise ReadOnlySessionError("La sesión de lectura no admite escrituras")
+
+
+def _begin_read_only(session, transaction, connection):
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET TRANSACTION READ ONLY")
+
+
+def _make_read_only(session: Session) -> None:
+    session.info["read_only"] = True
+    event.listen(session, "before_flush", _reject_flush)
+    event.listen(session, "after_begin", _begin_read_only)
+
+
+class _Node:
+    """Estado de salud de un engine de réplica."""
+    def __init__(self, engine):
+        self.engine = engine
+        self.healthy = True
+        self.checked_at: Optional[float] = None
+
+
+class _BaseRouter:
+    def __init__(
+        self,
+        primary,
+        replicas: Sequence = (),
+        pin_seconds: float = 5.0,
+        health_check_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.primary = primary
+        self.nodes: List[_Node] = [_Node(engine) for engine in replicas]
+        self.pin_seconds = pin_seconds
+        self.health_check_seconds = health_check_seconds
+        self.clock = clock
+        self._pins: Dict[str, float] = {}
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+
+    def pin(self, key: str) -> None:
+        """Fija las lecturas de ``key`` al primario durante ``pin_seconds``."""
+        with self._lock:
+            self._pins[key] = self.clock() + self.pin_seconds
+
+    def is_pinned(self, key: Optional[str]) -> bool:
+        if key is None:
+            return False
+        with self._lock:
+            until = self._pins.get(key)
+            if until is not None and until <= self.clock():
+                del self._pins[key]
+                until = None
+        return until is not None
+
+    def _rotation(self) -> List[_Node]:
+        """Réplicas en orden round-robin a partir del turno actual."""
+        if not self.nodes:
+            return []
+        start = next(self._turn) % len(self.nodes)
+        return self.nodes[start:] + self.nodes[:start]
+
+    def _needs_check(self, node: _Node) -> bool:
+        return node.checked_at is None or self.clock() - node.checked_at >= self.health_check_seconds
+
+    def _record(self, node: _Node, healthy: bool, error: Optional[Exception] = None) -> None:
+        if node.healthy and not healthy:
+            logger.warning(f"Read replica {node.engine.url!r} unhealthy: {error}")
+        node.healthy, node.checked_at = healthy, self.clock()
+
+
+class ReplicaRouter(_BaseRouter):
+    """Router para engines síncronos (Celery, scripts, servicios)."""
+
+    def _check(self, node: _Node) -> bool:
+        if self._needs_check(node):
+            try:
+                with node.engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                self._record(node, True)
+            except Exception as e:
+                self._record(node, False, e)
+        return node.healthy
+
+    def engine_for_read(self, pin_key: Optional[str] = None):
+        if not self.is_pinned(pin_key):
+            for node in self._rotation():
+                if self._check(node):
+                    return node.engine
+        return self.primary
+
+    @contextmanager
+    def read_session(self, pin_key: Optional[str] = None) -> Iterator[Session]:
+        """Sesión de solo lectura sobre una réplica sana (o el primario)."""
+        session = Session(bind=self.engine_for_read(pin_key), autoflush=False)
+        _make_read_only(session)
+        try:
+            yield session
+        finally:
+            session.rollback()
+            session.close()
+
+    @contextmanager
+    def write_session(self, pin_key: Optional[str] = None) -> Iterator[Session]:
+        """Sesión sobre el primario que confirma al salir sin errores."""
+        session = Session(bind=self.primary, autoflush=False)
+        try:
+            yield session
+            session.commit()
+            if pin_key is not None:
+                self.pin(pin_key)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+
+class AsyncReplicaRouter(_BaseRouter):
+    """Router para engines asíncronos (handlers de FastAPI)."""
+
+    async def _check(self, node: _Node) -> bool:
+        if self._needs_check(node):
+            try:
+                async with node.engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+                self._record(node, True)
+            except Exception as e:
+                self._record(node, False, e)
+        return node.healthy
+
+    async def engine_for_read(self, pin_key: Optional[str] = None) -> AsyncEngine:
+        if not self.is_pinned(pin_key):
+            for node in self._rotation():
+                if await self._check(node):
+                    return node.engine
+        return self.primary
+
+    @asynccontextmanager
+    async def read_session(self, pin_key: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        session = AsyncSession(
+            bind=await self.engine_for_read(pin_key), autoflush=False, expire_on_commit=False
+        )
+        _make_read_only(session.sync_session)
+        try:
+            yield session
+        finally:
+            await session.rollback()
+            await session.close()
+
+    @asynccontextmanager
+    async def write_session(self, pin_key: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+        session = AsyncSession(bind=self.primary, autoflush=False, expire_on_commit=False)
+        try:
+            yield session
+            await session.commit()
+            if pin_key is not None:
+                self.pin(pin_key)
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
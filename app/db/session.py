@@ -1,6 +1,129 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
+from app.db.instrumentation import StatementRecorder
+from app.db.pool import create_role_engine
+from app.db.routing import AsyncReplicaRouter, ReplicaRouter
+from app.db.sharding import DEFAULT_SHARD, ShardRouter, TenantSession
+from app.db.sqlite import SessionWriter, SingleWriter
+from app.services.dashboard_summary import install_summary_hooks
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Drivers asíncronos equivalentes a los síncronos de DATABASE_URL
+ASYNC_DRIVERS = (
+    ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+    ("postgresql://", "postgresql+asyncpg://"),
+    ("postgres://", "postgresql+asyncpg://"),
+    ("sqlite://", "sqlite+aiosqlite://"),
+)
+
+
+def async_database_url(url: str) -> str:
+    """Traduce una URL síncrona a su driver asíncrono (asyncpg / aiosqlite)."""
+    url = str(url)
+    for sync_prefix, async_prefix in ASYNC_DRIVERS:
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+
+# Engine síncrono: Celery, scripts y servicios
+engine = create_role_engine(settings.DATABASE_URL, settings.DB_POOL_ROLE)
+# Engine asíncrono: handlers de FastAPI
+async_engine = create_role_engine(async_database_url(settings.DATABASE_URL), settings.DB_POOL_ROLE, use_async=True)
+
+# Shards por tenant: el primario es el shard "default"; con
+# DATABASE_SHARD_URLS las sesiones enrutan las tablas de cada usuario a su shard
+shard_router = ShardRouter(
+    engine,
+    {
+        DEFAULT_SHARD: engine,
+        **{
+            name: create_role_engine(url, settings.DB_POOL_ROLE, target="shard")
+            for name, url in settings.DATABASE_SHARD_URLS.items()
+        },
+    },
+    async_shards={
+        DEFAULT_SHARD: async_engine,
+        **{
+            name: create_role_engine(async_database_url(url), settings.DB_POOL_ROLE, use_async=True, target="shard")
+            for name, url in settings.DATABASE_SHARD_URLS.items()
+        },
+    },
+    cache_seconds=settings.SHARD_DIRECTORY_CACHE_SECONDS,
+)
+
+
+class AppSession(Session):
+    """Sesión de la aplicación: mantiene los resúmenes del dashboard en cada flush."""
+    pass
+
+
+class AppTenantSession(TenantSession):
+    """``TenantSession`` de la aplicación, con los resúmenes del dashboard."""
+    pass
+
+
+# Los eventos van en las clases de la aplicación y no en Session: el mover de
+# shards, las lecturas de réplicas y otros engines no escriben resúmenes
+install_summary_hooks(AppSession)
+install_summary_hooks(AppTenantSession)
+
+if settings.DATABASE_SHARD_URLS:
+    SessionLocal = sessionmaker(
+        autocommit=False, autoflush=False, bind=engine, class_=AppTenantSession, shard_router=shard_router
+    )
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False,
+        sync_session_class=AppTenantSession, shard_router=shard_router, asynchronous=True,
+    )
+else:
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AppSession)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, autoflush=False, expire_on_commit=False, sync_session_class=AppSession,
+    )
+
+# Escrituras de las tareas: en modo embebido (SQLite) un único escritor por
+# proceso con commits por lote y BEGIN IMMEDIATE
+if engine.dialect.name == "sqlite":
+    db_writer = SingleWriter(
+        sessionmaker(
+            bind=engine.execution_options(sqlite_begin="IMMEDIATE"), expire_on_commit=False, class_=AppSession,
+        ),
+        batch_size=settings.SQLITE_WRITE_BATCH_SIZE,
+        batch_seconds=settings.SQLITE_WRITE_BATCH_SECONDS,
+    )
+else:
+    db_writer = SessionWriter(SessionLocal)
+
+# Réplicas de lectura para analítica, métricas y consultas de resultados
+replica_router = ReplicaRouter(
+    engine,
+    [
+        create_role_engine(url, settings.DB_POOL_ROLE, target="replica")
+        for url in settings.DATABASE_REPLICA_URLS
+    ],
+    pin_seconds=settings.REPLICA_PIN_SECONDS,
+    health_check_seconds=settings.REPLICA_HEALTH_CHECK_SECONDS,
+)
+async_replica_router = AsyncReplicaRouter(
+    async_engine,
+    [
+        create_role_engine(async_database_url(url), settings.DB_POOL_ROLE, use_async=True, target="replica")
+        for url in settings.DATABASE_REPLICA_URLS
+    ],
+    pin_seconds=settings.REPLICA_PIN_SECONDS,
+    health_check_seconds=settings.REPLICA_HEALTH_CHECK_SECONDS,
+)
+
+# Latencia por sentencia y detección de N+1 en todos los engines
+sql_recorder = StatementRecorder(
+    slow_seconds=settings.SLOW_STATEMENT_SECONDS,
+    n_plus_one_threshold=settings.N_PLUS_ONE_THRESHOLD,
+)
+for _router in (replica_router, async_replica_router):
+    sql_recorder.instrument(_router.primary)
+    for _node in _router.nodes:
+        sql_recorder.instrument(_node.engine)
+for _name in settings.DATABASE_SHARD_URLS:
+    sql_recorder.instrument(shard_router.shards[_name])
+    sql_recorder.instrument(shard_router.async_shards[_name])
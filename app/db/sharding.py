@@ -0,0 +1,546 @@
+# app/db/sharding.py
+"""
+Sharding por tenant: las filas de cada usuario (proyectos, materiales,
+cotizaciones, cuentas de marketplace y sus tablas hijas) viven en uno de N
+shards, y el directorio ``tenant_shards`` del primario dice en cuál.
+
+* ``ShardRouter`` resuelve ``user_id -> shard`` con una caché en proceso de
+  ``cache_seconds``. Un tenant sin entrada se asigna al shard con menos
+  tenants, y su fila de ``users`` se copia allí para que las claves
+  foráneas se cumplan.
+* ``TenantSession`` elige el engine en cada sentencia (``get_bind``). Las
+  tablas de ``TENANT_TABLES``, y el SQL sin tabla conocida (``text()``,
+  ``session.connection()``), van al shard del tenant de la sesión. Ese
+  tenant es ``session.info["tenant_id"]`` o, si falta, el del contexto
+  (``tenant_context``), que fijan la API y las tareas de Celery con
+  argumento ``user_id``. El resto de tablas va al primario. Las escrituras
+  por ``session.connection()`` no pasan por las comprobaciones de la
+  sesión y llaman a ``guard_bulk_write`` antes de cada bloque.
+* ``move_tenant`` mueve un tenant de shard en línea. Copia sus filas por
+  lotes sin bloquearlo y sincroniza las diferencias. Solo durante la última
+  sincronización congela sus escrituras: el estado pasa a ``moving`` y las
+  sesiones reciben ``TenantMovingError``. Después cambia el directorio y
+  borra las filas del origen.
+
+El primario es siempre el shard ``default``; ``DATABASE_SHARD_URLS`` añade
+los demás. Los ids se conservan al mover. En PostgreSQL cada shard reparte
+ids de un rango propio (``reserve_id_range``) para que no choquen. Los
+archivos de modelo sin proyecto no pertenecen a ningún tenant y no se
+mueven.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import Table, bindparam, event, func, or_, select, text
+from sqlalchemy.sql import Select
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+
+from app.db.base import Base
+from app.db.models import TenantShard, User
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD = "default"
+ACTIVE, MOVING = "active", "moving"
+
+# Tablas de cada tenant en orden de copia (padres primero): columna que las
+# une al tenant y tabla padre con user_id (None si la columna es user_id)
+TENANT_TABLES: Dict[str, Tuple[str, Optional[str]]] = {
+    "projects": ("user_id", None),
+    "materials": ("user_id", None),
+    "quotes": ("user_id", None),
+    "marketplace_accounts": ("user_id", None),
+    "user_dashboard_summaries": ("user_id", None),
+    "model_files": ("project_id", "projects"),
+    "project_costs": ("project_id", "projects"),
+    "inventory_transactions": ("material_id", "materials"),
+    "material_stock_daily": ("material_id", "materials"),
+}
+
+DIRECTORY = TenantShard.__table__
+USERS = User.__table__
+
+# Tenant de la unidad de trabajo actual (petición o tarea)
+current_tenant: ContextVar[Optional[int]] = ContextVar("current_tenant", default=None)
+
+
+class TenantRequiredError(Exception):
+    """Sentencia sobre tablas de tenant sin tenant, o con filas de otro usuario"""
+    pass
+
+
+class TenantMovingError(Exception):
+    """Escritura de un tenant congelado mientras se mueve de shard; reintentar"""
+    pass
+
+
+class ShardMoveError(Exception):
+    """El movimiento no se completó; el tenant sigue activo en su shard de origen"""
+    pass
+
+
+@contextmanager
+def tenant_context(user_id: Optional[int]) -> Iterator[None]:
+    """Fija el tenant de las sesiones abiertas dentro del bloque."""
+    token = current_tenant.set(user_id)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+def tenant_tables() -> List[Table]:
+    return [Base.metadata.tables[name] for name in TENANT_TABLES]
+
+
+def row_key(table: Table):
+    """Clave del keyset: ``id``, o ``user_id`` en las tablas de una fila por usuario."""
+    return table.primary_key.columns[0] if "id" not in table.c else table.c.id
+
+
+def tenant_filter(table: Table, user_id: int):
+    """Condición que selecciona las filas de ``user_id`` en ``table``."""
+    column, parent = TENANT_TABLES[table.name]
+    if parent is None:
+        return table.c[column] == user_id
+    parent_table = Base.metadata.tables[parent]
+    return table.c[column].in_(select(parent_table.c.id).where(parent_table.c.user_id == user_id))
+
+
+def _statement_tables(mapper, clause) -> Optional[set]:
+    """Tablas de la sentencia, o None si no se conocen (SQL textual)."""
+    tables = {table.name for table in mapper.tables} if mapper is not None else set()
+    if clause is not None:
+        tables.update(table.name for table in find_tables(clause, include_crud=True))
+    return tables or None
+
+
+@dataclass(frozen=True)
+class ShardEntry:
+    user_id: int
+    shard: str
+    state: str = ACTIVE
+    moving_to: Optional[str] = None
+
+
+class ShardRouter:
+    """
+    Directorio de shards con caché en proceso. ``shards`` incluye el shard
+    ``default``; ``async_shards`` tiene los engines asíncronos equivalentes
+    para las sesiones de los handlers.
+    """
+    def __init__(
+        self,
+        directory: Engine,
+        shards: Mapping[str, Engine],
+        async_shards: Optional[Mapping[str, Any]] = None,
+        cache_seconds: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.directory = directory
+        self.shards: Dict[str, Engine] = dict(shards)
+        self.async_shards: Dict[str, Any] = dict(async_shards or {})
+        self.cache_seconds = cache_seconds
+        self.clock = clock
+        self._cache: Dict[int, Tuple[ShardEntry, float]] = {}
+        self._lock = threading.Lock()
+
+    def entry(self, user_id: int, assign: bool = True) -> Optional[ShardEntry]:
+        """Entrada del directorio de ``user_id``; sin ella, lo asigna (o None)."""
+        with self._lock:
+            cached = self._cache.get(user_id)
+        if cached is not None and cached[1] > self.clock():
+            return cached[0]
+        entry = self.lookup(user_id)
+        if entry is None:
+            if not assign:
+                return None
+            entry = self.assign(user_id)
+        with self._lock:
+            self._cache[user_id] = (entry, self.clock() + self.cache_seconds)
+        return entry
+
+    def lookup(self, user_id: int) -> Optional[ShardEntry]:
+        """Lee la entrada en el directorio, sin caché."""
+        with self.directory.connect() as conn:
+            row = conn.execute(
+                select(DIRECTORY.c.shard, DIRECTORY.c.state, DIRECTORY.c.moving_to)
+                .where(DIRECTORY.c.user_id == user_id)
+            ).first()
+        return ShardEntry(user_id, row.shard, row.state, row.moving_to) if row is not None else None
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(user_id, None)
+
+    def assign(self, user_id: int, shard: Optional[str] = None) -> ShardEntry:
+        """Asigna un tenant nuevo al shard con menos tenants (o a ``shard``)."""
+        with self.directory.connect() as conn:
+            if shard is None:
+                counts = dict(conn.execute(
+                    select(DIRECTORY.c.shard, func.count()).group_by(DIRECTORY.c.shard)
+                ).all())
+                shard = min(self.shards, key=lambda name: (counts.get(name, 0), name))
+            user = conn.execute(select(USERS).where(USERS.c.id == user_id)).mappings().first()
+        if user is not None:
+            copy_user(self.shards[shard], user)
+        try:
+            with self.directory.begin() as conn:
+                conn.execute(DIRECTORY.insert().values(user_id=user_id, shard=shard, state=ACTIVE))
+        except IntegrityError:
+            # Otro proceso lo asignó primero
+            return self.lookup(user_id)
+        logger.info(f"Tenant {user_id} assigned to shard {shard}")
+        return ShardEntry(user_id, shard)
+
+    def engine_for(self, user_id: int, asynchronous: bool = False) -> Engine:
+        name = self.entry(user_id).shard
+        return self.async_shards[name].sync_engine if asynchronous else self.shards[name]
+
+    def check_writable(self, user_id: int) -> None:
+        entry = self.entry(user_id)
+        if entry.state != ACTIVE:
+            raise TenantMovingError(f"El usuario {user_id} se está moviendo al shard {entry.moving_to}")
+
+    def session(self, user_id: Optional[int] = None, **kwargs) -> "TenantSession":
+        """Sesión enrutada; ``user_id`` fija su tenant."""
+        kwargs.setdefault("autoflush", False)
+        return TenantSession(bind=self.directory, shard_router=self, tenant_id=user_id, **kwargs)
+
+    def each_shard(self) -> Iterator[Tuple[str, Session]]:
+        """Una sesión por shard, para los procesos que recorren todos los tenants."""
+        for name, engine in self.shards.items():
+            with Session(bind=engine, autoflush=False) as session:
+                yield name, session
+
+
+def tenants_on(shard: str) -> Select:
+    """
+    Ids de los usuarios cuyo shard es ``shard``, para ejecutar en la base
+    principal. Los usuarios aún sin asignar cuentan en el shard por defecto.
+    """
+    stmt = select(USERS.c.id).select_from(
+        USERS.outerjoin(DIRECTORY, DIRECTORY.c.user_id == USERS.c.id)
+    )
+    if shard == DEFAULT_SHARD:
+        return stmt.where(or_(DIRECTORY.c.shard.is_(None), DIRECTORY.c.shard == DEFAULT_SHARD))
+    return stmt.where(DIRECTORY.c.shard == shard)
+
+
+def _guard_flush(session: "TenantSession", flush_context, instances) -> None:
+    changed = [
+        obj for obj in (*session.new, *session.dirty, *session.deleted)
+        if type(obj).__table__.name in TENANT_TABLES
+    ]
+    if not changed:
+        return
+    tenant = session.tenant_id
+    if tenant is None:
+        raise TenantRequiredError("Escritura en tablas de tenant sin tenant en la sesión")
+    for obj in session.new:
+        owner = getattr(obj, "user_id", None)
+        if owner is not None and owner != tenant:
+            raise TenantRequiredError(f"Fila del usuario {owner} en una sesión del usuario {tenant}")
+    session.shard_router.check_writable(tenant)
+
+
+def guard_bulk_write(session: Session, owners: Sequence[Optional[int]]) -> List[int]:
+    """
+    Las comprobaciones de ``_guard_flush`` para escrituras por
+    ``session.connection()`` (``COPY``, ``executemany``), que no pasan por
+    los eventos de la sesión. Llamar antes de cada bloque: lanza
+    ``TenantRequiredError`` sin tenant y ``TenantMovingError`` si el tenant
+    está congelado. Devuelve los índices de las filas de otro usuario.
+    """
+    if not isinstance(session, TenantSession):
+        return []
+    tenant = session.tenant_id
+    if tenant is None:
+        raise TenantRequiredError("Escritura masiva en tablas de tenant sin tenant en la sesión")
+    session.shard_router.check_writable(tenant)
+    return [index for index, owner in enumerate(owners) if owner is not None and owner != tenant]
+
+
+def _guard_execute(orm_execute_state) -> None:
+    session = orm_execute_state.session
+    if session.tenant_id is not None and (
+        orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete
+    ):
+        session.shard_router.check_writable(session.tenant_id)
+
+
+class TenantSession(Session):
+    """
+    Sesión que enruta cada sentencia: las tablas de tenant al shard de
+    ``tenant_id``, el resto al ``bind`` (el primario). ``asynchronous``
+    indica que la sesión es la síncrona de una ``AsyncSession``.
+    """
+    def __init__(
+        self,
+        *args,
+        shard_router: ShardRouter,
+        tenant_id: Optional[int] = None,
+        asynchronous: bool = False,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.shard_router = shard_router
+        self.asynchronous = asynchronous
+        if tenant_id is not None:
+            self.info["tenant_id"] = tenant_id
+        event.listen(self, "before_flush", _guard_flush)
+        event.listen(self, "do_orm_execute", _guard_execute)
+
+    @property
+    def tenant_id(self) -> Optional[int]:
+        tenant = self.info.get("tenant_id")
+        return tenant if tenant is not None else current_tenant.get()
+
+    def get_bind(self, mapper=None, *, clause=None, **kwargs):
+        tables = _statement_tables(mapper, clause)
+        if tables is None or tables & TENANT_TABLES.keys():
+            tenant = self.tenant_id
+            if tenant is not None:
+                return self.shard_router.engine_for(tenant, self.asynchronous)
+            if tables is not None:
+                raise TenantRequiredError(f"Consulta sobre {sorted(tables)} sin tenant")
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def copy_user(engine: Engine, user: Mapping[str, Any]) -> None:
+    """Copia la fila de ``users`` del tenant al shard si aún no está."""
+    with engine.begin() as conn:
+        if conn.execute(select(USERS.c.id).where(USERS.c.id == user["id"])).first() is None:
+            conn.execute(USERS.insert().values(**user))
+
+
+def reserve_id_range(engine: Engine, index: int, stride: int) -> None:
+    """
+    PostgreSQL: las secuencias de las tablas de tenant del shard ``index``
+    siguen desde ``index * stride + 1`` (o su máximo actual, si es mayor).
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        for table in tenant_tables():
+            conn.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"GREATEST(:start, (SELECT COALESCE(MAX(id), 0) + 1 FROM {table.name})), false)"
+                ),
+                {"start": index * stride + 1},
+            )
+
+
+# ---------------------------------------------------------------------------
+# Rebalanceo
+# ---------------------------------------------------------------------------
+
+@dataclass
+class MoveResult:
+    user_id: int
+    source: str
+    target: str
+    rows_copied: int
+    rows_synced: int
+    rows_deleted: int
+    frozen_seconds: float
+
+
+def _rows(engine: Engine, table: Table, query) -> Dict[Any, Dict[str, Any]]:
+    key = row_key(table).name
+    with engine.connect() as conn:
+        return {row[key]: dict(row) for row in conn.execute(query).mappings()}
+
+
+def _tenant_batch(table: Table, user_id: int, after, batch_size: Optional[int] = None, upto=None):
+    key = row_key(table)
+    query = select(table).where(tenant_filter(table, user_id)).order_by(key)
+    if after is not None:
+        query = query.where(key > after)
+    if upto is not None:
+        query = query.where(key <= upto)
+    return query.limit(batch_size) if batch_size is not None else query
+
+
+def _update_rows(conn, table: Table, rows: Sequence[Dict[str, Any]]) -> None:
+    key = row_key(table)
+    columns = [c.name for c in table.c if c.name != key.name]
+    stmt = (
+        table.update()
+        .where(key == bindparam("_key"))
+        .values({name: bindparam(f"_v_{name}") for name in columns})
+    )
+    conn.execute(stmt, [{"_key": row[key.name], **{f"_v_{name}": row[name] for name in columns}} for row in rows])
+
+
+def copy_tenant_table(source: Engine, target: Engine, table: Table, user_id: int, batch_size: int) -> int:
+    """Copia las filas del tenant por lotes de keyset, cada lote en su transacción."""
+    last, copied = None, 0
+    while True:
+        rows = _rows(source, table, _tenant_batch(table, user_id, last, batch_size))
+        if not rows:
+            return copied
+        with target.begin() as conn:
+            conn.execute(table.insert(), list(rows.values()))
+        last, copied = max(rows), copied + len(rows)
+
+
+def sync_tenant(source: Engine, target: Engine, user_id: int, batch_size: int) -> int:
+    """
+    Lleva al destino las altas, cambios y bajas del tenant en el origen
+    comparando ambos lado a lado por lotes de keyset. Inserta y actualiza de
+    padres a hijos y borra de hijos a padres. Devuelve las filas escritas.
+    """
+    tables = tenant_tables()
+    stale: Dict[str, List[Any]] = {}
+    written = 0
+    for table in tables:
+        last = None
+        while True:
+            batch = _rows(source, table, _tenant_batch(table, user_id, last, batch_size))
+            upto = max(batch) if len(batch) == batch_size else None
+            current = _rows(target, table, _tenant_batch(table, user_id, last, upto=upto))
+            new = [row for key, row in batch.items() if key not in current]
+            changed = [row for key, row in batch.items() if key in current and current[key] != row]
+            stale.setdefault(table.name, []).extend(key for key in current if key not in batch)
+            if new or changed:
+                with target.begin() as conn:
+                    if new:
+                        conn.execute(table.insert(), new)
+                    if changed:
+                        _update_rows(conn, table, changed)
+                written += len(new) + len(changed)
+            if upto is None:
+                break
+            last = upto
+    for table in reversed(tables):
+        keys = stale.get(table.name)
+        for start in range(0, len(keys or ()), batch_size):
+            with target.begin() as conn:
+                conn.execute(table.delete().where(row_key(table).in_(keys[start:start + batch_size])))
+            written += len(keys[start:start + batch_size])
+    return written
+
+
+def delete_tenant(engine: Engine, user_id: int, batch_size: int) -> int:
+    """Borra las filas del tenant por lotes, de hijos a padres."""
+    deleted = 0
+    for table in reversed(tenant_tables()):
+        while True:
+            with engine.begin() as conn:
+                keys = conn.execute(
+                    select(row_key(table)).where(tenant_filter(table, user_id)).limit(batch_size)
+                ).scalars().all()
+                if not keys:
+                    break
+                conn.execute(table.delete().where(row_key(table).in_(keys)))
+            deleted += len(keys)
+    return deleted
+
+
+def _set_entry(directory: Engine, user_id: int, **values) -> None:
+    with directory.begin() as conn:
+        conn.execute(
+            DIRECTORY.update().where(DIRECTORY.c.user_id == user_id).values(updated_at=func.now(), **values)
+        )
+
+
+def move_tenant(
+    router: ShardRouter,
+    user_id: int,
+    target: str,
+    batch_size: int = 1000,
+    settle_seconds: float = 2.0,
+    sleep: Callable[[float], None] = time.sleep,
+) -> MoveResult:
+    """
+    Mueve el tenant ``user_id`` al shard ``target`` en línea:
+
+    1. Copia sus filas al destino sin bloquearlo y sincroniza lo que cambió
+       durante la copia.
+    2. Lo congela (``moving``) y espera a que todos los procesos lo vean
+       (``cache_seconds + settle_seconds``); hace la sincronización final.
+    3. Cambia el directorio al destino, espera a que caduquen las cachés que
+       aún leen del origen y borra allí sus filas.
+
+    Si falla antes del cambio, lo descongela en el origen, limpia el destino
+    y lanza ``ShardMoveError``. Un movimiento interrumpido con el tenant
+    congelado se reanuda llamando de nuevo con el mismo destino.
+    """
+    entry = router.lookup(user_id)
+    if entry is None:
+        raise ShardMoveError(f"El usuario {user_id} no tiene shard asignado")
+    if target not in router.shards or target == entry.shard:
+        raise ShardMoveError(f"Destino inválido para el usuario {user_id}: {target}")
+    if entry.state == MOVING and entry.moving_to != target:
+        raise ShardMoveError(f"El usuario {user_id} ya se está moviendo a {entry.moving_to}")
+    source, wait = entry.shard, router.cache_seconds + settle_seconds
+    source_engine, target_engine = router.shards[source], router.shards[target]
+
+    with router.directory.connect() as conn:
+        user = conn.execute(select(USERS).where(USERS.c.id == user_id)).mappings().first()
+    try:
+        # Restos de un intento anterior
+        delete_tenant(target_engine, user_id, batch_size)
+        if user is not None:
+            copy_user(target_engine, user)
+        copied = sum(
+            copy_tenant_table(source_engine, target_engine, table, user_id, batch_size)
+            for table in tenant_tables()
+        )
+        synced = sync_tenant(source_engine, target_engine, user_id, batch_size)
+        logger.info(f"Tenant {user_id}: {copied} rows copied to {target}, {synced} caught up; freezing")
+
+        _set_entry(router.directory, user_id, state=MOVING, moving_to=target)
+        router.invalidate(user_id)
+        sleep(wait)
+        frozen_at = time.monotonic()
+        synced += sync_tenant(source_engine, target_engine, user_id, batch_size)
+    except Exception as e:
+        _set_entry(router.directory, user_id, state=ACTIVE, moving_to=None)
+        router.invalidate(user_id)
+        delete_tenant(target_engine, user_id, batch_size)
+        raise ShardMoveError(f"No se pudo mover el usuario {user_id} a {target}: {e}") from e
+
+    _set_entry(router.directory, user_id, shard=target, state=ACTIVE, moving_to=None)
+    router.invalidate(user_id)
+    frozen = time.monotonic() - frozen_at
+    logger.info(f"Tenant {user_id} switched from {source} to {target} after {frozen:.2f}s frozen")
+
+    sleep(wait)
+    deleted = delete_tenant(source_engine, user_id, batch_size)
+    return MoveResult(user_id, source, target, copied, synced, deleted, frozen)
+
+
+def shard_loads(router: ShardRouter) -> Dict[str, Dict[str, int]]:
+    """Tenants y filas de tenant por shard, para decidir qué mover."""
+    with router.directory.connect() as conn:
+        tenants = dict(conn.execute(select(DIRECTORY.c.shard, func.count()).group_by(DIRECTORY.c.shard)).all())
+    loads = {}
+    for name, engine in router.shards.items():
+        with engine.connect() as conn:
+            rows = sum(conn.execute(select(func.count()).select_from(table)).scalar() for table in tenant_tables())
+        loads[name] = {"tenants": tenants.get(name, 0), "rows": rows}
+    return loads
+
+
+def tenant_rows(router: ShardRouter, user_id: int) -> int:
+    """Filas del tenant en su shard actual."""
+    engine = router.shards[router.lookup(user_id).shard]
+    with engine.connect() as conn:
+        return sum(
+            conn.execute(select(func.count()).select_from(table).where(tenant_filter(table, user_id))).scalar()
+            for table in tenant_tables()
+        )
@@ -0,0 +1,227 @@
+# app/db/sqlite.py
+"""
+Modo embebido de un solo nodo sobre SQLite.
+
+``configure_sqlite`` prepara cada conexión nueva de un engine SQLite:
+
+* ``journal_mode=WAL``: los lectores no bloquean al escritor ni al revés;
+* ``synchronous=NORMAL``: en WAL solo sincroniza a disco en los checkpoints,
+  sin arriesgar la integridad (una caída puede perder la última transacción);
+* ``busy_timeout``: espera a que se libere el bloqueo de escritura en lugar
+  de fallar al instante con "database is locked";
+* ``mmap_size``: lecturas mapeadas en memoria, sin copias por página.
+
+Además toma el control del ``BEGIN`` que pysqlite emite por su cuenta para
+que funcionen los SAVEPOINT y para poder abrir transacciones con
+``BEGIN IMMEDIATE`` (opción de ejecución ``sqlite_begin``): un escritor que
+toma el bloqueo al empezar espera con ``busy_timeout`` en vez de fallar al
+intentar pasar de lectura a escritura.
+
+SQLite admite un único escritor a la vez. ``SingleWriter`` serializa las
+escrituras del proceso en un hilo con su propia sesión: agrupa los trabajos
+que llegan juntos (hasta ``batch_size`` o ``batch_seconds``) y los confirma
+con un único ``COMMIT``. Si un trabajo falla, el lote se deshace y se
+repite con un SAVEPOINT por trabajo, de modo que el error de uno no descarta
+el resto (los SAVEPOINT cuestan ~20% por trabajo y solo se pagan entonces). ``SessionWriter`` ofrece la
+misma interfaz con una sesión y un ``COMMIT`` por trabajo (PostgreSQL).
+"""
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteJob = Callable[[Session], T]
+
+_STOP = object()
+
+
+def configure_sqlite(engine, pragmas: Dict[str, Any]) -> None:
+    """Aplica ``pragmas`` y el manejo de ``BEGIN`` a un engine SQLite."""
+    target = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(target, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        # Sin BEGIN implícito del driver: lo emite el evento "begin"
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(target, "begin")
+    def _on_begin(conn):
+        mode = conn.get_execution_options().get("sqlite_begin")
+        conn.exec_driver_sql(f"BEGIN {mode}" if mode else "BEGIN")
+
+
+class SessionWriter:
+    """Ejecuta cada trabajo en una sesión propia y lo confirma."""
+
+    def __init__(self, session_factory: sessionmaker):
+        self.session_factory = session_factory
+
+    def run(self, job: WriteJob, timeout: Optional[float] = None) -> T:
+        with self.session_factory() as db:
+            result = job(db)
+            db.commit()
+            return result
+
+    def close(self) -> None:
+        pass
+
+
+class SingleWriter:
+    """
+    Cola de escrituras con un único hilo escritor por proceso. Los trabajos
+    reciben la sesión del escritor, no deben confirmar y deben devolver
+    valores simples (no entidades de la sesión). Solo deben escribir en la
+    base: tras un fallo en su lote pueden ejecutarse una segunda vez.
+    """
+
+    def __init__(self, session_factory: sessionmaker, batch_size: int = 100, batch_seconds: float = 0.005):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self.batches = 0
+        self.jobs = 0
+
+    def _ensure_thread(self) -> None:
+        # Los hilos no sobreviven a un fork: cada proceso arranca el suyo
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._loop, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, job: WriteJob) -> "Future[T]":
+        self._ensure_thread()
+        future: Future = Future()
+        self._queue.put((job, future))
+        return future
+
+    def run(self, job: WriteJob, timeout: Optional[float] = None) -> T:
+        """Encola ``job`` y espera a que su lote se confirme."""
+        return self.submit(job).result(timeout)
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Termina el hilo después de confirmar los trabajos pendientes."""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _next_batch(self) -> Tuple[List[Tuple[WriteJob, Future]], bool]:
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch, deadline = [first], time.monotonic() + self.batch_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _loop(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = self._next_batch()
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[WriteJob, Future]]) -> None:
+        batch = [(job, future) for job, future in batch if future.set_running_or_notify_cancel()]
+        db = self.session_factory()
+        try:
+            try:
+                outcomes = [(future, job(db), None) for job, future in batch]
+            except Exception:
+                # Un trabajo falló: se repite el lote con un SAVEPOINT por
+                # trabajo para confirmar los demás
+                db.rollback()
+                outcomes = self._run_isolated(db, batch)
+            db.commit()
+        except Exception as e:
+            logger.error(f"SQLite write batch of {len(batch)} jobs failed: {e}")
+            db.rollback()
+            outcomes = [(future, None, e) for _, future in batch]
+        finally:
+            db.close()
+        self.batches += 1
+        self.jobs += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    @staticmethod
+    def _run_isolated(db: Session, batch: List[Tuple[WriteJob, Future]]) -> List[Tuple[Future, Any, Optional[Exception]]]:
+        outcomes = []
+        for job, future in batch:
+            try:
+                with db.begin_nested():
+                    outcomes.append((future, job(db), None))
+            except Exception as e:
+                outcomes.append((future, None, e))
+        return outcomes
+
+def sqlite_path(url: str) -> Optional[str]:
+    """Ruta del archivo de una URL ``sqlite:///``; ``None`` si es en memoria."""
+    url = str(url)
+    for prefix in ("sqlite+aiosqlite:///", "sqlite+pysqlite:///", "sqlite:///"):
+        if url.startswith(prefix):
+            path = url[len(prefix):].split("?")[0]
+            return path if path and path != ":memory:" else None
+    return None
+
+
+def backup_sqlite(db_file: str, backup_file: str) -> None:
+    """
+    Copia consistente con la API de backup de SQLite: incluye lo que aún
+    está en el archivo ``-wal`` y no bloquea a los escritores.
+    """
+    source = sqlite3.connect(db_file)
+    target = sqlite3.connect(backup_file)
+    try:
+        with target:
+            source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+def restore_sqlite(backup_file: str, db_file: str) -> None:
+    """
+    Restaura sobre la base viva con la API de backup: a diferencia de copiar
+    el archivo, el ``-wal`` existente no se vuelve a aplicar encima.
+    """
+    source = sqlite3.connect(backup_file)
+    target = sqlite3.connect(db_file)
+    try:
+        with target:
+            source.backup(target)
+    finally:
+        target.close()
+        source.close()
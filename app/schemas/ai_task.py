@@ -1,6 +1,7 @@
 # app/schemas/ai_task.py
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 
 
 class AIRequest(BaseModel):
@@ -22,6 +23,7 @@ class ComplexityReport(BaseModel):
     polygons: int = Field(..., description="Número total de polígonos")
     file_size_kb: float = Field(..., description="Tamaño del archivo en KB")
     complexity_score: float = Field(..., description="Puntuación de complejidad calculada")
+    features: Optional[Dict[str, float]] = Field(None, description="Rasgos geométricos usados en la puntuación")
 
 
 class PrintTimeRequest(BaseModel):
@@ -29,7 +31,86 @@ class PrintTimeRequest(BaseModel):
     material: str = Field(..., description="Tipo de material para impresión")
     layer_height_mm: float = Field(..., description="Altura de capa en mm")
     infill_percent: float = Field(..., description="Porcentaje de relleno")
+    printer_profile: Optional[str] = Field(None, description="Perfil de impresora usado para la calibración")
 
 
 class PrintTimeResponse(BaseModel):
-    estimated_time_minutes: float = Field(..., description="Tiempo estimado de impresión en minutos")
\ No newline at end of file
+    estimated_time_minutes: float = Field(..., description="Tiempo estimado de impresión en minutos")
+    exact: bool = Field(False, description="True si el tiempo proviene de simular el G-code laminado")
+    filament_length_mm: Optional[float] = Field(None, description="Filamento consumido en mm (solo G-code)")
+    filament_weight_g: Optional[float] = Field(None, description="Peso del filamento en gramos (solo G-code)")
+    layer_count: Optional[int] = Field(None, description="Número de capas (solo G-code)")
+
+class PrintTimeCalibrationReport(BaseModel):
+    material: str = Field(..., description="Material del grupo ('*' = cualquiera)")
+    printer_profile: str = Field(..., description="Perfil de impresora del grupo ('*' = cualquiera)")
+    n_samples: int = Field(..., description="Proyectos históricos usados en el ajuste")
+    mape: Optional[float] = Field(None, description="MAPE leave-one-out del modelo calibrado (%)")
+    baseline_mape: Optional[float] = Field(None, description="MAPE de la estimación sin calibrar (%)")
+    coefficients: Dict[str, float] = Field(..., description="Coeficientes por rasgo")
+    fitted_at: Optional[datetime] = Field(None, description="Fecha del último ajuste")
+
+
+class SimilarModel(BaseModel):
+    model_id: str = Field(..., description="ID del modelo similar")
+    distance: float = Field(..., description="Distancia entre descriptores de forma (0 = idénticos)")
+    seo_title: Optional[str] = Field(None, description="Título SEO reutilizable")
+    market_description: Optional[str] = Field(None, description="Descripción reutilizable")
+    tags: Optional[List[str]] = Field(None, description="Tags reutilizables")
+    complexity_score: Optional[float] = Field(None, description="Complejidad del modelo similar")
+
+
+class SimilarModelsResponse(BaseModel):
+    model_id: str = Field(..., description="ID del modelo consultado")
+    similar: List[SimilarModel] = Field(..., description="Modelos más cercanos, del más al menos similar")
+
+
+class ThinRegion(BaseModel):
+    face_count: int = Field(..., description="Caras de la región")
+    area_mm2: float = Field(..., description="Área de la región en mm²")
+    min_thickness_mm: float = Field(..., description="Espesor mínimo medido en la región")
+    center: List[float] = Field(..., description="Centroide de la región (x, y, z)")
+
+
+class NozzleVerdict(BaseModel):
+    nozzle_mm: float = Field(..., description="Diámetro de boquilla evaluado")
+    thin_area_ratio: float = Field(..., description="Fracción del área con espesor menor a la boquilla")
+    printable: bool = Field(..., description="Veredicto de imprimibilidad para esta boquilla")
+
+
+class WallThicknessReport(BaseModel):
+    min_thickness_mm: Optional[float] = Field(None, description="Espesor mínimo medido (None si ninguno cae en el rango)")
+    max_checked_mm: float = Field(..., description="Distancia máxima sondeada por cara")
+    regions: List[ThinRegion] = Field(..., description="Regiones delgadas, de mayor a menor área")
+    nozzles: List[NozzleVerdict] = Field(..., description="Veredicto por tamaño de boquilla")
+
+
+class ModelLodInfo(BaseModel):
+    level: int = Field(..., description="Nivel de detalle (0 = original)")
+    triangle_count: int = Field(..., description="Triángulos del nivel")
+    size_bytes: int = Field(..., description="Tamaño del STL binario")
+    size_ratio: float = Field(..., description="Tamaño relativo al nivel 0")
+    max_error_mm: float = Field(..., description="Desplazamiento máximo de vértices respecto al original")
+    mean_error_mm: float = Field(..., description="Desplazamiento medio de vértices respecto al original")
+
+
+class ModelLodsResponse(BaseModel):
+    model_id: str = Field(..., description="ID del modelo")
+    levels: List[ModelLodInfo] = Field(..., description="Niveles disponibles, del más al menos detallado")
+
+
+class ModelMetadataItem(BaseModel):
+    model_id: str = Field(..., description="ID del modelo")
+    seo_title: Optional[str] = Field(None, description="Título SEO")
+    tags: Optional[List[str]] = Field(None, description="Tags del modelo")
+    complexity_score: Optional[float] = Field(None, description="Puntuación de complejidad")
+    estimated_time_minutes: Optional[float] = Field(None, description="Tiempo de impresión estimado")
+    updated_at: Optional[datetime] = Field(None, description="Última actualización")
+
+    class Config:
+        orm_mode = True
+
+
+class ModelMetadataPage(BaseModel):
+    items: List[ModelMetadataItem] = Field(..., description="Metadatos de la página")
+    next_cursor: Optional[str] = Field(None, description="Cursor de la página siguiente; nulo en la última")
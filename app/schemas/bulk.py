@@ -0,0 +1,18 @@
+# app/schemas/bulk.py
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class RejectedRow(BaseModel):
+    line: int = Field(..., description="Línea (o fila en npz) del archivo")
+    error: str = Field(..., description="Motivo del rechazo")
+
+
+class BulkImportReport(BaseModel):
+    entity: str = Field(..., description="Entidad importada")
+    imported: int = Field(..., description="Filas insertadas")
+    rejected: int = Field(..., description="Filas rechazadas")
+    errors: List[RejectedRow] = Field(..., description="Primeros rechazos")
+
+    class Config:
+        orm_mode = True
@@ -0,0 +1,27 @@
+# app/schemas/dashboard.py
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+
+class DashboardSummary(BaseModel):
+    user_id: int = Field(..., description="ID del usuario")
+    projects_planning: int = Field(..., description="Proyectos en planificación")
+    projects_in_progress: int = Field(..., description="Proyectos en curso")
+    projects_on_hold: int = Field(..., description="Proyectos en pausa")
+    projects_completed: int = Field(..., description="Proyectos completados")
+    projects_cancelled: int = Field(..., description="Proyectos cancelados")
+    revenue_total: float = Field(..., description="Presupuesto de los proyectos completados")
+    quotes_total: int = Field(..., description="Cotizaciones totales")
+    quotes_draft: int = Field(..., description="Cotizaciones en borrador")
+    quotes_sent: int = Field(..., description="Cotizaciones enviadas")
+    quotes_accepted: int = Field(..., description="Cotizaciones aceptadas")
+    quotes_rejected: int = Field(..., description="Cotizaciones rechazadas")
+    quotes_value_total: float = Field(..., description="Importe total cotizado")
+    materials_low_stock: int = Field(..., description="Materiales con existencia baja")
+    marketplace_views: int = Field(..., description="Vistas en marketplaces")
+    marketplace_downloads: int = Field(..., description="Descargas en marketplaces")
+    marketplace_revenue: float = Field(..., description="Ingresos en marketplaces")
+    updated_at: datetime = Field(..., description="Última actualización del resumen")
+
+    class Config:
+        orm_mode = True
@@ -1,8 +1,11 @@
 import openai
 import json
-from typing import List
+from typing import Dict, List
 from app.core.config import settings
 from app.schemas.ai_task import ComplexityReport, PrintTimeRequest, PrintTimeResponse
+from app.services.complexity_engine import analyze_model_file
+from app.services.mesh_io import MeshLoadError
+from app.services.gcode_analyzer import GcodeAnalysisError, analyze_gcode, is_gcode_path
 
 
 class AIServiceError(Exception):
@@ -94,28 +97,58 @@ class AIService:
         except Exception:
             raise AIServiceError("No se pudo parsear JSON de tags de OpenAI: " + text)
 
-    def analyze_complexity(self, model_file_url: str) -> ComplexityReport:
+    def generate_tags_batch(self, model_ids: List[str]) -> Dict[str, List[str]]:
         """
-        Analiza la complejidad de un modelo 3D a partir de su URL.
+        Genera los tags de varios modelos con una sola llamada. Los modelos
+        que falten en la respuesta no aparecen en el resultado.
         """
         prompt = (
-            f"Analiza el modelo 3D en la URL: {model_file_url}. "
-            f"Devuelve JSON con vertices (int), polygons (int), file_size_kb (float), complexity_score (float 0-1)."
+            f"Como experto en SEO, sugiere entre 5 y 10 etiquetas descriptivas "
+            f"para cada uno de los modelos con ID: {', '.join(model_ids)}. "
+            f"Responde en JSON con clave 'tags', un objeto de ID de modelo a lista de etiquetas."
         )
         try:
             resp = openai.ChatCompletion.create(
                 model=self.model,
                 messages=[{"role": "user", "content": prompt}],
-                temperature=0.0,
+                temperature=0.5,
             )
-            return ComplexityReport.parse_raw(resp.choices[0].message.content)
         except Exception as e:
-            raise AIServiceError(f"Error al parsear ComplexityReport: {e}")
+            raise AIServiceError(f"Error en OpenAI generate_tags_batch: {e}")
+
+        text = resp.choices[0].message.content
+        try:
+            data = json.loads(text)
+            tags = data.get("tags")
+            if not isinstance(tags, dict):
+                raise ValueError
+        except Exception:
+            raise AIServiceError("No se pudo parsear JSON de tags de OpenAI: " + text)
+        return {
+            model_id: tags[model_id]
+            for model_id in model_ids
+            if isinstance(tags.get(model_id), list)
+        }
+
+    def analyze_complexity(self, model_file_url: str) -> ComplexityReport:
+        """
+        Analiza la complejidad de un modelo 3D a partir de su geometría.
+        La puntuación es determinista (ver ``ComplexityEngine``).
+        """
+        try:
+            return analyze_model_file(model_file_url)
+        except (MeshLoadError, ValueError) as e:
+            raise AIServiceError(f"Error al analizar la geometría del modelo: {e}")
 
     def predict_print_time(self, request: PrintTimeRequest) -> PrintTimeResponse:
         """
         Predice el tiempo de impresión (minutos) para un modelo 3D.
+        Si la URL apunta a un G-code laminado se simula el archivo en lugar
+        de consultar al modelo de lenguaje.
         """
+        if is_gcode_path(request.model_file_url):
+            return self.analyze_gcode(request)
+
         prompt = (
             f"Calcula tiempo de impresión para: URL={request.model_file_url}, "
             f"Material={request.material}, Layer={request.layer_height_mm}mm, Infill={request.infill_percent}%. "
@@ -129,4 +162,21 @@ class AIService:
             )
             return PrintTimeResponse.parse_raw(resp.choices[0].message.content)
         except Exception as e:
-            raise AIServiceError(f"Error al parsear PrintTimeResponse: {e}")
\ No newline at end of file
+            raise AIServiceError(f"Error al parsear PrintTimeResponse: {e}")
+
+    def analyze_gcode(self, request: PrintTimeRequest) -> PrintTimeResponse:
+        """
+        Calcula tiempo exacto, filamento y capas simulando el G-code. Si el
+        archivo tiene comandos que no se simulan, el tiempo no es exacto.
+        """
+        try:
+            report = analyze_gcode(request.model_file_url, material=request.material)
+        except GcodeAnalysisError as e:
+            raise AIServiceError(f"Error al analizar G-code: {e}")
+        return PrintTimeResponse(
+            estimated_time_minutes=report.print_time_minutes,
+            exact=report.exact,
+            filament_length_mm=report.filament_length_mm,
+            filament_weight_g=report.filament_weight_g,
+            layer_count=report.layer_count,
+        )
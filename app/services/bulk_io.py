@@ -0,0 +1,621 @@
+# app/services/bulk_io.py
+"""
+Importación y exportación masiva de materiales, proyectos y cotizaciones.
+
+Formatos: CSV, JSONL y un formato columnar ``.npz`` (un arreglo de numpy por
+columna; texto como cadenas, números con ``NaN`` y fechas con ``NaT`` para
+los nulos).
+
+La importación lee el archivo por bloques de ``chunk_rows`` filas y valida
+cada bloque por columnas con numpy: obligatorias, números, fechas,
+longitudes y valores de enumeraciones. Las filas válidas se escriben:
+
+* en PostgreSQL (psycopg2) con ``COPY ... FROM STDIN`` en formato CSV;
+* en los demás motores con un ``INSERT`` por bloque en modo ``executemany``.
+
+Cada bloque va en un SAVEPOINT y se confirma al terminar. Si la base rechaza
+el bloque (una clave foránea inexistente, por ejemplo) se repite fila por
+fila para aislar las culpables. Con sharding, antes de cada bloque se
+comprueba que el tenant de la sesión no esté congelado y se rechazan las
+filas de otro usuario. Las filas rechazadas van a ``rejects`` con su línea
+y el motivo; ``progress`` recibe el informe tras cada bloque. Al
+final se recalculan los resúmenes del dashboard de los usuarios afectados,
+porque estas escrituras no pasan por los eventos de la sesión.
+
+``id``, ``created_at`` y ``updated_at`` se ignoran al importar, de modo que
+un archivo exportado se puede volver a importar.
+"""
+import csv
+import io
+import json
+import logging
+import warnings
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import JSON, Boolean, DateTime, Enum, Float, Integer, String, Text, insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from app.core.metrics import BULK_IMPORT_ROWS
+from app.db.models import Material, Project, Quote
+from app.db.pagination import stream
+from app.db.sharding import guard_bulk_write
+from app.services.dashboard_summary import refresh_summaries
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = {"materials": Material, "projects": Project, "quotes": Quote}
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl", ".npz": "npz"}
+MEDIA_TYPES = {"csv": "text/csv", "jsonl": "application/x-ndjson", "npz": "application/octet-stream"}
+DEFAULT_CHUNK_ROWS = 5000
+# Columnas que asigna la base de datos
+IGNORED_COLUMNS = frozenset({"id", "created_at", "updated_at"})
+# Rechazos que se guardan en el informe (``rejects`` recibe todos)
+MAX_REPORTED_ERRORS = 100
+TRUE_VALUES = ("true", "t", "1", "yes", "y", "si", "sí")
+FALSE_VALUES = ("false", "f", "0", "no", "n")
+
+
+class BulkFormatError(ValueError):
+    """El archivo no se puede leer o tiene columnas desconocidas."""
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    kind: str  # float, int, bool, str, enum, datetime o json
+    required: bool = False
+    length: Optional[int] = None
+    choices: Tuple[str, ...] = ()
+
+
+@dataclass
+class Chunk:
+    """Bloque de filas en columnas, con la línea de origen de cada fila."""
+    lines: List[int]
+    columns: Dict[str, List[Any]]
+    # Filas que no se pudieron leer (índice en el bloque -> motivo)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def row(self, index: int) -> Dict[str, Any]:
+        return {name: values[index] for name, values in self.columns.items()}
+
+
+@dataclass
+class ImportReport:
+    entity: str
+    imported: int = 0
+    rejected: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    def reject(self, line: int, error: str) -> None:
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": error})
+
+
+RejectSink = Callable[[int, Dict[str, Any], str], None]
+
+
+def _column_kind(column) -> str:
+    column_type = column.type
+    if isinstance(column_type, Enum):
+        return "enum"
+    if isinstance(column_type, (String, Text)):
+        return "str"
+    if isinstance(column_type, Float):
+        return "float"
+    if isinstance(column_type, Integer):
+        return "int"
+    if isinstance(column_type, Boolean):
+        return "bool"
+    if isinstance(column_type, DateTime):
+        return "datetime"
+    if isinstance(column_type, JSON):
+        return "json"
+    raise TypeError(f"Tipo de columna no soportado: {column.key} {column_type!r}")
+
+
+@lru_cache(maxsize=None)
+def entity_fields(entity: str) -> Dict[str, FieldSpec]:
+    """Especificación de las columnas importables de ``entity``."""
+    fields = {}
+    for column in ENTITIES[entity].__table__.columns:
+        if column.key in IGNORED_COLUMNS:
+            continue
+        kind = _column_kind(column)
+        fields[column.key] = FieldSpec(
+            name=column.key,
+            kind=kind,
+            required=not column.nullable and column.default is None and column.server_default is None,
+            length=getattr(column.type, "length", None) if kind in ("str", "enum") else None,
+            choices=tuple(column.type.enums) if kind == "enum" else (),
+        )
+    return fields
+
+
+def export_columns(entity: str) -> List[str]:
+    return [column.key for column in ENTITIES[entity].__table__.columns]
+
+
+def detect_format(filename: str) -> str:
+    """Formato según la extensión del archivo."""
+    for suffix, fmt in FORMATS.items():
+        if filename.lower().endswith(suffix):
+            return fmt
+    raise BulkFormatError(f"Extensión no soportada: {filename} (usar {', '.join(FORMATS)})")
+
+
+# --- Lectura -----------------------------------------------------------------
+
+def _chunks_from_records(records: Iterable[Tuple[int, Any]], chunk_rows: int) -> Iterator[Chunk]:
+    """Agrupa ``(línea, dict o motivo de error)`` en bloques columnares."""
+    batch: List[Tuple[int, Any]] = []
+
+    def build() -> Chunk:
+        names: Dict[str, None] = {}
+        for _, record in batch:
+            if isinstance(record, dict):
+                names.update(dict.fromkeys(record))
+        rows = [record if isinstance(record, dict) else {} for _, record in batch]
+        return Chunk(
+            lines=[line for line, _ in batch],
+            columns={name: [row.get(name) for row in rows] for name in names},
+            errors={i: record for i, (_, record) in enumerate(batch) if not isinstance(record, dict)},
+        )
+
+    for record in records:
+        batch.append(record)
+        if len(batch) >= chunk_rows:
+            yield build()
+            batch = []
+    if batch:
+        yield build()
+
+
+def _csv_records(text: IO[str]) -> Iterator[Tuple[int, Any]]:
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if not header:
+        return
+    header = [name.strip() for name in header]
+    for row in reader:
+        if not row:
+            continue
+        if len(row) > len(header):
+            yield reader.line_num, f"La fila tiene {len(row)} columnas y la cabecera {len(header)}"
+            continue
+        yield reader.line_num, dict(zip(header, row))
+
+
+def _jsonl_records(text: IO[str]) -> Iterator[Tuple[int, Any]]:
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"JSON inválido: {e}"
+            continue
+        yield line_number, record if isinstance(record, dict) else "Se esperaba un objeto JSON"
+
+
+def _from_array(array: np.ndarray) -> List[Any]:
+    if array.dtype.kind == "f":
+        values = array.astype(object)
+        values[np.isnan(array)] = None
+        return values.tolist()
+    if array.dtype.kind == "M":
+        return array.astype("datetime64[us]").astype(object).tolist()
+    return array.tolist()
+
+
+def _npz_chunks(fileobj: IO[bytes], chunk_rows: int) -> Iterator[Chunk]:
+    try:
+        with np.load(fileobj, allow_pickle=False) as data:
+            columns = {name: data[name] for name in data.files}
+    except (OSError, ValueError) as e:
+        raise BulkFormatError(f"Archivo npz inválido: {e}")
+    lengths = {len(array) for array in columns.values()}
+    if len(lengths) > 1:
+        raise BulkFormatError("Las columnas del archivo npz tienen longitudes distintas")
+    total = lengths.pop() if lengths else 0
+    for start in range(0, total, chunk_rows):
+        stop = min(start + chunk_rows, total)
+        yield Chunk(
+            lines=list(range(start + 1, stop + 1)),
+            columns={name: _from_array(array[start:stop]) for name, array in columns.items()},
+        )
+
+
+def read_chunks(fileobj: IO[bytes], fmt: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[Chunk]:
+    """Bloques de ``chunk_rows`` filas de un archivo binario en ``fmt``."""
+    if fmt == "npz":
+        yield from _npz_chunks(fileobj, chunk_rows)
+        return
+    if fmt not in ("csv", "jsonl"):
+        raise BulkFormatError(f"Formato no soportado: {fmt}")
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="" if fmt == "csv" else None)
+    try:
+        records = _csv_records(text) if fmt == "csv" else _jsonl_records(text)
+        yield from _chunks_from_records(records, chunk_rows)
+    except UnicodeDecodeError as e:
+        raise BulkFormatError(f"El archivo no está en UTF-8: {e}")
+    finally:
+        # El archivo es del llamador: no cerrarlo con el envoltorio
+        text.detach()
+
+
+# --- Validación ----------------------------------------------------------------
+
+def _elementwise(values: np.ndarray, convert: Callable[[Any], Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Conversión elemento a elemento; devuelve (valores, máscara de inválidos)."""
+    out = np.empty(len(values), dtype=object)
+    invalid = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        try:
+            out[i] = convert(value)
+        except (TypeError, ValueError):
+            invalid[i] = True
+    return out, invalid
+
+
+def _to_float(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    try:
+        numbers = values.astype(float)
+        invalid = np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        converted, invalid = _elementwise(values, float)
+        converted[invalid] = np.nan
+        numbers = converted.astype(float)
+    return numbers, invalid | ~np.isfinite(numbers)
+
+
+def _parse_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _to_datetime(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    try:
+        with warnings.catch_warnings():
+            # Las zonas horarias se resuelven en la conversión por elemento
+            warnings.simplefilter("error")
+            parsed = values.astype("datetime64[us]")
+        invalid = np.isnat(parsed)
+        return parsed.astype(object), invalid
+    except (TypeError, ValueError, UserWarning, DeprecationWarning):
+        return _elementwise(values, _parse_datetime)
+
+
+def _parse_json(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _convert(spec: FieldSpec, values: np.ndarray) -> Tuple[np.ndarray, np.ndarray, str]:
+    """Valores convertidos, máscara de inválidos y motivo para ``spec``."""
+    if spec.kind == "float":
+        numbers, invalid = _to_float(values)
+        return np.array(numbers.tolist(), dtype=object), invalid, "no es un número"
+    if spec.kind == "int":
+        numbers, invalid = _to_float(values)
+        invalid |= np.floor(np.where(invalid, 0, numbers)) != np.where(invalid, 0, numbers)
+        integers = np.where(invalid, 0, numbers).astype(np.int64)
+        return np.array(integers.tolist(), dtype=object), invalid, "no es un entero"
+    if spec.kind == "bool":
+        lowered = np.char.lower(np.char.strip(values.astype(str)))
+        truthy = np.isin(lowered, TRUE_VALUES)
+        return np.array(truthy.tolist(), dtype=object), ~(truthy | np.isin(lowered, FALSE_VALUES)), "no es un booleano"
+    if spec.kind == "datetime":
+        parsed, invalid = _to_datetime(values)
+        return parsed, invalid, "no es una fecha ISO 8601"
+    if spec.kind == "json":
+        parsed, invalid = _elementwise(values, _parse_json)
+        return parsed, invalid, "no es JSON válido"
+
+    text = np.char.strip(values.astype(str))
+    if spec.kind == "enum":
+        text = np.char.upper(text)
+        invalid = ~np.isin(text, spec.choices)
+        return np.array(text.tolist(), dtype=object), invalid, f"debe ser uno de {', '.join(spec.choices)}"
+    invalid = np.char.str_len(text) > spec.length if spec.length else np.zeros(len(text), dtype=bool)
+    return np.array(text.tolist(), dtype=object), invalid, f"supera {spec.length} caracteres"
+
+
+def validate_chunk(
+    fields: Dict[str, FieldSpec], chunk: Chunk
+) -> Tuple[List[str], List[Tuple[int, Dict[str, Any]]], List[Tuple[int, str]]]:
+    """
+    Valida ``chunk`` por columnas. Devuelve las columnas a escribir, las
+    filas válidas ``(índice, valores)`` y los rechazos ``(índice, motivo)``.
+    """
+    unknown = set(chunk.columns) - set(fields) - IGNORED_COLUMNS
+    if unknown:
+        raise BulkFormatError(f"Columnas desconocidas: {sorted(unknown)}")
+
+    size = len(chunk)
+    rejected = np.zeros(size, dtype=bool)
+    reasons = np.empty(size, dtype=object)
+
+    def reject(mask: np.ndarray, reason: str) -> None:
+        new = mask & ~rejected
+        reasons[new] = reason
+        rejected[:] |= mask
+
+    for index, reason in chunk.errors.items():
+        reject(np.arange(size) == index, reason)
+
+    names = [name for name in fields if name in chunk.columns or fields[name].required]
+    converted: Dict[str, np.ndarray] = {}
+    for name in names:
+        spec = fields[name]
+        values = np.fromiter(chunk.columns.get(name, [None] * size), dtype=object, count=size)
+        missing = (np.equal(values, None) | np.equal(values, "")).astype(bool)
+        out = np.full(size, None, dtype=object)
+        present = ~missing
+        if present.any():
+            parsed, invalid, reason = _convert(spec, values[present])
+            out[present] = parsed
+            bad = np.zeros(size, dtype=bool)
+            bad[present] = invalid
+            out[bad] = None
+            reject(bad, f"{name}: {reason}")
+        if spec.required:
+            reject(missing, f"{name}: obligatorio")
+        converted[name] = out
+
+    valid = np.flatnonzero(~rejected)
+    columns = [converted[name] for name in names]
+    rows = [(int(i), dict(zip(names, values))) for i, values in zip(valid, zip(*(c[valid] for c in columns)))]
+    return names, rows, [(int(i), reasons[i]) for i in np.flatnonzero(rejected)]
+
+
+# --- Escritura ------------------------------------------------------------------
+
+def _copy_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def copy_rows(connection, table, columns: List[str], rows: List[Dict[str, Any]]) -> None:
+    """``COPY table (columns) FROM STDIN`` con psycopg2 (nulos como campo vacío)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(row[name]) for name in columns])
+    buffer.seek(0)
+    preparer = connection.dialect.identifier_preparer
+    sql = (
+        f"COPY {preparer.format_table(table)} ({', '.join(preparer.quote(name) for name in columns)}) "
+        "FROM STDIN WITH (FORMAT csv)"
+    )
+    cursor = connection.connection.driver_connection.cursor()
+    try:
+        cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+
+def insert_rows(db: Session, model, columns: List[str], rows: List[Dict[str, Any]]) -> None:
+    """Inserta ``rows`` con ``COPY`` en PostgreSQL/psycopg2 o con ``executemany``."""
+    connection = db.connection()
+    if connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2":
+        copy_rows(connection, model.__table__, columns, rows)
+    else:
+        connection.execute(insert(model.__table__), rows)
+
+
+def _write_chunk(
+    db: Session, model, columns: List[str], rows: List[Tuple[int, Dict[str, Any]]]
+) -> Tuple[int, List[Tuple[int, str]]]:
+    """Escribe el bloque; si la base lo rechaza, repite fila por fila."""
+    try:
+        with db.begin_nested():
+            insert_rows(db, model, columns, [values for _, values in rows])
+        return len(rows), []
+    except DBAPIError as e:
+        logger.info(f"Bulk chunk of {len(rows)} {model.__tablename__} rejected, retrying row by row: {e.orig}")
+
+    written, failed = 0, []
+    for index, values in rows:
+        try:
+            with db.begin_nested():
+                db.connection().execute(insert(model.__table__), [values])
+            written += 1
+        except DBAPIError as e:
+            failed.append((index, str(e.orig).splitlines()[0]))
+    return written, failed
+
+
+def import_file(
+    db: Session,
+    entity: str,
+    fileobj: IO[bytes],
+    fmt: str,
+    user_id: Optional[int] = None,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    rejects: Optional[RejectSink] = None,
+    progress: Optional[Callable[[ImportReport], None]] = None,
+) -> ImportReport:
+    """
+    Importa ``fileobj`` en la tabla de ``entity``. Las filas sin ``user_id``
+    reciben ``user_id``. Confirma cada bloque; devuelve el informe.
+    """
+    model = ENTITIES[entity]
+    fields = entity_fields(entity)
+    report = ImportReport(entity=entity)
+    touched_users: Set[int] = set()
+
+    def reject(chunk: Chunk, index: int, reason: str) -> None:
+        report.reject(chunk.lines[index], reason)
+        if rejects is not None:
+            rejects(chunk.lines[index], chunk.row(index), reason)
+
+    for chunk in read_chunks(fileobj, fmt, chunk_rows):
+        if user_id is not None:
+            chunk.columns["user_id"] = [
+                user_id if value in (None, "") else value
+                for value in chunk.columns.get("user_id", [None] * len(chunk))
+            ]
+        columns, rows, rejected = validate_chunk(fields, chunk)
+        if rows and "is_active" not in columns:
+            columns.append("is_active")
+        for _, values in rows:
+            if values.get("is_active") is None:
+                values["is_active"] = True
+        foreign = set(guard_bulk_write(db, [values.get("user_id") for _, values in rows]))
+        if foreign:
+            rejected += [(rows[i][0], "user_id: fila de otro usuario") for i in sorted(foreign)]
+            rows = [row for i, row in enumerate(rows) if i not in foreign]
+
+        written, failed = _write_chunk(db, model, columns, rows) if rows else (0, [])
+        db.commit()
+        for index, reason in sorted(rejected + failed):
+            reject(chunk, index, reason)
+        report.imported += written
+        failed_indexes = {index for index, _ in failed}
+        touched_users.update(
+            values["user_id"] for index, values in rows
+            if index not in failed_indexes and values.get("user_id") is not None
+        )
+        if progress is not None:
+            progress(report)
+
+    if touched_users:
+        refresh_summaries(db, touched_users)
+        db.commit()
+    BULK_IMPORT_ROWS.labels(entity=entity, result="imported").inc(report.imported)
+    BULK_IMPORT_ROWS.labels(entity=entity, result="rejected").inc(report.rejected)
+    logger.info(f"Bulk import of {entity}: {report.imported} imported, {report.rejected} rejected")
+    return report
+
+
+class RejectWriter:
+    """Escribe las filas rechazadas con ``_line`` y ``_error`` en CSV o JSONL."""
+
+    def __init__(self, fileobj: IO[str], fmt: str):
+        if fmt not in ("csv", "jsonl"):
+            raise BulkFormatError(f"Los rechazos se escriben en csv o jsonl, no en {fmt}")
+        self.fileobj = fileobj
+        self.fmt = fmt
+        self._writer: Optional[csv.DictWriter] = None
+
+    def __call__(self, line: int, row: Dict[str, Any], error: str) -> None:
+        record = {"_line": line, "_error": error, **row}
+        if self.fmt == "jsonl":
+            self.fileobj.write(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n")
+            return
+        if self._writer is None:
+            self._writer = csv.DictWriter(self.fileobj, fieldnames=list(record), extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(record)
+
+
+# --- Exportación ----------------------------------------------------------------
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"No serializable: {type(value).__name__}")
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _to_array(kind: str, values: List[Any]) -> np.ndarray:
+    """Columna para ``.npz``: sin objetos de Python, con NaN/NaT/"" como nulos."""
+    if kind in ("float", "int"):
+        array = np.array([np.nan if v is None else v for v in values], dtype=float)
+        if kind == "int" and not np.isnan(array).any():
+            return array.astype(np.int64)
+        return array
+    if kind == "datetime":
+        return np.array([_naive_utc(v) or np.datetime64("NaT") for v in values], dtype="datetime64[us]")
+    if kind == "bool" and None not in values:
+        return np.array(values, dtype=bool)
+    if kind == "json":
+        values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+    return np.array(["" if v is None else str(v) for v in values], dtype=str)
+
+
+def export_rows(db: Session, entity: str, user_id: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Filas de ``entity`` (de ``user_id`` si se indica) en orden de ``id``."""
+    model = ENTITIES[entity]
+    stmt = select(*model.__table__.columns).order_by(model.id)
+    if user_id is not None:
+        stmt = stmt.where(model.user_id == user_id)
+    for row in stream(db, stmt):
+        yield dict(row._mapping)
+
+
+def iter_export(
+    db: Session, entity: str, fmt: str, user_id: Optional[int] = None, batch_rows: int = 1000
+) -> Iterator[bytes]:
+    """
+    Exportación de ``entity`` en ``fmt`` como bloques de bytes. CSV y JSONL
+    se generan a medida que se leen las filas; ``npz`` necesita todas las
+    columnas y se entrega al final.
+    """
+    columns = export_columns(entity)
+    rows = export_rows(db, entity, user_id)
+    if fmt == "npz":
+        kinds = {column.key: _column_kind(column) for column in ENTITIES[entity].__table__.columns}
+        values: Dict[str, List[Any]] = {name: [] for name in columns}
+        for row in rows:
+            for name in columns:
+                values[name].append(row[name])
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **{name: _to_array(kinds[name], values[name]) for name in columns})
+        yield buffer.getvalue()
+        return
+    if fmt not in ("csv", "jsonl"):
+        raise BulkFormatError(f"Formato no soportado: {fmt}")
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        if writer is not None:
+            writer.writerow([_csv_value(row[name]) for name in columns])
+        else:
+            buffer.write(json.dumps(row, default=_json_default, ensure_ascii=False) + "\n")
+        pending += 1
+        if pending >= batch_rows:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
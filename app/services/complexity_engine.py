@@ -0,0 +1,202 @@
+# app/services/complexity_engine.py
+"""
+Puntuación de complejidad determinista a partir de la geometría.
+
+Rasgos calculados sobre los arreglos de la malla y su término en [0, 1]:
+
+============================  =====  ==========================================
+Rasgo                         Peso   Término
+============================  =====  ==========================================
+Número de triángulos          0.15   log10(n) / 6  (1M triángulos -> 1)
+Dispersión de aristas         0.10   coef. de variación de longitudes / 2
+Detalles pequeños             0.20   fracción de área en caras cuya arista
+                                     mayor es < ``small_feature_mm``
+Topología (género + cuerpos)  0.15   1 - exp(-(género + cuerpos - 1) / 5)
+Voladizos                     0.25   fracción de área orientada hacia abajo
+                                     más de ``overhang_angle_deg`` de la
+                                     vertical, excluyendo la cara de apoyo
+Paredes delgadas              0.15   fracción de área con espesor menor a
+                                     ``min_wall_mm``
+============================  =====  ==========================================
+
+``complexity_score`` es la suma ponderada, acotada a [0, 1]. La misma malla
+y los mismos parámetros producen siempre el mismo resultado.
+"""
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.schemas.ai_task import ComplexityReport
+from app.services.mesh_io import (
+    connected_components,
+    face_areas,
+    face_normals,
+    index_vertices,
+    parse_stl,
+    read_source,
+    unique_rows,
+)
+
+WEIGHTS = {
+    "triangles": 0.15,
+    "edge_spread": 0.10,
+    "small_features": 0.20,
+    "topology": 0.15,
+    "overhangs": 0.25,
+    "thin_walls": 0.15,
+}
+
+DEFAULT_SMALL_FEATURE_MM = 0.8
+DEFAULT_OVERHANG_ANGLE_DEG = 45.0
+DEFAULT_MIN_WALL_MM = 0.8
+BED_TOLERANCE_MM = 1e-3
+
+# Recibe los triángulos y devuelve el espesor estimado por cara (mm), p. ej.
+# ``partial(wall_thickness.face_thickness, max_distance=min_wall_mm)``
+ThicknessFn = Callable[[np.ndarray], np.ndarray]
+
+
+@dataclass
+class ComplexityFeatures:
+    """Rasgos geométricos crudos de una malla."""
+    triangle_count: int
+    vertex_count: int
+    edge_length_mean: float
+    edge_length_cv: float
+    small_feature_ratio: float
+    shell_count: int
+    genus: int
+    overhang_ratio: float
+    thin_wall_ratio: float
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def mesh_topology(faces: np.ndarray, n_vertices: int) -> Tuple[np.ndarray, int, int, np.ndarray]:
+    """
+    Aristas únicas, número de cuerpos (shells), género total y la etiqueta
+    de cuerpo por cara. El género usa la característica de Euler por cuerpo
+    (V - E + F = 2 - 2g) y se acota a cero en mallas abiertas.
+    """
+    edges, _, _ = unique_rows(np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1))
+
+    labels = connected_components(n_vertices, edges)
+    used = np.unique(faces)
+    shells, shell_of_vertex = np.unique(labels[used], return_inverse=True)
+    shell_count = len(shells)
+
+    euler = len(used) - len(edges) + len(faces)
+    genus = max(int(round((2 * shell_count - euler) / 2)), 0)
+
+    shell_index = np.full(n_vertices, -1)
+    shell_index[used] = shell_of_vertex
+    return edges, shell_count, genus, shell_index[faces[:, 0]]
+
+
+def shell_extent_thickness(triangles: np.ndarray, face_shell: np.ndarray) -> np.ndarray:
+    """
+    Espesor aproximado por cara: la menor extensión de la caja envolvente
+    de su cuerpo. Es una cota superior barata del espesor real.
+    """
+    n_shells = int(face_shell.max()) + 1
+    points = triangles.reshape(-1, 3)
+    point_shell = np.repeat(face_shell, 3)
+    lo = np.full((n_shells, 3), np.inf)
+    hi = np.full((n_shells, 3), -np.inf)
+    for axis in range(3):
+        np.minimum.at(lo[:, axis], point_shell, points[:, axis])
+        np.maximum.at(hi[:, axis], point_shell, points[:, axis])
+    return (hi - lo).min(axis=1)[face_shell]
+
+
+class ComplexityEngine:
+    """
+    Calcula rasgos y puntuación de complejidad de una malla.
+
+    ``thickness_fn`` permite sustituir la estimación de espesor por cara
+    (por defecto, la extensión mínima de cada cuerpo). El trazado sobre un
+    BVH de ``wall_thickness.face_thickness`` es más fiel pero varias veces
+    más lento; el informe completo lo da ``analyze_wall_thickness_task``.
+    """
+    def __init__(
+        self,
+        small_feature_mm: float = DEFAULT_SMALL_FEATURE_MM,
+        overhang_angle_deg: float = DEFAULT_OVERHANG_ANGLE_DEG,
+        min_wall_mm: float = DEFAULT_MIN_WALL_MM,
+        thickness_fn: Optional[ThicknessFn] = None,
+    ):
+        self.small_feature_mm = small_feature_mm
+        self.overhang_cos = np.cos(np.radians(overhang_angle_deg))
+        self.min_wall_mm = min_wall_mm
+        self.thickness_fn = thickness_fn
+
+    def features(self, triangles: np.ndarray) -> ComplexityFeatures:
+        triangles = np.asarray(triangles, dtype=np.float64)
+        vertices, faces = index_vertices(triangles)
+        areas = face_areas(triangles)
+        total_area = areas.sum() or 1.0
+
+        edges, shell_count, genus, face_shell = mesh_topology(faces, len(vertices))
+        lengths = np.linalg.norm(vertices[edges[:, 0]] - vertices[edges[:, 1]], axis=1)
+        mean_length = float(lengths.mean()) if len(lengths) else 0.0
+        cv = float(lengths.std() / mean_length) if mean_length > 0 else 0.0
+
+        side = np.linalg.norm(triangles - np.roll(triangles, 1, axis=1), axis=2).max(axis=1)
+        small_ratio = float(areas[side < self.small_feature_mm].sum() / total_area)
+
+        normals = face_normals(triangles)
+        on_bed = triangles[:, :, 2].max(axis=1) <= triangles[:, :, 2].min() + BED_TOLERANCE_MM
+        overhang = (normals[:, 2] < -self.overhang_cos) & ~on_bed
+        overhang_ratio = float(areas[overhang].sum() / total_area)
+
+        if self.thickness_fn is not None:
+            thickness = self.thickness_fn(triangles)
+        else:
+            thickness = shell_extent_thickness(triangles, face_shell)
+        thin_ratio = float(areas[thickness < self.min_wall_mm].sum() / total_area)
+
+        return ComplexityFeatures(
+            triangle_count=int(len(triangles)),
+            vertex_count=int(len(vertices)),
+            edge_length_mean=mean_length,
+            edge_length_cv=cv,
+            small_feature_ratio=small_ratio,
+            shell_count=int(shell_count),
+            genus=int(genus),
+            overhang_ratio=overhang_ratio,
+            thin_wall_ratio=thin_ratio,
+        )
+
+    @staticmethod
+    def score(features: ComplexityFeatures) -> float:
+        """Combina los rasgos según ``WEIGHTS`` en una puntuación 0–1."""
+        terms = {
+            "triangles": np.log10(max(features.triangle_count, 1)) / 6.0,
+            "edge_spread": features.edge_length_cv / 2.0,
+            "small_features": features.small_feature_ratio,
+            "topology": 1.0 - np.exp(-max(features.genus + features.shell_count - 1, 0) / 5.0),
+            "overhangs": features.overhang_ratio,
+            "thin_walls": features.thin_wall_ratio,
+        }
+        total = sum(WEIGHTS[name] * float(np.clip(value, 0.0, 1.0)) for name, value in terms.items())
+        return round(float(np.clip(total, 0.0, 1.0)), 6)
+
+    def analyze(self, triangles: np.ndarray) -> Tuple[ComplexityFeatures, float]:
+        features = self.features(triangles)
+        return features, self.score(features)
+
+
+def analyze_model_file(model_file_url: str, engine: Optional[ComplexityEngine] = None) -> ComplexityReport:
+    """Lee un STL y construye su ``ComplexityReport`` determinista."""
+    engine = engine or ComplexityEngine()
+    data = read_source(model_file_url)
+    features, score = engine.analyze(parse_stl(data))
+    return ComplexityReport(
+        vertices=features.vertex_count,
+        polygons=features.triangle_count,
+        file_size_kb=len(data) / 1024.0,
+        complexity_score=score,
+        features=features.as_dict(),
+    )
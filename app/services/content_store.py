@@ -0,0 +1,63 @@
+# app/services/content_store.py
+"""
+Almacén de contenido direccionado por hash en disco local.
+
+Cada blob se guarda bajo su SHA-256 (``ab/cd/abcd...``); escribir dos veces
+el mismo contenido no duplica archivos y las escrituras son atómicas.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from app.core.config import settings
+
+
+class ContentNotFound(Exception):
+    """Excepción para claves inexistentes en el almacén"""
+    pass
+
+
+class ContentStore:
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def path_for(self, key: str) -> Path:
+        if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+            raise ContentNotFound(f"Clave inválida: {key}")
+        return self.root / key[:2] / key[2:4] / key
+
+    def put(self, data: bytes) -> str:
+        """Guarda ``data`` y devuelve su clave."""
+        key = hashlib.sha256(data).hexdigest()
+        path = self.path_for(key)
+        if path.exists():
+            return key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        return key
+
+    def get(self, key: str) -> bytes:
+        path = self.path_for(key)
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            raise ContentNotFound(key)
+
+    def exists(self, key: str) -> bool:
+        try:
+            return self.path_for(key).exists()
+        except ContentNotFound:
+            return False
+
+    def delete(self, key: str) -> None:
+        try:
+            self.path_for(key).unlink()
+        except (FileNotFoundError, ContentNotFound):
+            pass
+
+
+content_store = ContentStore(settings.CONTENT_STORE_DIR)
@@ -0,0 +1,295 @@
+# app/services/dashboard_summary.py
+"""
+Resúmenes del dashboard por usuario mantenidos de forma incremental.
+
+``user_dashboard_summaries`` guarda por usuario los proyectos por estado, el
+ingreso de los completados, las cotizaciones por estado, los materiales con
+existencia baja y los totales de marketplace. Leer el dashboard es una
+búsqueda por clave primaria.
+
+``install_summary_hooks`` registra en las sesiones dos eventos:
+
+* ``before_flush`` calcula, con el historial de atributos, la diferencia
+  entre la contribución anterior y la nueva de cada fila rastreada
+  (proyectos, cotizaciones, materiales y cuentas de marketplace);
+* ``after_flush`` suma esas diferencias al resumen en la misma transacción.
+  Si el usuario aún no tiene resumen se calcula completo desde las tablas.
+
+Las escrituras que no pasan por la sesión (``UPDATE`` masivos, SQL manual)
+no se reflejan: ``reconcile_summaries`` recalcula los resúmenes con
+consultas agrupadas y corrige las filas que se desviaron.
+"""
+import logging
+from typing import Any, Callable, Dict, Iterable, Mapping, Optional, Tuple
+
+from sqlalchemy import case, event, func, inspect, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.core.metrics import DASHBOARD_SUMMARY_DRIFT
+from app.db.models import MarketplaceAccount, Material, Project, Quote, UserDashboardSummary
+
+logger = logging.getLogger(__name__)
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+_PENDING_KEY = "dashboard_summary_deltas"
+
+PROJECT_STATUS_COLUMNS = {
+    "PLANNING": "projects_planning",
+    "IN_PROGRESS": "projects_in_progress",
+    "ON_HOLD": "projects_on_hold",
+    "COMPLETED": "projects_completed",
+    "CANCELLED": "projects_cancelled",
+}
+QUOTE_STATUS_COLUMNS = {
+    "draft": "quotes_draft",
+    "sent": "quotes_sent",
+    "accepted": "quotes_accepted",
+    "rejected": "quotes_rejected",
+}
+SUMMARY_COLUMNS = tuple(
+    c.key for c in UserDashboardSummary.__table__.columns if c.key not in ("user_id", "updated_at")
+)
+# Tolerancia al comparar sumas de punto flotante en la reconciliación
+DRIFT_TOLERANCE = 1e-6
+
+Contribution = Dict[str, float]
+
+
+def _project(v: Mapping[str, Any]) -> Contribution:
+    contribution = {}
+    if v["status"] in PROJECT_STATUS_COLUMNS:
+        contribution[PROJECT_STATUS_COLUMNS[v["status"]]] = 1
+    if v["status"] == "COMPLETED":
+        contribution["revenue_total"] = v["budget"] or 0.0
+    return contribution
+
+
+def _quote(v: Mapping[str, Any]) -> Contribution:
+    contribution = {"quotes_total": 1, "quotes_value_total": v["total_amount"] or 0.0}
+    if v["status"] in QUOTE_STATUS_COLUMNS:
+        contribution[QUOTE_STATUS_COLUMNS[v["status"]]] = 1
+    return contribution
+
+
+def _material(v: Mapping[str, Any]) -> Contribution:
+    stock, threshold = v["current_stock"], v["low_stock_threshold"]
+    low = stock is not None and threshold is not None and stock <= threshold
+    return {"materials_low_stock": 1} if low else {}
+
+
+def _marketplace(v: Mapping[str, Any]) -> Contribution:
+    return {
+        "marketplace_views": v["total_views"] or 0,
+        "marketplace_downloads": v["total_downloads"] or 0,
+        "marketplace_revenue": v["total_revenue"] or 0.0,
+    }
+
+
+# Modelo -> (atributos que afectan al resumen, contribución de una fila)
+TRACKED: Dict[type, Tuple[Tuple[str, ...], Callable[[Mapping[str, Any]], Contribution]]] = {
+    Project: (("user_id", "is_active", "status", "budget"), _project),
+    Quote: (("user_id", "is_active", "status", "total_amount"), _quote),
+    Material: (("user_id", "is_active", "current_stock", "low_stock_threshold"), _material),
+    MarketplaceAccount: (("user_id", "is_active", "total_views", "total_downloads", "total_revenue"), _marketplace),
+}
+
+
+def _active(model):
+    return or_(model.is_active.is_(None), model.is_active.is_(True))
+
+
+def _aggregate_queries(user_ids: Optional[Iterable[int]] = None):
+    """Una consulta agrupada por usuario para cada tabla rastreada."""
+    def total(condition, value=1):
+        return func.coalesce(func.sum(case((condition, value), else_=0)), 0)
+
+    queries = [
+        select(
+            Project.user_id,
+            *[total(Project.status == status).label(column) for status, column in PROJECT_STATUS_COLUMNS.items()],
+            total(Project.status == "COMPLETED", func.coalesce(Project.budget, 0.0)).label("revenue_total"),
+        ),
+        select(
+            Quote.user_id,
+            func.count().label("quotes_total"),
+            *[total(Quote.status == status).label(column) for status, column in QUOTE_STATUS_COLUMNS.items()],
+            func.coalesce(func.sum(Quote.total_amount), 0.0).label("quotes_value_total"),
+        ),
+        select(
+            Material.user_id,
+            total(Material.current_stock <= Material.low_stock_threshold).label("materials_low_stock"),
+        ),
+        select(
+            MarketplaceAccount.user_id,
+            func.coalesce(func.sum(MarketplaceAccount.total_views), 0).label("marketplace_views"),
+            func.coalesce(func.sum(MarketplaceAccount.total_downloads), 0).label("marketplace_downloads"),
+            func.coalesce(func.sum(MarketplaceAccount.total_revenue), 0.0).label("marketplace_revenue"),
+        ),
+    ]
+    ids = list(user_ids) if user_ids is not None else None
+    for query, model in zip(queries, TRACKED):
+        query = query.where(model.user_id.isnot(None), _active(model))
+        if ids is not None:
+            query = query.where(model.user_id.in_(ids))
+        yield query.group_by(model.user_id)
+
+
+def compute_summaries(db, user_ids: Optional[Iterable[int]] = None) -> Dict[int, Dict[str, float]]:
+    """
+    Resúmenes calculados desde las tablas (``db`` es una sesión o una
+    conexión). Los usuarios de ``user_ids`` sin filas reciben ceros.
+    """
+    ids = list(user_ids) if user_ids is not None else None
+    summaries: Dict[int, Dict[str, float]] = {uid: dict.fromkeys(SUMMARY_COLUMNS, 0) for uid in ids or []}
+    for query in _aggregate_queries(ids):
+        for row in db.execute(query).mappings():
+            values = summaries.setdefault(row["user_id"], dict.fromkeys(SUMMARY_COLUMNS, 0))
+            values.update((k, v) for k, v in row.items() if k != "user_id")
+    return summaries
+
+
+def _values(obj, names: Tuple[str, ...], previous: bool) -> Dict[str, Any]:
+    state = inspect(obj)
+    values = {}
+    for name in names:
+        history = state.attrs[name].history
+        if previous and history.has_changes():
+            values[name] = history.deleted[0] if history.deleted else None
+        else:
+            values[name] = getattr(obj, name)
+    return values
+
+
+def _accumulate(deltas: Dict[int, Dict[str, float]], values: Mapping[str, Any], fn, sign: int) -> None:
+    if values["user_id"] is None or values["is_active"] is False:
+        return
+    delta = deltas.setdefault(values["user_id"], {})
+    for column, amount in fn(values).items():
+        delta[column] = delta.get(column, 0) + sign * amount
+
+
+def _collect_deltas(session: Session, flush_context, instances) -> None:
+    deltas: Dict[int, Dict[str, float]] = {}
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            names, fn = TRACKED[type(obj)]
+            _accumulate(deltas, _values(obj, names, previous=False), fn, 1)
+    for obj in session.dirty:
+        if type(obj) in TRACKED and session.is_modified(obj):
+            names, fn = TRACKED[type(obj)]
+            _accumulate(deltas, _values(obj, names, previous=True), fn, -1)
+            _accumulate(deltas, _values(obj, names, previous=False), fn, 1)
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            names, fn = TRACKED[type(obj)]
+            _accumulate(deltas, _values(obj, names, previous=True), fn, -1)
+    session.info[_PENDING_KEY] = deltas
+
+
+def _apply_deltas(session: Session, flush_context) -> None:
+    deltas = session.info.pop(_PENDING_KEY, None)
+    if not deltas:
+        return
+    conn = session.connection()
+    for user_id, delta in deltas.items():
+        changes = {column: amount for column, amount in delta.items() if amount}
+        if not changes:
+            continue
+        values = {column: getattr(UserDashboardSummary, column) + amount for column, amount in changes.items()}
+        values["updated_at"] = func.now()
+        result = conn.execute(
+            update(UserDashboardSummary).where(UserDashboardSummary.user_id == user_id).values(**values)
+        )
+        if result.rowcount == 0:
+            # Primer cambio del usuario: resumen completo, ya incluye este flush
+            conn.execute(_insert_summaries(conn.dialect.name, compute_summaries(conn, [user_id])))
+
+
+def _insert_summaries(dialect_name: str, summaries: Dict[int, Dict[str, float]]):
+    if dialect_name not in _INSERTS:
+        raise ValueError(f"Upsert no soportado para el dialecto {dialect_name}")
+    rows = [dict(values, user_id=user_id) for user_id, values in summaries.items()]
+    return _INSERTS[dialect_name](UserDashboardSummary).values(rows).on_conflict_do_nothing(
+        index_elements=[UserDashboardSummary.user_id]
+    )
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+def install_summary_hooks(target) -> None:
+    """Mantiene los resúmenes en los flush de ``target`` (clase de sesión o sessionmaker)."""
+    # Carga el valor anterior al asignar un atributo no cargado, para que el
+    # historial permita restar la contribución previa
+    for model, (names, _) in TRACKED.items():
+        for name in names:
+            attribute = getattr(model, name)
+            if not event.contains(attribute, "set", _keep_previous_value):
+                event.listen(attribute, "set", _keep_previous_value, active_history=True)
+    if not event.contains(target, "before_flush", _collect_deltas):
+        event.listen(target, "before_flush", _collect_deltas)
+        event.listen(target, "after_flush", _apply_deltas)
+
+
+def get_summary(db: Session, user_id: int) -> UserDashboardSummary:
+    """Resumen del usuario; se calcula y guarda si todavía no existe."""
+    summary = db.get(UserDashboardSummary, user_id)
+    if summary is None:
+        db.execute(_insert_summaries(db.get_bind().dialect.name, compute_summaries(db, [user_id])))
+        db.commit()
+        summary = db.get(UserDashboardSummary, user_id)
+    return summary
+
+
+def refresh_summaries(db: Session, user_ids: Iterable[int]) -> None:
+    """
+    Recalcula y guarda (sin confirmar) los resúmenes de ``user_ids``, tras
+    escrituras masivas que no pasan por la sesión. A diferencia de
+    ``reconcile_summaries`` no lo cuenta como desviación.
+    """
+    summaries = compute_summaries(db, user_ids)
+    if not summaries:
+        return
+    dialect_name = db.get_bind().dialect.name
+    if dialect_name not in _INSERTS:
+        raise ValueError(f"Upsert no soportado para el dialecto {dialect_name}")
+    stmt = _INSERTS[dialect_name](UserDashboardSummary).values(
+        [dict(values, user_id=user_id) for user_id, values in summaries.items()]
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[UserDashboardSummary.user_id],
+        set_={**{c: stmt.excluded[c] for c in SUMMARY_COLUMNS}, "updated_at": func.now()},
+    ))
+
+
+def reconcile_summaries(db: Session, user_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Recalcula los resúmenes (todos o los de ``user_ids``) y corrige los que
+    difieren de lo guardado. Devuelve el número de filas corregidas.
+    """
+    expected = compute_summaries(db, user_ids)
+    stored_query = select(UserDashboardSummary)
+    if user_ids is not None:
+        stored_query = stored_query.where(UserDashboardSummary.user_id.in_(list(user_ids)))
+    stored = {row.user_id: row for row in db.execute(stored_query).scalars()}
+
+    missing = {uid: values for uid, values in expected.items() if uid not in stored}
+    fixed = len(missing)
+    if missing:
+        db.execute(_insert_summaries(db.get_bind().dialect.name, missing))
+    for user_id, row in stored.items():
+        values = expected.get(user_id) or dict.fromkeys(SUMMARY_COLUMNS, 0)
+        drifted = {c: v for c, v in values.items() if abs((getattr(row, c) or 0) - v) > DRIFT_TOLERANCE}
+        if drifted:
+            logger.warning(f"Dashboard summary drift for user {user_id}: {sorted(drifted)}")
+            db.execute(
+                update(UserDashboardSummary)
+                .where(UserDashboardSummary.user_id == user_id)
+                .values(**drifted, updated_at=func.now())
+            )
+            fixed += 1
+    db.commit()
+    DASHBOARD_SUMMARY_DRIFT.inc(fixed)
+    return fixed
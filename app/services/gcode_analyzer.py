@@ -0,0 +1,420 @@
+# app/services/gcode_analyzer.py
+"""
+Análisis de G-code laminado: tiempo exacto, filamento y capas.
+
+El archivo se lee con ``mmap`` y se divide en bloques alineados a fin de
+línea. Cada bloque se tokeniza de forma independiente (en paralelo para
+archivos grandes) a registros numéricos sin estado; el estado que cruza
+los límites entre bloques (modo absoluto/relativo, G92, avance, posición)
+se resuelve después sobre todos los registros concatenados con operaciones
+vectorizadas de NumPy.
+
+Los arcos G2/G3 (centro por I/J o radio R) miden su longitud real y
+enlazan con sus vecinos por la tangente. G28 lleva los ejes indicados (o
+X, Y y Z) a cero y G92 sin ejes pone todos a cero. Cualquier otro comando
+G que mueva o espere y no se simule (G5, G29, G20...) marca el reporte
+como no exacto.
+
+La cinemática usa un perfil trapezoidal con la aceleración activa (M204)
+y velocidades de unión entre movimientos según el ángulo entre ellos.
+"""
+import math
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Códigos de registro
+OP_MOVE = 0
+OP_SET_POSITION = 1   # G92
+OP_ABSOLUTE = 2       # G90
+OP_RELATIVE = 3       # G91
+OP_E_ABSOLUTE = 4     # M82
+OP_E_RELATIVE = 5     # M83
+OP_DWELL = 6          # G4
+OP_ACCELERATION = 7   # M204
+OP_ARC_CW = 8         # G2
+OP_ARC_CCW = 9        # G3
+OP_HOME = 10          # G28
+OP_UNSUPPORTED = 11   # Otros comandos G
+
+# Comandos G sin efecto en el tiempo ni en la posición
+_NEUTRAL_G = {b"G17", b"G21", b"G90", b"G91", b"G94"}
+
+# Columnas de valores por registro
+X, Y, Z, E, F, P, I, J, R = range(9)
+COLUMNS = 9
+_AXES = {ord("X"): X, ord("Y"): Y, ord("Z"): Z, ord("E"): E, ord("F"): F}
+_ARC_AXES = {**_AXES, ord("I"): I, ord("J"): J, ord("R"): R}
+
+DEFAULT_ACCELERATION = 1500.0   # mm/s²
+DEFAULT_FEEDRATE = 1500.0       # mm/min
+DEFAULT_FILAMENT_DIAMETER = 1.75
+PARALLEL_THRESHOLD_BYTES = 32 * 1024 * 1024
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+# Densidad en g/cm³
+MATERIAL_DENSITIES = {
+    "PLA": 1.24,
+    "PETG": 1.27,
+    "ABS": 1.04,
+    "ASA": 1.07,
+    "TPU": 1.21,
+    "NYLON": 1.14,
+    "PC": 1.20,
+}
+
+
+class GcodeAnalysisError(Exception):
+    """Excepción para archivos G-code que no se pueden analizar"""
+    pass
+
+
+@dataclass
+class GcodeReport:
+    """Resultado del análisis de un archivo G-code."""
+    print_time_minutes: float
+    filament_length_mm: float
+    filament_weight_g: float
+    layer_count: int
+    move_count: int
+    max_z_mm: float
+    extrusion_per_layer_mm: List[float] = field(default_factory=list)
+    # False si el archivo tiene comandos G que no se simulan
+    exact: bool = True
+
+
+def _chunk_ranges(mm: mmap.mmap, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """Divide el archivo en rangos que terminan en salto de línea."""
+    size = len(mm)
+    ranges = []
+    start = 0
+    while start < size:
+        end = min(start + chunk_bytes, size)
+        if end < size:
+            newline = mm.find(b"\n", end)
+            end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def parse_block(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte un bloque de G-code en registros ``(ops, values)``.
+
+    ``values`` tiene columnas X, Y, Z, E, F, P, I, J, R con NaN donde el
+    parámetro no aparece. No depende de ningún estado previo, por lo que los bloques se
+    pueden procesar en cualquier orden.
+    """
+    ops = []
+    rows = []
+    nan = math.nan
+    for raw in data.split(b"\n"):
+        line = raw.split(b";", 1)[0].strip()
+        if not line:
+            continue
+        words = line.upper().split()
+        cmd = words[0]
+        if cmd in (b"G0", b"G1", b"G00", b"G01"):
+            op = OP_MOVE
+        elif cmd in (b"G2", b"G02"):
+            op = OP_ARC_CW
+        elif cmd in (b"G3", b"G03"):
+            op = OP_ARC_CCW
+        elif cmd == b"G28":
+            op = OP_HOME
+        elif cmd == b"G92":
+            op = OP_SET_POSITION
+        elif cmd == b"G90":
+            op = OP_ABSOLUTE
+        elif cmd == b"G91":
+            op = OP_RELATIVE
+        elif cmd == b"M82":
+            op = OP_E_ABSOLUTE
+        elif cmd == b"M83":
+            op = OP_E_RELATIVE
+        elif cmd in (b"G4", b"G04"):
+            op = OP_DWELL
+        elif cmd == b"M204":
+            op = OP_ACCELERATION
+        elif cmd.startswith(b"G") and cmd not in _NEUTRAL_G:
+            op = OP_UNSUPPORTED
+        else:
+            continue
+
+        row = [nan] * COLUMNS
+        for word in words[1:]:
+            letter = word[0]
+            if op == OP_HOME:
+                # G28 X Y: los ejes nombrados, con o sin valor, vuelven a cero
+                column = _AXES.get(letter)
+                if column is not None and column != F:
+                    row[column] = 0.0
+                continue
+            try:
+                value = float(word[1:])
+            except ValueError:
+                continue
+            if op == OP_DWELL:
+                if letter == ord("P"):
+                    row[P] = value / 1000.0
+                elif letter == ord("S"):
+                    row[P] = value
+            elif op == OP_ACCELERATION:
+                # M204 S<print> o P<print>; T es para desplazamientos y se ignora
+                if letter in (ord("S"), ord("P")):
+                    row[P] = value
+            else:
+                column = (_ARC_AXES if op in (OP_ARC_CW, OP_ARC_CCW) else _AXES).get(letter)
+                if column is not None:
+                    row[column] = value
+        if op == OP_HOME and all(math.isnan(row[axis]) for axis in (X, Y, Z)):
+            row[X] = row[Y] = row[Z] = 0.0
+        elif op == OP_SET_POSITION and all(math.isnan(row[axis]) for axis in (X, Y, Z, E)):
+            row[X] = row[Y] = row[Z] = row[E] = 0.0
+        ops.append(op)
+        rows.append(row)
+
+    if not ops:
+        return np.empty(0, dtype=np.int8), np.empty((0, COLUMNS))
+    return np.asarray(ops, dtype=np.int8), np.asarray(rows, dtype=np.float64)
+
+
+def _parse_range(path: str, start: int, end: int) -> Tuple[np.ndarray, np.ndarray]:
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return parse_block(mm[start:end])
+
+
+def _forward_fill(mask: np.ndarray) -> np.ndarray:
+    """Índice del último elemento con ``mask`` verdadero (o -1)."""
+    idx = np.where(mask, np.arange(len(mask)), -1)
+    return np.maximum.accumulate(idx)
+
+
+def _resolve_axis(values: np.ndarray, has_value: np.ndarray, relative: np.ndarray, anchors: np.ndarray) -> np.ndarray:
+    """
+    Posición lógica de un eje tras cada registro.
+
+    ``anchors`` marca registros que fijan el valor (movimientos absolutos y
+    G92); los movimientos relativos suman incrementos desde el último ancla.
+    """
+    increments = np.where(has_value & relative & ~anchors, values, 0.0)
+    cumulative = np.cumsum(increments)
+    last_anchor = _forward_fill(anchors & has_value)
+    anchored = last_anchor >= 0
+    safe = np.where(anchored, last_anchor, 0)
+    base = np.where(anchored, values[safe] - cumulative[safe], 0.0)
+    return base + cumulative
+
+
+def _resolve_modes(ops: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Modo relativo de XYZ y de E vigente en cada registro."""
+    xyz_switch = (ops == OP_ABSOLUTE) | (ops == OP_RELATIVE)
+    last = _forward_fill(xyz_switch)
+    xyz_relative = np.where(last >= 0, ops[np.maximum(last, 0)] == OP_RELATIVE, False)
+
+    e_switch = xyz_switch | (ops == OP_E_ABSOLUTE) | (ops == OP_E_RELATIVE)
+    last = _forward_fill(e_switch)
+    last_op = ops[np.maximum(last, 0)]
+    e_relative = np.where(last >= 0, (last_op == OP_RELATIVE) | (last_op == OP_E_RELATIVE), False)
+    return xyz_relative, e_relative
+
+
+def _trapezoid_time(distance, v_max, v_in, v_out, accel) -> np.ndarray:
+    """Tiempo de un perfil trapezoidal (o triangular) por movimiento."""
+    v_in = np.minimum(v_in, v_max)
+    v_out = np.minimum(v_out, v_max)
+    d_acc = (v_max ** 2 - v_in ** 2) / (2 * accel)
+    d_dec = (v_max ** 2 - v_out ** 2) / (2 * accel)
+    cruise = distance - d_acc - d_dec
+
+    v_peak = np.sqrt(np.maximum((2 * accel * distance + v_in ** 2 + v_out ** 2) / 2, 0.0))
+    v_peak = np.clip(v_peak, np.maximum(v_in, v_out), v_max)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_trapezoid = (v_max - v_in) / accel + (v_max - v_out) / accel + cruise / v_max
+        t_triangle = (v_peak - v_in) / accel + (v_peak - v_out) / accel
+        # Sin margen para acelerar: cota inferior a velocidad media
+        t_triangle = np.maximum(t_triangle, distance / np.maximum(v_peak, 1e-9))
+    return np.where(cruise >= 0, t_trapezoid, t_triangle)
+
+
+def _arc_geometry(
+    start: np.ndarray, end: np.ndarray, offsets: np.ndarray, radius: np.ndarray, clockwise: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Longitud en XY y tangentes unitarias de entrada y salida de cada arco.
+
+    El centro es ``start + offsets`` (I, J) o, si el arco da ``radius``, el
+    del lado que indica su signo como en Marlin. Un arco con I/J que
+    termina donde empieza es una vuelta completa.
+    """
+    chord = end - start
+    d = np.linalg.norm(chord, axis=1)
+    use_radius = ~np.isnan(radius) & np.isnan(offsets).all(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = np.sqrt(np.maximum(np.nan_to_num(radius) ** 2 - (d / 2) ** 2, 0.0))
+        side = np.where(clockwise ^ (np.nan_to_num(radius) < 0), -1.0, 1.0)
+        normal = np.stack([-chord[:, 1], chord[:, 0]], axis=1) / d[:, None]
+    from_radius = (start + end) / 2 + np.nan_to_num(side * h)[:, None] * np.nan_to_num(normal)
+    center = np.where(use_radius[:, None], from_radius, start + np.nan_to_num(offsets))
+
+    r0 = start - center
+    r1 = end - center
+    a0 = np.arctan2(r0[:, 1], r0[:, 0])
+    a1 = np.arctan2(r1[:, 1], r1[:, 0])
+    sweep = np.mod(np.where(clockwise, a0 - a1, a1 - a0), 2 * math.pi)
+    sweep = np.where((sweep < 1e-9) & ~use_radius & (d < 1e-9), 2 * math.pi, sweep)
+    length = np.linalg.norm(r0, axis=1) * sweep
+
+    # Tangente: el radio girado 90° en el sentido del arco
+    turn = np.where(clockwise, -1.0, 1.0)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        entry = turn * np.stack([-r0[:, 1], r0[:, 0]], axis=1) / np.linalg.norm(r0, axis=1)[:, None]
+        exit_ = turn * np.stack([-r1[:, 1], r1[:, 0]], axis=1) / np.linalg.norm(r1, axis=1)[:, None]
+    return length, np.nan_to_num(entry), np.nan_to_num(exit_)
+
+
+def simulate(
+    ops: np.ndarray,
+    values: np.ndarray,
+    filament_diameter_mm: float = DEFAULT_FILAMENT_DIAMETER,
+    density_g_cm3: float = MATERIAL_DENSITIES["PLA"],
+    default_acceleration: float = DEFAULT_ACCELERATION,
+) -> GcodeReport:
+    """Resuelve el estado y calcula tiempo, filamento y capas."""
+    if len(ops) == 0:
+        raise GcodeAnalysisError("El archivo no contiene comandos de movimiento")
+
+    has = ~np.isnan(values)
+    is_arc = (ops == OP_ARC_CW) | (ops == OP_ARC_CCW)
+    is_home = ops == OP_HOME
+    is_move = (ops == OP_MOVE) | is_arc | is_home
+    is_set = ops == OP_SET_POSITION
+    xyz_relative, e_relative = _resolve_modes(ops)
+
+    positions = np.empty((len(ops), 4))
+    for axis, relative in ((X, xyz_relative), (Y, xyz_relative), (Z, xyz_relative), (E, e_relative)):
+        # G28 lleva a cero también en modo relativo
+        moves_absolute = is_move & (~relative | is_home)
+        anchors = moves_absolute | is_set
+        positions[:, axis] = _resolve_axis(
+            np.nan_to_num(values[:, axis]), has[:, axis], relative & is_move, anchors
+        )
+
+    # G92 cambia el sistema de coordenadas sin mover el cabezal
+    starts = np.concatenate([np.zeros((1, 4)), positions[:-1]])
+    deltas = positions - starts
+    deltas[~is_move] = 0.0
+
+    feed = values[:, F]
+    last_feed = _forward_fill(is_move & has[:, F])
+    feedrate = np.where(last_feed >= 0, feed[np.maximum(last_feed, 0)], DEFAULT_FEEDRATE)
+
+    accel_rows = (ops == OP_ACCELERATION) & has[:, P]
+    last_accel = _forward_fill(accel_rows)
+    acceleration = np.where(last_accel >= 0, values[np.maximum(last_accel, 0), P], default_acceleration)
+
+    dwell_seconds = np.nansum(np.where(ops == OP_DWELL, values[:, P], 0.0))
+
+    move_idx = np.flatnonzero(is_move)
+    d = deltas[move_idx]
+    # Trayecto en XY y direcciones de entrada y salida: la cuerda en las
+    # rectas, la tangente en los arcos
+    xy_length = np.linalg.norm(d[:, :2], axis=1)
+    entry_xy = np.where(xy_length[:, None] > 0, d[:, :2] / np.maximum(xy_length, 1e-12)[:, None], 0.0)
+    exit_xy = entry_xy.copy()
+    arcs = np.flatnonzero(is_arc[move_idx])
+    if len(arcs):
+        rows = move_idx[arcs]
+        arc_length, arc_entry, arc_exit = _arc_geometry(
+            starts[rows, :2], positions[rows, :2], values[rows][:, [I, J]], values[rows, R], ops[rows] == OP_ARC_CW
+        )
+        xy_length[arcs], entry_xy[arcs], exit_xy[arcs] = arc_length, arc_entry, arc_exit
+    xyz_length = np.hypot(xy_length, d[:, 2])
+    e_delta = d[:, 3]
+    length = np.where(xyz_length > 0, xyz_length, np.abs(e_delta))
+    active = length > 0
+
+    d, xy_length, xyz_length, e_delta, length = d[active], xy_length[active], xyz_length[active], e_delta[active], length[active]
+    v_max = np.maximum(feedrate[move_idx][active] / 60.0, 1e-3)
+    accel = np.maximum(acceleration[move_idx][active], 1e-3)
+
+    # Velocidad de unión: plena en movimientos colineales, cero en reversas
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scale = np.where(xyz_length > 0, 1.0 / xyz_length, 0.0)[:, None]
+    dz = d[:, 2:3]
+    entry = np.hstack([entry_xy[active] * xy_length[:, None], dz]) * scale
+    exit_ = np.hstack([exit_xy[active] * xy_length[:, None], dz]) * scale
+    cos_theta = np.einsum("ij,ij->i", exit_[:-1], entry[1:])
+    junction = np.minimum(v_max[:-1], v_max[1:]) * np.clip((1 + cos_theta) / 2, 0.0, 1.0)
+    v_in = np.concatenate([[0.0], junction])
+    v_out = np.concatenate([junction, [0.0]])
+
+    seconds = float(np.sum(_trapezoid_time(length, v_max, v_in, v_out, accel))) + float(dwell_seconds)
+
+    filament_mm = max(float(np.sum(e_delta)), 0.0)
+    area_mm2 = math.pi * (filament_diameter_mm / 2) ** 2
+    weight_g = filament_mm * area_mm2 / 1000.0 * density_g_cm3
+
+    z = positions[move_idx[active], Z]
+    printing = (e_delta > 0) & (xy_length > 0)
+    if printing.any():
+        layer_z, layer_idx = np.unique(np.round(z[printing], 4), return_inverse=True)
+        per_layer = np.bincount(layer_idx, weights=e_delta[printing])
+    else:
+        layer_z, per_layer = np.empty(0), np.empty(0)
+
+    return GcodeReport(
+        print_time_minutes=seconds / 60.0,
+        filament_length_mm=filament_mm,
+        filament_weight_g=weight_g,
+        layer_count=int(len(layer_z)),
+        move_count=int(active.sum()),
+        max_z_mm=float(z.max()) if len(z) else 0.0,
+        extrusion_per_layer_mm=[float(v) for v in per_layer],
+        exact=not bool((ops == OP_UNSUPPORTED).any()),
+    )
+
+
+def analyze_gcode(
+    path: str,
+    material: Optional[str] = None,
+    filament_diameter_mm: float = DEFAULT_FILAMENT_DIAMETER,
+    workers: Optional[int] = None,
+    chunk_bytes: int = DEFAULT_CHUNK_BYTES,
+) -> GcodeReport:
+    """
+    Analiza un archivo G-code. Archivos mayores a ``PARALLEL_THRESHOLD_BYTES``
+    (o cuando se indica ``workers``) se tokenizan en paralelo por bloques.
+    """
+    density = MATERIAL_DENSITIES.get((material or "PLA").strip().upper(), MATERIAL_DENSITIES["PLA"])
+    try:
+        size = os.path.getsize(path)
+    except OSError as e:
+        raise GcodeAnalysisError(f"No se pudo abrir el G-code {path}: {e}")
+    if size == 0:
+        raise GcodeAnalysisError(f"Archivo G-code vacío: {path}")
+
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ranges = _chunk_ranges(mm, chunk_bytes)
+        if (workers is None and size < PARALLEL_THRESHOLD_BYTES) or len(ranges) == 1:
+            parsed = [parse_block(mm[start:end]) for start, end in ranges]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parsed = list(pool.map(
+                    _parse_range, [path] * len(ranges), *zip(*ranges)
+                ))
+
+    ops = np.concatenate([p[0] for p in parsed])
+    values = np.concatenate([p[1] for p in parsed])
+    return simulate(ops, values, filament_diameter_mm=filament_diameter_mm, density_g_cm3=density)
+
+
+def is_gcode_path(path: str) -> bool:
+    """Indica si la ruta apunta a un archivo G-code local."""
+    return path.lower().endswith((".gcode", ".gco", ".g")) and os.path.isfile(path)
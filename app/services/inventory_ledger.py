@@ -0,0 +1,279 @@
+# app/services/inventory_ledger.py
+"""
+Libro de movimientos de inventario con acumulados diarios.
+
+``inventory_transactions`` solo recibe inserciones. En PostgreSQL está
+particionada por mes de ``created_at``: las consultas por rango de fechas
+solo leen las particiones del rango y los meses antiguos se pueden archivar
+o eliminar sin ``DELETE`` masivos. ``ensure_monthly_partitions`` crea por
+adelantado las particiones de los próximos meses.
+
+Cada movimiento actualiza en la misma transacción la fila de su día en
+``material_stock_daily`` (entradas, salidas y existencia al cierre), de
+modo que el historial de existencias y la rotación se leen de los
+acumulados sin recorrer el libro. Un movimiento con fecha pasada ajusta
+también el cierre de los días posteriores. Los movimientos de un material
+se serializan bloqueando su fila en ``materials``: dos inserciones
+concurrentes calcularían la apertura de un día nuevo sin ver la otra.
+
+``record_transaction`` rechaza tipos desconocidos; al leer el libro
+(``rebuild_rollups`` y la migración 010) un tipo desconocido no mueve la
+existencia, con la misma regla en los dos lados (``ledger_delta``).
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db.models import InventoryTransaction, Material, MaterialStockDaily
+from app.db.pagination import stream
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Signo del movimiento sobre la existencia; los ajustes llevan su propio signo
+STOCK_SIGN = {"purchase": 1, "return": 1, "adjustment": 1, "usage": -1, "waste": -1}
+PARTITION_MONTHS_AHEAD = 3
+
+
+def _utc_day(moment: datetime) -> date:
+    if moment.tzinfo is None:
+        return moment.date()
+    return moment.astimezone(timezone.utc).date()
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ledger_delta(transaction_type: str, quantity: float) -> float:
+    """Variación de existencia de un movimiento ya registrado; 0 si el tipo es desconocido."""
+    return STOCK_SIGN.get(transaction_type, 0) * quantity
+
+
+def stock_delta(transaction_type: str, quantity: float) -> float:
+    """Variación de existencia de un movimiento nuevo, validado."""
+    if transaction_type not in STOCK_SIGN:
+        raise ValueError(f"Tipo de movimiento desconocido: {transaction_type}")
+    if transaction_type != "adjustment" and quantity < 0:
+        raise ValueError("La cantidad debe ser positiva salvo en ajustes")
+    return ledger_delta(transaction_type, quantity)
+
+
+def _rollup_upsert(dialect_name: str, material_id: int, day: date, delta: float):
+    """
+    Suma el movimiento a la fila del día. Una fila nueva parte del cierre
+    del último día anterior con movimientos.
+    """
+    if dialect_name not in _INSERTS:
+        raise ValueError(f"Upsert no soportado para el dialecto {dialect_name}")
+    previous = (
+        select(MaterialStockDaily.closing_stock)
+        .where(MaterialStockDaily.material_id == material_id, MaterialStockDaily.day < day)
+        .order_by(MaterialStockDaily.day.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    stmt = _INSERTS[dialect_name](MaterialStockDaily).values(
+        material_id=material_id,
+        day=day,
+        quantity_in=max(delta, 0.0),
+        quantity_out=max(-delta, 0.0),
+        transaction_count=1,
+        closing_stock=func.coalesce(previous, 0.0) + delta,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[MaterialStockDaily.material_id, MaterialStockDaily.day],
+        set_={
+            "quantity_in": MaterialStockDaily.quantity_in + stmt.excluded.quantity_in,
+            "quantity_out": MaterialStockDaily.quantity_out + stmt.excluded.quantity_out,
+            "transaction_count": MaterialStockDaily.transaction_count + 1,
+            "closing_stock": MaterialStockDaily.closing_stock + delta,
+        },
+    )
+
+
+def record_transaction(
+    db: Session,
+    material_id: int,
+    transaction_type: str,
+    quantity: float,
+    created_at: Optional[datetime] = None,
+    unit_cost: Optional[float] = None,
+    reference: Optional[str] = None,
+    notes: Optional[str] = None,
+    commit: bool = True,
+) -> InventoryTransaction:
+    """Inserta un movimiento y actualiza los acumulados diarios."""
+    delta = stock_delta(transaction_type, quantity)
+    created_at = created_at or datetime.now(timezone.utc)
+    day = _utc_day(created_at)
+
+    transaction = InventoryTransaction(
+        material_id=material_id,
+        transaction_type=transaction_type,
+        quantity=quantity,
+        unit_cost=unit_cost,
+        reference=reference,
+        notes=notes,
+        created_at=created_at,
+    )
+    # Un movimiento a la vez por material hasta el commit: la apertura de un
+    # día nuevo lee el cierre confirmado de los movimientos anteriores
+    db.execute(select(Material.id).where(Material.id == material_id).with_for_update())
+    db.add(transaction)
+    db.flush()
+
+    db.execute(_rollup_upsert(db.get_bind().dialect.name, material_id, day, delta))
+    # Movimiento con fecha pasada: el cierre de los días siguientes cambia
+    db.execute(
+        update(MaterialStockDaily)
+        .where(MaterialStockDaily.material_id == material_id, MaterialStockDaily.day > day)
+        .values(closing_stock=MaterialStockDaily.closing_stock + delta)
+    )
+    if commit:
+        db.commit()
+    return transaction
+
+
+def rebuild_rollups(db: Session, material_id: Optional[int] = None) -> int:
+    """
+    Recalcula los acumulados desde el libro (todos los materiales o uno).
+    Devuelve el número de filas diarias escritas.
+    """
+    ledger = select(
+        InventoryTransaction.material_id,
+        InventoryTransaction.created_at,
+        InventoryTransaction.transaction_type,
+        InventoryTransaction.quantity,
+    ).where(InventoryTransaction.material_id.isnot(None))
+    reset = delete(MaterialStockDaily)
+    if material_id is not None:
+        ledger = ledger.where(InventoryTransaction.material_id == material_id)
+        reset = reset.where(MaterialStockDaily.material_id == material_id)
+
+    days: Dict[Tuple[int, date], List[float]] = defaultdict(lambda: [0.0, 0.0, 0])
+    for row in stream(db, ledger.order_by(InventoryTransaction.material_id, InventoryTransaction.created_at)):
+        delta = ledger_delta(row.transaction_type, row.quantity)
+        totals = days[(row.material_id, _utc_day(row.created_at))]
+        totals[0] += max(delta, 0.0)
+        totals[1] += max(-delta, 0.0)
+        totals[2] += 1
+
+    rows, closing, current = [], 0.0, None
+    for (mid, day), (quantity_in, quantity_out, count) in sorted(days.items()):
+        if mid != current:
+            closing, current = 0.0, mid
+        closing += quantity_in - quantity_out
+        rows.append({
+            "material_id": mid,
+            "day": day,
+            "quantity_in": quantity_in,
+            "quantity_out": quantity_out,
+            "transaction_count": count,
+            "closing_stock": closing,
+        })
+
+    db.execute(reset)
+    if rows:
+        db.execute(insert(MaterialStockDaily), rows)
+    db.commit()
+    return len(rows)
+
+
+def ensure_monthly_partitions(conn: Connection, months_ahead: int = PARTITION_MONTHS_AHEAD) -> List[str]:
+    """
+    Crea las particiones mensuales del libro hasta ``months_ahead`` meses
+    después del actual. Sin efecto fuera de PostgreSQL.
+    """
+    if conn.dialect.name != "postgresql":
+        return []
+    month = datetime.now(timezone.utc).date().replace(day=1)
+    created = []
+    for _ in range(months_ahead + 1):
+        upper = _add_months(month, 1)
+        name = f"inventory_transactions_y{month:%Y}m{month:%m}"
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF inventory_transactions "
+            f"FOR VALUES FROM ('{month}') TO ('{upper}')"
+        )
+        created.append(name)
+        month = upper
+    return created
+
+
+def _daily_stock(
+    db: Session, start: date, end: date, material_ids: Optional[Iterable[int]] = None
+) -> Dict[int, List[float]]:
+    """Existencia al cierre de cada día de ``[start, end]`` por material."""
+    ids = list(material_ids) if material_ids is not None else None
+    latest = select(
+        MaterialStockDaily.material_id, func.max(MaterialStockDaily.day).label("day")
+    ).where(MaterialStockDaily.day < start)
+    in_range = select(
+        MaterialStockDaily.material_id, MaterialStockDaily.day, MaterialStockDaily.closing_stock
+    ).where(MaterialStockDaily.day.between(start, end))
+    if ids is not None:
+        latest = latest.where(MaterialStockDaily.material_id.in_(ids))
+        in_range = in_range.where(MaterialStockDaily.material_id.in_(ids))
+    latest = latest.group_by(MaterialStockDaily.material_id).subquery()
+
+    opening = dict(db.execute(
+        select(MaterialStockDaily.material_id, MaterialStockDaily.closing_stock).join(
+            latest,
+            and_(MaterialStockDaily.material_id == latest.c.material_id, MaterialStockDaily.day == latest.c.day),
+        )
+    ).all())
+    closings: Dict[int, Dict[date, float]] = defaultdict(dict)
+    for mid, day, closing in db.execute(in_range).all():
+        closings[mid][day] = closing
+
+    span = (end - start).days + 1
+    series = {}
+    for mid in (ids if ids is not None else set(opening) | set(closings)):
+        stock, values = opening.get(mid, 0.0), []
+        for offset in range(span):
+            # Un día sin movimientos conserva el cierre anterior
+            stock = closings[mid].get(start + timedelta(days=offset), stock)
+            values.append(stock)
+        series[mid] = values
+    return series
+
+
+def stock_history(db: Session, material_id: int, start: date, end: date) -> List[Tuple[date, float]]:
+    """Existencia al cierre de cada día entre ``start`` y ``end``."""
+    values = _daily_stock(db, start, end, [material_id])[material_id]
+    return [(start + timedelta(days=offset), stock) for offset, stock in enumerate(values)]
+
+
+def inventory_turnover(
+    db: Session, start: date, end: date, material_id: Optional[int] = None
+) -> Optional[float]:
+    """
+    Rotación del periodo: salidas totales / existencia media diaria (de un
+    material o de todo el inventario). ``None`` si la existencia media es 0.
+    """
+    total_out, average = turnover_totals(db, start, end, material_id)
+    if average <= 0:
+        return None
+    return total_out / average
+
+
+def turnover_totals(
+    db: Session, start: date, end: date, material_id: Optional[int] = None
+) -> Tuple[float, float]:
+    """Salidas totales y existencia media diaria del periodo; se suman entre shards."""
+    outflow = select(func.coalesce(func.sum(MaterialStockDaily.quantity_out), 0.0)).where(
+        MaterialStockDaily.day.between(start, end)
+    )
+    if material_id is not None:
+        outflow = outflow.where(MaterialStockDaily.material_id == material_id)
+    total_out = db.execute(outflow).scalar()
+
+    series = _daily_stock(db, start, end, None if material_id is None else [material_id])
+    span = (end - start).days + 1
+    average = sum(sum(values) for values in series.values()) / span
+    return float(total_out), average
@@ -0,0 +1,266 @@
+# app/services/mesh_bvh.py
+"""
+Jerarquía de volúmenes envolventes (BVH) sobre arreglos de triángulos.
+
+Construcción tipo LBVH: los triángulos se ordenan por el código Morton de
+su centroide, se agrupan en hojas contiguas de ``leaf_size`` y las cajas
+de los niveles superiores se obtienen fusionando pares de hijos. El árbol
+es binario completo y se guarda en forma de montículo (hijos de ``k`` en
+``2k + 1`` y ``2k + 2``), sin punteros.
+
+Las consultas se resuelven por lotes con un frente de pares
+``(rayo, nodo)``: los nodos de cada rayo se visitan de cerca a lejos y se
+descartan los que empiezan después del mejor impacto encontrado. La
+intersección final usa Möller–Trumbore vectorizado. Los segmentos
+(``max_t`` finito) podan el frente desde la raíz, por lo que son más
+baratos que los rayos infinitos.
+
+Rendimiento: el recorrido en NumPy resuelve del orden de 10^5 rayos/s
+(≈60k segmentos/s y ≈100k rayos/s sobre un toro de 1M caras en un núcleo),
+no los millones por segundo de un núcleo compilado. El reporte de espesor
+de una malla de 1M caras tarda decenas de segundos, por lo que
+``analyze_wall_thickness_task`` corre en el carril ``ai_bulk``.
+"""
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+DEFAULT_LEAF_SIZE = 4
+DESCEND_LEVELS = 6
+RAY_CHUNK = 1 << 16
+MORTON_BITS = 10
+
+
+def _spread_bits(x: np.ndarray) -> np.ndarray:
+    """Intercala dos ceros entre los 10 bits bajos de ``x``."""
+    x = x.astype(np.uint64) & np.uint64(0x3FF)
+    x = (x | (x << np.uint64(16))) & np.uint64(0x030000FF)
+    x = (x | (x << np.uint64(8))) & np.uint64(0x0300F00F)
+    x = (x | (x << np.uint64(4))) & np.uint64(0x030C30C3)
+    x = (x | (x << np.uint64(2))) & np.uint64(0x09249249)
+    return x
+
+
+def morton_codes(points: np.ndarray) -> np.ndarray:
+    """Códigos Morton de 30 bits de puntos ``(n, 3)`` dentro de su caja."""
+    lo = points.min(axis=0)
+    extent = np.maximum(points.max(axis=0) - lo, 1e-12)
+    scale = (1 << MORTON_BITS) - 1
+    q = np.clip(((points - lo) / extent * scale).astype(np.int64), 0, scale)
+    return (_spread_bits(q[:, 0]) << np.uint64(2)) | (_spread_bits(q[:, 1]) << np.uint64(1)) | _spread_bits(q[:, 2])
+
+
+@dataclass
+class _RayBatch:
+    """Estado de un lote de rayos durante el recorrido."""
+    origins: np.ndarray
+    directions: np.ndarray
+    origin_axes: List[np.ndarray]
+    inv_axes: List[np.ndarray]
+    min_t: float
+    ignore: Optional[np.ndarray]
+    t_best: np.ndarray
+    face_best: np.ndarray
+
+
+class MeshBVH:
+    """
+    BVH inmutable sobre triángulos ``(n, 3, 3)``.
+
+    ``order`` mapea la posición ordenada al índice original de la cara;
+    todas las consultas devuelven índices originales.
+    """
+    def __init__(self, triangles: np.ndarray, leaf_size: int = DEFAULT_LEAF_SIZE):
+        triangles = np.asarray(triangles, dtype=np.float64)
+        if triangles.ndim != 3 or triangles.shape[1:] != (3, 3) or len(triangles) == 0:
+            raise ValueError("Se esperaban triángulos con forma (n, 3, 3)")
+        self.leaf_size = leaf_size
+        self.order = np.argsort(morton_codes(triangles[:, 0] + triangles[:, 1] + triangles[:, 2]), kind="stable")
+        tri = triangles[self.order]
+        self.n_triangles = len(tri)
+
+        # Datos de Möller–Trumbore precalculados por eje en orden de hoja
+        v0, e1, e2 = tri[:, 0], tri[:, 1] - tri[:, 0], tri[:, 2] - tri[:, 0]
+        self.v0_axes = [np.ascontiguousarray(v0[:, a]) for a in range(3)]
+        self.e1_axes = [np.ascontiguousarray(e1[:, a]) for a in range(3)]
+        self.e2_axes = [np.ascontiguousarray(e2[:, a]) for a in range(3)]
+
+        n_leaves = -(-self.n_triangles // leaf_size)
+        self.depth = max(int(np.ceil(np.log2(n_leaves))), 0)
+        padded = 1 << self.depth
+        self.first_leaf = padded - 1
+
+        # Cajas de hojas; las hojas de relleno quedan vacías (lo > hi)
+        pad = padded * leaf_size - self.n_triangles
+        # (las reducciones sobre ejes cortos se escriben a mano: son mucho
+        # más rápidas que ``min(axis=1)``)
+        tri_lo = np.concatenate([np.minimum(np.minimum(tri[:, 0], tri[:, 1]), tri[:, 2]), np.full((pad, 3), np.inf)])
+        tri_hi = np.concatenate([np.maximum(np.maximum(tri[:, 0], tri[:, 1]), tri[:, 2]), np.full((pad, 3), -np.inf)])
+        tri_lo = tri_lo.reshape(padded, leaf_size, 3)
+        tri_hi = tri_hi.reshape(padded, leaf_size, 3)
+        self.lo = np.empty((2 * padded - 1, 3))
+        self.hi = np.empty((2 * padded - 1, 3))
+        self.lo[self.first_leaf:] = tri_lo[:, 0]
+        self.hi[self.first_leaf:] = tri_hi[:, 0]
+        for k in range(1, leaf_size):
+            np.minimum(self.lo[self.first_leaf:], tri_lo[:, k], out=self.lo[self.first_leaf:])
+            np.maximum(self.hi[self.first_leaf:], tri_hi[:, k], out=self.hi[self.first_leaf:])
+
+        for level in range(self.depth - 1, -1, -1):
+            start, count = (1 << level) - 1, 1 << level
+            first_child = 2 * start + 1
+            left = slice(first_child, first_child + 2 * count, 2)
+            right = slice(first_child + 1, first_child + 2 * count, 2)
+            self.lo[start:start + count] = np.minimum(self.lo[left], self.lo[right])
+            self.hi[start:start + count] = np.maximum(self.hi[left], self.hi[right])
+
+        # Copias por eje para el recorrido; las hojas vacías nunca se intersecan
+        empty = self.lo[:, 0] > self.hi[:, 0]
+        self.lo[empty], self.hi[empty] = np.inf, np.inf
+        self.lo_axes = [np.ascontiguousarray(self.lo[:, a]) for a in range(3)]
+        self.hi_axes = [np.ascontiguousarray(self.hi[:, a]) for a in range(3)]
+
+    def intersect(
+        self,
+        origins: np.ndarray,
+        directions: np.ndarray,
+        max_t: float = np.inf,
+        ignore: Optional[np.ndarray] = None,
+        min_t: float = 0.0,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Primer impacto de cada rayo (o segmento si ``max_t`` es finito).
+
+        ``ignore`` indica por rayo una cara original a descartar (p. ej. la
+        cara de origen). Devuelve ``(t, face)``; sin impacto, ``t = inf`` y
+        ``face = -1``.
+        """
+        origins = np.asarray(origins, dtype=np.float64).reshape(-1, 3)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 3)
+        t_out = np.full(len(origins), np.inf)
+        face_out = np.full(len(origins), -1, dtype=np.int64)
+        if ignore is not None:
+            # Se traduce a posición ordenada para compararla en las hojas
+            rank = np.empty(self.n_triangles, dtype=np.int64)
+            rank[self.order] = np.arange(self.n_triangles)
+            ignore = np.where(np.asarray(ignore) >= 0, rank[np.maximum(ignore, 0)], -1)
+        for start in range(0, len(origins), RAY_CHUNK):
+            chunk = slice(start, start + RAY_CHUNK)
+            t, face = self._intersect_chunk(
+                origins[chunk], directions[chunk], max_t, min_t,
+                None if ignore is None else ignore[chunk],
+            )
+            t_out[chunk] = t
+            face_out[chunk] = np.where(face >= 0, self.order[np.maximum(face, 0)], -1)
+        return t_out, face_out
+
+    def _intersect_chunk(self, origins, directions, max_t, min_t, ignore):
+        with np.errstate(divide="ignore"):
+            inv = 1.0 / directions
+        batch = _RayBatch(
+            origins=origins,
+            directions=directions,
+            origin_axes=[np.ascontiguousarray(origins[:, a]) for a in range(3)],
+            inv_axes=[np.ascontiguousarray(inv[:, a]) for a in range(3)],
+            min_t=min_t,
+            ignore=ignore,
+            t_best=np.full(len(origins), float(max_t)),
+            face_best=np.full(len(origins), -1, dtype=np.int64),
+        )
+        ray = np.arange(len(origins))
+        node = np.zeros(len(origins), dtype=np.int64)
+        hit, t_near = self._slab(ray, node, batch)
+        self._visit(ray[hit], node[hit], t_near[hit], 0, batch)
+        batch.t_best[batch.face_best < 0] = np.inf
+        return batch.t_best, batch.face_best
+
+    def _visit(self, ray, node, t_near, level, batch):
+        """
+        Procesa pares ``(rayo, nodo)`` de un mismo nivel en orden de
+        cercanía: rondas de ancho creciente por rayo, descendiendo
+        ``DESCEND_LEVELS`` niveles por ronda. Los nodos que empiezan después
+        del mejor impacto ya encontrado se descartan sin visitarlos.
+        """
+        if len(ray) == 0:
+            return
+        order = np.lexsort((t_near, ray))
+        ray, node, t_near = ray[order], node[order], t_near[order]
+        group_start = np.r_[0, np.flatnonzero(ray[1:] != ray[:-1]) + 1]
+        rank = np.arange(len(ray)) - np.repeat(group_start, np.diff(np.r_[group_start, len(ray)]))
+        # Reordenado por rango, cada ronda es un tramo contiguo
+        by_rank = np.argsort(rank, kind="stable")
+        ray, node, t_near, rank = ray[by_rank], node[by_rank], t_near[by_rank], rank[by_rank]
+
+        start, width = 0, 1
+        while start <= rank[-1]:
+            lo, hi = np.searchsorted(rank, [start, start + width])
+            take = np.arange(lo, hi)
+            take = take[t_near[take] <= batch.t_best[ray[take]]]
+            start, width = start + width, width * 2
+            if len(take) == 0:
+                continue
+            if level == self.depth:
+                self._test_leaves(ray[take], node[take] - self.first_leaf, batch)
+                continue
+            sub_ray, sub_node = ray[take], node[take]
+            steps = min(DESCEND_LEVELS, self.depth - level)
+            for _ in range(steps):
+                sub_ray = np.repeat(sub_ray, 2)
+                sub_node = np.stack([2 * sub_node + 1, 2 * sub_node + 2], axis=1).ravel()
+                hit, sub_t = self._slab(sub_ray, sub_node, batch)
+                sub_ray, sub_node, sub_t = sub_ray[hit], sub_node[hit], sub_t[hit]
+            if len(sub_ray):
+                self._visit(sub_ray, sub_node, sub_t, level + steps, batch)
+
+    def _test_leaves(self, ray, leaf, batch):
+        """Intersecta los triángulos de las hojas y actualiza el mejor impacto."""
+        ray = np.repeat(ray, self.leaf_size)
+        tri = (leaf[:, None] * self.leaf_size + np.arange(self.leaf_size)).ravel()
+        valid = tri < self.n_triangles
+        if batch.ignore is not None:
+            valid &= tri != batch.ignore[ray]
+        ray, tri = ray[valid], tri[valid]
+
+        t = self._moller_trumbore(batch.origins[ray], batch.directions[ray], tri)
+        ok = (t >= batch.min_t) & (t <= batch.t_best[ray])
+        ray, tri, t = ray[ok], tri[ok], t[ok]
+        if len(ray) == 0:
+            return
+        order = np.lexsort((t, ray))
+        ray, tri, t = ray[order], tri[order], t[order]
+        first = np.r_[True, ray[1:] != ray[:-1]]
+        batch.t_best[ray[first]] = t[first]
+        batch.face_best[ray[first]] = tri[first]
+
+    def _slab(self, ray, node, batch):
+        """Prueba rayo-caja por ejes, acotada por el mejor impacto del rayo."""
+        t_near = np.full(len(ray), batch.min_t)
+        t_far = batch.t_best[ray]
+        with np.errstate(invalid="ignore"):
+            for axis in range(3):
+                o, r = batch.origin_axes[axis][ray], batch.inv_axes[axis][ray]
+                t1 = (self.lo_axes[axis][node] - o) * r
+                t2 = (self.hi_axes[axis][node] - o) * r
+                # 0 * inf produce NaN en rayos paralelos a un eje; fmin/fmax los ignoran
+                t_near = np.fmax(t_near, np.fmin(t1, t2))
+                t_far = np.fmin(t_far, np.fmax(t1, t2))
+        return t_near <= t_far, t_near
+
+    def _moller_trumbore(self, origins, directions, tri):
+        """Möller–Trumbore por ejes; sin impacto devuelve ``inf``."""
+        dx, dy, dz = directions[:, 0], directions[:, 1], directions[:, 2]
+        ax, ay, az = (self.e1_axes[a][tri] for a in range(3))
+        bx, by, bz = (self.e2_axes[a][tri] for a in range(3))
+        sx, sy, sz = (origins[:, a] - self.v0_axes[a][tri] for a in range(3))
+
+        px, py, pz = dy * bz - dz * by, dz * bx - dx * bz, dx * by - dy * bx
+        det = ax * px + ay * py + az * pz
+        parallel = np.abs(det) < 1e-12
+        inv_det = 1.0 / np.where(parallel, 1.0, det)
+        u = (sx * px + sy * py + sz * pz) * inv_det
+        qx, qy, qz = sy * az - sz * ay, sz * ax - sx * az, sx * ay - sy * ax
+        v = (dx * qx + dy * qy + dz * qz) * inv_det
+        t = (bx * qx + by * qy + bz * qz) * inv_det
+        miss = parallel | (u < 0) | (v < 0) | (u + v > 1)
+        return np.where(miss, np.inf, t)
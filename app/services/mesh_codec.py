@@ -0,0 +1,192 @@
+# app/services/mesh_codec.py
+"""
+Formato compacto de archivo para mallas (``.pmq``).
+
+Pasos de codificación, todos vectorizados:
+
+1. Cuantización de posiciones a una grilla de ``precision_mm`` y
+   deduplicación de vértices sobre los enteros resultantes.
+2. Orden de vértices por código Morton, para que vértices cercanos en el
+   espacio queden cercanos en el arreglo; las coordenadas se guardan como
+   diferencias con el vértice anterior.
+3. Cada cara se rota (sin cambiar su orientación) para que empiece por su
+   menor índice y las caras se ordenan; se guarda la diferencia del primer
+   índice con la cara anterior y los otros dos relativos al primero.
+4. Los enteros van en zigzag con el ancho mínimo (1, 2, 4 u 8 bytes),
+   separados por planos de bytes y comprimidos con zlib.
+
+Decodificar es ``frombuffer`` + ``cumsum``. La malla decodificada es la
+original cuantizada: reexportarla a STL y volver a codificarla produce el
+mismo archivo.
+"""
+import logging
+import zlib
+from typing import Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db.models import ModelFile
+from app.services.content_store import ContentStore
+from app.services.mesh_bvh import morton_codes
+from app.services.mesh_io import load_mesh, unique_rows
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PMQ1"
+FORMAT_VERSION = 1
+DEFAULT_PRECISION_MM = 0.001
+ZLIB_LEVEL = 6
+HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("reserved", "<u2"),
+    ("n_vertices", "<u4"),
+    ("n_faces", "<u4"),
+    ("precision", "<f8"),
+    ("origin", "<i8", (3,)),
+    ("vertex_bytes", "<u4"),
+    ("face_bytes", "<u4"),
+])
+
+
+class MeshCodecError(Exception):
+    """Excepción para archivos ``.pmq`` corruptos o de versión desconocida"""
+    pass
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+
+def _unzigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.uint64)
+    return (values >> np.uint64(1)).astype(np.int64) ^ -(values & np.uint64(1)).astype(np.int64)
+
+
+def _pack(values: np.ndarray) -> bytes:
+    """Enteros sin signo -> ancho mínimo, planos de bytes y zlib."""
+    peak = int(values.max()) if values.size else 0
+    width = next(w for w in (1, 2, 4, 8) if peak < 1 << (8 * w))
+    narrow = np.ascontiguousarray(values, dtype=f"<u{width}").ravel()
+    planes = narrow.view(np.uint8).reshape(-1, width).T
+    return bytes([width]) + zlib.compress(planes.tobytes(), ZLIB_LEVEL)
+
+
+def _unpack(blob: bytes, count: int) -> np.ndarray:
+    width = blob[0]
+    if width not in (1, 2, 4, 8):
+        raise MeshCodecError(f"Ancho de entero inválido: {width}")
+    raw = zlib.decompress(blob[1:])
+    if len(raw) != count * width:
+        raise MeshCodecError("Tamaño de bloque inconsistente")
+    planes = np.frombuffer(raw, dtype=np.uint8).reshape(width, count)
+    return np.ascontiguousarray(planes.T).view(f"<u{width}").ravel().astype(np.uint64)
+
+
+def quantize(triangles: np.ndarray, precision_mm: float = DEFAULT_PRECISION_MM) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Malla indexada en la grilla absoluta de paso ``precision_mm``. Devuelve
+    ``(origen en celdas, vértices (m, 3) int64 relativos al origen, caras (n, 3))``.
+    """
+    points = np.asarray(triangles, dtype=np.float64).reshape(-1, 3)
+    grid = np.rint(points / precision_mm).astype(np.int64)
+    origin = grid.min(axis=0)
+    vertices, _, inverse = unique_rows(grid - origin)
+    return origin, vertices, inverse.reshape(-1, 3)
+
+
+def encode_mesh(triangles: np.ndarray, precision_mm: float = DEFAULT_PRECISION_MM) -> bytes:
+    """Codifica triángulos ``(n, 3, 3)`` al formato ``.pmq``."""
+    if precision_mm <= 0:
+        raise ValueError("precision_mm debe ser positiva")
+    origin, vertices, faces = quantize(triangles, precision_mm)
+
+    order = np.argsort(morton_codes(vertices.astype(np.float64)), kind="stable")
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    vertices = vertices[order]
+    faces = rank[faces]
+
+    # Rotación que deja primero el menor índice (conserva la orientación)
+    first = np.argmin(faces, axis=1)[:, None]
+    faces = np.take_along_axis(faces, (first + np.arange(3)) % 3, axis=1)
+    faces = faces[np.lexsort((faces[:, 2], faces[:, 1], faces[:, 0]))]
+
+    vertex_deltas = np.diff(vertices, axis=0, prepend=np.zeros((1, 3), dtype=np.int64))
+    face_deltas = np.stack([
+        np.diff(faces[:, 0], prepend=0),
+        faces[:, 1] - faces[:, 0],
+        faces[:, 2] - faces[:, 0],
+    ], axis=1)
+    vertex_blob = _pack(_zigzag(vertex_deltas))
+    face_blob = _pack(_zigzag(face_deltas))
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = FORMAT_VERSION
+    header["n_vertices"] = len(vertices)
+    header["n_faces"] = len(faces)
+    header["precision"] = precision_mm
+    header["origin"] = origin
+    header["vertex_bytes"] = len(vertex_blob)
+    header["face_bytes"] = len(face_blob)
+    return header.tobytes() + vertex_blob + face_blob
+
+
+def is_encoded_mesh(data: bytes) -> bool:
+    return data[:4] == MAGIC
+
+
+def decode_indexed(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Decodifica a ``(vértices (m, 3) float64, caras (n, 3) int64)``."""
+    if len(data) < HEADER_DTYPE.itemsize or not is_encoded_mesh(data):
+        raise MeshCodecError("No es un archivo PMQ")
+    header = np.frombuffer(data, dtype=HEADER_DTYPE, count=1)[0]
+    if header["version"] != FORMAT_VERSION:
+        raise MeshCodecError(f"Versión PMQ no soportada: {header['version']}")
+    n_vertices, n_faces = int(header["n_vertices"]), int(header["n_faces"])
+    start = HEADER_DTYPE.itemsize
+    middle = start + int(header["vertex_bytes"])
+    end = middle + int(header["face_bytes"])
+    if end != len(data):
+        raise MeshCodecError("Tamaño de archivo PMQ inconsistente")
+    try:
+        vertex_deltas = _unzigzag(_unpack(data[start:middle], n_vertices * 3)).reshape(-1, 3)
+        face_deltas = _unzigzag(_unpack(data[middle:end], n_faces * 3)).reshape(-1, 3)
+    except zlib.error as e:
+        raise MeshCodecError(f"Bloque comprimido corrupto: {e}")
+
+    vertices = (np.cumsum(vertex_deltas, axis=0) + header["origin"]) * float(header["precision"])
+    first = np.cumsum(face_deltas[:, 0])
+    faces = np.stack([first, first + face_deltas[:, 1], first + face_deltas[:, 2]], axis=1)
+    if faces.size and (faces.min() < 0 or faces.max() >= n_vertices):
+        raise MeshCodecError("Índices de cara fuera de rango")
+    return vertices, faces
+
+
+def decode_mesh(data: bytes) -> np.ndarray:
+    """Decodifica a triángulos ``(n, 3, 3)`` float32 listos para STL."""
+    vertices, faces = decode_indexed(data)
+    return vertices[faces].astype(np.float32)
+
+
+def archive_model_file(
+    db: Session,
+    store: ContentStore,
+    model_file: ModelFile,
+    precision_mm: float = DEFAULT_PRECISION_MM,
+) -> ModelFile:
+    """Codifica el STL de ``model_file`` y guarda la copia PMQ en el almacén."""
+    data = encode_mesh(load_mesh(model_file.file_path), precision_mm)
+    model_file.archive_key = store.put(data)
+    model_file.archive_size = len(data)
+    model_file.archive_precision_mm = precision_mm
+    db.commit()
+    if model_file.file_size:
+        logger.info(
+            f"Model file {model_file.id} archived: {model_file.file_size} -> {len(data)} bytes "
+            f"({model_file.file_size / len(data):.1f}x)"
+        )
+    return model_file
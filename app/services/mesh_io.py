@@ -0,0 +1,247 @@
+# app/services/mesh_io.py
+"""
+Lectura y escritura de mallas triangulares como arreglos NumPy.
+
+Las mallas se representan como ``(n, 3, 3)`` float32 (triángulo, vértice,
+coordenada). El STL binario se interpreta con ``np.frombuffer`` sobre un
+dtype estructurado, sin bucles de Python por triángulo.
+
+Las rutas y URLs llegan de las peticiones: ``read_source`` solo lee bajo
+``MODEL_SOURCE_ROOTS`` y el almacén de contenido, descarga solo de
+``MODEL_SOURCE_HOSTS`` (también tras redirecciones) y corta la lectura al
+pasar de ``MODEL_SOURCE_MAX_BYTES``.
+"""
+import os
+import re
+import tempfile
+import urllib.request
+from typing import Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+import numpy as np
+
+STL_HEADER_BYTES = 80
+STL_RECORD_DTYPE = np.dtype([
+    ("normal", "<f4", (3,)),
+    ("vertices", "<f4", (3, 3)),
+    ("attributes", "<u2"),
+])
+_ASCII_VERTEX = re.compile(rb"vertex\s+(\S+)\s+(\S+)\s+(\S+)")
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+class MeshLoadError(Exception):
+    """Excepción para archivos de malla ilegibles o no soportados"""
+    pass
+
+
+def parse_stl(data: bytes) -> np.ndarray:
+    """Convierte el contenido de un STL (binario o ASCII) en triángulos."""
+    if len(data) >= STL_HEADER_BYTES + 4:
+        count = int(np.frombuffer(data, dtype="<u4", count=1, offset=STL_HEADER_BYTES)[0])
+        if STL_HEADER_BYTES + 4 + count * STL_RECORD_DTYPE.itemsize == len(data):
+            records = np.frombuffer(data, dtype=STL_RECORD_DTYPE, count=count, offset=STL_HEADER_BYTES + 4)
+            return np.ascontiguousarray(records["vertices"], dtype=np.float32)
+
+    if data.lstrip()[:5].lower() == b"solid":
+        coords = _ASCII_VERTEX.findall(data)
+        if coords and len(coords) % 3 == 0:
+            flat = np.array(coords, dtype=np.float32)
+            return flat.reshape(-1, 3, 3)
+
+    raise MeshLoadError("Formato STL no reconocido")
+
+
+def _check_url(url: str, hosts: Iterable[str]) -> None:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or (parts.hostname or "").lower() not in hosts:
+        raise MeshLoadError(f"Origen no permitido: {url}")
+
+
+def _check_path(path: str, roots: Iterable[str]) -> str:
+    """Ruta real de ``path`` si está bajo uno de ``roots`` (enlaces resueltos)."""
+    real = os.path.realpath(path)
+    for root in roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath([real, root]) == root:
+            return real
+    raise MeshLoadError(f"Ruta fuera de los directorios permitidos: {path}")
+
+
+def _read_limited(fh, max_bytes: int, source: str) -> bytes:
+    chunks = []
+    total = 0
+    while True:
+        chunk = fh.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return b"".join(chunks)
+        total += len(chunk)
+        if total > max_bytes:
+            raise MeshLoadError(f"{source} supera el máximo de {max_bytes} bytes")
+        chunks.append(chunk)
+
+
+class _AllowedRedirects(urllib.request.HTTPRedirectHandler):
+    """Sigue redirecciones solo hacia hosts permitidos."""
+
+    def __init__(self, hosts: Iterable[str]):
+        self.hosts = hosts
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_url(newurl, self.hosts)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def read_source(
+    path_or_url: str,
+    roots: Optional[Iterable[str]] = None,
+    hosts: Optional[Iterable[str]] = None,
+    max_bytes: Optional[int] = None,
+) -> bytes:
+    """
+    Lee el contenido de una ruta local, ``file://`` o ``http(s)://``. Los
+    límites no indicados salen de la configuración.
+    """
+    if roots is None or hosts is None or max_bytes is None:
+        # Importado aquí: las funciones de mallas no necesitan configuración
+        from app.core.config import settings
+        roots = [*settings.MODEL_SOURCE_ROOTS, settings.CONTENT_STORE_DIR] if roots is None else roots
+        hosts = settings.MODEL_SOURCE_HOSTS if hosts is None else hosts
+        max_bytes = settings.MODEL_SOURCE_MAX_BYTES if max_bytes is None else max_bytes
+    hosts = {host.lower() for host in hosts}
+
+    if path_or_url.startswith(("http://", "https://")):
+        _check_url(path_or_url, hosts)
+        opener = urllib.request.build_opener(_AllowedRedirects(hosts))
+        try:
+            with opener.open(path_or_url, timeout=60) as resp:
+                length = resp.headers.get("Content-Length")
+                if length is not None and length.isdigit() and int(length) > max_bytes:
+                    raise MeshLoadError(f"{path_or_url} supera el máximo de {max_bytes} bytes")
+                return _read_limited(resp, max_bytes, path_or_url)
+        except MeshLoadError:
+            raise
+        except Exception as e:
+            raise MeshLoadError(f"No se pudo descargar {path_or_url}: {e}")
+
+    path = local_path(path_or_url, roots)
+    try:
+        with open(path, "rb") as fh:
+            return _read_limited(fh, max_bytes, path)
+    except OSError as e:
+        raise MeshLoadError(f"No se pudo leer {path}: {e}")
+
+
+def local_path(path_or_url: str, roots: Optional[Iterable[str]] = None) -> str:
+    """Ruta real de una ruta local o ``file://`` bajo los directorios permitidos."""
+    if roots is None:
+        from app.core.config import settings
+        roots = [*settings.MODEL_SOURCE_ROOTS, settings.CONTENT_STORE_DIR]
+    if path_or_url.startswith("file://"):
+        path = path_or_url[len("file://"):]
+    elif "://" in path_or_url:
+        raise MeshLoadError(f"Esquema no soportado: {path_or_url}")
+    else:
+        path = path_or_url
+    return _check_path(path, roots)
+
+
+def load_mesh(path_or_url: str) -> np.ndarray:
+    """
+    Carga una malla STL desde una ruta local, ``file://`` o ``http(s)://``.
+    """
+    triangles = parse_stl(read_source(path_or_url))
+    if len(triangles) == 0:
+        raise MeshLoadError(f"Malla sin triángulos: {path_or_url}")
+    return triangles
+
+
+def stl_bytes(triangles: np.ndarray) -> bytes:
+    """Serializa triángulos a STL binario con normales calculadas."""
+    triangles = np.asarray(triangles, dtype=np.float32)
+    records = np.zeros(len(triangles), dtype=STL_RECORD_DTYPE)
+    records["vertices"] = triangles
+    records["normal"] = face_normals(triangles)
+    header = b"PrintOptimizer".ljust(STL_HEADER_BYTES, b" ")
+    return header + np.uint32(len(triangles)).tobytes() + records.tobytes()
+
+
+def binary_stl_size(count: int) -> int:
+    """Tamaño en bytes de un STL binario de ``count`` triángulos."""
+    return STL_HEADER_BYTES + 4 + count * STL_RECORD_DTYPE.itemsize
+
+
+def write_stl(path: str, triangles: np.ndarray) -> int:
+    """Escribe un STL binario de forma atómica y devuelve su tamaño."""
+    data = stl_bytes(triangles)
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+    return len(data)
+
+
+def face_normals(triangles: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """Normales por cara; sin normalizar su norma es el doble del área."""
+    triangles = np.asarray(triangles, dtype=np.float64)
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    if not normalize:
+        return normals
+    norms = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, norms, out=np.zeros_like(normals), where=norms > 0)
+
+
+def face_areas(triangles: np.ndarray) -> np.ndarray:
+    """Área de cada triángulo."""
+    return 0.5 * np.linalg.norm(face_normals(triangles, normalize=False), axis=1)
+
+
+def unique_rows(rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Equivalente a ``np.unique(rows, axis=0, return_index=True,
+    return_inverse=True)`` con ``lexsort`` por columnas, mucho más rápido
+    en arreglos grandes. Devuelve ``(únicas, primer índice, inverso)``.
+    """
+    order = np.lexsort(rows.T[::-1])
+    ordered = rows[order]
+    new = np.ones(len(rows), dtype=bool)
+    new[1:] = np.any(ordered[1:] != ordered[:-1], axis=1)
+    group = np.cumsum(new) - 1
+    inverse = np.empty(len(rows), dtype=np.int64)
+    inverse[order] = group
+    return ordered[new], order[new], inverse
+
+
+def index_vertices(triangles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Deduplica vértices idénticos. Devuelve ``(vertices (m, 3), faces (n, 3))``.
+    """
+    flat = np.asarray(triangles).reshape(-1, 3)
+    vertices, _, inverse = unique_rows(flat)
+    return vertices, inverse.reshape(-1, 3)
+
+
+def connected_components(n_nodes: int, edges: np.ndarray) -> np.ndarray:
+    """
+    Etiqueta de componente por nodo mediante enganche por mínimo y salto
+    de punteros; converge en pocas iteraciones vectorizadas.
+    """
+    labels = np.arange(n_nodes)
+    if len(edges) == 0:
+        return labels
+    u, v = edges[:, 0], edges[:, 1]
+    while True:
+        lu, lv = labels[u], labels[v]
+        if np.array_equal(lu, lv):
+            break
+        low = np.minimum(lu, lv)
+        np.minimum.at(labels, lu, low)
+        np.minimum.at(labels, lv, low)
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+    return labels
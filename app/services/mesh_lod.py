@@ -0,0 +1,195 @@
+# app/services/mesh_lod.py
+"""
+Niveles de detalle (LOD) para vistas previas y visores web.
+
+La simplificación usa agrupamiento de vértices en una grilla regular: los
+vértices de cada celda se reemplazan por su promedio y se descartan los
+triángulos degenerados o duplicados. Todo el proceso es vectorizado y el
+tamaño de celda se ajusta iterativamente hasta entrar en el presupuesto
+de triángulos de cada nivel; un nivel que no entra se omite.
+
+El nivel 0 es la malla original: su fila referencia el archivo de origen
+(``source_url``) en lugar de guardar una copia. Los niveles siguientes
+usan ``LOD_TRIANGLE_BUDGETS`` y se guardan en el almacén de contenido.
+Todos se registran en ``model_lods``; al regenerarlos se borran los
+blobs anteriores que ya no referencia ninguna fila.
+"""
+import logging
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db.models import ModelFile, ModelLod
+from app.db.queries import LODS_FOR_MODEL
+from app.services.content_store import ContentStore
+from app.services.mesh_io import binary_stl_size, face_areas, index_vertices, stl_bytes, unique_rows
+
+logger = logging.getLogger(__name__)
+
+LOD_TRIANGLE_BUDGETS = (200_000, 50_000, 10_000)
+MIN_BUDGET_FILL = 0.7
+MAX_CELL_ITERATIONS = 10
+
+
+@dataclass
+class LodMesh:
+    level: int
+    triangles: np.ndarray
+    cell_size_mm: float
+    max_error_mm: float
+    mean_error_mm: float
+
+
+def cluster_decimate(vertices: np.ndarray, faces: np.ndarray, cell_size: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simplifica una malla indexada por agrupamiento de vértices con celdas
+    de ``cell_size``. Devuelve ``(triángulos, desplazamiento por vértice)``.
+    """
+    cells = np.floor((vertices - vertices.min(axis=0)) / cell_size).astype(np.int64)
+    dims = cells.max(axis=0) + 1
+    cell_key = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    _, cluster = np.unique(cell_key, return_inverse=True)
+
+    counts = np.bincount(cluster)
+    representative = np.stack(
+        [np.bincount(cluster, weights=vertices[:, a]) / counts for a in range(3)], axis=1
+    )
+    displacement = np.linalg.norm(vertices - representative[cluster], axis=1)
+
+    new_faces = cluster[faces]
+    a, b, c = new_faces[:, 0], new_faces[:, 1], new_faces[:, 2]
+    new_faces = new_faces[(a != b) & (b != c) & (a != c)]
+    if len(new_faces):
+        _, first, _ = unique_rows(np.sort(new_faces, axis=1))
+        new_faces = new_faces[np.sort(first)]
+    return representative[new_faces].astype(np.float32), displacement
+
+
+def decimate_to_budget(
+    vertices: np.ndarray,
+    faces: np.ndarray,
+    budget: int,
+    surface_area: float,
+) -> Optional[Tuple[np.ndarray, float, np.ndarray]]:
+    """
+    Busca un tamaño de celda que deje a lo sumo ``budget`` triángulos, lo
+    más cerca posible del presupuesto. ``None`` si ninguna iteración entra
+    en el presupuesto.
+    """
+    # Una celda de lado h deja del orden de 2 * área / h² triángulos
+    cell = np.sqrt(2.0 * surface_area / budget) if surface_area > 0 else 1.0
+    best = None
+    for _ in range(MAX_CELL_ITERATIONS):
+        result, displacement = cluster_decimate(vertices, faces, cell)
+        count = len(result)
+        if count <= budget and (best is None or count > len(best[0])):
+            best = (result, cell, displacement)
+        if MIN_BUDGET_FILL * budget <= count <= budget:
+            break
+        cell *= float(np.clip(np.sqrt(max(count, 1) / budget), 0.5, 2.0))
+    return best
+
+
+def generate_lods(triangles: np.ndarray, budgets: Sequence[int] = LOD_TRIANGLE_BUDGETS) -> List[LodMesh]:
+    """Nivel 0 (original) y un nivel por presupuesto menor al anterior."""
+    triangles = np.asarray(triangles, dtype=np.float32)
+    lods = [LodMesh(level=0, triangles=triangles, cell_size_mm=0.0, max_error_mm=0.0, mean_error_mm=0.0)]
+    vertices, faces = index_vertices(triangles.astype(np.float64))
+    area = float(face_areas(triangles).sum())
+    for budget in sorted(budgets, reverse=True):
+        if budget >= len(lods[-1].triangles):
+            continue
+        decimated = decimate_to_budget(vertices, faces, budget, area)
+        if decimated is None:
+            logger.warning(f"No LOD within {budget} triangles after {MAX_CELL_ITERATIONS} cell sizes, level skipped")
+            continue
+        result, cell, displacement = decimated
+        if len(result) == 0 or len(result) >= len(lods[-1].triangles):
+            continue
+        lods.append(LodMesh(
+            level=len(lods),
+            triangles=result,
+            cell_size_mm=float(cell),
+            max_error_mm=float(displacement.max()),
+            mean_error_mm=float(displacement.mean()),
+        ))
+    return lods
+
+
+def _delete_unreferenced(db: Session, store: ContentStore, keys: Set[str]) -> None:
+    """Borra del almacén los blobs de ``keys`` que ya no referencia ninguna fila."""
+    if not keys:
+        return
+    # El almacén deduplica por contenido: otro modelo puede compartir el blob
+    referenced = {key for (key,) in db.query(ModelLod.content_key).filter(ModelLod.content_key.in_(keys))}
+    referenced.update(key for (key,) in db.query(ModelFile.archive_key).filter(ModelFile.archive_key.in_(keys)))
+    for key in keys - referenced:
+        store.delete(key)
+
+
+def store_model_lods(
+    db: Session,
+    store: ContentStore,
+    model_id: str,
+    triangles: np.ndarray,
+    source_url: str,
+) -> List[ModelLod]:
+    """
+    Genera, guarda y registra los LODs de un modelo (reemplaza los previos).
+    El nivel 0 referencia ``source_url``; su tamaño es el del STL binario.
+    """
+    rows = []
+    for lod in generate_lods(triangles):
+        if lod.level == 0:
+            size_bytes, content_key = binary_stl_size(len(lod.triangles)), None
+        else:
+            data = stl_bytes(lod.triangles)
+            size_bytes, content_key = len(data), store.put(data)
+        rows.append(ModelLod(
+            model_id=model_id,
+            level=lod.level,
+            triangle_count=len(lod.triangles),
+            size_bytes=size_bytes,
+            content_key=content_key,
+            source_url=source_url if lod.level == 0 else None,
+            cell_size_mm=lod.cell_size_mm,
+            max_error_mm=lod.max_error_mm,
+            mean_error_mm=lod.mean_error_mm,
+        ))
+    previous = {
+        key for (key,) in db.query(ModelLod.content_key).filter(
+            ModelLod.model_id == model_id, ModelLod.content_key.isnot(None)
+        )
+    }
+    db.query(ModelLod).filter_by(model_id=model_id).delete()
+    db.add_all(rows)
+    db.commit()
+    _delete_unreferenced(db, store, previous - {r.content_key for r in rows})
+    original = rows[0].size_bytes
+    logger.info(
+        f"LODs for model {model_id}: "
+        + ", ".join(f"L{r.level} {r.triangle_count} tris {r.size_bytes / original:.1%}" for r in rows)
+    )
+    return rows
+
+
+def select_lod(
+    db: Session,
+    model_id: str,
+    max_bytes: Optional[int] = None,
+    max_triangles: Optional[int] = None,
+) -> Optional[ModelLod]:
+    """
+    El nivel más detallado que cabe en el presupuesto del cliente; si
+    ninguno cabe, el más liviano. ``None`` si el modelo no tiene LODs.
+    """
+    lods = db.execute(LODS_FOR_MODEL, {"model_id": model_id}).scalars().all()
+    for lod in lods:
+        if max_bytes is not None and lod.size_bytes > max_bytes:
+            continue
+        if max_triangles is not None and lod.triangle_count > max_triangles:
+            continue
+        return lod
+    return lods[-1] if lods else None
@@ -0,0 +1,81 @@
+# app/services/metadata_store.py
+"""
+Escrituras de ``ModelMetadata`` como upsert nativo de una sola sentencia.
+
+``INSERT ... ON CONFLICT (model_id) DO UPDATE`` sobre la restricción única
+de ``model_id`` (PostgreSQL y SQLite): sin SELECT previo y sin filas
+duplicadas cuando dos tareas escriben el mismo modelo a la vez. Solo se
+actualizan las columnas recibidas; las demás conservan su valor.
+"""
+from typing import Any, Dict, Iterable, List
+
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.db.models import ModelMetadata
+
+_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+# Columnas que un upsert nunca sobrescribe
+PROTECTED_COLUMNS = frozenset({"id", "model_id", "created_at", "updated_at"})
+# Filas por sentencia en escrituras masivas (límite de parámetros de SQLite)
+BULK_CHUNK_ROWS = 500
+
+
+def normalize_tags(tags: Any) -> List[str]:
+    """Tags sin espacios sobrantes, en minúsculas, sin vacíos ni repetidos (en orden)."""
+    if not isinstance(tags, list):
+        return []
+    normalized = (" ".join(str(tag).split()).lower() for tag in tags if tag is not None)
+    return list(dict.fromkeys(tag for tag in normalized if tag))
+
+
+def metadata_upsert(dialect_name: str, rows: List[Dict[str, Any]]):
+    """
+    Sentencia de upsert para ``rows``, que deben tener ``model_id`` y las
+    mismas columnas a escribir.
+    """
+    if dialect_name not in _INSERTS:
+        raise ValueError(f"Upsert no soportado para el dialecto {dialect_name}")
+    columns = set(rows[0])
+    if "model_id" not in columns or any(set(row) != columns for row in rows):
+        raise ValueError("Todas las filas deben tener model_id y las mismas columnas")
+    unknown = columns - set(ModelMetadata.__table__.columns.keys())
+    if unknown:
+        raise ValueError(f"Columnas desconocidas: {sorted(unknown)}")
+
+    stmt = _INSERTS[dialect_name](ModelMetadata).values(rows)
+    updates = {name: stmt.excluded[name] for name in sorted(columns - PROTECTED_COLUMNS)}
+    # ON CONFLICT no aplica el onupdate de la columna
+    updates["updated_at"] = func.now()
+    return stmt.on_conflict_do_update(index_elements=[ModelMetadata.model_id], set_=updates)
+
+
+def upsert_model_metadata(db: Session, model_id: str, commit: bool = True, **values: Any) -> None:
+    """Escribe ``values`` en la fila del modelo, creándola si no existe."""
+    db.execute(metadata_upsert(db.get_bind().dialect.name, [dict(values, model_id=model_id)]))
+    if commit:
+        db.commit()
+
+
+def bulk_upsert_model_metadata(db: Session, rows: Iterable[Dict[str, Any]], commit: bool = True) -> int:
+    """
+    Escribe muchos resultados con una sentencia por grupo de columnas (y por
+    ``BULK_CHUNK_ROWS`` filas). Las filas repetidas de un mismo ``model_id``
+    se combinan; gana la última. Devuelve el número de modelos escritos.
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        merged.setdefault(row["model_id"], {}).update(row)
+
+    groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+    for row in merged.values():
+        groups.setdefault(frozenset(row), []).append(row)
+
+    dialect_name = db.get_bind().dialect.name
+    for group in groups.values():
+        for start in range(0, len(group), BULK_CHUNK_ROWS):
+            db.execute(metadata_upsert(dialect_name, group[start:start + BULK_CHUNK_ROWS]))
+    if commit:
+        db.commit()
+    return len(merged)
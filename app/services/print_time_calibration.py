@@ -0,0 +1,293 @@
+# app/services/print_time_calibration.py
+"""
+Calibración del tiempo de impresión con el histórico de proyectos.
+
+Ajusta, por material y perfil de impresora, una regresión ridge que corrige
+la estimación cruda del predictor (``model_metadata.raw_time_minutes``)
+hacia las horas reales (``projects.actual_hours``) usando rasgos
+geométricos del modelo.
+
+La inferencia corrige un modelo y el histórico solo tiene horas reales por
+proyecto. El modelo es lineal y sin término independiente aparte, así que
+las horas de un proyecto son la suma de las de sus modelos y su fila de
+diseño es la suma de las filas de sus modelos: la primera columna cuenta
+los modelos (1 al inferir). Solo entran los proyectos con todos sus
+modelos estimados. El error se mide con MAPE leave-one-out calculado en
+forma cerrada.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.models import (
+    ModelFile,
+    ModelMetadata,
+    PrintTimeCalibration,
+    Project,
+    ProjectCost,
+)
+from app.db.queries import CALIBRATION_FOR_GROUP
+
+logger = logging.getLogger(__name__)
+
+# Comodín para grupos sin material o impresora específicos
+ANY = "*"
+FEATURE_NAMES = ("intercept", "raw_hours", "polygons_k", "complexity")
+DEFAULT_ALPHA = 1.0
+MIN_SAMPLES = 8
+# model_id por consulta al leer los rasgos del primario
+GEOMETRY_BATCH = 1000
+
+
+@dataclass
+class CalibrationFit:
+    """Resultado del ajuste de un grupo material/impresora."""
+    material: str
+    printer_profile: str
+    coefficients: np.ndarray
+    n_samples: int
+    mape: float
+    baseline_mape: float
+    alpha: float
+
+
+def normalize_key(value: Optional[str]) -> str:
+    """Normaliza nombres de material o impresora para agrupar."""
+    if not value:
+        return ANY
+    return value.strip().upper() or ANY
+
+
+def build_features(raw_hours, polygons, complexity) -> np.ndarray:
+    """Matriz de diseño ``(n, len(FEATURE_NAMES))`` de ``n`` modelos a partir de columnas."""
+    raw_hours = np.asarray(raw_hours, dtype=np.float64)
+    polygons = np.nan_to_num(np.asarray(polygons, dtype=np.float64))
+    complexity = np.nan_to_num(np.asarray(complexity, dtype=np.float64))
+    return np.column_stack([np.ones_like(raw_hours), raw_hours, polygons / 1000.0, complexity])
+
+
+def mean_absolute_percentage_error(actual: np.ndarray, predicted: np.ndarray) -> float:
+    """MAPE en porcentaje."""
+    return float(np.mean(np.abs(predicted - actual) / actual) * 100.0)
+
+
+def fit_ridge(X: np.ndarray, y: np.ndarray, alpha: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Ridge sin centrar: la primera columna (número de modelos) no se
+    penaliza y las demás se escalan por su media cuadrática. Sin centrar,
+    el ajuste sigue siendo lineal en las filas y vale igual para la suma
+    de un proyecto que para un modelo.
+
+    Devuelve los coeficientes en la escala original de ``X`` y las
+    predicciones leave-one-out, obtenidas de la diagonal de la matriz
+    sombrero sin reajustar el modelo n veces.
+    """
+    scale = np.sqrt(np.mean(X ** 2, axis=0))
+    scale[0] = 1.0
+    scale[scale == 0] = 1.0
+    Z = X / scale
+
+    penalty = np.full(Z.shape[1], float(alpha))
+    penalty[0] = 0.0
+    A_inv = np.linalg.pinv(Z.T @ Z + np.diag(penalty))
+    beta = A_inv @ (Z.T @ y)
+
+    residuals = y - Z @ beta
+    leverage = np.einsum("ij,jk,ik->i", Z, A_inv, Z)
+    loo_pred = y - residuals / np.clip(1.0 - leverage, 1e-6, None)
+    return beta / scale, loo_pred
+
+
+class PrintTimeCalibrator:
+    """
+    Ajusta y aplica la calibración del estimador de tiempo de impresión.
+    """
+    def __init__(self, db: Session, alpha: float = DEFAULT_ALPHA, min_samples: int = MIN_SAMPLES):
+        self.db = db
+        self.alpha = alpha
+        self.min_samples = min_samples
+
+    def load_history(self, shards: Optional[Iterable[Session]] = None) -> Dict[str, np.ndarray]:
+        """
+        Carga los proyectos con horas reales y la suma de los rasgos de sus
+        modelos, con el material/impresora de sus costos.
+
+        Los proyectos se leen de cada sesión de ``shards`` (por defecto, la
+        del calibrador); los rasgos, de ``model_metadata`` en el primario.
+        """
+        material = self._cost_item_subquery("material")
+        printer = self._cost_item_subquery("printer")
+        stmt = (
+            select(
+                Project.id,
+                Project.actual_hours,
+                material.c.item_name,
+                printer.c.item_name,
+                ModelFile.id,
+            )
+            .join(ModelFile, ModelFile.project_id == Project.id)
+            .outerjoin(material, material.c.project_id == Project.id)
+            .outerjoin(printer, printer.c.project_id == Project.id)
+            .where(Project.actual_hours > 0)
+            .order_by(Project.id)
+        )
+        projects, model_ids = [], set()
+        for db in shards if shards is not None else [self.db]:
+            by_project: Dict[int, dict] = {}
+            for project_id, actual, material_name, printer_name, model_file_id in db.execute(stmt):
+                project = by_project.setdefault(project_id, {
+                    "actual": actual, "material": material_name, "printer": printer_name, "models": [],
+                })
+                project["models"].append(str(model_file_id))
+                model_ids.add(str(model_file_id))
+            projects.extend(by_project.values())
+
+        features = self._model_features(model_ids)
+        # Un modelo sin estimación dejaría horas reales sin su rasgo
+        projects = [p for p in projects if all(m in features for m in p["models"])]
+        if not projects:
+            empty = np.empty(0)
+            return {"X": np.empty((0, len(FEATURE_NAMES))), "y": empty,
+                    "material": empty.astype(object), "printer": empty.astype(object)}
+        return {
+            "X": np.vstack([sum(features[m] for m in p["models"]) for p in projects]),
+            "y": np.asarray([p["actual"] for p in projects], dtype=np.float64),
+            "material": np.array([normalize_key(p["material"]) for p in projects], dtype=object),
+            "printer": np.array([normalize_key(p["printer"]) for p in projects], dtype=object),
+        }
+
+    def _model_features(self, model_ids: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Fila de diseño de cada modelo con estimación cruda, en bloques de ``IN``."""
+        model_ids = sorted(model_ids)
+        features = {}
+        for start in range(0, len(model_ids), GEOMETRY_BATCH):
+            rows = self.db.execute(
+                select(ModelMetadata.model_id, ModelMetadata.raw_time_minutes,
+                       ModelMetadata.polygons, ModelMetadata.complexity_score)
+                .where(ModelMetadata.model_id.in_(model_ids[start:start + GEOMETRY_BATCH]),
+                       ModelMetadata.raw_time_minutes.isnot(None))
+            ).all()
+            if rows:
+                ids, minutes, polygons, scores = zip(*rows)
+                X = build_features(np.asarray(minutes) / 60.0, np.asarray(polygons, dtype=np.float64),
+                                   np.asarray(scores, dtype=np.float64))
+                features.update(zip(ids, X))
+        return features
+
+    def _cost_item_subquery(self, category: str):
+        return (
+            select(
+                ProjectCost.project_id.label("project_id"),
+                func.min(ProjectCost.item_name).label("item_name"),
+            )
+            .where(ProjectCost.category == category)
+            .group_by(ProjectCost.project_id)
+            .subquery()
+        )
+
+    def fit(self, history: Optional[Dict[str, np.ndarray]] = None) -> List[CalibrationFit]:
+        """
+        Ajusta un modelo por cada grupo con suficientes muestras: el par
+        material/impresora, el material con cualquier impresora y el global.
+        """
+        history = history if history is not None else self.load_history()
+        X, y = history["X"], history["y"]
+        materials, printers = history["material"], history["printer"]
+
+        groups = {(ANY, ANY): np.ones(len(y), dtype=bool)}
+        for material in np.unique(materials):
+            if material != ANY:
+                groups[(material, ANY)] = materials == material
+        for material, printer in set(zip(materials, printers)):
+            if material != ANY and printer != ANY:
+                groups[(material, printer)] = (materials == material) & (printers == printer)
+
+        fits = []
+        for (material, printer), mask in groups.items():
+            n = int(mask.sum())
+            if n < self.min_samples:
+                continue
+            coef, loo_pred = fit_ridge(X[mask], y[mask], self.alpha)
+            fits.append(CalibrationFit(
+                material=material,
+                printer_profile=printer,
+                coefficients=coef,
+                n_samples=n,
+                mape=mean_absolute_percentage_error(y[mask], loo_pred),
+                baseline_mape=mean_absolute_percentage_error(y[mask], X[mask, 1]),
+                alpha=self.alpha,
+            ))
+        logger.info(f"Print-time calibration fitted {len(fits)} groups from {len(y)} projects")
+        return fits
+
+    def save(self, fits: List[CalibrationFit]) -> None:
+        """Persiste los coeficientes reemplazando los del mismo grupo."""
+        for fit in fits:
+            row = self.db.execute(
+                CALIBRATION_FOR_GROUP, {"material": fit.material, "printer_profile": fit.printer_profile}
+            ).scalars().first()
+            if not row:
+                row = PrintTimeCalibration(material=fit.material, printer_profile=fit.printer_profile)
+                self.db.add(row)
+            row.feature_names = list(FEATURE_NAMES)
+            row.coefficients = [float(c) for c in fit.coefficients]
+            row.alpha = fit.alpha
+            row.n_samples = fit.n_samples
+            row.mape = fit.mape
+            row.baseline_mape = fit.baseline_mape
+        self.db.commit()
+
+    def lookup(self, material: Optional[str], printer_profile: Optional[str]) -> Optional[PrintTimeCalibration]:
+        """Busca el grupo más específico disponible para material/impresora."""
+        material, printer = normalize_key(material), normalize_key(printer_profile)
+        rows = self.db.query(PrintTimeCalibration).filter(
+            PrintTimeCalibration.material.in_({material, ANY})
+        ).all()
+        by_group = {(r.material, r.printer_profile): r for r in rows}
+        for key in ((material, printer), (material, ANY), (ANY, ANY)):
+            if key in by_group:
+                return by_group[key]
+        return None
+
+    def calibrate_minutes(
+        self,
+        raw_minutes: float,
+        material: Optional[str],
+        printer_profile: Optional[str] = None,
+        polygons: Optional[int] = None,
+        complexity: Optional[float] = None,
+    ) -> float:
+        """
+        Corrige una estimación cruda en minutos. Sin calibración disponible,
+        o si el modelo produce un valor no positivo, se devuelve la cruda.
+        """
+        calibration = self.lookup(material, printer_profile)
+        if calibration is None:
+            return raw_minutes
+        x = build_features([raw_minutes / 60.0], [polygons or 0], [complexity or 0.0])[0]
+        hours = float(x @ np.asarray(calibration.coefficients, dtype=np.float64))
+        if hours <= 0:
+            return raw_minutes
+        return hours * 60.0
+
+    def report(self) -> List[Dict]:
+        """Métricas de calidad por grupo, para la API y Prometheus."""
+        rows = self.db.query(PrintTimeCalibration).order_by(
+            PrintTimeCalibration.material, PrintTimeCalibration.printer_profile
+        ).all()
+        return [
+            {
+                "material": r.material,
+                "printer_profile": r.printer_profile,
+                "n_samples": r.n_samples,
+                "mape": r.mape,
+                "baseline_mape": r.baseline_mape,
+                "coefficients": dict(zip(r.feature_names, r.coefficients)),
+                "fitted_at": r.fitted_at,
+            }
+            for r in rows
+        ]
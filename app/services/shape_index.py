@@ -0,0 +1,279 @@
+# app/services/shape_index.py
+"""
+Índice de similitud geométrica entre modelos.
+
+Cada malla se resume en un descriptor float32 de tamaño fijo:
+
+- histograma D2 (distancias entre pares de puntos muestreados sobre la
+  superficie, normalizadas por la distancia media), en raíz cuadrada para
+  que la distancia euclídea aproxime la distancia de Hellinger;
+- proporciones de la caja envolvente (extensiones ordenadas / mayor);
+- momentos de inercia normalizados (valores propios de la covarianza).
+
+El descriptor es invariante a traslación, rotación y escala. Los
+descriptores se guardan en ``model_shape_descriptors`` y se cargan en una
+matriz contigua para búsquedas top-k por producto matricial.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.db.models import ModelMetadata, ModelShapeDescriptor
+from app.services.mesh_io import face_areas
+
+logger = logging.getLogger(__name__)
+
+DESCRIPTOR_VERSION = 1
+D2_BINS = 32
+D2_SAMPLES = 4096
+D2_MAX_RATIO = 3.0
+SHAPE_WEIGHT = 0.5
+DESCRIPTOR_SIZE = D2_BINS + 6
+
+
+def sample_surface(triangles: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Muestrea ``n`` puntos uniformes por área sobre la superficie."""
+    areas = face_areas(triangles)
+    total = areas.sum()
+    if total <= 0:
+        raise ValueError("La malla no tiene área")
+    idx = np.searchsorted(np.cumsum(areas) / total, rng.random(n), side="right")
+    idx = np.minimum(idx, len(triangles) - 1)
+    r1 = np.sqrt(rng.random(n))
+    r2 = rng.random(n)
+    tri = triangles[idx].astype(np.float64)
+    return (
+        (1 - r1)[:, None] * tri[:, 0]
+        + (r1 * (1 - r2))[:, None] * tri[:, 1]
+        + (r1 * r2)[:, None] * tri[:, 2]
+    )
+
+
+def compute_descriptor(triangles: np.ndarray, samples: int = D2_SAMPLES, seed: int = 0) -> np.ndarray:
+    """Descriptor de forma reproducible (semilla fija) de tamaño ``DESCRIPTOR_SIZE``."""
+    rng = np.random.default_rng(seed)
+    points = sample_surface(np.asarray(triangles), samples, rng)
+
+    pairs = rng.integers(0, samples, size=(samples * 2, 2))
+    d2 = np.linalg.norm(points[pairs[:, 0]] - points[pairs[:, 1]], axis=1)
+    mean = d2.mean()
+    if mean <= 0:
+        raise ValueError("La malla es degenerada")
+    hist, _ = np.histogram(d2 / mean, bins=D2_BINS, range=(0.0, D2_MAX_RATIO))
+    hist = np.sqrt(hist / max(hist.sum(), 1))
+
+    extents = np.sort(np.ptp(points, axis=0))[::-1]
+    box = extents / extents[0]
+
+    centered = points - points.mean(axis=0)
+    eigen = np.sort(np.linalg.eigvalsh(centered.T @ centered / samples))[::-1]
+    moments = eigen / eigen.sum()
+
+    descriptor = np.concatenate([hist, SHAPE_WEIGHT * box, SHAPE_WEIGHT * moments])
+    return descriptor.astype(np.float32)
+
+
+@dataclass
+class SimilarModel:
+    model_id: str
+    distance: float
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    matrix: np.ndarray
+    norms: np.ndarray
+    model_ids: Tuple[str, ...]
+    positions: Dict[str, int]
+
+
+_EMPTY = _Snapshot(
+    np.empty((0, DESCRIPTOR_SIZE), dtype=np.float32), np.empty(0, dtype=np.float32), (), {}
+)
+
+
+class ShapeIndex:
+    """
+    Matriz ``(n, DESCRIPTOR_SIZE)`` float32 en memoria con búsqueda top-k.
+
+    Las consultas leen una instantánea inmutable; ``add`` y ``sync`` la
+    sustituyen entera bajo ``_lock``. La sincronización carga las filas con
+    ``id`` mayor al último visto y recarga la tabla completa cuando el
+    recuento y la suma de ``id`` de la tabla no coinciden con las filas
+    cargadas (borrados, reemplazos o un ``id`` menor confirmado tarde), y
+    en todo caso cada ``full_sync_seconds``. El recuento recorre la tabla:
+    se consulta como mucho cada ``check_seconds`` y no en cada búsqueda.
+    """
+    def __init__(
+        self,
+        full_sync_seconds: float = 300.0,
+        check_seconds: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._lock = threading.Lock()
+        self._snapshot = _EMPTY
+        self._last_row_id = 0
+        # Fila de la tabla cargada por modelo
+        self._row_ids: Dict[str, int] = {}
+        self._row_id_sum = 0
+        self._next_full_sync = 0.0
+        self._next_check = 0.0
+        self.full_sync_seconds = full_sync_seconds
+        self.check_seconds = check_seconds
+        self.clock = clock
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._snapshot.matrix
+
+    @property
+    def norms(self) -> np.ndarray:
+        return self._snapshot.norms
+
+    @property
+    def model_ids(self) -> Tuple[str, ...]:
+        return self._snapshot.model_ids
+
+    def __len__(self) -> int:
+        return len(self._snapshot.model_ids)
+
+    def add(self, model_ids: Sequence[str], descriptors: np.ndarray) -> None:
+        """Agrega o reemplaza descriptores."""
+        descriptors = np.asarray(descriptors, dtype=np.float32).reshape(-1, DESCRIPTOR_SIZE)
+        with self._lock:
+            self._snapshot = self._merged(self._snapshot, model_ids, descriptors)
+
+    @staticmethod
+    def _merged(snapshot: _Snapshot, model_ids: Sequence[str], descriptors: np.ndarray) -> _Snapshot:
+        positions = dict(snapshot.positions)
+        ids = list(snapshot.model_ids)
+        matrix = snapshot.matrix
+        replaced = False
+        new_rows = []
+        for model_id, vector in zip(model_ids, descriptors):
+            pos = positions.get(model_id)
+            if pos is None:
+                positions[model_id] = len(ids)
+                ids.append(model_id)
+                new_rows.append(vector)
+            else:
+                if not replaced:
+                    # Copia: las consultas en curso siguen con la anterior
+                    matrix = matrix.copy()
+                    replaced = True
+                matrix[pos] = vector
+        if new_rows:
+            matrix = np.vstack([matrix, np.vstack(new_rows)])
+        return _Snapshot(matrix, np.einsum("ij,ij->i", matrix, matrix), tuple(ids), positions)
+
+    def vector(self, model_id: str) -> Optional[np.ndarray]:
+        snapshot = self._snapshot
+        pos = snapshot.positions.get(model_id)
+        return None if pos is None else snapshot.matrix[pos]
+
+    def query(self, descriptor: np.ndarray, k: int = 5, exclude: Optional[str] = None) -> List[SimilarModel]:
+        """Los ``k`` modelos más cercanos por distancia euclídea."""
+        snapshot = self._snapshot
+        if not snapshot.model_ids:
+            return []
+        q = np.asarray(descriptor, dtype=np.float32)
+        dist2 = snapshot.norms - 2.0 * (snapshot.matrix @ q) + q @ q
+        excluded = snapshot.positions.get(exclude) if exclude else None
+        if excluded is not None:
+            dist2[excluded] = np.inf
+        k = min(k, len(dist2) - (excluded is not None))
+        if k <= 0:
+            return []
+        top = np.argpartition(dist2, k - 1)[:k]
+        top = top[np.argsort(dist2[top])]
+        return [
+            SimilarModel(model_id=snapshot.model_ids[i], distance=float(np.sqrt(max(dist2[i], 0.0))))
+            for i in top
+        ]
+
+    def sync(self, db: Session) -> None:
+        """Carga las filas nuevas de ``model_shape_descriptors`` y aplica los borrados."""
+        if self.clock() < self._next_check:
+            return
+        self._next_check = self.clock() + self.check_seconds
+        current = ModelShapeDescriptor.version == DESCRIPTOR_VERSION
+        count, id_sum, latest = db.query(
+            func.count(ModelShapeDescriptor.id), func.sum(ModelShapeDescriptor.id), func.max(ModelShapeDescriptor.id)
+        ).filter(current).one()
+        latest = latest or 0
+        with self._lock:
+            full = self.clock() >= self._next_full_sync
+            loaded = False
+            if not full and latest > self._last_row_id:
+                row_ids, ids, vectors = self._rows(db, ModelShapeDescriptor.id > self._last_row_id)
+                self._snapshot = self._merged(self._snapshot, ids, vectors)
+                for model_id, row_id in zip(ids, row_ids):
+                    self._row_id_sum += row_id - self._row_ids.get(model_id, 0)
+                    self._row_ids[model_id] = row_id
+                loaded = True
+            if full or (count, id_sum or 0) != (len(self._row_ids), self._row_id_sum):
+                row_ids, ids, vectors = self._rows(db)
+                self._snapshot = self._merged(_EMPTY, ids, vectors)
+                self._row_ids = dict(zip(ids, row_ids))
+                self._row_id_sum = sum(self._row_ids.values())
+                self._next_full_sync = self.clock() + self.full_sync_seconds
+                loaded = True
+            self._last_row_id = max(self._last_row_id, latest)
+        if loaded:
+            logger.info(f"Shape index synced: {len(self)} models")
+
+    @staticmethod
+    def _rows(db: Session, *filters) -> Tuple[List[int], List[str], np.ndarray]:
+        rows = (
+            db.query(ModelShapeDescriptor.id, ModelShapeDescriptor.model_id, ModelShapeDescriptor.descriptor)
+            .filter(ModelShapeDescriptor.version == DESCRIPTOR_VERSION, *filters)
+            .order_by(ModelShapeDescriptor.id)
+            .all()
+        )
+        vectors = np.frombuffer(b"".join(r.descriptor for r in rows), dtype=np.float32)
+        return [r.id for r in rows], [r.model_id for r in rows], vectors.reshape(-1, DESCRIPTOR_SIZE)
+
+
+# Índice compartido por proceso
+shape_index = ShapeIndex()
+
+
+def store_descriptor(db: Session, model_id: str, descriptor: np.ndarray, model_file_id: Optional[int] = None) -> None:
+    """
+    Guarda el descriptor de un modelo. Un reemplazo borra e inserta la fila
+    para que el nuevo ``id`` llegue a los índices de otros procesos.
+    """
+    db.query(ModelShapeDescriptor).filter_by(model_id=model_id).delete()
+    db.add(ModelShapeDescriptor(
+        model_id=model_id,
+        model_file_id=model_file_id,
+        version=DESCRIPTOR_VERSION,
+        descriptor=np.asarray(descriptor, dtype=np.float32).tobytes(),
+    ))
+    db.commit()
+    shape_index.add([model_id], descriptor)
+
+
+def find_similar_models(db: Session, model_id: str, k: int = 5) -> Optional[List[Tuple[SimilarModel, Optional[ModelMetadata]]]]:
+    """
+    Modelos geométricamente similares con su ``ModelMetadata`` para reuso.
+    Devuelve ``None`` si el modelo aún no está indexado.
+    """
+    shape_index.sync(db)
+    vector = shape_index.vector(model_id)
+    if vector is None:
+        return None
+    matches = shape_index.query(vector, k=k, exclude=model_id)
+    metadata = {
+        m.model_id: m
+        for m in db.query(ModelMetadata).filter(
+            ModelMetadata.model_id.in_([s.model_id for s in matches])
+        )
+    }
+    return [(s, metadata.get(s.model_id)) for s in matches]
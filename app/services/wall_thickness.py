@@ -0,0 +1,115 @@
+# app/services/wall_thickness.py
+"""
+Análisis de espesor de pared mediante trazado de segmentos sobre un BVH.
+
+Desde el centroide de cada cara se lanza un segmento en dirección opuesta
+a su normal; la distancia al primer impacto es el espesor local de la
+pared. Una pared más delgada que la boquilla no puede extruirse, por lo
+que el veredicto por boquilla compara el área afectada con
+``MAX_THIN_AREA_RATIO``.
+"""
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.schemas.ai_task import NozzleVerdict, ThinRegion, WallThicknessReport
+from app.services.mesh_bvh import MeshBVH
+from app.services.mesh_io import connected_components, face_areas, face_normals, index_vertices, load_mesh
+
+NOZZLE_SIZES_MM = (0.25, 0.4, 0.6, 0.8)
+MAX_THIN_AREA_RATIO = 0.01
+MAX_REGIONS = 20
+SELF_HIT_EPSILON = 1e-6
+
+
+def face_thickness(
+    triangles: np.ndarray,
+    max_distance: float = np.inf,
+    bvh: Optional[MeshBVH] = None,
+) -> np.ndarray:
+    """
+    Espesor local por cara (mm). Las caras sin impacto dentro de
+    ``max_distance`` o degeneradas devuelven ``inf``.
+    """
+    triangles = np.asarray(triangles, dtype=np.float64)
+    bvh = bvh or MeshBVH(triangles)
+    normals = face_normals(triangles)
+    valid = np.flatnonzero(np.abs(normals).sum(axis=1) > 0)
+
+    points = triangles.reshape(-1, 3)
+    scale = float(np.linalg.norm(points.max(axis=0) - points.min(axis=0))) or 1.0
+    thickness = np.full(len(triangles), np.inf)
+    t, _ = bvh.intersect(
+        triangles[valid].mean(axis=1),
+        -normals[valid],
+        max_t=max_distance,
+        ignore=valid,
+        min_t=SELF_HIT_EPSILON * scale,
+    )
+    thickness[valid] = t
+    return thickness
+
+
+def thin_regions(triangles: np.ndarray, thickness: np.ndarray, threshold: float) -> Sequence[ThinRegion]:
+    """Agrupa en regiones conexas las caras con espesor menor a ``threshold``."""
+    thin = np.flatnonzero(thickness < threshold)
+    if len(thin) == 0:
+        return []
+    vertices, faces = index_vertices(triangles[thin])
+    edges = faces[:, [0, 1, 1, 2]].reshape(-1, 2)
+    labels = connected_components(len(vertices), edges)
+    _, region = np.unique(labels[faces[:, 0]], return_inverse=True)
+
+    areas = face_areas(triangles[thin])
+    centroids = triangles[thin].mean(axis=1)
+    region_area = np.bincount(region, weights=areas)
+    region_count = np.bincount(region)
+    region_min = np.full(len(region_area), np.inf)
+    np.minimum.at(region_min, region, thickness[thin])
+    weights = np.maximum(region_area, 1e-12)
+    center = np.stack([np.bincount(region, weights=areas * centroids[:, i]) / weights for i in range(3)], axis=1)
+
+    top = np.argsort(-region_area)[:MAX_REGIONS]
+    return [
+        ThinRegion(
+            face_count=int(region_count[r]),
+            area_mm2=float(region_area[r]),
+            min_thickness_mm=float(region_min[r]),
+            center=[float(c) for c in center[r]],
+        )
+        for r in top
+    ]
+
+
+def analyze_wall_thickness(
+    triangles: np.ndarray,
+    nozzle_sizes: Sequence[float] = NOZZLE_SIZES_MM,
+) -> WallThicknessReport:
+    """Reporte de paredes delgadas con veredicto por boquilla."""
+    triangles = np.asarray(triangles, dtype=np.float64)
+    max_checked = float(max(nozzle_sizes))
+    thickness = face_thickness(triangles, max_distance=max_checked)
+    areas = face_areas(triangles)
+    total_area = areas.sum() or 1.0
+
+    nozzles = []
+    for nozzle in sorted(nozzle_sizes):
+        ratio = float(areas[thickness < nozzle].sum() / total_area)
+        nozzles.append(NozzleVerdict(
+            nozzle_mm=nozzle,
+            thin_area_ratio=ratio,
+            printable=ratio <= MAX_THIN_AREA_RATIO,
+        ))
+
+    finite = thickness[np.isfinite(thickness)]
+    return WallThicknessReport(
+        min_thickness_mm=float(finite.min()) if len(finite) else None,
+        max_checked_mm=max_checked,
+        regions=thin_regions(triangles, thickness, max_checked),
+        nozzles=nozzles,
+    )
+
+
+def analyze_model_wall_thickness(model_file_url: str) -> WallThicknessReport:
+    """Carga un STL y analiza sus paredes delgadas."""
+    return analyze_wall_thickness(load_mesh(model_file_url))
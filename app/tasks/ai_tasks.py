@@ -1,91 +1,261 @@
 # app/tasks/ai_tasks.py
 
+import logging
+from typing import Dict, List, Optional
+from celery import current_task, group
 from app.core.celery import celery_app
+from app.core.config import settings
+from app.core.task_batching import BatchItem, batched_task
+from app.core.metrics import PRINT_TIME_CALIBRATION_MAPE
 from app.services.ai_service import AIService
-from app.db.session import SessionLocal
-from app.db.models import ModelMetadata
+from app.services.print_time_calibration import PrintTimeCalibrator
+from app.services.complexity_engine import ComplexityEngine, analyze_model_file
+from app.services.mesh_io import MeshLoadError, load_mesh
+from app.services.shape_index import compute_descriptor, store_descriptor
+from app.services.wall_thickness import analyze_model_wall_thickness
+from app.services.content_store import content_store
+from app.services.mesh_lod import store_model_lods
+from app.services.mesh_codec import DEFAULT_PRECISION_MM, archive_model_file
+from app.services.metadata_store import bulk_upsert_model_metadata, normalize_tags, upsert_model_metadata
+from app.db.queries import METADATA_GEOMETRY, MODEL_FILE_BY_ID
+from app.db.session import SessionLocal, db_writer, shard_router
+from app.db.models import ModelFile
 from app.schemas.ai_task import PrintTimeRequest
 
-@celery_app.task(name="app.tasks.generate_seo_title_task")
-def generate_seo_title_task(model_id: str) -> None:
+logger = logging.getLogger(__name__)
+
+def _current_task_id() -> Optional[str]:
+    """ID de la tarea en curso, guardado con su resultado (None fuera de un worker)."""
+    return current_task.request.id if current_task else None
+
+def _result(model_id: str) -> dict:
+    """
+    Resultado guardado en el backend: ``/ai/result`` lee con él la fila del
+    modelo, que una tarea posterior del mismo modelo vuelve a marcar.
+    """
+    return {"model_id": model_id}
+
+@celery_app.task(name="app.tasks.generate_seo_title_task", acks_late=True)
+def generate_seo_title_task(model_id: str) -> dict:
     """Genera y guarda el título SEO para un modelo."""
     service = AIService()
     title = service.generate_seo_title(model_id)
+    task_id = _current_task_id()
+    db_writer.run(lambda db: upsert_model_metadata(
+        db, model_id, commit=False, task_id=task_id, seo_title=title
+    ))
+    return _result(model_id)
+
+@celery_app.task(name="app.tasks.generate_market_description_task", acks_late=True)
+def generate_market_description_task(model_id: str) -> dict:
+    """Genera y guarda la descripción optimizada para marketplaces."""
+    service = AIService()
+    desc = service.generate_market_description(model_id)
+    task_id = _current_task_id()
+    db_writer.run(lambda db: upsert_model_metadata(
+        db, model_id, commit=False, task_id=task_id, market_description=desc
+    ))
+    return _result(model_id)
+
+@celery_app.task(name="app.tasks.generate_tags_task", acks_late=True)
+def generate_tags_task(model_id: str) -> dict:
+    """Genera y guarda los tags inteligentes basados en contenido."""
+    service = AIService()
+    tags = normalize_tags(service.generate_tags(model_id))
+    task_id = _current_task_id()
+    db_writer.run(lambda db: upsert_model_metadata(db, model_id, commit=False, task_id=task_id, tags=tags))
+    return _result(model_id)
+
+@batched_task(
+    celery_app,
+    name="app.tasks.generate_tags_batch_task",
+    acks_late=True,
+    max_items=settings.TASK_BATCH_MAX_ITEMS,
+    max_wait_seconds=settings.TASK_BATCH_MAX_WAIT_SECONDS,
+)
+def generate_tags_batch(items: List[BatchItem]) -> Dict[str, dict]:
+    """
+    Genera y guarda los tags de un lote de modelos con una llamada y un
+    upsert. Cada elemento guarda el resultado de su clave, con el que
+    ``/ai/result`` resuelve también los repetidos del mismo modelo.
+    """
+    tags = AIService().generate_tags_batch([item.key for item in items])
+    rows = [
+        {"model_id": item.key, "task_id": item.id, "tags": normalize_tags(tags[item.key])}
+        for item in items if item.key in tags
+    ]
+    if rows:
+        db_writer.run(lambda db: bulk_upsert_model_metadata(db, rows, commit=False))
+    return {row["model_id"]: _result(row["model_id"]) for row in rows}
+
+@celery_app.task(name="app.tasks.analyze_complexity_task", acks_late=True)
+def analyze_complexity_task(model_file_url: str, model_id: str) -> dict:
+    """Analiza la complejidad del modelo y guarda el reporte."""
+    service = AIService()
+    report = service.analyze_complexity(model_file_url)
+    task_id = _current_task_id()
+    db_writer.run(lambda db: upsert_model_metadata(
+        db,
+        model_id,
+        commit=False,
+        task_id=task_id,
+        vertices=report.vertices,
+        polygons=report.polygons,
+        file_size_kb=report.file_size_kb,
+        complexity_score=report.complexity_score,
+    ))
+    return _result(model_id)
+
+@celery_app.task(name="app.tasks.predict_print_time_task", acks_late=True)
+def predict_print_time_task(request_dict: dict, model_id: str) -> dict:
+    """Predice y guarda el tiempo de impresión."""
+    req = PrintTimeRequest(**request_dict)
+    service = AIService()
+    result = service.predict_print_time(req)
     db = SessionLocal()
     try:
-        meta = db.query(ModelMetadata).filter_by(model_id=model_id).first()
-        if not meta:
-            meta = ModelMetadata(model_id=model_id)
-            db.add(meta)
-        meta.seo_title = title
-        db.commit()
+        if result.exact:
+            # El G-code ya codifica la trayectoria real: no se calibra
+            minutes = result.estimated_time_minutes
+        else:
+            geometry = db.execute(METADATA_GEOMETRY, {"model_id": model_id}).first()
+            calibrator = PrintTimeCalibrator(db)
+            minutes = calibrator.calibrate_minutes(
+                result.estimated_time_minutes,
+                req.material,
+                req.printer_profile,
+                polygons=geometry.polygons if geometry else None,
+                complexity=geometry.complexity_score if geometry else None,
+            )
     finally:
         db.close()
+    task_id = _current_task_id()
+    db_writer.run(lambda db: upsert_model_metadata(
+        db, model_id, commit=False, task_id=task_id,
+        estimated_time_minutes=minutes, raw_time_minutes=result.estimated_time_minutes,
+    ))
+    return _result(model_id)
 
-@celery_app.task(name="app.tasks.generate_market_description_task")
-def generate_market_description_task(model_id: str) -> None:
-    """Genera y guarda la descripción optimizada para marketplaces."""
-    service = AIService()
-    desc = service.generate_market_description(model_id)
+@celery_app.task(name="app.tasks.calibrate_print_time_task", acks_late=True)
+def calibrate_print_time_task() -> dict:
+    """Reajusta la calibración del tiempo de impresión con el histórico."""
     db = SessionLocal()
     try:
-        meta = db.query(ModelMetadata).filter_by(model_id=model_id).first()
-        if not meta:
-            meta = ModelMetadata(model_id=model_id)
-            db.add(meta)
-        meta.market_description = desc
-        db.commit()
+        calibrator = PrintTimeCalibrator(db)
+        # Los proyectos están repartidos entre los shards
+        shards = (session for _, session in shard_router.each_shard())
+        fits = calibrator.fit(calibrator.load_history(shards))
+        calibrator.save(fits)
+        for fit in fits:
+            PRINT_TIME_CALIBRATION_MAPE.labels(
+                material=fit.material, printer_profile=fit.printer_profile
+            ).set(fit.mape)
+        return {"groups": len(fits)}
     finally:
         db.close()
 
-@celery_app.task(name="app.tasks.generate_tags_task")
-def generate_tags_task(model_id: str) -> None:
-    """Genera y guarda los tags inteligentes basados en contenido."""
-    service = AIService()
-    tags = service.generate_tags(model_id)
+@celery_app.task(name="app.tasks.index_model_shape_task", acks_late=True)
+def index_model_shape_task(model_file_url: str, model_id: str) -> None:
+    """Calcula y guarda el descriptor de forma para búsqueda de similares."""
+    triangles = load_mesh(model_file_url)
+    descriptor = compute_descriptor(triangles)
     db = SessionLocal()
     try:
-        meta = db.query(ModelMetadata).filter_by(model_id=model_id).first()
-        if not meta:
-            meta = ModelMetadata(model_id=model_id)
-            db.add(meta)
-        meta.tags = tags
-        db.commit()
+        store_descriptor(db, model_id, descriptor)
     finally:
         db.close()
 
-@celery_app.task(name="app.tasks.analyze_complexity_task")
-def analyze_complexity_task(model_file_url: str, model_id: str) -> None:
-    """Analiza la complejidad del modelo y guarda el reporte."""
-    service = AIService()
-    report = service.analyze_complexity(model_file_url)
+@celery_app.task(name="app.tasks.analyze_wall_thickness_task", acks_late=True)
+def analyze_wall_thickness_task(model_file_url: str, model_id: str) -> dict:
+    """Analiza paredes delgadas y guarda el veredicto por boquilla."""
+    report = analyze_model_wall_thickness(model_file_url)
+    task_id = _current_task_id()
+    db_writer.run(lambda db: upsert_model_metadata(
+        db, model_id, commit=False, task_id=task_id, wall_thickness_report=report.dict()
+    ))
+    return _result(model_id)
+
+@celery_app.task(name="app.tasks.generate_model_lods_task", acks_late=True)
+def generate_model_lods_task(model_file_url: str, model_id: str) -> dict:
+    """Genera los niveles de detalle del modelo y reporta la reducción."""
+    triangles = load_mesh(model_file_url)
     db = SessionLocal()
     try:
-        meta = db.query(ModelMetadata).filter_by(model_id=model_id).first()
-        if not meta:
-            meta = ModelMetadata(model_id=model_id)
-            db.add(meta)
-        meta.vertices = report.vertices
-        meta.polygons = report.polygons
-        meta.file_size_kb = report.file_size_kb
-        meta.complexity_score = report.complexity_score
-        db.commit()
+        lods = store_model_lods(db, content_store, model_id, triangles, model_file_url)
+        original = lods[0].size_bytes
+        return {
+            "model_id": model_id,
+            "levels": [
+                {
+                    "level": lod.level,
+                    "triangles": lod.triangle_count,
+                    "size_ratio": lod.size_bytes / original,
+                    "max_error_mm": lod.max_error_mm,
+                }
+                for lod in lods
+            ],
+        }
     finally:
         db.close()
 
-@celery_app.task(name="app.tasks.predict_print_time_task")
-def predict_print_time_task(request_dict: dict, model_id: str) -> None:
-    """Predice y guarda el tiempo de impresión."""
-    req = PrintTimeRequest(**request_dict)
-    service = AIService()
-    result = service.predict_print_time(req)
+@celery_app.task(name="app.tasks.archive_model_file_task", acks_late=True)
+def archive_model_file_task(model_file_id: int, precision_mm: float = DEFAULT_PRECISION_MM) -> dict:
+    """Guarda la copia compacta (PMQ) de un archivo de modelo."""
+    db = SessionLocal()
+    try:
+        model_file = db.execute(MODEL_FILE_BY_ID, {"model_file_id": model_file_id}).scalars().first()
+        if not model_file or not model_file.file_path:
+            return {"model_file_id": model_file_id, "archived": False}
+        archive_model_file(db, content_store, model_file, precision_mm)
+        return {
+            "model_file_id": model_file_id,
+            "archived": True,
+            "archive_size": model_file.archive_size,
+            "original_size": model_file.file_size,
+        }
+    finally:
+        db.close()
+
+@celery_app.task(name="app.tasks.recompute_complexity_scores_task", acks_late=True)
+def recompute_complexity_scores_task(batch_size: int = 200) -> dict:
+    """Recalcula la complejidad de todo el catálogo en lotes paralelos."""
+    db = SessionLocal()
+    try:
+        ids = [
+            row.id for row in
+            db.query(ModelFile.id).filter(ModelFile.file_path.isnot(None)).order_by(ModelFile.id)
+        ]
+    finally:
+        db.close()
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    if batches:
+        group(recompute_complexity_batch_task.s(batch) for batch in batches).apply_async()
+    return {"models": len(ids), "batches": len(batches)}
+
+@celery_app.task(name="app.tasks.recompute_complexity_batch_task", acks_late=True)
+def recompute_complexity_batch_task(model_file_ids: list) -> dict:
+    """Recalcula y guarda la complejidad de un lote de archivos de modelo."""
+    engine = ComplexityEngine()
     db = SessionLocal()
     try:
-        meta = db.query(ModelMetadata).filter_by(model_id=model_id).first()
-        if not meta:
-            meta = ModelMetadata(model_id=model_id)
-            db.add(meta)
-        meta.estimated_time_minutes = result.estimated_time_minutes
-        db.commit()
+        files = db.query(ModelFile).filter(ModelFile.id.in_(model_file_ids)).all()
+        rows = []
+        failed = 0
+        for model_file in files:
+            try:
+                report = analyze_model_file(model_file.file_path, engine)
+            except (MeshLoadError, ValueError) as e:
+                logger.warning(f"Complexity recompute failed for model file {model_file.id}: {e}")
+                failed += 1
+                continue
+            rows.append({
+                "model_id": str(model_file.id),
+                "vertices": report.vertices,
+                "polygons": report.polygons,
+                "file_size_kb": report.file_size_kb,
+                "complexity_score": report.complexity_score,
+            })
     finally:
         db.close()
+    db_writer.run(lambda db: bulk_upsert_model_metadata(db, rows, commit=False))
+    return {"processed": len(files) - failed, "failed": failed}
@@ -9,7 +9,7 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-@celery_app.task(bind=True, max_retries=3)
+@celery_app.task(name="app.tasks.send_email_task", bind=True, max_retries=3)
 def send_email_task(self, to_email: str, subject: str, body: str, attachments: list = None):
     """Send email task"""
     try:
@@ -36,7 +36,7 @@ def send_email_task(self, to_email: str, subject: str, body: str, attachments: l
     finally:
         db.close()
 
-@celery_app.task(bind=True, max_retries=3)
+@celery_app.task(name="app.tasks.send_quote_email_task", bind=True, max_retries=3)
 def send_quote_email_task(self, quote_id: int, user_id: int):
     """Send quote email task"""
     try:
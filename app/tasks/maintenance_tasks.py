@@ -2,20 +2,25 @@
 """
 Maintenance and cleanup tasks
 """
+import json
 import os
 import shutil
 from datetime import datetime, timedelta
 from pathlib import Path
 from celery import current_app
 from app.core.celery import celery_app
-from app.core.database import SessionLocal
+from app.db.pagination import keyset_pages
+from app.db.session import replica_router, shard_router
+from app.db.sharding import DEFAULT_SHARD, tenants_on
+from app.services.dashboard_summary import reconcile_summaries
+from app.services.inventory_ledger import ensure_monthly_partitions
 from app.services.analytics_service import AnalyticsService
-from app.models.models import ModelFile, InventoryTransaction
+from app.db.models import ModelFile, InventoryTransaction
 import logging
 
 logger = logging.getLogger(__name__)
 
-@celery_app.task(bind=True, max_retries=2)
+@celery_app.task(name="app.tasks.cleanup_old_files_task", bind=True, max_retries=2)
 def cleanup_old_files_task(self, days_old: int = 30):
     """Clean up old temporary files"""
     try:
@@ -60,7 +65,7 @@ def cleanup_old_files_task(self, days_old: int = 30):
         
         return {"status": "failed", "error": str(exc)}
 
-@celery_app.task(bind=True, max_retries=2)
+@celery_app.task(name="app.tasks.backup_database_task", bind=True, max_retries=2)
 def backup_database_task(self):
     """Create database backup"""
     try:
@@ -82,52 +87,60 @@ def backup_database_task(self):
         
         return {"status": "failed", "error": str(exc)}
 
-@celery_app.task(bind=True, max_retries=2)
+@celery_app.task(name="app.tasks.generate_daily_analytics_task", bind=True, max_retries=2)
 def generate_daily_analytics_task(self):
     """Generate daily analytics reports"""
     try:
-        db = SessionLocal()
-        analytics_service = AnalyticsService(db)
-        
-        # Get all active users
-        from app.models.models import User
-        users = db.query(User).filter(User.is_active == True).all()
-        
-        reports = []
-        for user in users:
-            try:
-                stats = analytics_service.get_dashboard_stats(user.id)
-                project_stats = analytics_service.get_project_stats(user.id)
-                material_stats = analytics_service.get_material_stats(user.id)
-                
-                report = {
-                    "user_id": user.id,
-                    "date": datetime.now().date().isoformat(),
-                    "dashboard_stats": stats,
-                    "project_stats": project_stats,  
-                    "material_stats": material_stats
-                }
-                
-                reports.append(report)
-                
-            except Exception as e:
-                logger.error(f"Analytics generation failed for user {user.id}: {e}")
+        from app.db.models import User
+        users_processed = 0
+        users_failed = 0
         
-        # Save reports to file or database
+        # One JSON line per user, written as it is generated
         reports_dir = Path("reports")
         reports_dir.mkdir(exist_ok=True)
         
-        report_file = reports_dir / f"daily_analytics_{datetime.now().date().isoformat()}.json"
+        report_file = reports_dir / f"daily_analytics_{datetime.now().date().isoformat()}.jsonl"
         
-        import json
         with open(report_file, 'w') as f:
-            json.dump(reports, f, indent=2, default=str)
-        
-        logger.info(f"Daily analytics generated for {len(users)} users")
+            # Tenant rows live on the user's shard: aggregate shard by shard,
+            # with the ids of each shard read from the directory page by page
+            for name, shard in shard_router.each_shard():
+                active_users = tenants_on(name).where(User.is_active == True)
+                
+                for page in keyset_pages(replica_router.read_session, active_users, [User.id]):
+                    # Read-only aggregation, one short transaction per page: the
+                    # default shard is served by a read replica when available
+                    with replica_router.read_session() as reader:
+                        analytics_service = AnalyticsService(reader if name == DEFAULT_SHARD else shard)
+                        
+                        for user in page:
+                            users_processed += 1
+                            try:
+                                stats = analytics_service.get_dashboard_stats(user.id)
+                                project_stats = analytics_service.get_project_stats(user.id)
+                                material_stats = analytics_service.get_material_stats(user.id)
+                                
+                                report = {
+                                    "user_id": user.id,
+                                    "date": datetime.now().date().isoformat(),
+                                    "dashboard_stats": stats,
+                                    "project_stats": project_stats,  
+                                    "material_stats": material_stats
+                                }
+                                
+                                f.write(json.dumps(report, default=str) + "\n")
+                                
+                            except Exception as e:
+                                users_failed += 1
+                                logger.error(f"Analytics generation failed for user {user.id}: {e}")
+                    shard.close()
+        
+        logger.info(f"Daily analytics generated for {users_processed} users")
         
         return {
             "status": "success",
-            "users_processed": len(users),
+            "users_processed": users_processed,
+            "users_failed": users_failed,
             "report_file": str(report_file)
         }
         
@@ -138,6 +151,24 @@ def generate_daily_analytics_task(self):
             raise self.retry(countdown=3600)
         
         return {"status": "failed", "error": str(exc)}
-    
-    finally:
-        db.close()
\ No newline at end of file
+
+@celery_app.task(name="app.tasks.ensure_inventory_partitions_task")
+def ensure_inventory_partitions_task(months_ahead: int = 3) -> dict:
+    """Create the upcoming monthly partitions of the inventory ledger on every shard"""
+    partitions = []
+    for shard in shard_router.shards.values():
+        with shard.begin() as conn:
+            partitions.extend(ensure_monthly_partitions(conn, months_ahead))
+    logger.info(f"Inventory ledger partitions ensured: {partitions}")
+    return {"status": "success", "partitions": partitions}
+
+
+@celery_app.task(name="app.tasks.reconcile_dashboard_summaries_task")
+def reconcile_dashboard_summaries_task() -> dict:
+    """Recompute the dashboard summaries and fix rows that drifted"""
+    # On the primary of each shard: replica lag would show up as drift
+    fixed = 0
+    for name, db in shard_router.each_shard():
+        fixed += reconcile_summaries(db)
+    logger.info(f"Dashboard summaries reconciled, {fixed} rows fixed")
+    return {"status": "success", "rows_fixed": fixed}
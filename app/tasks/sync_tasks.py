@@ -2,37 +2,62 @@
 """
 Data synchronization tasks
 """
+import json
+from datetime import datetime
+from pathlib import Path
 from celery import current_app
+from sqlalchemy import select
 from app.core.celery import celery_app
 from app.services.marketplace_service import MarketplaceService
-from app.core.database import SessionLocal
-from app.models.models import User
+from app.db.pagination import keyset_pages
+from app.db.session import SessionLocal, replica_router
+from app.db.sharding import tenant_context
+from app.db.models import User
 import logging
 
 logger = logging.getLogger(__name__)
 
-@celery_app.task(bind=True, max_retries=3)
+@celery_app.task(name="app.tasks.sync_marketplace_data_task", bind=True, max_retries=3)
 def sync_marketplace_data_task(self):
     """Sync marketplace data for all users"""
     try:
         db = SessionLocal()
         
-        # Get all active users
-        users = db.query(User).filter(User.is_active == True).all()
+        # Active user ids in keyset pages, each read in its own short read
+        # session: no replica transaction stays open while users sync
+        active_users = select(User.id).where(User.is_active == True)
         
         marketplace_service = MarketplaceService(db)
         
-        results = []
-        for user in users:
-            try:
-                stats = marketplace_service.sync_marketplace_stats(user.id)
-                results.append({"user_id": user.id, "stats": stats})
-            except Exception as e:
-                logger.error(f"Sync failed for user {user.id}: {e}")
-                results.append({"user_id": user.id, "error": str(e)})
+        # Per-user results are appended to the day's JSONL file as they finish
+        reports_dir = Path("reports")
+        reports_dir.mkdir(exist_ok=True)
+        report_file = reports_dir / f"marketplace_sync_{datetime.now().date().isoformat()}.jsonl"
         
-        logger.info(f"Marketplace sync completed for {len(users)} users")
-        return {"status": "success", "results": results}
+        synced = 0
+        failed = 0
+        with open(report_file, 'a') as f:
+            for page in keyset_pages(replica_router.read_session, active_users, [User.id]):
+                for user in page:
+                    result = {"user_id": user.id, "synced_at": datetime.now().isoformat()}
+                    try:
+                        # Route the tenant tables to the user's shard
+                        with tenant_context(user.id):
+                            result["stats"] = marketplace_service.sync_marketplace_stats(user.id)
+                        synced += 1
+                    except Exception as e:
+                        logger.error(f"Sync failed for user {user.id}: {e}")
+                        result["error"] = str(e)
+                        failed += 1
+                    f.write(json.dumps(result, default=str) + "\n")
+        
+        logger.info(f"Marketplace sync completed for {synced + failed} users ({failed} failed)")
+        return {
+            "status": "success",
+            "users_synced": synced,
+            "users_failed": failed,
+            "report_file": str(report_file)
+        }
         
     except Exception as exc:
         logger.error(f"Marketplace sync task failed: {exc}")
@@ -45,7 +70,7 @@ def sync_marketplace_data_task(self):
     finally:
         db.close()
 
-@celery_app.task(bind=True, max_retries=3)
+@celery_app.task(name="app.tasks.sync_user_marketplace_data_task", bind=True, max_retries=3)
 def sync_user_marketplace_data_task(self, user_id: int):
     """Sync marketplace data for specific user"""
     try:
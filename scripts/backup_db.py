@@ -7,6 +7,7 @@ import os
 from datetime import datetime
 from pathlib import Path
 from app.core.config import settings
+from app.db.sqlite import backup_sqlite, restore_sqlite
 
 def create_backup():
     """Create database backup"""
@@ -59,8 +60,8 @@ def create_backup():
         db_file = settings.DATABASE_URL.replace("sqlite:///", "")
         backup_file = backup_dir / f"printoptimizer_backup_{timestamp}.db"
         
-        import shutil
-        shutil.copy2(db_file, backup_file)
+        # Online backup API: consistent even with pages still in the -wal file
+        backup_sqlite(db_file, str(backup_file))
         print(f"✓ Database backup created: {backup_file}")
         return str(backup_file)
     
@@ -82,9 +83,8 @@ def restore_backup(backup_file: str):
         
     elif "sqlite" in settings.DATABASE_URL and backup_file.endswith(".db"):
         # SQLite restore
-        import shutil
         db_file = settings.DATABASE_URL.replace("sqlite:///", "")
-        shutil.copy2(backup_file, db_file)
+        restore_sqlite(backup_file, db_file)
         print(f"✓ Database restored from: {backup_file}")
         return True
     
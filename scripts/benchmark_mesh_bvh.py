@@ -0,0 +1,63 @@
+# scripts/benchmark_mesh_bvh.py
+"""
+Benchmark of BVH build time and batched ray/segment throughput
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.mesh_bvh import MeshBVH
+from app.services.mesh_io import face_normals
+from app.services.wall_thickness import face_thickness
+
+def sphere(n_triangles, radius):
+    """UV sphere with roughly ``n_triangles`` faces"""
+    rings = max(int(np.sqrt(n_triangles / 4)), 4)
+    segments = 2 * rings
+    theta = np.linspace(0, np.pi, rings + 1)
+    phi = np.linspace(0, 2 * np.pi, segments, endpoint=False)
+    tt, pp = np.meshgrid(theta, phi, indexing="ij")
+    points = radius * np.stack([np.sin(tt) * np.cos(pp), np.sin(tt) * np.sin(pp), np.cos(tt)], axis=-1)
+    i, j = np.meshgrid(np.arange(rings), np.arange(segments), indexing="ij")
+    j1 = (j + 1) % segments
+    a, b, c, d = points[i, j], points[i + 1, j], points[i + 1, j1], points[i, j1]
+    triangles = np.concatenate([np.stack([a, b, c], axis=-2), np.stack([a, c, d], axis=-2)], axis=0)
+    return triangles.reshape(-1, 3, 3)
+
+def run_benchmark(n_triangles, n_rays, max_distance, radius):
+    triangles = sphere(n_triangles, radius)
+    print(f"Triangles: {len(triangles):,}")
+
+    start = time.perf_counter()
+    bvh = MeshBVH(triangles)
+    print(f"Build: {time.perf_counter() - start:.3f}s (depth {bvh.depth})")
+
+    rng = np.random.default_rng(0)
+    origins = rng.uniform(-radius, radius, size=(n_rays, 3))
+    directions = rng.normal(size=(n_rays, 3))
+    start = time.perf_counter()
+    t, _ = bvh.intersect(origins, directions)
+    elapsed = time.perf_counter() - start
+    print(f"Rays: {n_rays / elapsed:,.0f} rays/s ({np.isfinite(t).mean():.0%} hit)")
+
+    sample = triangles[rng.choice(len(triangles), size=min(n_rays, len(triangles)), replace=False)]
+    origins = sample.mean(axis=1)
+    directions = -face_normals(sample)
+    start = time.perf_counter()
+    bvh.intersect(origins, directions, max_t=max_distance, min_t=1e-6 * radius)
+    elapsed = time.perf_counter() - start
+    print(f"Segments ({max_distance} mm): {len(sample) / elapsed:,.0f} segments/s")
+
+    start = time.perf_counter()
+    face_thickness(triangles, max_distance=max_distance, bvh=bvh)
+    print(f"Full wall-thickness pass: {time.perf_counter() - start:.3f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the mesh BVH")
+    parser.add_argument("--triangles", type=int, default=1_000_000)
+    parser.add_argument("--rays", type=int, default=200_000)
+    parser.add_argument("--max-distance", type=float, default=0.8)
+    parser.add_argument("--radius", type=float, default=50.0)
+    args = parser.parse_args()
+    run_benchmark(args.triangles, args.rays, args.max_distance, args.radius)
@@ -0,0 +1,43 @@
+# scripts/benchmark_mesh_codec.py
+"""
+Benchmark of PMQ mesh encoding: size reduction and encode/decode throughput
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.mesh_codec import decode_mesh, encode_mesh
+from app.services.mesh_io import load_mesh, stl_bytes
+from scripts.benchmark_mesh_bvh import sphere
+
+def run_benchmark(triangles, precisions, repeats):
+    stl_size = len(stl_bytes(triangles))
+    print(f"Triangles: {len(triangles):,}  binary STL: {stl_size / 1e6:.1f} MB")
+    for precision in precisions:
+        encode_times, decode_times = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            encoded = encode_mesh(triangles, precision)
+            encode_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            decoded = decode_mesh(encoded)
+            decode_times.append(time.perf_counter() - start)
+        error = np.abs(np.sort(decoded.reshape(-1)) - np.sort(triangles.reshape(-1))).max()
+        encode_s, decode_s = min(encode_times), min(decode_times)
+        print(
+            f"precision {precision} mm: {len(encoded) / 1e6:.2f} MB ({stl_size / len(encoded):.1f}x), "
+            f"encode {len(triangles) / encode_s / 1e6:.2f} Mtri/s, "
+            f"decode {len(triangles) / decode_s / 1e6:.2f} Mtri/s, "
+            f"max coord error {error:.4g} mm"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the PMQ mesh codec")
+    parser.add_argument("stl", nargs="?", help="STL file to encode (default: synthetic sphere)")
+    parser.add_argument("--triangles", type=int, default=1_000_000)
+    parser.add_argument("--precision", type=float, action="append")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    mesh = load_mesh(args.stl) if args.stl else sphere(args.triangles, 50.0).astype(np.float32)
+    run_benchmark(mesh, args.precision or [0.001, 0.01], args.repeats)
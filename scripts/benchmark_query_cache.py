@@ -0,0 +1,95 @@
+# scripts/benchmark_query_cache.py
+"""
+Benchmark of the hot ModelMetadata lookups: legacy Query API, a select()
+built per call, a lambda_stmt and the prebuilt statements of
+app/db/queries.py
+
+Runs against an in-memory SQLite database so that the per-call Python
+overhead (statement construction, cache key, ORM setup) dominates. The
+compile cache hit rate comes from a separate instrumented pass.
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, lambda_stmt, select
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.instrumentation import StatementRecorder
+from app.db.models import ModelMetadata
+from app.db.queries import METADATA_BY_MODEL_ID, METADATA_GEOMETRY
+
+VARIANTS = {
+    "query": {
+        "entity": lambda db, model_id: db.query(ModelMetadata).filter_by(model_id=model_id).first(),
+        "columns": lambda db, model_id: db.query(
+            ModelMetadata.polygons, ModelMetadata.complexity_score
+        ).filter_by(model_id=model_id).first(),
+    },
+    "select": {
+        "entity": lambda db, model_id: db.execute(
+            select(ModelMetadata).filter_by(model_id=model_id)
+        ).scalars().first(),
+        "columns": lambda db, model_id: db.execute(
+            select(ModelMetadata.polygons, ModelMetadata.complexity_score).filter_by(model_id=model_id)
+        ).first(),
+    },
+    "lambda": {
+        "entity": lambda db, model_id: db.execute(lambda_stmt(
+            lambda: select(ModelMetadata).where(ModelMetadata.model_id == model_id)
+        )).scalars().first(),
+        "columns": lambda db, model_id: db.execute(lambda_stmt(
+            lambda: select(ModelMetadata.polygons, ModelMetadata.complexity_score)
+            .where(ModelMetadata.model_id == model_id)
+        )).first(),
+    },
+    "prebuilt": {
+        "entity": lambda db, model_id: db.execute(METADATA_BY_MODEL_ID, {"model_id": model_id}).scalars().first(),
+        "columns": lambda db, model_id: db.execute(METADATA_GEOMETRY, {"model_id": model_id}).first(),
+    },
+}
+
+def hit_rate(engine, lookup, ids):
+    recorder = StatementRecorder()
+    recorder.instrument(engine)
+    with Session(engine) as db:
+        for model_id in ids:
+            lookup(db, model_id)
+    recorder.uninstrument(engine)
+    return recorder.report()["compile_cache"]["hit_rate"]
+
+def run_benchmark(rows, calls, repeats):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all([ModelMetadata(model_id=f"m{i}", polygons=i, complexity_score=i / rows) for i in range(rows)])
+        db.commit()
+
+    ids = [f"m{i % rows}" for i in range(calls)]
+    print(f"{rows:,} rows, {calls:,} lookups per run, best of {repeats}")
+    for shape in ("entity", "columns"):
+        baseline = None
+        for name, lookups in VARIANTS.items():
+            lookup = lookups[shape]
+            best = float("inf")
+            for _ in range(repeats):
+                with Session(engine) as db:
+                    start = time.perf_counter()
+                    for model_id in ids:
+                        lookup(db, model_id)
+                    best = min(best, time.perf_counter() - start)
+            per_call = best / calls * 1e6
+            baseline = baseline or per_call
+            print(
+                f"{shape:8} {name:8} {per_call:7.1f} us/call  "
+                f"saved {baseline - per_call:6.1f} us ({baseline / per_call:.2f}x)  "
+                f"compile cache hit rate {hit_rate(engine, lookup, ids[:1000]):.3f}"
+            )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cached lookup statements")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.calls, args.repeats)
@@ -0,0 +1,108 @@
+# scripts/benchmark_sqlite_embedded.py
+"""
+Benchmark of the embedded (SQLite) mode under concurrent task load
+
+Writer threads play Celery tasks (read a ModelMetadata row, upsert it)
+while reader threads play API requests. Compares:
+
+* default: SQLite defaults (rollback journal), one commit per task;
+* wal: the embedded-mode pragmas, one commit per task;
+* wal+writer: the pragmas plus the single-writer queue with batched commits.
+"""
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.performance_optimization import DatabaseOptimizer
+from app.db.base import Base
+from app.db.queries import METADATA_BY_MODEL_ID
+from app.db.sqlite import SessionWriter, SingleWriter, configure_sqlite
+from app.services.metadata_store import upsert_model_metadata
+
+def percentile(samples, q):
+    return statistics.quantiles(samples, n=100)[q - 1] * 1e3 if len(samples) > 1 else float("nan")
+
+def run_mode(mode, directory, writers, readers, tasks, rows, batch_seconds):
+    engine = create_engine(f"sqlite:///{Path(directory) / f'{mode}.db'}", pool_size=writers + readers)
+    if mode != "default":
+        configure_sqlite(engine, DatabaseOptimizer.configure_sqlite_pragmas())
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    if mode == "wal+writer":
+        writer = SingleWriter(sessionmaker(bind=engine.execution_options(sqlite_begin="IMMEDIATE"), expire_on_commit=False), batch_seconds=batch_seconds)
+    else:
+        writer = SessionWriter(Session)
+
+    write_latency, read_latency, errors = [], [], []
+    done = threading.Event()
+
+    def task_worker(offset):
+        for i in range(tasks):
+            model_id = f"m{(offset * tasks + i) % rows}"
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.execute(METADATA_BY_MODEL_ID, {"model_id": model_id}).scalars().first()
+                writer.run(lambda db: upsert_model_metadata(db, model_id, commit=False, polygons=i))
+            except OperationalError as e:
+                errors.append(str(e.orig))
+                continue
+            write_latency.append(time.perf_counter() - start)
+
+    def api_reader():
+        i = 0
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.execute(METADATA_BY_MODEL_ID, {"model_id": f"m{i % rows}"}).scalars().first()
+            except OperationalError as e:
+                errors.append(str(e.orig))
+                continue
+            read_latency.append(time.perf_counter() - start)
+            i += 7
+
+    threads = [threading.Thread(target=api_reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    start = time.perf_counter()
+    task_threads = [threading.Thread(target=task_worker, args=(n,)) for n in range(writers)]
+    for t in task_threads:
+        t.start()
+    for t in task_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for t in threads:
+        t.join()
+    writer.close()
+    engine.dispose()
+
+    print(
+        f"{mode:11} {len(write_latency) / elapsed:8.0f} tasks/s  "
+        f"task p50 {percentile(write_latency, 50):6.2f} ms p99 {percentile(write_latency, 99):7.2f} ms  "
+        f"read p50 {percentile(read_latency, 50):5.2f} ms p99 {percentile(read_latency, 99):6.2f} ms  "
+        f"reads {len(read_latency):6}  errors {len(errors)}"
+        + (f" ({errors[0]})" if errors else "")
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark SQLite embedded mode under concurrent tasks")
+    parser.add_argument("--writers", type=int, default=8, help="Concurrent task threads")
+    parser.add_argument("--readers", type=int, default=4, help="Concurrent API reader threads")
+    parser.add_argument("--tasks", type=int, default=250, help="Tasks per writer thread")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--batch-seconds", type=float, default=settings.SQLITE_WRITE_BATCH_SECONDS)
+    args = parser.parse_args()
+    print(f"{args.writers} task threads x {args.tasks} tasks, {args.readers} reader threads")
+    with tempfile.TemporaryDirectory() as directory:
+        for mode in ("default", "wal", "wal+writer"):
+            run_mode(mode, directory, args.writers, args.readers, args.tasks, args.rows, args.batch_seconds)
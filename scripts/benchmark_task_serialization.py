@@ -0,0 +1,175 @@
+# scripts/benchmark_task_serialization.py
+"""
+Benchmark of Celery payload serialization and result memory in Redis
+
+Encodes representative task messages and result metas with the previous
+configuration (JSON) and with msgpack and msgpackz (msgpack plus zstd over
+the threshold, see app/core/task_serialization.py), reporting size and
+encode/decode time. Then estimates the result keys Redis holds after
+--days of a typical daily task mix: before, every result with no expiry;
+after, the per-task policy of app/core/task_results.py. With --redis the
+keys are written to that server (db is flushed) and INFO memory is read;
+otherwise the estimate is key plus value plus a fixed per-key overhead.
+
+    python scripts/benchmark_task_serialization.py
+    python scripts/benchmark_task_serialization.py --redis redis://localhost:6379/15
+"""
+import argparse
+import datetime
+import random
+import time
+import uuid
+
+from kombu.serialization import dumps, loads
+
+from app.core.task_results import RESULT_TTLS
+from app.core.task_serialization import SERIALIZER, register_serializer, zstandard
+
+# dictEntry, robj and SDS headers of a string key with expiry (approximate)
+REDIS_KEY_OVERHEAD = 90
+
+# Tasks per day in production-like load
+DAILY_TASKS = {
+    "app.tasks.generate_seo_title_task": 2000,
+    "app.tasks.generate_tags_task": 2000,
+    "app.tasks.analyze_complexity_task": 1500,
+    "app.tasks.generate_model_lods_task": 1500,
+    "app.tasks.recompute_complexity_batch_task": 250,
+    "app.tasks.send_email_task": 800,
+    "app.tasks.sync_marketplace_data_task": 288,
+    "app.tasks.sync_user_marketplace_data_task": 400,
+    "app.tasks.cleanup_old_files_task": 1,
+    "app.tasks.reconcile_dashboard_summaries_task": 24,
+}
+
+def task_message(args):
+    """Body of a protocol 2 task message: (args, kwargs, embed)."""
+    return [args, {}, {"callbacks": None, "errbacks": None, "chain": None, "chord": None}]
+
+def result_meta(result):
+    return {
+        "status": "SUCCESS",
+        "result": result,
+        "traceback": None,
+        "children": [],
+        "date_done": datetime.datetime.utcnow().isoformat(),
+        "task_id": str(uuid.uuid4()),
+    }
+
+def sample_payloads(seed=7):
+    rng = random.Random(seed)
+    gcode_summary = {
+        "print_time_minutes": 412.7,
+        "filament_length_mm": 18234.5,
+        "filament_weight_g": 54.3,
+        "layer_count": 1200,
+        "move_count": 912345,
+        "max_z_mm": 240.0,
+        "extrusion_per_layer_mm": [round(rng.uniform(5, 40), 3) for _ in range(1200)],
+    }
+    return {
+        "message: seo title": task_message(["3f9c2a7e-model"]),
+        "message: print time": task_message([
+            {"material": "PLA", "printer_profile": "prusa_mk4", "layer_height": 0.2, "infill": 20},
+            "3f9c2a7e-model",
+        ]),
+        "message: batch manifest": task_message([sorted(rng.sample(range(1, 2_000_000), 200))]),
+        "result: None (AI task)": result_meta(None),
+        "result: LOD summary": result_meta({
+            "model_id": "3f9c2a7e-model",
+            "levels": [
+                {"level": i, "triangles": 200_000 >> (2 * i), "size_ratio": 1 / 4 ** i, "max_error_mm": 0.05 * i}
+                for i in range(4)
+            ],
+        }),
+        "result: G-code summary": result_meta(gcode_summary),
+    }
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        value = fn()
+    return value, (time.perf_counter() - start) / repeat * 1e6
+
+def encoded_size(serializer, payload):
+    _, _, data = dumps(payload, serializer=serializer)
+    return len(data.encode() if isinstance(data, str) else data)
+
+def benchmark_codecs(payloads, repeat):
+    serializers = ["json", "msgpack", SERIALIZER]
+    print(f"zstd {'available' if zstandard is not None else 'not installed: msgpackz stays uncompressed'}")
+    print(f"{'payload':26} " + " ".join(f"{name:>28}" for name in serializers))
+    for name, payload in payloads.items():
+        cells = []
+        for serializer in serializers:
+            (content_type, encoding, data), encode_us = timed(lambda: dumps(payload, serializer=serializer), repeat)
+            _, decode_us = timed(lambda: loads(data, content_type, encoding, accept=[content_type]), repeat)
+            cells.append(f"{encoded_size(serializer, payload):7,d} B {encode_us:6.1f}/{decode_us:6.1f} us")
+        print(f"{name:26} " + " ".join(f"{cell:>28}" for cell in cells))
+
+def result_for(task, payloads):
+    if task == "app.tasks.generate_model_lods_task":
+        return payloads["result: LOD summary"]
+    if task.startswith("app.tasks.generate_") or task == "app.tasks.analyze_complexity_task":
+        return payloads["result: None (AI task)"]
+    return result_meta({"status": "success", "results": {"synced": 12, "skipped": 3}})
+
+def live_keys(days):
+    """Result keys alive after ``days`` days: (task, count) before and after."""
+    seconds = days * 86400
+    before = {task: per_day * days for task, per_day in DAILY_TASKS.items()}
+    after = {}
+    for task, per_day in DAILY_TASKS.items():
+        ttl = RESULT_TTLS[task]
+        after[task] = 0 if ttl is None else int(per_day * min(ttl, seconds) / 86400)
+    return before, after
+
+def estimate_memory(counts, serializer, payloads):
+    total = 0
+    for task, count in counts.items():
+        key = f"celery-task-meta-{uuid.uuid4()}"
+        total += count * (len(key) + encoded_size(serializer, result_for(task, payloads)) + REDIS_KEY_OVERHEAD)
+    return total
+
+def measure_redis(url, counts, serializer, payloads):
+    import redis
+
+    client = redis.Redis.from_url(url)
+    client.flushdb()
+    baseline = client.info("memory")["used_memory"]
+    pipe = client.pipeline(transaction=False)
+    for task, count in counts.items():
+        ttl = RESULT_TTLS[task] if serializer == SERIALIZER else None
+        _, _, value = dumps(result_for(task, payloads), serializer=serializer)
+        for _ in range(count):
+            key = f"celery-task-meta-{uuid.uuid4()}"
+            pipe.set(key, value, ex=ttl)
+            if len(pipe) >= 1000:
+                pipe.execute()
+    pipe.execute()
+    used = client.info("memory")["used_memory"] - baseline
+    client.flushdb()
+    return used
+
+def benchmark_memory(payloads, days, redis_url):
+    before, after = live_keys(days)
+    method = f"measured on {redis_url}" if redis_url else "estimated"
+    print(f"\nresult keys after {days} days ({method})")
+    for label, counts, serializer in (("before: json, no expiry", before, "json"),
+                                      (f"after: {SERIALIZER}, per-task TTL", after, SERIALIZER)):
+        if redis_url:
+            memory = measure_redis(redis_url, counts, serializer, payloads)
+        else:
+            memory = estimate_memory(counts, serializer, payloads)
+        print(f"{label:34} {sum(counts.values()):9,d} keys  {memory / 1e6:8.1f} MB")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark Celery serialization and result memory")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--redis", help="Redis URL to measure memory on (the db is flushed)")
+    args = parser.parse_args()
+    register_serializer()
+    payloads = sample_payloads()
+    benchmark_codecs(payloads, args.repeat)
+    benchmark_memory(payloads, args.days, args.redis)
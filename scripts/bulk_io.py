@@ -0,0 +1,84 @@
+# scripts/bulk_io.py
+"""
+Bulk import/export of materials, projects and quotes.
+
+The format comes from the file extension (.csv, .jsonl/.ndjson, .npz).
+Rejected rows go to a rejects file (CSV or JSONL, default
+<input>.rejects.jsonl) with their line number and the reason, e.g.:
+
+    python scripts/bulk_io.py import materials catalog.csv --user-id 3
+    python scripts/bulk_io.py export quotes quotes.jsonl --user-id 3
+"""
+import argparse
+import sys
+import time
+
+from app.db.session import SessionLocal
+from app.services.bulk_io import (
+    DEFAULT_CHUNK_ROWS,
+    ENTITIES,
+    BulkFormatError,
+    RejectWriter,
+    detect_format,
+    import_file,
+    iter_export,
+)
+
+def run_import(args):
+    fmt = args.format or detect_format(args.file)
+    rejects_path = args.rejects or f"{args.file}.rejects.jsonl"
+    start = time.perf_counter()
+
+    def progress(report):
+        done = report.imported + report.rejected
+        print(
+            f"\r{done:,} rows  {report.imported:,} imported  {report.rejected:,} rejected  "
+            f"{done / (time.perf_counter() - start):,.0f} rows/s",
+            end="", file=sys.stderr, flush=True,
+        )
+
+    with open(args.file, "rb") as source, open(rejects_path, "w", encoding="utf-8", newline="") as rejects_file, \
+            SessionLocal(info={"tenant_id": args.user_id}) as db:
+        report = import_file(
+            db, args.entity, source, fmt,
+            user_id=args.user_id,
+            chunk_rows=args.chunk_rows,
+            rejects=RejectWriter(rejects_file, detect_format(rejects_path)),
+            progress=progress,
+        )
+    print(file=sys.stderr)
+    print(f"{report.imported:,} {args.entity} imported, {report.rejected:,} rejected")
+    if report.rejected:
+        print(f"Rejected rows written to {rejects_path}")
+    return 1 if report.rejected else 0
+
+def run_export(args):
+    fmt = args.format or detect_format(args.file)
+    with open(args.file, "wb") as target, SessionLocal(info={"tenant_id": args.user_id}) as db:
+        for data in iter_export(db, args.entity, fmt, args.user_id):
+            target.write(data)
+    print(f"{args.entity} exported to {args.file}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export of materials, projects and quotes")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, handler in (("import", run_import), ("export", run_export)):
+        command = commands.add_parser(name)
+        command.add_argument("entity", choices=sorted(ENTITIES))
+        command.add_argument("file")
+        command.add_argument("--format", choices=["csv", "jsonl", "npz"], help="Override the extension")
+        command.add_argument("--user-id", type=int, help="Owner of rows without user_id / export filter")
+        command.set_defaults(handler=handler)
+        if name == "import":
+            command.add_argument("--rejects", help="Rejects file (.csv or .jsonl)")
+            command.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+    try:
+        return args.handler(args)
+    except BulkFormatError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
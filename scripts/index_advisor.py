@@ -0,0 +1,172 @@
+# scripts/index_advisor.py
+"""
+Index advisor for the hot query shapes of the business metrics.
+
+Replays the MetricsCollector query shapes under a QueryShapeRecorder,
+runs EXPLAIN on them and prints the proposed composite/partial indexes.
+With --apply it creates them (CONCURRENTLY on PostgreSQL) and prints
+before/after timings. --seed fills a scratch database first, e.g.:
+
+    python scripts/index_advisor.py --url sqlite:///advisor.db --seed 200000 --apply
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from app.db.index_advisor import IndexAdvisor, QueryShapeRecorder, normalize_statement
+
+# Columns used by the workload, as created by 001_initial_migration
+SEED_METADATA = sa.MetaData()
+sa.Table(
+    "users", SEED_METADATA,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("email", sa.String(100)),
+    sa.Column("role", sa.String(20)),
+    sa.Column("created_at", sa.DateTime(timezone=True)),
+    sa.Column("updated_at", sa.DateTime(timezone=True)),
+)
+sa.Table(
+    "projects", SEED_METADATA,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("status", sa.String(20)),
+    sa.Column("budget", sa.Float),
+    sa.Column("client_name", sa.String(100)),
+    sa.Column("created_at", sa.DateTime(timezone=True)),
+    sa.Column("updated_at", sa.DateTime(timezone=True)),
+)
+sa.Table(
+    "quotes", SEED_METADATA,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("status", sa.String(20)),
+    sa.Column("total_amount", sa.Float),
+)
+sa.Table(
+    "materials", SEED_METADATA,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("current_stock", sa.Float),
+    sa.Column("low_stock_threshold", sa.Float),
+)
+
+def seed(engine, rows, seed_value=7):
+    """Populate a scratch database with a realistic status/date skew."""
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    SEED_METADATA.create_all(engine)
+    tables = SEED_METADATA.tables
+
+    def when():
+        return now - timedelta(days=rng.expovariate(1 / 365))
+
+    with engine.begin() as conn:
+        for table in tables.values():
+            conn.execute(table.delete())
+        conn.execute(tables["users"].insert(), [
+            {"email": f"user{i}@example.com", "role": rng.choices(["user", "admin", "viewer"], [90, 2, 8])[0],
+             "created_at": when(), "updated_at": when()}
+            for i in range(rows)
+        ])
+        conn.execute(tables["projects"].insert(), [
+            {"status": rng.choices(["completed", "in_progress", "planning", "cancelled"], [10, 30, 50, 10])[0],
+             "budget": rng.uniform(10, 500), "client_name": f"client {i % 500}",
+             "created_at": when(), "updated_at": when()}
+            for i in range(rows)
+        ])
+        conn.execute(tables["quotes"].insert(), [
+            {"status": rng.choices(["accepted", "sent", "draft", "rejected"], [15, 40, 35, 10])[0],
+             "total_amount": rng.uniform(10, 500)}
+            for _ in range(rows)
+        ])
+        conn.execute(tables["materials"].insert(), [
+            {"current_stock": rng.uniform(0, 100), "low_stock_threshold": rng.choice([0.5, 1, 2, 5])}
+            for _ in range(rows)
+        ])
+
+def metrics_workload(engine):
+    """The MetricsCollector query shapes, against the reflected tables."""
+    meta = sa.MetaData()
+    users, projects, quotes, materials = (
+        sa.Table(name, meta, autoload_with=engine) for name in ("users", "projects", "quotes", "materials")
+    )
+    now = datetime.utcnow()
+    month_ago = now - timedelta(days=30)
+    month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    count = sa.func.count()
+    return [
+        sa.select(sa.func.sum(projects.c.budget)).where(projects.c.status == "completed"),
+        sa.select(sa.func.sum(projects.c.budget)).where(
+            projects.c.status == "completed", projects.c.updated_at >= month_ago
+        ),
+        sa.select(count).select_from(projects).where(projects.c.status == "completed"),
+        sa.select(count).select_from(users).where(users.c.role == "user"),
+        sa.select(count).select_from(users).where(users.c.role == "user", users.c.updated_at >= month_ago),
+        sa.select(count).select_from(users).where(users.c.role == "user", users.c.created_at >= month_start),
+        sa.select(count).select_from(quotes).where(quotes.c.status == "accepted"),
+        sa.select(count).select_from(materials).where(
+            materials.c.current_stock <= materials.c.low_stock_threshold
+        ),
+    ]
+
+def time_workload(engine, statements, repeats):
+    """Median seconds per query shape."""
+    timings = {}
+    with engine.connect() as conn:
+        for statement in statements:
+            samples = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                conn.execute(statement).all()
+                samples.append(time.perf_counter() - start)
+            sql = str(statement.compile(dialect=engine.dialect))
+            timings[normalize_statement(sql)] = statistics.median(samples)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose indexes for the metrics query shapes")
+    parser.add_argument("--url", help="Database URL (default: settings.DATABASE_URL)")
+    parser.add_argument("--seed", type=int, help="Rows per table to seed before analyzing")
+    parser.add_argument("--min-rows", type=int, default=1000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--apply", action="store_true", help="Create the proposed indexes")
+    args = parser.parse_args()
+
+    if args.url:
+        url = args.url
+    else:
+        from app.core.config import settings
+        url = str(settings.DATABASE_URL)
+    engine = sa.create_engine(url)
+    if args.seed:
+        start = time.perf_counter()
+        seed(engine, args.seed)
+        print(f"Seeded {args.seed:,} rows per table in {time.perf_counter() - start:.1f}s")
+
+    statements = metrics_workload(engine)
+    recorder = QueryShapeRecorder()
+    with recorder.record(engine):
+        before = time_workload(engine, statements, args.repeats)
+
+    advisor = IndexAdvisor(engine, min_rows=args.min_rows)
+    for advice in advisor.analyze(recorder.shapes.values()):
+        scans = ", ".join(advice.full_scans) or "-"
+        print(f"\n{normalize_statement(advice.shape.statement)}\n  calls={advice.shape.calls} full scans: {scans}")
+        for proposal in advice.proposals:
+            print(f"  -> {proposal.ddl(engine.dialect.name)}")
+
+    proposals = advisor.propose(recorder.shapes.values())
+    print("\nProposed indexes:" if proposals else "\nNo indexes to propose")
+    for proposal in proposals:
+        print(f"  {proposal.ddl(engine.dialect.name)};")
+
+    if args.apply and proposals:
+        advisor.apply(proposals)
+        after = time_workload(engine, statements, args.repeats)
+        print(f"\n{'before ms':>10} {'after ms':>10} {'speedup':>8}  query")
+        for sql, seconds in before.items():
+            print(f"{seconds * 1e3:10.2f} {after[sql] * 1e3:10.2f} {seconds / after[sql]:7.1f}x  {sql[:90]}")
+
+if __name__ == "__main__":
+    main()
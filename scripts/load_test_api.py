@@ -0,0 +1,64 @@
+# scripts/load_test_api.py
+"""
+Concurrent load test for API endpoints.
+
+Run it against a live server before and after a change to compare
+throughput and latency, e.g.:
+
+    python scripts/load_test_api.py http://localhost:8000 /ready /api/v1/ai/result/<task_id> -c 100 -d 30
+
+Requests during --warmup seconds (pool connections, first statement
+compiles) are sent but not counted.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+
+import httpx
+
+async def worker(client, paths, measure_from, deadline, latencies, statuses, offset):
+    i = offset
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            response = await client.get(path)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        if start < measure_from:
+            continue
+        statuses[status] += 1
+        if isinstance(status, int):
+            latencies.append(time.perf_counter() - start)
+
+async def run_load_test(base_url, paths, concurrency, duration, warmup=0.0):
+    latencies, statuses = [], Counter()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        start = time.perf_counter() + warmup
+        deadline = start + duration
+        await asyncio.gather(*(
+            worker(client, paths, start, deadline, latencies, statuses, i) for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    print(f"Concurrency: {concurrency}  duration: {elapsed:.1f}s  requests: {len(latencies)}")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        q = statistics.quantiles(latencies, n=100)
+        print(f"Latency ms: p50={q[49] * 1000:.1f} p95={q[94] * 1000:.1f} p99={q[98] * 1000:.1f} max={max(latencies) * 1000:.1f}")
+    print("Status codes: " + ", ".join(f"{code}={count}" for code, count in sorted(statuses.items(), key=str)))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent GET load test")
+    parser.add_argument("base_url")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("-c", "--concurrency", type=int, default=50)
+    parser.add_argument("-d", "--duration", type=float, default=20.0)
+    parser.add_argument("-w", "--warmup", type=float, default=2.0)
+    args = parser.parse_args()
+    asyncio.run(run_load_test(args.base_url, args.paths, args.concurrency, args.duration, args.warmup))
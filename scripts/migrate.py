@@ -53,6 +53,25 @@ def show_migration_history():
     """Show migration history"""
     run_command("alembic history", "Show migration history")
 
+def show_backfills():
+    """Show the progress checkpoints of the online-migration backfills"""
+    from sqlalchemy import inspect, select
+    from app.db.models import OnlineMigrationCheckpoint
+    from app.db.session import SessionLocal
+
+    with SessionLocal() as db:
+        if not inspect(db.get_bind()).has_table(OnlineMigrationCheckpoint.__tablename__):
+            print("No backfills recorded")
+            return
+        checkpoints = db.execute(
+            select(OnlineMigrationCheckpoint).order_by(OnlineMigrationCheckpoint.started_at)
+        ).scalars().all()
+    for c in checkpoints:
+        status = f"completed {c.completed_at:%Y-%m-%d %H:%M}" if c.completed_at else f"in progress, last key {c.last_key}"
+        print(f"{c.name}: {c.rows_done} rows changed in {c.batches} batches, {status}")
+    if not checkpoints:
+        print("No backfills recorded")
+
 def main():
     """Main migration management function"""
     if len(sys.argv) < 2:
@@ -63,6 +82,7 @@ def main():
         print("  python scripts/migrate.py downgrade <revision> # Downgrade database")
         print("  python scripts/migrate.py current              # Show current revision")
         print("  python scripts/migrate.py history              # Show migration history")
+        print("  python scripts/migrate.py backfills            # Show online backfill progress")
         sys.exit(1)
     
     command = sys.argv[1]
@@ -92,6 +112,9 @@ def main():
         elif command == "history":
             show_migration_history()
             
+        elif command == "backfills":
+            show_backfills()
+            
         else:
             print(f"Unknown command: {command}")
             sys.exit(1)
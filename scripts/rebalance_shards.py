@@ -0,0 +1,86 @@
+# scripts/rebalance_shards.py
+"""
+Tenant placement across the database shards (see app/db/sharding.py).
+
+    python scripts/rebalance_shards.py status
+    python scripts/rebalance_shards.py move 42 shard2
+    python scripts/rebalance_shards.py plan --top 5
+    python scripts/rebalance_shards.py reserve-ids
+
+`move` copies the tenant online and freezes its writes only for the final
+sync (the frozen time is printed). `plan` lists the largest tenants of the
+busiest shard and the emptiest target, without moving anything.
+`reserve-ids` gives every PostgreSQL shard its own id range, so moved rows
+keep their ids; run it once after adding a shard.
+"""
+import argparse
+import sys
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.sharding import DIRECTORY, ShardMoveError, move_tenant, reserve_id_range, shard_loads, tenant_rows
+from app.db.session import shard_router
+
+def run_status(args):
+    for name, load in shard_loads(shard_router).items():
+        print(f"{name:20} {load['tenants']:8,} tenants {load['rows']:12,} rows")
+    with shard_router.directory.connect() as conn:
+        moving = conn.execute(select(DIRECTORY).where(DIRECTORY.c.state != "active")).all()
+    for entry in moving:
+        print(f"tenant {entry.user_id} frozen: {entry.state} from {entry.shard} to {entry.moving_to}")
+    return 0
+
+def run_plan(args):
+    loads = shard_loads(shard_router)
+    source = max(loads, key=lambda name: loads[name]["rows"])
+    target = min(loads, key=lambda name: loads[name]["rows"])
+    with shard_router.directory.connect() as conn:
+        tenants = conn.execute(select(DIRECTORY.c.user_id).where(DIRECTORY.c.shard == source)).scalars().all()
+    sizes = sorted(((tenant_rows(shard_router, user_id), user_id) for user_id in tenants), reverse=True)
+    print(f"busiest shard {source} ({loads[source]['rows']:,} rows), emptiest {target} ({loads[target]['rows']:,} rows)")
+    for rows, user_id in sizes[:args.top]:
+        print(f"  python scripts/rebalance_shards.py move {user_id} {target}    # {rows:,} rows")
+    return 0
+
+def run_move(args):
+    try:
+        result = move_tenant(
+            shard_router, args.user_id, args.target,
+            batch_size=args.batch_size,
+            settle_seconds=settings.SHARD_MOVE_SETTLE_SECONDS,
+        )
+    except ShardMoveError as e:
+        print(f"Move failed: {e}", file=sys.stderr)
+        return 1
+    print(
+        f"tenant {result.user_id} moved {result.source} -> {result.target}: "
+        f"{result.rows_copied:,} rows copied, {result.rows_synced:,} synced, "
+        f"{result.rows_deleted:,} deleted from source, writes frozen {result.frozen_seconds:.2f}s"
+    )
+    return 0
+
+def run_reserve_ids(args):
+    for index, (name, engine) in enumerate(shard_router.shards.items()):
+        reserve_id_range(engine, index, settings.SHARD_ID_STRIDE)
+        print(f"{name}: ids from {index * settings.SHARD_ID_STRIDE + 1:,}")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Tenant placement across the database shards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("status").set_defaults(handler=run_status)
+    plan = commands.add_parser("plan")
+    plan.add_argument("--top", type=int, default=5)
+    plan.set_defaults(handler=run_plan)
+    move = commands.add_parser("move")
+    move.add_argument("user_id", type=int)
+    move.add_argument("target", choices=sorted(shard_router.shards))
+    move.add_argument("--batch-size", type=int, default=settings.SHARD_MOVE_BATCH_SIZE)
+    move.set_defaults(handler=run_move)
+    commands.add_parser("reserve-ids").set_defaults(handler=run_reserve_ids)
+    args = parser.parse_args()
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
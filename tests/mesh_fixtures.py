@@ -0,0 +1,42 @@
+# tests/mesh_fixtures.py
+"""
+Mallas sintéticas para las pruebas de geometría
+"""
+import numpy as np
+
+def box(sx=1.0, sy=1.0, sz=1.0, origin=(0.0, 0.0, 0.0)):
+    """Caja cerrada de 12 triángulos con normales hacia afuera."""
+    v = np.array([[x, y, z] for x in (0, sx) for y in (0, sy) for z in (0, sz)], dtype=np.float32)
+    v += np.asarray(origin, dtype=np.float32)
+    faces = [
+        (0, 1, 3), (0, 3, 2), (4, 6, 7), (4, 7, 5),
+        (0, 4, 5), (0, 5, 1), (2, 3, 7), (2, 7, 6),
+        (0, 2, 6), (0, 6, 4), (1, 5, 7), (1, 7, 3),
+    ]
+    return v[np.array(faces)]
+
+def torus(major=10.0, minor=3.0, n_major=48, n_minor=24):
+    """Toro cerrado (género 1) triangulado sobre una grilla regular."""
+    u = np.linspace(0, 2 * np.pi, n_major, endpoint=False)
+    w = np.linspace(0, 2 * np.pi, n_minor, endpoint=False)
+    uu, ww = np.meshgrid(u, w, indexing="ij")
+    points = np.stack([
+        (major + minor * np.cos(ww)) * np.cos(uu),
+        (major + minor * np.cos(ww)) * np.sin(uu),
+        minor * np.sin(ww) + minor,
+    ], axis=-1).reshape(-1, 3)
+    i, j = np.meshgrid(np.arange(n_major), np.arange(n_minor), indexing="ij")
+    a = i * n_minor + j
+    b = ((i + 1) % n_major) * n_minor + j
+    c = ((i + 1) % n_major) * n_minor + (j + 1) % n_minor
+    d = i * n_minor + (j + 1) % n_minor
+    faces = np.concatenate([
+        np.stack([a, b, c], axis=-1).reshape(-1, 3),
+        np.stack([a, c, d], axis=-1).reshape(-1, 3),
+    ])
+    return points[faces].astype(np.float32)
+
+def rotate_z(triangles, angle):
+    c, s = np.cos(angle), np.sin(angle)
+    rot = np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]], dtype=np.float32)
+    return triangles @ rot.T
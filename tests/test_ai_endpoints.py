@@ -76,6 +76,21 @@ def test_result_success_returns_data(client, in_memory_db, monkeypatch):
     assert payload["data"]["seo_title"] == "A"
     assert payload["data"]["estimated_time_minutes"] == 5.0
 
+def test_result_of_an_earlier_task_reads_the_model_row(client, in_memory_db, monkeypatch):
+    # A later task on the same model has re-stamped the row with its own id
+    session = in_memory_db()
+    session.add(ModelMetadata(model_id="foo", seo_title="A", tags=["x"], task_id="later"))
+    session.commit()
+
+    class FakeResult:
+        state = "SUCCESS"
+        result = {"model_id": "foo"}
+    monkeypatch.setattr("app.api.ai.celery_app.AsyncResult", lambda tid: FakeResult())
+
+    resp = client.get("/api/v1/ai/result/earlier")
+    assert resp.status_code == 200
+    assert resp.json()["data"]["seo_title"] == "A"
+
 def test_result_failure_returns_error(client, in_memory_db, monkeypatch):
     # Stub AsyncResult to return FAILURE
     class FakeResultFail:
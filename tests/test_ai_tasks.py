@@ -6,12 +6,15 @@ from sqlalchemy.orm import sessionmaker
 from celery import Celery
 
 from app.core.config import settings
+from app.core.task_batching import BatchItem
 from app.db.base import Base
 from app.db.models import ModelMetadata
+from app.db.sqlite import SessionWriter
 from app.tasks.ai_tasks import (
     generate_seo_title_task,
     generate_market_description_task,
     generate_tags_task,
+    generate_tags_batch,
     analyze_complexity_task,
     predict_print_time_task,
 )
@@ -25,6 +28,7 @@ def in_memory_db(monkeypatch):
     TestingSessionLocal = sessionmaker(bind=engine)
     Base.metadata.create_all(bind=engine)
     monkeypatch.setattr("app.tasks.ai_tasks.SessionLocal", TestingSessionLocal)
+    monkeypatch.setattr("app.tasks.ai_tasks.db_writer", SessionWriter(TestingSessionLocal))
     return TestingSessionLocal
 
 # Fixture: Celery eager mode
@@ -43,6 +47,8 @@ class StubService(AIService):
         return "Stub Description"
     def generate_tags(self, model_id):
         return ["tag1", "tag2"]
+    def generate_tags_batch(self, model_ids):
+        return {model_id: ["tag1"] for model_id in model_ids}
     def analyze_complexity(self, url):
         return ComplexityReport(vertices=10, polygons=20, file_size_kb=1.5, complexity_score=0.75)
     def predict_print_time(self, req):
@@ -73,6 +79,16 @@ def test_generate_tags_persists(in_memory_db):
     meta = db.query(ModelMetadata).filter_by(model_id=model_id).one()
     assert meta.tags == ["tag1", "tag2"]
 
+def test_tags_batch_result_names_the_model_of_each_key(in_memory_db):
+    items = [BatchItem("item1", "model3"), BatchItem("item2", "model6")]
+    # Items repeating a key receive this same result, which /result resolves by model_id
+    assert generate_tags_batch.handler(items) == {
+        "model3": {"model_id": "model3"},
+        "model6": {"model_id": "model6"},
+    }
+    db = in_memory_db()
+    assert db.query(ModelMetadata).filter_by(model_id="model6").one().tags == ["tag1"]
+
 def test_analyze_complexity_persists(in_memory_db):
     model_id = "model4"
     analyze_complexity_task("http://example.com/model.stl", model_id)
@@ -0,0 +1,138 @@
+# tests/test_bulk_io.py
+
+import io
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import Material, Project, Quote, User, UserDashboardSummary
+from app.services.bulk_io import (
+    BulkFormatError,
+    RejectWriter,
+    copy_rows,
+    import_file,
+    iter_export,
+)
+
+# Fixture: SQLite file with foreign keys enforced, so the database can reject rows
+@pytest.fixture
+def session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bulk.db'}")
+
+    @event.listens_for(engine, "connect")
+    def _foreign_keys(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA foreign_keys=ON")
+
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([User(id=1, name="ana", email="ana@example.com"), User(id=2, name="luis", email="luis@example.com")])
+    session.commit()
+    yield session
+    session.close()
+    engine.dispose()
+
+def _export(session, entity, fmt, user_id=None):
+    return b"".join(iter_export(session, entity, fmt, user_id, batch_rows=2))
+
+CATALOG = (
+    "name,brand,material_type,color,current_stock,unit,cost_per_unit,properties\n"
+    "PLA Basic,Acme,filament,black,2.5,kg,20.5,\"{\"\"diameter\"\": 1.75}\"\n"
+    ",Acme,FILAMENT,white,1,kg,19\n"
+    "Resin X,Acme,liquid,grey,1,l,35\n"
+    "PETG,Acme,FILAMENT,red,lots,kg,25\n"
+    "Nylon,Acme,POWDER,,0.5,kg,\n"
+    "TPU,Acme,FILAMENT,blue,0.2,kg,30\n"
+)
+
+def test_csv_import_validates_rows_and_reports_rejects(session):
+    rejects = io.StringIO()
+    progress = []
+    report = import_file(
+        session, "materials", io.BytesIO(CATALOG.encode()), "csv",
+        user_id=1, chunk_rows=4, rejects=RejectWriter(rejects, "jsonl"), progress=lambda r: progress.append(r.imported),
+    )
+
+    assert (report.imported, report.rejected) == (2, 4)
+    assert [e["line"] for e in report.errors] == [3, 4, 5, 6]
+    assert report.errors[0]["error"] == "name: obligatorio"
+    assert report.errors[1]["error"].startswith("material_type: debe ser uno de")
+    assert report.errors[2]["error"] == "current_stock: no es un número"
+    assert report.errors[3]["error"] == "cost_per_unit: obligatorio"
+    assert progress == [1, 2]
+
+    rejected = [json.loads(line) for line in rejects.getvalue().splitlines()]
+    assert rejected[2]["_line"] == 5 and rejected[2]["current_stock"] == "lots"
+
+    pla = session.execute(select(Material).where(Material.name == "PLA Basic")).scalar_one()
+    assert (pla.material_type, pla.current_stock, pla.user_id, pla.is_active) == ("FILAMENT", 2.5, 1, True)
+    assert pla.properties == {"diameter": 1.75}
+
+def test_database_rejections_are_isolated_row_by_row(session):
+    rows = [
+        {"client_name": "a", "total_amount": 10, "status": "sent", "user_id": 1},
+        {"client_name": "b", "total_amount": 20, "status": "sent", "user_id": 99},
+        {"client_name": "c", "total_amount": 30, "status": "accepted", "user_id": 2},
+    ]
+    data = "\n".join(json.dumps(row) for row in rows) + "\nnot json\n"
+    report = import_file(session, "quotes", io.BytesIO(data.encode()), "jsonl")
+
+    assert (report.imported, report.rejected) == (2, 2)
+    assert [e["line"] for e in report.errors] == [2, 4]
+    assert "FOREIGN KEY" in report.errors[0]["error"]
+    assert session.execute(select(Quote.client_name).order_by(Quote.id)).scalars().all() == ["a", "c"]
+
+def test_import_refreshes_dashboard_summaries(session):
+    data = (
+        "name,status,budget\n"
+        "a,completed,100\n"
+        "b,in_progress,50\n"
+    )
+    import_file(session, "projects", io.BytesIO(data.encode()), "csv", user_id=2)
+    summary = session.get(UserDashboardSummary, 2)
+    assert (summary.projects_completed, summary.projects_in_progress, summary.revenue_total) == (1, 1, 100.0)
+
+@pytest.mark.parametrize("fmt", ["csv", "jsonl", "npz"])
+def test_export_round_trip(session, fmt):
+    session.add_all([
+        Project(name="a", status="PLANNING", budget=100.0, due_date=datetime(2026, 11, 1, 9, 30), user_id=1),
+        Project(name="b", description="línea, con \"comillas\"", user_id=1),
+        Project(name="c", user_id=2),
+    ])
+    session.commit()
+    exported = _export(session, "projects", fmt, user_id=1)
+
+    report = import_file(session, "projects", io.BytesIO(exported), fmt)
+    assert (report.imported, report.rejected) == (2, 0)
+    copies = session.execute(select(Project).where(Project.id > 3).order_by(Project.id)).scalars().all()
+    assert [(p.name, p.status, p.budget, p.due_date, p.description, p.user_id) for p in copies] == [
+        ("a", "PLANNING", 100.0, datetime(2026, 11, 1, 9, 30), None, 1),
+        ("b", None, None, None, "línea, con \"comillas\"", 1),
+    ]
+
+def test_unknown_columns_abort_the_import(session):
+    with pytest.raises(BulkFormatError):
+        import_file(session, "materials", io.BytesIO(b"name,cost_per_unit,colour\nPLA,20,red\n"), "csv")
+
+def test_copy_rows_formats_nulls_booleans_and_json():
+    class Cursor:
+        def copy_expert(self, sql, buffer):
+            self.sql, self.data = sql, buffer.read()
+
+        def close(self):
+            pass
+
+    cursor = Cursor()
+
+    class Connection:
+        dialect = create_engine("postgresql://").dialect
+        connection = type("Pooled", (), {"driver_connection": type("Driver", (), {"cursor": lambda self: cursor})()})()
+
+    copy_rows(Connection(), Material.__table__, ["name", "properties", "is_active", "supplier"], [
+        {"name": "PLA", "properties": {"d": 1.75}, "is_active": True, "supplier": None},
+    ])
+    assert cursor.sql == "COPY materials (name, properties, is_active, supplier) FROM STDIN WITH (FORMAT csv)"
+    assert cursor.data == 'PLA,"{""d"": 1.75}",t,\r\n'
@@ -0,0 +1,91 @@
+# tests/test_celery_exporter.py
+
+import json
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from celery import Celery
+from celery.app.task import Context
+from prometheus_client import CollectorRegistry
+
+from app.core.celery_exporter import QueueCollector, oldest_enqueued_at, task_wait_seconds
+from app.core.task_queues import LANES, queue_settings
+
+def noop(*args, **kwargs):
+    pass
+
+def test_wait_counts_from_enqueue_or_eta():
+    assert task_wait_seconds(Context(enqueued_at=100.0), now=103.5) == 3.5
+    eta = datetime.fromtimestamp(110.0, tz=timezone.utc).isoformat()
+    assert task_wait_seconds(Context(enqueued_at=100.0, eta=eta), now=112.0) == 2.0
+    # Messages published before the header existed, and eager calls
+    assert task_wait_seconds(Context(), now=112.0) is None
+
+class FakeRedis:
+    def __init__(self, lists):
+        self.lists = lists
+
+    def lindex(self, key, index):
+        items = self.lists.get(key, [])
+        return items[index] if items else None
+
+def _message(enqueued_at):
+    return json.dumps({"body": "", "headers": {"enqueued_at": enqueued_at}, "properties": {}}).encode()
+
+def test_oldest_message_is_the_list_tail():
+    client = FakeRedis({"email": [_message(50.0), _message(10.0)], "sync": [b"not json"]})
+    assert oldest_enqueued_at(client, "email") == 10.0
+    assert oldest_enqueued_at(client, "sync") is None
+    assert oldest_enqueued_at(client, "maintenance") is None
+
+# Fixture: lanes on the in-memory broker
+@pytest.fixture
+def app():
+    app = Celery("exporter", broker="memory://", backend="cache+memory://")
+    app.conf.update(**queue_settings())
+    app.task(name="app.tasks.send_email_task")(noop)
+    yield app
+    with app.connection_for_write() as conn:
+        for queue in LANES:
+            conn.default_channel.queue_purge(queue)
+
+def _samples(collector):
+    registry = CollectorRegistry()
+    registry.register(collector)
+    return {
+        (sample.name, sample.labels.get("queue")): sample.value
+        for family in registry.collect() for sample in family.samples
+    }
+
+def test_collector_reports_queues_and_worker_counts(app, monkeypatch):
+    for _ in range(3):
+        app.send_task("app.tasks.send_email_task", args=["a@example.com", "hola", "cuerpo"])
+    replies = {
+        "reserved": {"background@h": [{"delivery_info": {"routing_key": "email"}}]},
+        "active": {
+            "background@h": [{"delivery_info": {"routing_key": "email"}}, {"delivery_info": {"routing_key": "sync"}}],
+            "ai-bulk@h": [{"delivery_info": {"routing_key": "ai_bulk"}}],
+        },
+    }
+    monkeypatch.setattr(app.control, "inspect", lambda timeout: SimpleNamespace(
+        reserved=lambda: replies["reserved"], active=lambda: replies["active"],
+    ))
+    client = FakeRedis({"email": [_message(970.0), _message(940.0)]})
+    samples = _samples(QueueCollector(app, client=client, clock=lambda: 1000.0))
+
+    assert samples[("celery_queue_length", "email")] == 3
+    assert samples[("celery_queue_length", "ai_interactive")] == 0
+    assert samples[("celery_queue_oldest_message_age_seconds", "email")] == 60.0
+    assert samples[("celery_queue_oldest_message_age_seconds", "sync")] == 0.0
+    assert samples[("celery_tasks_reserved", "email")] == 1
+    assert samples[("celery_tasks_active", "email")] == 1
+    assert samples[("celery_tasks_active", "ai_bulk")] == 1
+    assert samples[("celery_exporter_broker_up", None)] == 1
+
+def test_collector_reports_broker_down(app, monkeypatch):
+    def unreachable(timeout):
+        raise ConnectionError("redis down")
+    monkeypatch.setattr(app.control, "inspect", unreachable)
+    samples = _samples(QueueCollector(app, client=FakeRedis({})))
+    assert samples == {("celery_exporter_broker_up", None): 0}
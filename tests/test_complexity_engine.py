@@ -0,0 +1,62 @@
+# tests/test_complexity_engine.py
+
+from functools import partial
+
+import numpy as np
+import pytest
+
+from mesh_fixtures import box, torus
+from app.core.config import settings
+from app.services.complexity_engine import ComplexityEngine, analyze_model_file
+from app.services.mesh_io import connected_components, write_stl
+from app.services.wall_thickness import face_thickness
+
+def test_connected_components_labels_chains():
+    edges = np.array([[0, 1], [1, 2], [3, 4], [5, 4]])
+    labels = connected_components(7, edges)
+    assert len(np.unique(labels)) == 3
+    assert labels[0] == labels[2]
+    assert labels[3] == labels[5]
+    assert labels[6] == 6
+
+def test_cube_features():
+    features = ComplexityEngine().features(box(20, 20, 20))
+    assert features.triangle_count == 12
+    assert features.vertex_count == 8
+    assert features.shell_count == 1
+    assert features.genus == 0
+    # La cara inferior apoya en la cama: no es voladizo
+    assert features.overhang_ratio == 0.0
+    assert features.thin_wall_ratio == 0.0
+
+def test_torus_has_genus_one():
+    features = ComplexityEngine().features(torus())
+    assert features.shell_count == 1
+    assert features.genus == 1
+
+def test_floating_shell_is_overhang_and_thin_plate_is_thin():
+    mesh = np.concatenate([box(10, 10, 10), box(10, 10, 0.4, origin=(20, 0, 5))])
+    features = ComplexityEngine().features(mesh)
+    assert features.shell_count == 2
+    assert features.overhang_ratio > 0
+    assert features.thin_wall_ratio > 0
+
+def test_ray_cast_thickness_is_opt_in():
+    # A thin plate fused to a thick block: one shell, so the shell extent misses it
+    mesh = np.concatenate([box(10, 10, 10), box(10, 10, 0.4, origin=(10, 0, 0))])
+    assert ComplexityEngine().features(mesh).thin_wall_ratio == 0.0
+    engine = ComplexityEngine(thickness_fn=partial(face_thickness, max_distance=0.8))
+    assert engine.features(mesh).thin_wall_ratio > 0
+
+def test_score_is_reproducible_and_bounded(tmp_path, monkeypatch):
+    # Model files are only read from the configured roots
+    monkeypatch.setattr(settings, "MODEL_SOURCE_ROOTS", [str(tmp_path)])
+    path = tmp_path / "torus.stl"
+    write_stl(str(path), torus())
+    first = analyze_model_file(str(path))
+    second = analyze_model_file(str(path))
+    assert first.complexity_score == second.complexity_score
+    assert 0.0 <= first.complexity_score <= 1.0
+    assert first.polygons == len(torus())
+    assert first.features["genus"] == 1
+    assert first.file_size_kb == pytest.approx(path.stat().st_size / 1024)
@@ -0,0 +1,95 @@
+# tests/test_dashboard_summary.py
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import MarketplaceAccount, Material, Project, Quote, User, UserDashboardSummary
+from app.services.dashboard_summary import (
+    compute_summaries,
+    get_summary,
+    install_summary_hooks,
+    reconcile_summaries,
+)
+
+# Fixture: in-memory SQLite with the summary hooks on its sessions
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine)
+    install_summary_hooks(factory)
+    session = factory()
+    session.add_all([User(id=1, name="ana", email="ana@example.com"), User(id=2, name="luis", email="luis@example.com")])
+    session.commit()
+    yield session
+    session.close()
+
+def _stored(session, user_id):
+    session.expire_all()
+    row = session.get(UserDashboardSummary, user_id)
+    return {column: getattr(row, column) for column in compute_summaries(session, [user_id])[user_id]}
+
+def _populate(session):
+    session.add_all([
+        Project(name="a", status="PLANNING", budget=100.0, user_id=1),
+        Project(name="b", status="COMPLETED", budget=250.0, user_id=1),
+        Project(name="c", status="COMPLETED", budget=50.0, user_id=2),
+        Quote(client_name="x", status="sent", total_amount=80.0, user_id=1),
+        Quote(client_name="y", status="accepted", total_amount=120.0, user_id=1),
+        Material(name="PLA", cost_per_unit=20.0, current_stock=0.5, low_stock_threshold=1.0, user_id=1),
+        Material(name="PETG", cost_per_unit=25.0, current_stock=5.0, low_stock_threshold=1.0, user_id=1),
+        MarketplaceAccount(platform="CULTS3D", total_views=10, total_downloads=3, total_revenue=9.5, user_id=1),
+    ])
+    session.commit()
+
+def test_hooks_keep_summary_equal_to_recomputation(session):
+    _populate(session)
+    stored = _stored(session, 1)
+    assert stored["projects_planning"] == 1
+    assert stored["projects_completed"] == 1
+    assert stored["revenue_total"] == 250.0
+    assert stored["quotes_total"] == 2 and stored["quotes_accepted"] == 1
+    assert stored["quotes_value_total"] == 200.0
+    assert stored["materials_low_stock"] == 1
+    assert stored["marketplace_views"] == 10
+    assert stored == compute_summaries(session, [1])[1]
+
+def test_updates_and_deletes_move_counts(session):
+    _populate(session)
+    project = session.query(Project).filter_by(name="a").one()
+    project.status = "COMPLETED"
+    material = session.query(Material).filter_by(name="PETG").one()
+    material.current_stock = 0.2
+    session.delete(session.query(Quote).filter_by(client_name="x").one())
+    # Reasignar a otro usuario resta de uno y suma al otro
+    session.query(Project).filter_by(name="c").one().user_id = 1
+    session.commit()
+
+    for user_id in (1, 2):
+        assert _stored(session, user_id) == compute_summaries(session, [user_id])[user_id]
+    assert _stored(session, 1)["revenue_total"] == 400.0
+    assert _stored(session, 2)["projects_completed"] == 0
+
+def test_updates_of_expired_attributes_use_previous_value(session):
+    _populate(session)
+    session.expire_all()
+    session.query(Project).filter_by(name="b").one().budget = 300.0
+    session.commit()
+    assert _stored(session, 1)["revenue_total"] == 300.0
+
+def test_reconcile_fixes_drift_from_bulk_updates(session):
+    _populate(session)
+    # Un UPDATE masivo no pasa por los eventos de la sesión
+    session.execute(update(Quote).values(status="rejected"))
+    session.commit()
+    assert _stored(session, 1)["quotes_rejected"] == 0
+
+    assert reconcile_summaries(session) == 1
+    assert _stored(session, 1)["quotes_rejected"] == 2
+    assert reconcile_summaries(session) == 0
+
+def test_get_summary_computes_missing_rows(session):
+    summary = get_summary(session, 2)
+    assert summary.user_id == 2 and summary.projects_completed == 0
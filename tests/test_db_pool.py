@@ -0,0 +1,55 @@
+# tests/test_db_pool.py
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.performance_optimization import DatabaseOptimizer
+from app.db.pool import InstrumentedQueuePool
+
+
+def sample(name, role="test"):
+    return REGISTRY.get_sample_value(name, {"role": role, "engine": "sync", "target": "primary"}) or 0.0
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    engine.pool.role = "test"
+    yield engine
+    engine.dispose()
+
+
+def test_role_configs_size_pools_per_process():
+    api = DatabaseOptimizer.configure_pool_for_role("api")
+    worker = DatabaseOptimizer.configure_pool_for_role("worker")
+    beat = DatabaseOptimizer.configure_pool_for_role("beat")
+    assert api["pool_size"] > worker["pool_size"] >= beat["pool_size"] == 1
+    assert api["pool_pre_ping"] and worker["pool_recycle"] == 3600
+    with pytest.raises(ValueError):
+        DatabaseOptimizer.configure_pool_for_role("scheduler")
+
+
+def test_checkouts_and_usage_are_exported(engine):
+    before = sample("db_pool_checkouts_total")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert sample("db_pool_checked_out_connections") == 1
+    assert sample("db_pool_checked_out_connections") == 0
+    assert sample("db_pool_checkouts_total") == before + 1
+    assert sample("db_pool_checkout_wait_seconds_count") >= 1
+
+
+def test_exhausted_pool_counts_timeouts(engine):
+    before = sample("db_pool_timeouts_total")
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert sample("db_pool_timeouts_total") == before + 1
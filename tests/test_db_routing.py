@@ -0,0 +1,120 @@
+# tests/test_db_routing.py
+
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db.base import Base
+from app.db.models import ModelMetadata
+from app.db.routing import AsyncReplicaRouter, ReadOnlySessionError, ReplicaRouter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def sqlite_db(path, name):
+    """Base SQLite con una fila que identifica a la instancia."""
+    engine = create_engine(f"sqlite:///{path / name}.db")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(ModelMetadata.__table__.insert().values(model_id="origin", seo_title=name))
+    return engine
+
+
+def origin(session):
+    return session.query(ModelMetadata.seo_title).filter_by(model_id="origin").scalar()
+
+
+@pytest.fixture
+def router(tmp_path):
+    clock = FakeClock()
+    router = ReplicaRouter(
+        sqlite_db(tmp_path, "primary"),
+        [sqlite_db(tmp_path, "replica1"), sqlite_db(tmp_path, "replica2")],
+        pin_seconds=5,
+        health_check_seconds=10,
+        clock=clock,
+    )
+    router.clock_control = clock
+    return router
+
+
+def test_reads_rotate_over_replicas(router):
+    seen = []
+    for _ in range(4):
+        with router.read_session() as db:
+            seen.append(origin(db))
+    assert seen == ["replica1", "replica2", "replica1", "replica2"]
+
+
+def test_read_session_rejects_writes(router):
+    with router.read_session() as db:
+        db.add(ModelMetadata(model_id="new"))
+        with pytest.raises(ReadOnlySessionError):
+            db.flush()
+
+
+def test_write_pins_reads_to_primary(router):
+    with router.write_session(pin_key="user:1") as db:
+        db.add(ModelMetadata(model_id="m1", seo_title="nuevo"))
+
+    with router.read_session(pin_key="user:1") as db:
+        assert origin(db) == "primary"
+        assert db.query(ModelMetadata).filter_by(model_id="m1").count() == 1
+    with router.read_session(pin_key="user:2") as db:
+        assert origin(db).startswith("replica")
+
+    router.clock_control.now += 6
+    with router.read_session(pin_key="user:1") as db:
+        assert origin(db).startswith("replica")
+
+
+def test_unhealthy_replica_is_skipped_then_rechecked(router, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    router.nodes[0].engine, healthy = broken, router.nodes[0].engine
+    for _ in range(3):
+        with router.read_session() as db:
+            assert origin(db) == "replica2"
+
+    router.nodes[0].engine = healthy
+    router.clock_control.now += 11
+    seen = set()
+    for _ in range(2):
+        with router.read_session() as db:
+            seen.add(origin(db))
+    assert seen == {"replica1", "replica2"}
+
+
+def test_falls_back_to_primary_without_healthy_replicas(tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    router = ReplicaRouter(sqlite_db(tmp_path, "primary"), [broken])
+    with router.read_session() as db:
+        assert origin(db) == "primary"
+
+
+def test_async_router_reads_replica(tmp_path):
+    sqlite_db(tmp_path, "primary")
+    sqlite_db(tmp_path, "replica")
+    router = AsyncReplicaRouter(
+        create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary'}.db"),
+        [create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica'}.db")],
+    )
+
+    async def read(pin_key=None):
+        async with router.read_session(pin_key) as db:
+            return (await db.execute(text("SELECT seo_title FROM model_metadata WHERE model_id = 'origin'"))).scalar()
+
+    async def scenario():
+        before = await read("k")
+        async with router.write_session(pin_key="k") as db:
+            await db.execute(text("UPDATE model_metadata SET seo_title = 'escrito'"))
+        return before, await read("k"), await read()
+
+    assert asyncio.run(scenario()) == ("replica", "escrito", "replica")
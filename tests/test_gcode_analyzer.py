@@ -0,0 +1,77 @@
+# tests/test_gcode_analyzer.py
+
+import math
+
+import pytest
+
+from app.services.gcode_analyzer import GcodeAnalysisError, analyze_gcode
+
+def _write_gcode(path, layers=3, lines_per_layer=4):
+    lines = ["G21", "G90", "M82", "M204 S1000", "G92 E0"]
+    for layer in range(layers):
+        lines.append(f"G1 Z{0.2 * (layer + 1):.2f} F600")
+        e = 0.0
+        for i in range(lines_per_layer):
+            e += 1.0
+            lines.append(f"G1 X{(i % 2) * 20 + 5} Y{i} E{e:.3f} F1200 ; perimeter")
+        lines.append("G92 E0")
+    lines.append("G4 S2")
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+def test_counts_filament_and_layers(tmp_path):
+    gcode = _write_gcode(tmp_path / "part.gcode")
+    report = analyze_gcode(str(gcode), material="PLA")
+    assert report.layer_count == 3
+    assert report.filament_length_mm == pytest.approx(12.0)
+    assert report.extrusion_per_layer_mm == pytest.approx([4.0, 4.0, 4.0])
+    assert report.filament_weight_g == pytest.approx(12.0 * 3.14159 * 0.875 ** 2 / 1000 * 1.24, rel=1e-3)
+    assert report.print_time_minutes > 2 / 60
+
+def test_relative_extrusion_matches_absolute(tmp_path):
+    absolute = tmp_path / "abs.gcode"
+    absolute.write_text("G90\nM82\nG92 E0\nG1 X10 E1\nG1 X20 E2\nG1 E1.5\nG1 E2\nG1 X30 E3\n")
+    relative = tmp_path / "rel.gcode"
+    relative.write_text("G90\nM83\nG1 X10 E1\nG1 X20 E1\nG1 E-0.5\nG1 E0.5\nG1 X30 E1\n")
+    a = analyze_gcode(str(absolute))
+    r = analyze_gcode(str(relative))
+    assert a.filament_length_mm == pytest.approx(r.filament_length_mm) == pytest.approx(3.0)
+    assert a.print_time_minutes == pytest.approx(r.print_time_minutes)
+
+def test_parallel_chunks_match_single_pass(tmp_path):
+    gcode = _write_gcode(tmp_path / "big.gcode", layers=40, lines_per_layer=25)
+    single = analyze_gcode(str(gcode))
+    chunked = analyze_gcode(str(gcode), workers=2, chunk_bytes=512)
+    assert chunked.layer_count == single.layer_count
+    assert chunked.filament_length_mm == pytest.approx(single.filament_length_mm)
+    assert chunked.print_time_minutes == pytest.approx(single.print_time_minutes)
+
+def test_empty_file_raises(tmp_path):
+    empty = tmp_path / "empty.gcode"
+    empty.write_text("")
+    with pytest.raises(GcodeAnalysisError):
+        analyze_gcode(str(empty))
+
+def test_arcs_follow_their_true_path(tmp_path):
+    # Half circle of radius 50 (157 mm) then a 10 mm line back along its tangent
+    arc = tmp_path / "arc.gcode"
+    arc.write_text("G90\nM82\nG92 E0\nG1 F1500\nG2 X100 Y0 I50 J0 E10\nG1 X100 Y10\n")
+    same_by_radius = tmp_path / "radius.gcode"
+    same_by_radius.write_text("G90\nM82\nG92 E0\nG1 F1500\nG2 X100 Y0 R50 E10\nG1 X100 Y10\n")
+    report = analyze_gcode(str(arc))
+    assert report.exact
+    assert report.print_time_minutes >= (math.pi * 50 + 10) / 25 / 60
+    assert report.print_time_minutes == pytest.approx(analyze_gcode(str(same_by_radius)).print_time_minutes)
+
+def test_home_and_bare_g92_reset_positions(tmp_path):
+    gcode = tmp_path / "home.gcode"
+    gcode.write_text("G90\nM82\nG1 X10 Y10 F6000\nG28 X\nG1 Y0\nG1 E5\nG92\nG1 E5\n")
+    report = analyze_gcode(str(gcode))
+    # G28 X returns to X0 and the bare G92 zeroes E before the second extrusion
+    assert report.filament_length_mm == pytest.approx(10.0)
+    assert report.move_count == 5
+
+def test_unsupported_commands_make_the_time_inexact(tmp_path):
+    gcode = tmp_path / "probe.gcode"
+    gcode.write_text("G21\nG90\nG29\nG1 X10 F1200\n")
+    assert not analyze_gcode(str(gcode)).exact
@@ -1,20 +1,21 @@
 # tests/test_health_ready.py
 import pytest
 from starlette.testclient import TestClient
-import redis as _redis
+from app.api import main
 from app.api.main import app
-import app.db.session
+from app.api.deps import get_async_db
 
 @pytest.fixture
 def client():
-    return TestClient(app)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
 
 class DummyDB:
-    def execute(self, query):
+    async def execute(self, query):
         return None
 
 class DummyRedis:
-    def ping(self):
+    async def ping(self):
         return True
 
 @ pytest.mark.parametrize("db_error,redis_error,status_code", [
@@ -24,24 +25,22 @@ class DummyRedis:
 ])
 def test_ready_various(db_error, redis_error, status_code, monkeypatch, client):
     # Mock DB
-    def fake_session():
+    async def fake_db():
         db = DummyDB()
         if db_error:
-            def fail(q):
+            async def fail(q):
                 raise Exception("DB fail")
             db.execute = fail
-        return db
-    monkeypatch.setattr(app.db.session, "SessionLocal", fake_session)
-
-    # Mock Redis
-    def fake_from_url(url):
-        r = DummyRedis()
-        if redis_error:
-            def fail():
-                raise Exception("Redis fail")
-            r.ping = fail
-        return r
-    monkeypatch.setattr(_redis, "from_url", fake_from_url)
+        yield db
+    app.dependency_overrides[get_async_db] = fake_db
+
+    # Mock the shared Redis client
+    r = DummyRedis()
+    if redis_error:
+        async def fail():
+            raise Exception("Redis fail")
+        r.ping = fail
+    monkeypatch.setattr(main, "redis_client", r)
 
     response = client.get("/ready")
     assert response.status_code == status_code
@@ -50,4 +49,4 @@ def test_ready_various(db_error, redis_error, status_code, monkeypatch, client):
 def test_health(client):
     response = client.get("/health")
     assert response.status_code == 200
-    assert response.json() == {"status": "ok"}
\ No newline at end of file
+    assert response.json() == {"status": "ok"}
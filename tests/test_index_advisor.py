@@ -0,0 +1,93 @@
+# tests/test_index_advisor.py
+
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sa
+
+from app.db.index_advisor import (
+    IndexAdvisor,
+    IndexProposal,
+    QueryShapeRecorder,
+    explain_full_scans,
+    normalize_statement,
+)
+
+metadata = sa.MetaData()
+projects = sa.Table(
+    "projects", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("status", sa.String(20)),
+    sa.Column("budget", sa.Float),
+    sa.Column("updated_at", sa.DateTime),
+)
+materials = sa.Table(
+    "materials", metadata,
+    sa.Column("id", sa.Integer, primary_key=True),
+    sa.Column("current_stock", sa.Float),
+    sa.Column("low_stock_threshold", sa.Float),
+)
+
+# Fixture: SQLite con 200 filas por tabla
+@pytest.fixture
+def engine():
+    engine = sa.create_engine("sqlite:///:memory:")
+    metadata.create_all(engine)
+    now = datetime(2026, 10, 1)
+    with engine.begin() as conn:
+        conn.execute(projects.insert(), [
+            {"status": ("completed", "planning")[i % 2], "budget": i, "updated_at": now - timedelta(days=i)}
+            for i in range(200)
+        ])
+        conn.execute(materials.insert(), [
+            {"current_stock": i % 10, "low_stock_threshold": 2} for i in range(200)
+        ])
+    return engine
+
+def workload(conn, days):
+    conn.execute(sa.select(sa.func.sum(projects.c.budget)).where(
+        projects.c.status == "completed", projects.c.updated_at >= datetime(2026, 10, 1) - timedelta(days=days)
+    )).all()
+    conn.execute(sa.select(sa.func.count()).select_from(projects).where(projects.c.status == "completed")).all()
+    conn.execute(sa.select(sa.func.count()).select_from(materials).where(
+        materials.c.current_stock <= materials.c.low_stock_threshold
+    )).all()
+    conn.execute(sa.select(projects).where(projects.c.id.in_([1, 2, 3][:days % 3 + 1]))).all()
+
+def test_normalize_collapses_whitespace_and_in_lists():
+    assert normalize_statement("SELECT a\n  FROM t WHERE t.id IN (?, ?, ?)") == "SELECT a FROM t WHERE t.id IN (...)"
+
+def test_recorder_groups_shapes(engine):
+    recorder = QueryShapeRecorder()
+    with recorder.record(engine), engine.connect() as conn:
+        for days in (7, 30, 90):
+            workload(conn, days)
+    assert len(recorder.shapes) == 4
+    assert all(shape.calls == 3 for shape in recorder.shapes.values())
+
+def test_proposes_composite_and_partial_indexes(engine):
+    recorder = QueryShapeRecorder()
+    with recorder.record(engine), engine.connect() as conn:
+        workload(conn, 30)
+    advisor = IndexAdvisor(engine, min_rows=100)
+    proposals = advisor.propose(recorder.shapes.values())
+    assert proposals == [
+        IndexProposal("projects", ("status", "updated_at")),
+        IndexProposal("materials", ("current_stock",), "current_stock <= low_stock_threshold"),
+    ]
+    assert proposals[1].ddl("postgresql") == (
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_materials_current_stock_partial "
+        "ON materials (current_stock) WHERE current_stock <= low_stock_threshold"
+    )
+
+    advisor.apply(proposals)
+    with engine.connect() as conn:
+        for shape in recorder.shapes.values():
+            assert explain_full_scans(conn, shape.statement, shape.parameters) == []
+    assert advisor.propose(recorder.shapes.values()) == []
+
+def test_small_tables_are_ignored(engine):
+    recorder = QueryShapeRecorder()
+    with recorder.record(engine), engine.connect() as conn:
+        workload(conn, 30)
+    assert IndexAdvisor(engine, min_rows=1000).propose(recorder.shapes.values()) == []
@@ -0,0 +1,147 @@
+# tests/test_inventory_ledger.py
+
+import importlib.util
+from datetime import date, datetime
+from pathlib import Path
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, delete, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import InventoryTransaction, Material, MaterialStockDaily
+from app.services.inventory_ledger import (
+    ensure_monthly_partitions,
+    inventory_turnover,
+    rebuild_rollups,
+    record_transaction,
+    stock_history,
+)
+
+MIGRATION = Path(__file__).resolve().parents[1] / " alembic" / "versions" / "010_partition_inventory_transactions.py"
+
+# Fixture: in-memory SQLite with two materials
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add_all([Material(id=1, name="PLA", cost_per_unit=20.0), Material(id=2, name="PETG", cost_per_unit=25.0)])
+    session.commit()
+    yield session
+    session.close()
+
+def _rollups(session):
+    return [
+        (r.material_id, r.day, r.quantity_in, r.quantity_out, r.transaction_count, r.closing_stock)
+        for r in session.execute(
+            select(MaterialStockDaily).order_by(MaterialStockDaily.material_id, MaterialStockDaily.day)
+        ).scalars()
+    ]
+
+def test_stock_history_carries_closing_stock_over_quiet_days(session):
+    record_transaction(session, 1, "purchase", 10, created_at=datetime(2026, 3, 1, 9))
+    record_transaction(session, 1, "usage", 3, created_at=datetime(2026, 3, 1, 18))
+    record_transaction(session, 1, "usage", 2, created_at=datetime(2026, 3, 4, 12))
+
+    history = stock_history(session, 1, date(2026, 2, 28), date(2026, 3, 5))
+    assert history == [
+        (date(2026, 2, 28), 0.0),
+        (date(2026, 3, 1), 7.0),
+        (date(2026, 3, 2), 7.0),
+        (date(2026, 3, 3), 7.0),
+        (date(2026, 3, 4), 5.0),
+        (date(2026, 3, 5), 5.0),
+    ]
+    assert _rollups(session)[0] == (1, date(2026, 3, 1), 10.0, 3.0, 2, 7.0)
+
+def test_backdated_transaction_shifts_later_closings(session):
+    record_transaction(session, 1, "purchase", 10, created_at=datetime(2026, 3, 1))
+    record_transaction(session, 1, "usage", 4, created_at=datetime(2026, 3, 5))
+    record_transaction(session, 1, "waste", 1, created_at=datetime(2026, 3, 3))
+
+    assert [(day, closing) for _, day, _, _, _, closing in _rollups(session)] == [
+        (date(2026, 3, 1), 10.0),
+        (date(2026, 3, 3), 9.0),
+        (date(2026, 3, 5), 5.0),
+    ]
+
+def test_rebuild_matches_incremental_rollups(session):
+    moves = [
+        (1, "purchase", 50, datetime(2026, 1, 30, 23)),
+        (2, "purchase", 5, datetime(2026, 2, 1)),
+        (1, "usage", 12.5, datetime(2026, 2, 2)),
+        (1, "adjustment", -2, datetime(2026, 2, 2)),
+        (2, "return", 1, datetime(2026, 1, 15)),
+        (1, "usage", 3, datetime(2026, 2, 10)),
+    ]
+    for material_id, kind, quantity, when in moves:
+        record_transaction(session, material_id, kind, quantity, created_at=when)
+    incremental = _rollups(session)
+
+    assert rebuild_rollups(session) == len(incremental)
+    assert _rollups(session) == incremental
+
+def test_migration_backfills_rollups_from_the_ledger(session):
+    moves = [
+        (1, "purchase", 50, datetime(2026, 1, 30, 23)),
+        (1, "usage", 12.5, datetime(2026, 2, 2)),
+        (1, "adjustment", -2, datetime(2026, 2, 2)),
+        (2, "return", 1, datetime(2026, 1, 15)),
+        (2, "waste", 0.5, datetime(2026, 1, 16)),
+    ]
+    for material_id, kind, quantity, when in moves:
+        record_transaction(session, material_id, kind, quantity, created_at=when)
+    incremental = _rollups(session)
+    session.execute(delete(MaterialStockDaily))
+    session.commit()
+
+    spec = importlib.util.spec_from_file_location("migration_010", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with session.get_bind().begin() as conn, Operations.context(MigrationContext.configure(conn)):
+        migration._backfill_rollups("sqlite")
+
+    assert _rollups(session) == incremental
+
+def test_rebuild_and_migration_ignore_unknown_types_alike(session):
+    record_transaction(session, 1, "purchase", 10, created_at=datetime(2026, 3, 1))
+    # A type written before validation existed: counted, but moves no stock
+    session.add(InventoryTransaction(material_id=1, transaction_type="gift", quantity=4, created_at=datetime(2026, 3, 2)))
+    session.commit()
+
+    rebuild_rollups(session)
+    rebuilt = _rollups(session)
+    assert rebuilt[-1] == (1, date(2026, 3, 2), 0.0, 0.0, 1, 10.0)
+
+    session.execute(delete(MaterialStockDaily))
+    session.commit()
+    spec = importlib.util.spec_from_file_location("migration_010", MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with session.get_bind().begin() as conn, Operations.context(MigrationContext.configure(conn)):
+        migration._backfill_rollups("sqlite")
+    assert _rollups(session) == rebuilt
+
+def test_turnover_is_outflow_over_average_stock(session):
+    record_transaction(session, 1, "purchase", 20, created_at=datetime(2026, 3, 1))
+    record_transaction(session, 1, "usage", 10, created_at=datetime(2026, 3, 2))
+    record_transaction(session, 2, "purchase", 10, created_at=datetime(2026, 3, 1))
+
+    # Material 1: closings 20, 10 -> average 15
+    assert inventory_turnover(session, date(2026, 3, 1), date(2026, 3, 2), material_id=1) == pytest.approx(10 / 15)
+    # Inventory: closings 30, 20 -> average 25
+    assert inventory_turnover(session, date(2026, 3, 1), date(2026, 3, 2)) == pytest.approx(10 / 25)
+    assert inventory_turnover(session, date(2026, 1, 1), date(2026, 1, 31)) is None
+
+def test_rejects_unknown_types_and_negative_quantities(session):
+    with pytest.raises(ValueError):
+        record_transaction(session, 1, "gift", 1)
+    with pytest.raises(ValueError):
+        record_transaction(session, 1, "usage", -1)
+
+def test_partitions_are_postgresql_only(session):
+    with session.get_bind().connect() as conn:
+        assert ensure_monthly_partitions(conn) == []
@@ -0,0 +1,54 @@
+# tests/test_mesh_bvh.py
+
+import numpy as np
+
+from mesh_fixtures import box, torus
+from app.services.mesh_bvh import MeshBVH
+from app.services.wall_thickness import analyze_wall_thickness, face_thickness
+
+def brute_force(triangles, origins, directions):
+    bvh = MeshBVH(triangles, leaf_size=len(triangles))
+    return bvh.intersect(origins, directions)
+
+def test_intersect_matches_brute_force():
+    rng = np.random.default_rng(3)
+    triangles = torus(n_major=64, n_minor=32)
+    origins = rng.uniform(-15, 15, size=(500, 3))
+    directions = rng.normal(size=(500, 3))
+    t, face = MeshBVH(triangles, leaf_size=4).intersect(origins, directions)
+    t_ref, face_ref = brute_force(triangles, origins, directions)
+    assert np.array_equal(np.isfinite(t), np.isfinite(t_ref))
+    assert np.allclose(t[np.isfinite(t)], t_ref[np.isfinite(t_ref)])
+    assert (face >= 0).sum() > 50
+
+def test_segment_stops_at_max_t_and_axis_aligned_rays():
+    bvh = MeshBVH(box(10, 10, 10))
+    origins = np.array([[5.0, 5.0, -5.0], [5.0, 5.0, -5.0]])
+    directions = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 1.0]])
+    t, face = bvh.intersect(origins, directions)
+    assert np.allclose(t, 5.0)
+    t, face = bvh.intersect(origins, directions, max_t=4.0)
+    assert np.all(np.isinf(t)) and np.all(face == -1)
+
+def test_plate_thickness():
+    plate = box(20, 20, 0.3)
+    thickness = face_thickness(plate)
+    # Las caras grandes miden el espesor de la placa
+    top_bottom = np.ptp(plate[:, :, 2], axis=1) == 0
+    assert np.allclose(thickness[top_bottom], 0.3, atol=1e-6)
+
+def test_report_verdict_per_nozzle():
+    mesh = np.concatenate([box(20, 20, 20), box(20, 20, 0.5, origin=(30, 0, 0))])
+    report = analyze_wall_thickness(mesh)
+    verdicts = {n.nozzle_mm: n.printable for n in report.nozzles}
+    assert verdicts == {0.25: True, 0.4: True, 0.6: False, 0.8: False}
+    assert abs(report.min_thickness_mm - 0.5) < 1e-6
+    # Cada cara de la placa es una región delgada; el cubo no aporta ninguna
+    assert len(report.regions) == 2
+    assert all(r.center[0] > 30 for r in report.regions)
+
+def test_solid_cube_is_printable():
+    report = analyze_wall_thickness(box(20, 20, 20))
+    assert report.min_thickness_mm is None
+    assert all(n.printable for n in report.nozzles)
+    assert report.regions == []
@@ -0,0 +1,73 @@
+# tests/test_mesh_codec.py
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from mesh_fixtures import box, torus
+from app.core.config import settings
+from app.db.base import Base
+from app.db.models import ModelFile
+from app.services.content_store import ContentStore
+from app.services.mesh_codec import (
+    MeshCodecError,
+    archive_model_file,
+    decode_mesh,
+    encode_mesh,
+)
+from app.services.mesh_io import parse_stl, stl_bytes, write_stl
+
+def canonical(triangles):
+    """Caras como conjunto, rotadas para empezar por el menor vértice."""
+    flat = [tuple(map(tuple, np.roll(t, -min(range(3), key=lambda i: tuple(t[i])), axis=0))) for t in triangles]
+    return sorted(flat)
+
+def test_round_trip_within_precision():
+    rng = np.random.default_rng(0)
+    mesh = torus(n_major=60, n_minor=30)
+    mesh = mesh[rng.permutation(len(mesh))]
+    decoded = decode_mesh(encode_mesh(mesh, precision_mm=0.01))
+    assert decoded.shape == mesh.shape
+    expected = np.rint(mesh.astype(np.float64) / 0.01) * 0.01
+    assert canonical(np.round(decoded, 4)) == canonical(np.round(expected, 4).astype(np.float32))
+
+def test_reexport_is_lossless():
+    mesh = torus(n_major=80, n_minor=40) + np.float32(123.456)
+    encoded = encode_mesh(mesh, precision_mm=0.001)
+    reexported = parse_stl(stl_bytes(decode_mesh(encoded)))
+    assert encode_mesh(reexported, precision_mm=0.001) == encoded
+
+def test_orientation_is_preserved():
+    decoded = decode_mesh(encode_mesh(box(10, 20, 30)))
+    normals = np.cross(decoded[:, 1] - decoded[:, 0], decoded[:, 2] - decoded[:, 0])
+    outward = (decoded.mean(axis=1) - np.array([5, 10, 15])) * normals
+    assert np.all(outward.sum(axis=1) > 0)
+
+def test_size_reduction():
+    mesh = torus(n_major=200, n_minor=100)
+    assert len(stl_bytes(mesh)) / len(encode_mesh(mesh)) > 5
+
+def test_corrupt_data_is_rejected():
+    encoded = encode_mesh(box())
+    with pytest.raises(MeshCodecError):
+        decode_mesh(b"solid nope")
+    with pytest.raises(MeshCodecError):
+        decode_mesh(encoded[:-3])
+
+def test_archive_model_file(tmp_path, monkeypatch):
+    # Model files are only read from the configured roots
+    monkeypatch.setattr(settings, "MODEL_SOURCE_ROOTS", [str(tmp_path)])
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    path = tmp_path / "part.stl"
+    size = write_stl(str(path), torus(n_major=60, n_minor=30))
+    model_file = ModelFile(filename="part.stl", file_path=str(path), file_size=size)
+    session.add(model_file)
+    session.commit()
+
+    store = ContentStore(str(tmp_path / "store"))
+    archive_model_file(session, store, model_file, precision_mm=0.01)
+    assert model_file.archive_size < size / 5
+    assert len(decode_mesh(store.get(model_file.archive_key))) == 60 * 30 * 2
@@ -0,0 +1,45 @@
+# tests/test_mesh_io.py
+
+import pytest
+
+from mesh_fixtures import box
+from app.services.mesh_io import MeshLoadError, load_mesh, read_source, write_stl
+
+# Fixture: an uploads root holding one STL
+@pytest.fixture
+def uploads(tmp_path):
+    root = tmp_path / "uploads"
+    write_stl(str(root / "part.stl"), box(10, 10, 10))
+    return root
+
+def test_reads_files_under_the_allowed_roots(uploads):
+    data = read_source(f"file://{uploads / 'part.stl'}", roots=[str(uploads)], hosts=[], max_bytes=10_000)
+    assert len(data) == 84 + 12 * 50
+
+def test_rejects_paths_outside_the_roots(uploads, tmp_path):
+    secret = tmp_path / "secret.txt"
+    secret.write_text("token")
+    for source in (str(secret), str(uploads / ".." / "secret.txt"), f"file://{secret}"):
+        with pytest.raises(MeshLoadError):
+            read_source(source, roots=[str(uploads)], hosts=[], max_bytes=10_000)
+    # A symlink inside the root still resolves outside it
+    (uploads / "link.stl").symlink_to(secret)
+    with pytest.raises(MeshLoadError):
+        read_source(str(uploads / "link.stl"), roots=[str(uploads)], hosts=[], max_bytes=10_000)
+
+def test_rejects_hosts_and_schemes_not_allowed(uploads):
+    for source in ("http://169.254.169.254/latest/meta-data", "https://evil.example/m.stl", "ftp://files.example/m.stl"):
+        with pytest.raises(MeshLoadError):
+            read_source(source, roots=[str(uploads)], hosts=["files.example"], max_bytes=10_000)
+
+def test_stops_reading_past_the_size_limit(uploads):
+    with pytest.raises(MeshLoadError):
+        read_source(str(uploads / "part.stl"), roots=[str(uploads)], hosts=[], max_bytes=100)
+
+def test_load_mesh_uses_the_configured_roots(uploads, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "MODEL_SOURCE_ROOTS", [str(uploads)])
+    assert len(load_mesh(str(uploads / "part.stl"))) == 12
+    monkeypatch.setattr(settings, "MODEL_SOURCE_ROOTS", [])
+    with pytest.raises(MeshLoadError):
+        load_mesh(str(uploads / "part.stl"))
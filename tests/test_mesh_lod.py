@@ -0,0 +1,86 @@
+# tests/test_mesh_lod.py
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from mesh_fixtures import box, torus
+from app.db.base import Base
+from app.services.content_store import ContentStore
+from app.services.mesh_io import index_vertices, parse_stl
+from app.services import mesh_lod
+from app.services.mesh_lod import cluster_decimate, decimate_to_budget, generate_lods, select_lod, store_model_lods
+
+# Fixture: in-memory SQLite
+@pytest.fixture
+def in_memory_db():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSessionLocal = sessionmaker(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return TestingSessionLocal
+
+def test_cluster_decimate_keeps_coarse_box_intact():
+    result, displacement = cluster_decimate(*index_vertices(box(10, 10, 10)), cell_size=1.0)
+    assert len(result) == 12
+    assert displacement.max() == 0
+
+def test_cluster_decimate_reduces_and_bounds_error():
+    mesh = torus(n_major=200, n_minor=100)
+    result, displacement = cluster_decimate(*index_vertices(mesh), cell_size=1.0)
+    assert 0 < len(result) < len(mesh) / 4
+    # Ningún vértice se mueve más que la diagonal de su celda
+    assert displacement.max() <= np.sqrt(3) + 1e-9
+
+def test_generate_lods_respects_budgets():
+    mesh = torus(n_major=200, n_minor=100)
+    lods = generate_lods(mesh, budgets=(20_000, 5_000, 1_000))
+    counts = [len(lod.triangles) for lod in lods]
+    assert counts[0] == len(mesh)
+    assert counts[1:] == sorted(counts[1:], reverse=True)
+    assert all(c <= b for c, b in zip(counts[1:], (20_000, 5_000, 1_000)))
+    assert [lod.level for lod in lods] == list(range(len(lods)))
+    assert lods[-1].max_error_mm > lods[1].max_error_mm
+
+def test_decimate_to_budget_never_returns_a_level_over_budget(monkeypatch):
+    vertices, faces = index_vertices(torus(n_major=200, n_minor=100))
+    # A single iteration from a far too small cell cannot reach the budget
+    monkeypatch.setattr(mesh_lod, "MAX_CELL_ITERATIONS", 1)
+    assert decimate_to_budget(vertices, faces, budget=100, surface_area=1e-6) is None
+
+def test_store_and_select_lod(in_memory_db, tmp_path):
+    session = in_memory_db()
+    store = ContentStore(str(tmp_path))
+    mesh = torus(n_major=200, n_minor=100)
+    rows = store_model_lods(session, store, "m1", mesh, "uploads/m1.stl")
+    assert rows[0].triangle_count == len(mesh)
+    assert len(rows) >= 2
+    # Level 0 references the original instead of storing a copy
+    assert rows[0].content_key is None and rows[0].source_url == "uploads/m1.stl"
+    assert rows[0].size_bytes == 84 + 50 * len(mesh)
+
+    small = select_lod(session, "m1", max_bytes=rows[1].size_bytes)
+    assert small.level == 1
+    assert len(parse_stl(store.get(small.content_key))) == small.triangle_count
+    assert select_lod(session, "m1").level == 0
+    assert select_lod(session, "m1", max_triangles=1).level == rows[-1].level
+    assert select_lod(session, "missing") is None
+
+    # Regenerar reemplaza las filas sin duplicar contenido
+    store_model_lods(session, store, "m1", mesh, "uploads/m1.stl")
+    assert session.query(type(rows[0])).count() == len(rows)
+
+def test_replacing_lods_deletes_unreferenced_blobs(in_memory_db, tmp_path):
+    session = in_memory_db()
+    store = ContentStore(str(tmp_path))
+    mesh = torus(n_major=200, n_minor=100)
+    old = [row.content_key for row in store_model_lods(session, store, "m1", mesh, "uploads/m1.stl")[1:]]
+    # Another model shares the same blobs
+    store_model_lods(session, store, "m2", mesh, "uploads/m2.stl")
+
+    new = store_model_lods(session, store, "m1", torus(n_major=150, n_minor=80), "uploads/m1.stl")
+    assert all(store.exists(row.content_key) for row in new[1:])
+    assert all(store.exists(key) for key in old)
+
+    store_model_lods(session, store, "m2", torus(n_major=150, n_minor=80), "uploads/m2.stl")
+    assert not any(store.exists(key) for key in old)
@@ -0,0 +1,58 @@
+# tests/test_metadata_store.py
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import ModelMetadata
+from app.services.metadata_store import bulk_upsert_model_metadata, normalize_tags, upsert_model_metadata
+
+# Fixture: in-memory SQLite
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def test_upsert_creates_then_updates_only_given_columns(session):
+    upsert_model_metadata(session, "m1", seo_title="Jarrón", tags=["jarrón"])
+    upsert_model_metadata(session, "m1", complexity_score=0.4)
+    upsert_model_metadata(session, "m1", seo_title="Jarrón espiral")
+
+    rows = session.query(ModelMetadata).filter_by(model_id="m1").all()
+    assert len(rows) == 1
+    assert rows[0].seo_title == "Jarrón espiral"
+    assert rows[0].tags == ["jarrón"]
+    assert rows[0].complexity_score == 0.4
+
+def test_bulk_upsert_merges_repeated_models(session):
+    upsert_model_metadata(session, "a", seo_title="A")
+    written = bulk_upsert_model_metadata(session, [
+        {"model_id": "a", "polygons": 10, "complexity_score": 0.1},
+        {"model_id": "b", "polygons": 20, "complexity_score": 0.2},
+        {"model_id": "a", "complexity_score": 0.3},
+        {"model_id": "c", "tags": ["c"]},
+    ])
+    assert written == 3
+    by_id = {m.model_id: m for m in session.query(ModelMetadata)}
+    assert (by_id["a"].seo_title, by_id["a"].polygons, by_id["a"].complexity_score) == ("A", 10, 0.3)
+    assert by_id["b"].polygons == 20
+    assert by_id["c"].tags == ["c"]
+
+def test_model_id_is_unique(session):
+    session.add_all([ModelMetadata(model_id="dup"), ModelMetadata(model_id="dup")])
+    with pytest.raises(IntegrityError):
+        session.commit()
+
+def test_rejects_unknown_columns(session):
+    with pytest.raises(ValueError):
+        upsert_model_metadata(session, "m1", colour="red")
+
+def test_normalize_tags():
+    assert normalize_tags(["  Dragon ", "dragon", "Fantasy  Art", "", None, 3]) == ["dragon", "fantasy art", "3"]
+    assert normalize_tags(None) == []
+    assert normalize_tags("dragon") == []
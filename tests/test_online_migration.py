@@ -0,0 +1,153 @@
+# tests/test_online_migration.py
+
+import importlib.util
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from app.db.models import OnlineMigrationCheckpoint
+from app.db.online_migration import (
+    MigrationBudget,
+    MigrationBudgetExceeded,
+    backfill,
+    with_lock_budget,
+)
+
+MIGRATION = Path(__file__).resolve().parents[1] / " alembic" / "versions" / "012_add_model_metadata_task_id.py"
+
+BUDGET = MigrationBudget.from_settings(batch_size=4, batch_sleep_seconds=0, max_replica_lag_seconds=0)
+
+# Fixture: SQLite file with model_metadata as it was before revision 012
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'online.db'}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE model_metadata (id INTEGER PRIMARY KEY, model_id VARCHAR(36), tags JSON)")
+        conn.execute(
+            text("INSERT INTO model_metadata (id, model_id, tags) VALUES (:id, :model_id, :tags)"),
+            [
+                {"id": i, "model_id": f"m{i}", "tags": json.dumps([" Dragon", "dragon"] if i % 2 else ["ok"])}
+                for i in range(1, 11)
+            ],
+        )
+    yield engine
+    engine.dispose()
+
+def _load_migration():
+    spec = importlib.util.spec_from_file_location("migration_012", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _tags(engine):
+    with engine.connect() as conn:
+        return {row.id: json.loads(row.tags) for row in conn.execute(text("SELECT id, tags FROM model_metadata"))}
+
+def _checkpoint(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(select(OnlineMigrationCheckpoint.__table__).where(
+            OnlineMigrationCheckpoint.name == name
+        )).first()
+
+def _record_batches(batches):
+    def apply_batch(conn, rows):
+        batches.append([row.id for row in rows])
+        return len(rows)
+    return apply_batch
+
+def test_backfill_walks_keyset_batches_and_completes_once(engine):
+    migration = _load_migration()
+    batches = []
+    result = backfill(engine, "ids", migration.model_metadata, _record_batches(batches), budget=BUDGET)
+
+    assert result.completed and result.rows == 10
+    assert batches == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    checkpoint = _checkpoint(engine, "ids")
+    assert (checkpoint.last_key, checkpoint.rows_done, checkpoint.batches) == (10, 10, 3)
+    assert checkpoint.completed_at is not None
+
+    again = backfill(engine, "ids", migration.model_metadata, _record_batches(batches), budget=BUDGET)
+    assert again.completed and len(batches) == 3
+
+def test_interrupted_backfill_resumes_after_last_committed_batch(engine):
+    migration = _load_migration()
+    table = migration.model_metadata
+    first = backfill(engine, "resume", table, _record_batches([]), budget=BUDGET, max_batches=1)
+    assert not first.completed
+
+    def failing(conn, rows):
+        conn.execute(text("UPDATE model_metadata SET model_id = 'changed' WHERE id = :id"), {"id": rows[0].id})
+        raise RuntimeError("worker killed")
+
+    with pytest.raises(RuntimeError):
+        backfill(engine, "resume", table, failing, budget=BUDGET)
+    # The failed batch rolled back together with its checkpoint
+    assert _checkpoint(engine, "resume").last_key == 4
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT model_id FROM model_metadata WHERE id = 5")).scalar() == "m5"
+
+    batches = []
+    resumed = backfill(engine, "resume", table, _record_batches(batches), budget=BUDGET)
+    assert resumed.resumed_from == 4
+    assert batches == [[5, 6, 7, 8], [9, 10]]
+    assert _checkpoint(engine, "resume").rows_done == 10
+
+def test_migration_012_adds_task_id_and_normalizes_tags(engine):
+    migration = _load_migration()
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"transactional_ddl": True})
+        with Operations.context(context), context.begin_transaction():
+            migration.upgrade()
+
+    columns = {c["name"] for c in inspect(engine).get_columns("model_metadata")}
+    assert "task_id" in columns
+    assert "ix_model_metadata_task_id" in {i["name"] for i in inspect(engine).get_indexes("model_metadata")}
+    assert set(map(tuple, _tags(engine).values())) == {("dragon",), ("ok",)}
+    checkpoint = _checkpoint(engine, migration.TAGS_BACKFILL)
+    assert checkpoint.rows_done == 5 and checkpoint.completed_at is not None
+
+class _LockTimeout(Exception):
+    pgcode = "55P03"
+
+class _FakePostgresConnection:
+    dialect = SimpleNamespace(name="postgresql")
+
+    def __init__(self):
+        self.statements = []
+
+    def begin_nested(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def exec_driver_sql(self, sql):
+        self.statements.append(sql)
+
+def test_lock_budget_retries_ddl_until_lock_is_acquired(monkeypatch):
+    monkeypatch.setattr("app.db.online_migration.time.sleep", lambda seconds: None)
+    conn = _FakePostgresConnection()
+    attempts = []
+
+    def alter():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise DBAPIError("ALTER TABLE", {}, _LockTimeout())
+        return "done"
+
+    budget = MigrationBudget.from_settings(lock_timeout_ms=250, lock_retries=3)
+    assert with_lock_budget(conn, alter, budget) == "done"
+    assert conn.statements.count("SET LOCAL lock_timeout = '250ms'") == 3
+
+    attempts.clear()
+    with pytest.raises(MigrationBudgetExceeded):
+        with_lock_budget(conn, alter, MigrationBudget.from_settings(lock_retries=2))
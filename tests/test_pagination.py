@@ -0,0 +1,76 @@
+# tests/test_pagination.py
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import ModelMetadata
+from app.db.pagination import InvalidCursor, keyset_pages, paginate, stream
+
+# Fixture: SQLite con 25 modelos; varios comparten updated_at
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    start = datetime(2026, 1, 1)
+    session.add_all([
+        ModelMetadata(model_id=f"m{i:02d}", updated_at=start + timedelta(days=i // 3)) for i in range(25)
+    ])
+    session.commit()
+    yield session
+    session.close()
+
+def walk(session, order_by, limit, descending=False):
+    pages, cursor = [], None
+    while True:
+        page = paginate(session, select(ModelMetadata), order_by, cursor, limit, descending)
+        pages.append([m.model_id for m in page.items])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+def test_pages_cover_all_rows_once(session):
+    pages = walk(session, [ModelMetadata.id], 10)
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert sum(pages, []) == [f"m{i:02d}" for i in range(25)]
+
+def test_ties_are_broken_by_primary_key(session):
+    pages = walk(session, [ModelMetadata.updated_at, ModelMetadata.id], 4, descending=True)
+    assert sum(pages, []) == [f"m{i:02d}" for i in reversed(range(25))]
+
+def test_inserts_between_pages_do_not_shift_results(session):
+    first = paginate(session, select(ModelMetadata), [ModelMetadata.id], limit=10)
+    session.add(ModelMetadata(model_id="late"))
+    session.commit()
+    second = paginate(session, select(ModelMetadata), [ModelMetadata.id], first.next_cursor, 10)
+    assert [m.model_id for m in second.items] == [f"m{i:02d}" for i in range(10, 20)]
+
+def test_rejects_foreign_or_corrupt_cursors(session):
+    page = paginate(session, select(ModelMetadata), [ModelMetadata.id], limit=5)
+    with pytest.raises(InvalidCursor):
+        paginate(session, select(ModelMetadata), [ModelMetadata.updated_at, ModelMetadata.id], page.next_cursor)
+    with pytest.raises(InvalidCursor):
+        paginate(session, select(ModelMetadata), [ModelMetadata.id], "not-a-cursor")
+
+def test_stream_yields_all_rows_in_batches(session):
+    rows = list(stream(session, select(ModelMetadata.model_id).order_by(ModelMetadata.id), batch_size=7))
+    assert [r.model_id for r in rows] == [f"m{i:02d}" for i in range(25)]
+
+def test_keyset_pages_read_each_page_in_its_own_session(session):
+    factory = sessionmaker(bind=session.get_bind())
+    opened = []
+
+    def open_session():
+        opened.append(factory())
+        return opened[-1]
+
+    stmt = select(ModelMetadata.id, ModelMetadata.model_id)
+    pages = [[r.model_id for r in page] for page in keyset_pages(open_session, stmt, [ModelMetadata.id], limit=10)]
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert sum(pages, []) == [f"m{i:02d}" for i in range(25)]
+    assert len(opened) == 3
+    assert not any(s.in_transaction() for s in opened)
@@ -0,0 +1,116 @@
+# tests/test_print_time_calibration.py
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import ModelFile, ModelMetadata, Project, ProjectCost
+from app.services.print_time_calibration import (
+    ANY,
+    PrintTimeCalibrator,
+    build_features,
+    fit_ridge,
+)
+
+# Fixture: in-memory SQLite
+@pytest.fixture
+def in_memory_db():
+    engine = create_engine("sqlite:///:memory:")
+    TestingSessionLocal = sessionmaker(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return TestingSessionLocal
+
+def _seed_projects(session, n=30, factor=1.5, material="PLA", metadata=None, first_model=1):
+    """Projects of one or two models; each model takes ``raw * factor + 0.5`` hours."""
+    metadata = metadata or session
+    rng = np.random.default_rng(0)
+    model_id = first_model
+    for i in range(n):
+        raws = rng.uniform(1.0, 20.0, size=1 + i % 2)
+        project = Project(name=f"p{i}", actual_hours=float(sum(raws * factor + 0.5)))
+        session.add(project)
+        session.flush()
+        session.add(ProjectCost(category="material", item_name=material, unit_cost=1.0, project_id=project.id))
+        for raw in raws:
+            session.add(ModelFile(id=model_id, filename=f"m{model_id}.stl", project_id=project.id))
+            metadata.add(ModelMetadata(model_id=str(model_id), raw_time_minutes=float(raw * 60),
+                                       estimated_time_minutes=float(raw * 60 * factor)))
+            model_id += 1
+    session.commit()
+    metadata.commit()
+
+def test_fit_ridge_recovers_linear_relation():
+    raw = np.linspace(1, 10, 50)
+    X = build_features(raw, np.zeros(50), np.zeros(50))
+    coef, loo = fit_ridge(X, 2.0 * raw + 1.0, alpha=1e-9)
+    assert coef[0] == pytest.approx(1.0, abs=1e-6)
+    assert coef[1] == pytest.approx(2.0, abs=1e-6)
+    assert np.allclose(loo, 2.0 * raw + 1.0, atol=1e-5)
+
+def test_fit_persists_groups_and_improves_mape(in_memory_db):
+    session = in_memory_db()
+    _seed_projects(session)
+    calibrator = PrintTimeCalibrator(session, alpha=1e-6)
+    fits = calibrator.fit()
+    calibrator.save(fits)
+
+    groups = {(f.material, f.printer_profile) for f in fits}
+    assert groups == {(ANY, ANY), ("PLA", ANY)}
+    for fit in fits:
+        assert fit.mape < fit.baseline_mape
+
+    report = calibrator.report()
+    assert len(report) == 2
+    assert all(r["mape"] is not None for r in report)
+
+def test_calibrate_minutes_uses_most_specific_group(in_memory_db):
+    session = in_memory_db()
+    _seed_projects(session)
+    calibrator = PrintTimeCalibrator(session, alpha=1e-6)
+    calibrator.save(calibrator.fit())
+
+    calibrated = calibrator.calibrate_minutes(600.0, "pla", "unknown-printer")
+    assert calibrated == pytest.approx((10.0 * 1.5 + 0.5) * 60.0, rel=1e-3)
+
+def test_calibrate_minutes_without_history_returns_raw(in_memory_db):
+    session = in_memory_db()
+    calibrator = PrintTimeCalibrator(session)
+    calibrator.save(calibrator.fit())
+    assert calibrator.calibrate_minutes(42.0, "PETG") == 42.0
+
+def test_history_sums_the_features_of_each_project_model(in_memory_db):
+    session = in_memory_db()
+    project = Project(name="two parts", actual_hours=5.0)
+    session.add(project)
+    session.flush()
+    session.add_all([
+        ModelFile(id=1, filename="a.stl", project_id=project.id),
+        ModelFile(id=2, filename="b.stl", project_id=project.id),
+        ModelMetadata(model_id="1", raw_time_minutes=60.0, polygons=1000, complexity_score=0.2),
+        ModelMetadata(model_id="2", raw_time_minutes=120.0, polygons=3000, complexity_score=0.4),
+    ])
+    # A project with a model the estimator has not seen is left out
+    other = Project(name="unestimated", actual_hours=2.0)
+    session.add(other)
+    session.flush()
+    session.add(ModelFile(id=3, filename="c.stl", project_id=other.id))
+    session.commit()
+
+    history = PrintTimeCalibrator(session).load_history()
+    assert history["X"].tolist() == [pytest.approx([2.0, 3.0, 4.0, 0.6])]
+    assert history["y"].tolist() == [5.0]
+
+def test_history_merges_projects_from_every_shard(in_memory_db):
+    shard_engine = create_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=shard_engine)
+    primary, shard = in_memory_db(), sessionmaker(bind=shard_engine)()
+    _seed_projects(primary, n=5)
+    # Model metadata lives on the primary, the projects and model files on the shard
+    _seed_projects(shard, n=4, material="PETG", metadata=primary, first_model=100)
+
+    history = PrintTimeCalibrator(primary).load_history([primary, shard])
+    assert len(history["y"]) == 9
+    assert sorted(set(history["material"])) == ["PETG", "PLA"]
+    assert history["X"][:, 0].sum() == 7 + 6
@@ -0,0 +1,46 @@
+# tests/test_queries.py
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.db.base import Base
+from app.db.instrumentation import StatementRecorder
+from app.db.models import ModelLod, ModelMetadata
+from app.db.queries import LODS_FOR_MODEL, METADATA_BY_MODEL_ID, METADATA_GEOMETRY
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add_all([ModelMetadata(model_id=f"m{i}", polygons=i * 10, complexity_score=i / 10) for i in range(5)])
+        db.add_all([
+            ModelLod(model_id="m1", level=level, triangle_count=100 >> level, size_bytes=1000 >> level, content_key="k")
+            for level in (2, 0, 1)
+        ])
+        db.commit()
+    return engine
+
+
+def test_prebuilt_statements_match_query_api(engine):
+    with Session(engine) as db:
+        assert db.execute(METADATA_BY_MODEL_ID, {"model_id": "m3"}).scalars().first() is \
+            db.query(ModelMetadata).filter_by(model_id="m3").first()
+        assert tuple(db.execute(METADATA_GEOMETRY, {"model_id": "m2"}).first()) == (20, 0.2)
+        assert db.execute(METADATA_GEOMETRY, {"model_id": "missing"}).first() is None
+        assert [lod.level for lod in db.execute(LODS_FOR_MODEL, {"model_id": "m1"}).scalars()] == [0, 1, 2]
+
+
+def test_reports_compile_cache_hit_rate(engine):
+    recorder = StatementRecorder()
+    recorder.instrument(engine)
+    with Session(engine) as db:
+        for i in range(5):
+            db.execute(METADATA_BY_MODEL_ID, {"model_id": f"m{i}"}).scalars().first()
+    recorder.uninstrument(engine)
+
+    cache = recorder.report()["compile_cache"]
+    assert cache["miss"] == 1 and cache["hit"] == 4
+    assert cache["hit_rate"] == pytest.approx(0.8)
@@ -0,0 +1,95 @@
+# tests/test_shape_index.py
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from mesh_fixtures import box, rotate_z
+from app.db.base import Base
+from app.db.models import ModelMetadata, ModelShapeDescriptor
+from app.services import shape_index as shape_index_module
+from app.services.mesh_io import parse_stl, stl_bytes
+from app.services.shape_index import (
+    DESCRIPTOR_SIZE,
+    ShapeIndex,
+    compute_descriptor,
+    find_similar_models,
+    store_descriptor,
+)
+
+# Fixture: in-memory SQLite and a fresh per-test index
+@pytest.fixture
+def in_memory_db(monkeypatch):
+    engine = create_engine("sqlite:///:memory:")
+    TestingSessionLocal = sessionmaker(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(shape_index_module, "shape_index", ShapeIndex())
+    return TestingSessionLocal
+
+def test_stl_round_trip():
+    triangles = box(2, 3, 4)
+    assert np.array_equal(parse_stl(stl_bytes(triangles)), triangles)
+
+def test_descriptor_is_pose_and_scale_invariant():
+    base = compute_descriptor(box(1, 2, 4))
+    moved = compute_descriptor(rotate_z(box(1, 2, 4) * 10 + 5, 0.7))
+    other = compute_descriptor(box(1, 1, 1))
+    assert base.shape == (DESCRIPTOR_SIZE,)
+    assert base.dtype == np.float32
+    assert np.linalg.norm(base - moved) < 0.5 * np.linalg.norm(base - other)
+
+def test_query_matches_brute_force():
+    rng = np.random.default_rng(1)
+    vectors = rng.random((2000, DESCRIPTOR_SIZE)).astype(np.float32)
+    index = ShapeIndex()
+    index.add([str(i) for i in range(len(vectors))], vectors)
+    q = vectors[7]
+    result = index.query(q, k=5, exclude="7")
+    brute = np.argsort(np.linalg.norm(vectors - q, axis=1))[1:6]
+    assert [r.model_id for r in result] == [str(i) for i in brute]
+
+def test_find_similar_models_offers_metadata(in_memory_db):
+    session = in_memory_db()
+    session.add(ModelMetadata(model_id="cube", seo_title="Cubo", tags=["cubo"], complexity_score=0.1))
+    session.commit()
+    store_descriptor(session, "cube", compute_descriptor(box(1, 1, 1)))
+    store_descriptor(session, "plank", compute_descriptor(box(1, 8, 0.2)))
+    store_descriptor(session, "new", compute_descriptor(rotate_z(box(3, 3, 3), 0.3)))
+
+    # Un índice nuevo debe sincronizarse desde la tabla
+    shape_index_module.shape_index = ShapeIndex()
+    matches = find_similar_models(session, "new", k=2)
+    assert [m.model_id for m, _ in matches] == ["cube", "plank"]
+    assert matches[0][1].seo_title == "Cubo"
+    assert find_similar_models(session, "missing") is None
+
+def test_sync_reloads_late_commits_and_deletes(in_memory_db):
+    session = in_memory_db()
+    clock = [0.0]
+    index = ShapeIndex(full_sync_seconds=60, check_seconds=0, clock=lambda: clock[0])
+    shape_index_module.shape_index = index
+    store_descriptor(session, "a", compute_descriptor(box(1, 1, 1)))
+    store_descriptor(session, "b", compute_descriptor(box(1, 2, 4)))
+    index.sync(session)
+    assert sorted(index.model_ids) == ["a", "b"]
+
+    # A row with a lower id committed after "b" was seen, and "a" deleted
+    session.add(ModelShapeDescriptor(id=0, model_id="late", version=1, descriptor=compute_descriptor(box(2, 2, 1)).tobytes()))
+    session.query(ModelShapeDescriptor).filter_by(model_id="a").delete()
+    session.commit()
+    index.sync(session)
+    assert sorted(index.model_ids) == ["b", "late"]
+    assert index.query(compute_descriptor(box(1, 1, 1)), k=5)[0].model_id in ("b", "late")
+
+    # An in-place update keeps the count and the ids: the periodic reload picks it up
+    replacement = compute_descriptor(box(5, 1, 1))
+    session.query(ModelShapeDescriptor).filter_by(model_id="late").update(
+        {"descriptor": replacement.tobytes()}
+    )
+    session.commit()
+    index.sync(session)
+    assert not np.array_equal(index.vector("late"), replacement)
+    clock[0] = 61.0
+    index.sync(session)
+    assert np.array_equal(index.vector("late"), replacement)
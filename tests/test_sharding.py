@@ -0,0 +1,171 @@
+# tests/test_sharding.py
+
+import io
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+
+from app.db.base import Base
+from app.db.models import (
+    InventoryTransaction, Material, ModelFile, ModelMetadata, Project, ProjectCost, Quote, User,
+)
+from app.db.sharding import (
+    MOVING,
+    ShardMoveError,
+    ShardRouter,
+    TenantMovingError,
+    TenantRequiredError,
+    move_tenant,
+    tenant_context,
+    tenants_on,
+)
+from app.services.bulk_io import import_file
+import app.db.sharding as sharding
+
+# Fixture: a directory database and two shards, each one a SQLite file
+@pytest.fixture
+def router(tmp_path):
+    engines = {}
+    for name in ("directory", "a", "b"):
+        engines[name] = create_engine(f"sqlite:///{tmp_path / name}.db")
+        Base.metadata.create_all(bind=engines[name])
+    with engines["directory"].begin() as conn:
+        conn.execute(User.__table__.insert(), [
+            {"id": i, "name": f"user{i}", "email": f"user{i}@example.com"} for i in (1, 2, 3)
+        ])
+    router = ShardRouter(engines["directory"], {"a": engines["a"], "b": engines["b"]}, cache_seconds=0)
+    yield router
+    for engine in engines.values():
+        engine.dispose()
+
+def _count(engine, model, **filters):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model).filter_by(**filters)).scalar()
+
+def _seed_tenant(router, user_id, first_id=1):
+    """Rows of one tenant; ``first_id`` stands in for the shard id ranges of PostgreSQL."""
+    with router.session(user_id) as db:
+        project = Project(id=first_id, name="farm", status="IN_PROGRESS", budget=100.0, user_id=user_id)
+        material = Material(id=first_id, name="PLA", cost_per_unit=20.0, current_stock=5.0, user_id=user_id)
+        db.add_all([project, material, Quote(id=first_id, client_name="acme", total_amount=50.0, user_id=user_id)])
+        db.flush()
+        db.add_all([
+            ModelFile(id=first_id, filename="part.stl", project_id=project.id),
+            ProjectCost(id=first_id, category="material", item_name="PLA", unit_cost=20.0, project_id=project.id),
+            InventoryTransaction(id=first_id, transaction_type="in", quantity=5.0, material_id=material.id),
+        ])
+        db.commit()
+        return project.id
+
+def test_new_tenants_go_to_the_least_loaded_shard(router):
+    assert [router.entry(user_id).shard for user_id in (1, 2, 3)] == ["a", "b", "a"]
+    # The user row is copied so the shard's foreign keys hold
+    assert _count(router.shards["b"], User, id=2) == 1
+    assert _count(router.shards["a"], User, id=2) == 0
+
+def test_sessions_route_tenant_tables_to_the_tenant_shard(router):
+    _seed_tenant(router, 1)
+    _seed_tenant(router, 2)
+    assert _count(router.shards["a"], Project, user_id=1) == 1
+    assert _count(router.shards["b"], Project, user_id=2) == 1
+    assert _count(router.shards["a"], Project, user_id=2) == 0
+
+    with tenant_context(2), router.session() as db:
+        assert db.execute(select(Project.name, Project.user_id)).all() == [("farm", 2)]
+        assert db.execute(text("SELECT count(*) FROM quotes")).scalar() == 1
+        # Global tables stay on the primary
+        db.add(ModelMetadata(model_id="m1"))
+        db.commit()
+    assert _count(router.directory, ModelMetadata) == 1
+    assert _count(router.shards["b"], ModelMetadata) == 0
+
+def test_tenants_on_lists_the_users_of_one_shard(router):
+    router.entry(1)
+    router.entry(2)
+    with router.directory.connect() as conn:
+        assert conn.execute(tenants_on("a")).scalars().all() == [1]
+        assert conn.execute(tenants_on("b")).scalars().all() == [2]
+        # Users without an entry count on the default shard
+        assert conn.execute(tenants_on("default")).scalars().all() == [3]
+
+def test_tenant_tables_require_a_tenant(router):
+    with router.session() as db:
+        with pytest.raises(TenantRequiredError):
+            db.execute(select(Project))
+        assert db.execute(select(User.name).where(User.id == 1)).scalar() == "user1"
+    with router.session(1) as db:
+        db.add(Project(name="x", user_id=2))
+        with pytest.raises(TenantRequiredError):
+            db.flush()
+
+def test_move_tenant_keeps_ids_and_syncs_changes_made_during_the_copy(router, monkeypatch):
+    project_id = _seed_tenant(router, 1)
+    _seed_tenant(router, 2, first_id=1000)
+    source, target = router.shards["a"], router.shards["b"]
+    real_sync = sharding.sync_tenant
+    calls = []
+
+    def sync_with_concurrent_writes(src, dst, user_id, batch_size):
+        if not calls:
+            # The tenant is still writable while its rows are copied
+            with router.session(1) as db:
+                db.get(Project, project_id).name = "renamed"
+                db.delete(db.execute(select(Quote)).scalar_one())
+                db.add(Material(name="PETG", cost_per_unit=25.0, user_id=1))
+                db.commit()
+        calls.append(router.lookup(user_id).state)
+        return real_sync(src, dst, user_id, batch_size)
+
+    def frozen_sleep(seconds):
+        if router.lookup(1).state == MOVING:
+            with router.session(1) as db:
+                db.add(Quote(client_name="late", user_id=1))
+                with pytest.raises(TenantMovingError):
+                    db.flush()
+
+    monkeypatch.setattr(sharding, "sync_tenant", sync_with_concurrent_writes)
+    result = move_tenant(router, 1, "b", batch_size=1, sleep=frozen_sleep)
+
+    assert calls == ["active", MOVING]
+    assert (result.source, result.target, result.rows_copied) == ("a", "b", 6)
+    assert router.lookup(1).shard == "b" and router.lookup(1).state == "active"
+    with router.session(1) as db:
+        assert db.get(Project, project_id).name == "renamed"
+        # Shards hold several tenants: routing does not filter rows by user_id
+        assert sorted(db.execute(select(Material.name).filter_by(user_id=1)).scalars()) == ["PETG", "PLA"]
+        assert db.execute(select(func.count()).select_from(Quote).filter_by(user_id=1)).scalar() == 0
+        assert db.get(ModelFile, 1).project_id == project_id
+    for model in (Project, Material, Quote, ModelFile, ProjectCost, InventoryTransaction):
+        assert _count(source, model) == 0
+    # The other tenant on the target was not touched
+    assert _count(target, Project, user_id=2) == 1
+
+def test_failed_move_unfreezes_the_tenant_and_cleans_the_target(router):
+    _seed_tenant(router, 1)
+    router.entry(2)
+    with router.shards["b"].begin() as conn:
+        # Another tenant already owns the same project id on the target
+        conn.execute(Project.__table__.insert().values(id=1, name="taken", user_id=2))
+
+    with pytest.raises(ShardMoveError):
+        move_tenant(router, 1, "b", sleep=lambda seconds: None)
+    assert router.lookup(1).shard == "a" and router.lookup(1).state == "active"
+    assert _count(router.shards["b"], Material, user_id=1) == 0
+    assert _count(router.shards["a"], Project, user_id=1) == 1
+
+def test_bulk_import_checks_the_tenant_of_each_chunk(router):
+    router.entry(1), router.entry(2)
+    catalog = b"name,cost_per_unit,user_id\nPLA,20,\nPETG,25,2\nTPU,30,1\n"
+    with router.session(1) as db:
+        report = import_file(db, "materials", io.BytesIO(catalog), "csv", user_id=1)
+    assert (report.imported, report.rejected) == (2, 1)
+    assert report.errors[0]["line"] == 3
+    assert _count(router.shards["a"], Material, user_id=1) == 2
+    assert _count(router.shards["a"], Material, user_id=2) == 0
+
+    # A frozen tenant writes no chunk to the shard it is leaving
+    sharding._set_entry(router.directory, 1, state=MOVING, moving_to="b")
+    with router.session(1) as db:
+        with pytest.raises(TenantMovingError):
+            import_file(db, "materials", io.BytesIO(catalog), "csv", user_id=1, chunk_rows=1)
+    assert _count(router.shards["a"], Material, user_id=1) == 2
@@ -0,0 +1,80 @@
+# tests/test_sql_instrumentation.py
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.instrumentation import StatementRecorder, fingerprint, fingerprint_id
+from app.db.models import ModelMetadata
+
+
+@pytest.fixture
+def recorder():
+    return StatementRecorder(slow_seconds=10, n_plus_one_threshold=5)
+
+
+@pytest.fixture
+def engine(recorder, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sql.db'}")
+    Base.metadata.create_all(bind=engine)
+    recorder.instrument(engine)
+    return engine
+
+
+def test_fingerprint_strips_literals_and_parameter_lists():
+    a = fingerprint("SELECT * FROM t WHERE t.id IN (?, ?, ?) AND t.name = 'x' LIMIT 10")
+    b = fingerprint("SELECT *\nFROM t WHERE t.id IN (?) AND t.name = 'other' LIMIT 20")
+    assert a == b == "SELECT * FROM t WHERE t.id IN (...) AND t.name = ? LIMIT ?"
+
+
+def test_records_statement_latency(recorder, engine):
+    with engine.connect() as conn:
+        for _ in range(3):
+            conn.execute(text("SELECT count(*) FROM model_metadata")).scalar()
+    key = fingerprint_id("SELECT count(*) FROM model_metadata")
+    stats = recorder.stats[key]
+    assert stats.calls == 3 and stats.max_seconds > 0
+    assert REGISTRY.get_sample_value("db_statement_duration_seconds_count", {"statement": key}) >= 3
+    assert recorder.report()["statements"][0]["statement_id"] == key
+
+
+def test_flags_n_plus_one_per_unit(recorder, engine):
+    session = sessionmaker(bind=engine)()
+    session.add_all([ModelMetadata(model_id=str(i)) for i in range(6)])
+    session.commit()
+
+    with recorder.unit_of_work("GET /models") as unit:
+        for i in range(6):
+            session.execute(select(ModelMetadata).filter_by(model_id=str(i))).scalar_one()
+    with recorder.unit_of_work("GET /models/bulk"):
+        session.execute(select(ModelMetadata)).scalars().all()
+    session.close()
+
+    assert unit.statements >= 6
+    incidents = recorder.report()["n_plus_one"]
+    assert [i["unit"] for i in incidents] == ["GET /models"]
+    assert incidents[0]["executions"] == 6
+    assert "model_metadata.model_id = ?" in incidents[0]["statement"]
+    assert REGISTRY.get_sample_value(
+        "db_n_plus_one_total", {"unit": "GET /models", "statement": incidents[0]["statement_id"]}
+    ) == 1
+
+
+def test_async_statements_count_in_unit(recorder, tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+    recorder.instrument(engine)
+
+    async def scenario():
+        with recorder.unit_of_work("GET /async") as unit:
+            async with AsyncSession(engine) as session:
+                for _ in range(2):
+                    await session.execute(text("SELECT 1"))
+        await engine.dispose()
+        return unit
+
+    assert asyncio.run(scenario()).statements == 2
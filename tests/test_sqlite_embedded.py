@@ -0,0 +1,113 @@
+# tests/test_sqlite_embedded.py
+
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.db.models import ModelMetadata
+from app.db.sqlite import SingleWriter, backup_sqlite, configure_sqlite, restore_sqlite, sqlite_path
+from app.services.metadata_store import upsert_model_metadata
+
+PRAGMAS = {"journal_mode": "WAL", "synchronous": "NORMAL", "busy_timeout": 4000, "mmap_size": 1 << 20}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'embedded.db'}")
+    configure_sqlite(engine, PRAGMAS)
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def writer(engine):
+    writer = SingleWriter(
+        sessionmaker(bind=engine.execution_options(sqlite_begin="IMMEDIATE"), expire_on_commit=False),
+        batch_size=20,
+        batch_seconds=0.05,
+    )
+    yield writer
+    writer.close()
+
+
+def _count(engine):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(ModelMetadata)).scalar()
+
+
+def test_pragmas_are_applied_per_connection(engine):
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 4000
+        assert conn.exec_driver_sql("PRAGMA mmap_size").scalar() == 1 << 20
+
+
+def test_savepoints_work_with_explicit_begin(engine):
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add(ModelMetadata(model_id="kept"))
+        with pytest.raises(RuntimeError):
+            with db.begin_nested():
+                db.add(ModelMetadata(model_id="discarded"))
+                db.flush()
+                raise RuntimeError("boom")
+        db.commit()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT model_id FROM model_metadata")).scalars().all() == ["kept"]
+
+
+def test_single_writer_batches_concurrent_jobs(engine, writer):
+    def task(i):
+        writer.run(lambda db: upsert_model_metadata(db, f"m{i}", commit=False, polygons=i))
+
+    threads = [threading.Thread(target=task, args=(i,)) for i in range(60)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _count(engine) == 60
+    assert writer.jobs == 60
+    assert writer.batches < 60
+
+
+def test_failed_job_does_not_discard_its_batch(engine, writer):
+    def fail(db):
+        upsert_model_metadata(db, "bad", commit=False, polygons=1)
+        raise ValueError("invalid")
+
+    ok = [writer.submit(lambda db, i=i: upsert_model_metadata(db, f"ok{i}", commit=False)) for i in range(3)]
+    bad = writer.submit(fail)
+    with pytest.raises(ValueError):
+        bad.result(5)
+    for future in ok:
+        future.result(5)
+
+    with engine.connect() as conn:
+        ids = set(conn.execute(text("SELECT model_id FROM model_metadata")).scalars())
+    assert ids == {"ok0", "ok1", "ok2"}
+
+
+def test_backup_includes_wal_pages_and_restores(engine, writer, tmp_path):
+    writer.run(lambda db: upsert_model_metadata(db, "before", commit=False))
+    backup = tmp_path / "backup.db"
+    backup_sqlite(sqlite_path(str(engine.url)), str(backup))
+    writer.run(lambda db: upsert_model_metadata(db, "after", commit=False))
+
+    with sqlite3.connect(backup) as conn:
+        assert [r[0] for r in conn.execute("SELECT model_id FROM model_metadata")] == ["before"]
+    restore_sqlite(str(backup), sqlite_path(str(engine.url)))
+    assert _count(engine) == 1
+
+
+def test_sqlite_path():
+    assert sqlite_path("sqlite:///data/app.db") == "data/app.db"
+    assert sqlite_path("sqlite+aiosqlite:////srv/app.db?timeout=5") == "/srv/app.db"
+    assert sqlite_path("sqlite://") is None
+    assert sqlite_path("postgresql://u@h/db") is None
@@ -0,0 +1,120 @@
+# tests/test_task_batching.py
+
+from types import SimpleNamespace
+
+import pytest
+from celery import Celery
+from celery.exceptions import Retry
+
+from app.core.task_batching import BatchedTask
+
+class FakeRedis:
+    """The list, string and expiry commands the batcher uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+        return len(self.data[key])
+
+    def lrange(self, key, start, stop):
+        return self.data.get(key, [])[start:stop + 1]
+
+    def ltrim(self, key, start, stop):
+        self.data[key] = self.data.get(key, [])[start:]
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode()
+        return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def expire(self, key, seconds):
+        pass
+
+def worker_task(retries=0, max_retries=3):
+    def retry(exc=None, countdown=None):
+        return Retry(exc=exc, when=countdown)
+    task = SimpleNamespace(request=SimpleNamespace(retries=retries), max_retries=max_retries, retry=retry)
+    task.rescheduled = []
+    task.apply_async = lambda **options: task.rescheduled.append(options)
+    return task
+
+# Fixture: app on in-memory broker and backend, with a batcher that records its calls
+@pytest.fixture
+def batcher(monkeypatch):
+    app = Celery("batching", broker="memory://", backend="cache+memory://")
+    calls = []
+
+    def handler(items):
+        calls.append([item.key for item in items])
+        if any(item.key == "boom" for item in items):
+            raise RuntimeError("upstream down")
+        return {item.key: item.key.upper() for item in items if item.key != "missing"}
+
+    batched = BatchedTask(app, handler, "app.tasks.tag_batch", max_items=3, max_wait_seconds=2.0, client=FakeRedis())
+    batched.calls = calls
+    batched.flushes = []
+    monkeypatch.setattr(batched.task, "apply_async", lambda **options: batched.flushes.append(options))
+    return batched
+
+def test_flush_is_scheduled_on_count_or_time(batcher):
+    batcher.submit(key="a")
+    assert batcher.flushes == [{"countdown": 2.0}]
+    batcher.submit(key="b")
+    batcher.submit(key="c")
+    assert batcher.flushes == [{"countdown": 2.0}, {}]
+    assert batcher.pending() == 3
+
+def test_flush_runs_batches_and_stores_each_item_result(batcher):
+    results = [batcher.submit(key=key) for key in ("a", "b", "a", "missing", "c")]
+
+    assert batcher.flush(worker_task()) == {"items": 5, "batches": 2}
+    # A repeated key is handled once per batch
+    assert batcher.calls == [["a", "b"], ["missing", "c"]]
+    assert [r.state for r in results] == ["SUCCESS", "SUCCESS", "SUCCESS", "FAILURE", "SUCCESS"]
+    assert results[2].result == "A"
+    assert batcher.pending() == 0
+    assert batcher.client.get(batcher.lock_key) is None
+
+def test_rerun_after_interrupted_flush_skips_stored_items(batcher):
+    first = batcher.submit(key="a")
+    batcher.submit(key="b")
+    # The worker stored "a" and died before trimming the list
+    batcher.app.backend.store_result(first.id, "A", "SUCCESS")
+
+    batcher.flush(worker_task())
+    assert batcher.calls == [["b"]]
+    assert batcher.pending() == 0
+
+def test_failed_batch_is_retried_then_marked_failed(batcher):
+    result = batcher.submit(key="boom")
+    with pytest.raises(Retry):
+        batcher.flush(worker_task(retries=0))
+    # Items stay buffered for the retry and the lock is released
+    assert batcher.pending() == 1
+    assert batcher.client.get(batcher.lock_key) is None
+
+    batcher.flush(worker_task(retries=3))
+    assert result.state == "FAILURE"
+    assert "upstream down" in str(result.result)
+    assert batcher.pending() == 0
+
+def test_concurrent_flush_leaves_items_to_the_lock_holder(batcher):
+    batcher.submit(key="a")
+    batcher.client.set(batcher.lock_key, "other-worker", nx=True)
+    task = worker_task()
+    assert batcher.flush(task)["skipped"]
+    assert batcher.pending() == 1
+    # Items pushed after the holder's last read still get a flush
+    assert task.rescheduled == [{"countdown": 2.0}]
@@ -0,0 +1,121 @@
+# tests/test_task_queues.py
+
+from types import SimpleNamespace
+
+import pytest
+from celery import Celery
+from celery.worker import state
+
+from app.core.task_queues import (
+    LANES,
+    LATE_ACK_LANES,
+    TASK_LANES,
+    LanePolicy,
+    QueueDepthAutoscaler,
+    TaskRoutingError,
+    queue_depths,
+    queue_settings,
+    validate_routes,
+)
+
+def noop(*args, **kwargs):
+    pass
+
+# Fixture: app on the in-memory broker with every routed task registered
+@pytest.fixture
+def app():
+    app = Celery("lanes", broker="memory://", backend="cache+memory://")
+    app.conf.update(**queue_settings())
+    for name, lane in TASK_LANES.items():
+        app.task(name=name, acks_late=lane in LATE_ACK_LANES)(noop)
+    yield app
+    with app.connection_for_write() as conn:
+        channel = conn.default_channel
+        for queue in LANES:
+            channel.queue_purge(queue)
+
+def test_every_registered_task_has_a_lane(app):
+    validate_routes(app)
+
+    app.conf.beat_schedule = {"nightly": {"task": "app.tasks.backup_database", "schedule": 60}}
+    app.task(name="app.tasks.forgotten_task")(noop)
+    with pytest.raises(TaskRoutingError) as error:
+        validate_routes(app)
+    assert "app.tasks.forgotten_task" in str(error.value)
+    assert "beat 'nightly'" in str(error.value)
+
+def test_only_ai_lanes_acknowledge_after_running(app):
+    assert not app.conf.task_acks_late
+    assert app.tasks["app.tasks.generate_tags_task"].acks_late
+    assert not app.tasks["app.tasks.send_email_task"].acks_late
+
+    app.tasks["app.tasks.backup_database_task"].acks_late = True
+    with pytest.raises(TaskRoutingError) as error:
+        validate_routes(app)
+    assert "acks_late" in str(error.value)
+    assert "app.tasks.backup_database_task" in str(error.value)
+
+def test_tasks_land_on_their_lane_queue(app):
+    app.send_task("app.tasks.generate_tags_task", args=["m1"])
+    app.send_task("app.tasks.generate_model_lods_task", args=["url", "m1"])
+    app.send_task("app.tasks.generate_model_lods_task", args=["url", "m2"], queue="ai_interactive")
+    app.send_task("app.tasks.send_email_task", args=["a@example.com", "hola", "cuerpo"])
+
+    assert queue_depths(app, LANES) == {
+        "ai_interactive": 2, "ai_bulk": 1, "email": 1, "sync": 0, "maintenance": 0,
+    }
+
+def test_policy_sizes_the_lane_for_its_wait_target():
+    policy = LanePolicy(LANES["ai_interactive"])
+    # 3 s per task, 5 s target: 10 queued tasks need 6 processes
+    assert policy.desired(depth=10, busy=2) == 6
+    assert policy.desired(depth=100, busy=8) == LANES["ai_interactive"].max_concurrency
+    assert policy.desired(depth=0, busy=0) == LANES["ai_interactive"].min_concurrency
+    # Busy processes are never asked to go
+    assert policy.desired(depth=0, busy=4) == 4
+
+    # Measured: 4 tasks in 4 busy-seconds -> tasks take ~1 s
+    for _ in range(20):
+        policy.observe(completed=4, busy_seconds=4.0)
+    assert policy.task_seconds == pytest.approx(1.0, abs=0.01)
+    assert policy.desired(depth=9, busy=0) == 2
+
+class FakePool:
+    def __init__(self, processes):
+        self.num_processes = processes
+
+    def grow(self, n):
+        self.num_processes += n
+
+    def shrink(self, n):
+        self.num_processes -= n
+
+    def maintain_pool(self):
+        pass
+
+def test_autoscaler_follows_queue_depth(app, monkeypatch):
+    monkeypatch.setattr(state, "active_requests", set())
+    monkeypatch.setattr(state, "total_count", {})
+    app.amqp.queues.select(["ai_interactive", "email"])
+    now = [0.0]
+    pool = FakePool(3)
+    scaler = QueueDepthAutoscaler(
+        pool, 10, 3, worker=SimpleNamespace(app=app), keepalive=30, clock=lambda: now[0],
+    )
+
+    for i in range(10):
+        app.send_task("app.tasks.generate_seo_title_task", args=[f"m{i}"])
+    scaler.maybe_scale()
+    # ai_interactive: ceil(10 * 3 / 5) = 6, email: min 1
+    assert pool.num_processes == 7
+
+    with app.connection_for_write() as conn:
+        conn.default_channel.queue_purge("ai_interactive")
+    now[0] = 10.0
+    scaler.maybe_scale()
+    # Within keepalive of the last scale-up: keeps its processes
+    assert pool.num_processes == 7
+    now[0] = 45.0
+    scaler.maybe_scale()
+    assert pool.num_processes == 3
+    assert scaler.info()["desired"] == 3
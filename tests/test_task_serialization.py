@@ -0,0 +1,131 @@
+# tests/test_task_serialization.py
+
+import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+import pytest
+from celery import Celery
+
+from app.core import task_serialization
+from app.core.task_queues import TASK_LANES, TaskRoutingError
+from app.core.task_results import DAY, HOUR, RESULT_TTLS, PolicyRedisBackend, result_settings
+from app.core.task_serialization import (
+    CONTENT_TYPE,
+    RAW,
+    SERIALIZER,
+    ZSTD,
+    PayloadDecodeError,
+    dumps,
+    loads,
+    register_serializer,
+)
+
+needs_zstd = pytest.mark.skipif(task_serialization.zstandard is None, reason="zstandard not installed")
+
+def noop(*args, **kwargs):
+    pass
+
+def test_round_trip_converts_types_like_json():
+    payload = {
+        "ids": list(range(5)),
+        "when": datetime.datetime(2026, 10, 19, 20, 0),
+        "cost": Decimal("12.50"),
+        "tags": {"pla"},
+        "raw": b"\x00\x01",
+        "nested": {1: None, "ok": True},
+    }
+    assert loads(dumps(payload)) == {
+        "ids": [0, 1, 2, 3, 4],
+        "when": "2026-10-19T20:00:00",
+        "cost": "12.50",
+        "tags": ["pla"],
+        "raw": b"\x00\x01",
+        "nested": {1: None, "ok": True},
+    }
+
+@needs_zstd
+def test_only_large_payloads_are_compressed():
+    small = {"model_id": "m1"}
+    manifest = [list(range(1000))]
+    assert dumps(small)[:1] == RAW
+    body = dumps(manifest)
+    assert body[:1] == ZSTD
+    assert len(body) < len(dumps(manifest, compress_min_bytes=10**9))
+    assert loads(body) == manifest
+
+def test_without_zstd_payloads_stay_raw(monkeypatch):
+    monkeypatch.setattr(task_serialization, "zstandard", None)
+    manifest = [list(range(1000))]
+    assert dumps(manifest)[:1] == RAW
+    assert loads(dumps(manifest)) == manifest
+    with pytest.raises(PayloadDecodeError):
+        loads(ZSTD + b"compressed")
+    with pytest.raises(PayloadDecodeError):
+        loads(b"\x07")
+
+def test_celery_messages_use_the_serializer():
+    register_serializer()
+    app = Celery("codec", broker="memory://", backend="cache+memory://")
+    app.conf.update(task_serializer=SERIALIZER, accept_content=[SERIALIZER, "json"])
+    task = app.task(name="app.tasks.recompute_complexity_batch_task")(noop)
+    with app.connection_for_write() as conn:
+        task.apply_async(([1, 2, 3],), connection=conn)
+        message = conn.SimpleQueue("celery").get(timeout=1)
+    assert message.content_type == CONTENT_TYPE
+    assert message.decode()[0] == [[1, 2, 3]]
+
+def test_every_task_has_a_result_policy(monkeypatch):
+    assert RESULT_TTLS.keys() == TASK_LANES.keys()
+    app = Celery("results", broker="memory://", backend="cache+memory://")
+    app.conf.update(**result_settings())
+    assert app.task(name="app.tasks.send_email_task")(noop).ignore_result
+    assert not app.task(name="app.tasks.generate_tags_task")(noop).ignore_result
+
+    monkeypatch.setitem(TASK_LANES, "app.tasks.new_task", "ai_bulk")
+    with pytest.raises(TaskRoutingError):
+        result_settings()
+
+class FakePipeline:
+    def __init__(self, writes):
+        self.writes = writes
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def setex(self, key, ttl, value):
+        self.writes.append((key, ttl))
+
+    def set(self, key, value):
+        self.writes.append((key, None))
+
+    def publish(self, key, value):
+        pass
+
+    def execute(self):
+        pass
+
+def test_backend_stores_each_result_with_its_task_ttl():
+    app = Celery("results", broker="memory://")
+    app.conf.update(**result_settings(default_ttl=DAY))
+    backend = PolicyRedisBackend(app=app, url="redis://localhost:6379/0")
+    writes = []
+    backend.client = SimpleNamespace(get=lambda key: None, pipeline=lambda: FakePipeline(writes))
+
+    backend.store_result("t1", None, "SUCCESS", request=SimpleNamespace(task="app.tasks.generate_tags_task"))
+    backend.store_result("t2", {"status": "success"}, "SUCCESS",
+                         request=SimpleNamespace(task="app.tasks.backup_database_task"))
+    # Ignored tasks only store failures, with the default TTL
+    backend.store_result("t3", ValueError("smtp"), "FAILURE",
+                         request=SimpleNamespace(task="app.tasks.send_email_task"))
+    backend.store_result("t4", None, "SUCCESS")
+
+    assert writes == [
+        (b"celery-task-meta-t1", HOUR),
+        (b"celery-task-meta-t2", 7 * DAY),
+        (b"celery-task-meta-t3", DAY),
+        (b"celery-task-meta-t4", DAY),
+    ]